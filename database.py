@@ -2,6 +2,7 @@ from sqlalchemy.engine import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import event, exc, text
+from db_retry import RetryingSession, TRANSIENT_ERROR_CODES
 import logging
 
 # Configure logging
@@ -51,14 +52,16 @@ def receive_checkout(dbapi_conn, connection_record, connection_proxy):
 @event.listens_for(engine, "handle_error")
 def handle_error(exception_context):
     """Handle specific database errors and enable retry logic"""
-    if isinstance(exception_context.original_exception, exc.DBAPIError):
+    # original_exception is the raw driver error; the wrapped one is the DBAPIError
+    if isinstance(exception_context.sqlalchemy_exception, exc.DBAPIError):
         # Check for connection-related errors
-        error_code = str(exception_context.original_exception.orig)
-        if any(code in error_code for code in ['08S01', '08001', '40613', '40197', '40501', '40540', '10053', '10054', '0x20']):
+        error_code = str(exception_context.original_exception)
+        if any(code in error_code for code in TRANSIENT_ERROR_CODES):
             # These are transient/connection errors - mark for retry
             exception_context.is_disconnect = True
 
-SessionLocal = sessionmaker(bind=engine)
+# Read-only queries are retried on transient faults (db_retry.py)
+SessionLocal = sessionmaker(bind=engine, class_=RetryingSession)
 Base = declarative_base()
 
 
@@ -0,0 +1,224 @@
+"""
+Read Retry on Transient Azure SQL Faults
+========================================
+
+Session class (used by database.SessionLocal) that replays read-only
+queries which fail with a transient Azure SQL error - failover, throttling,
+a dropped connection - instead of surfacing them as 500s.
+
+A failed query is retried when all of these hold:
+
+- the error carries one of TRANSIENT_ERROR_CODES
+- the statement is an ORM / Core SELECT (raw text() SQL is never retried)
+- the session's current transaction has written nothing: no flush, no
+  INSERT / UPDATE / DELETE, no bulk_* call and no direct connection() use
+- the session holds no pending changes (new, dirty or deleted objects),
+  which the rollback before a retry would silently discard
+- the error was not raised by a flush: an autoflush ahead of the SELECT
+  counts as a write, whether or not it got to the database
+- the attempt limit and the process-wide retry budget allow it
+
+A retry rolls the (read-only) transaction back, so the next attempt runs on
+a fresh pooled connection - database.handle_error has already invalidated
+the broken one - after a jittered exponential backoff. Write transactions
+are never replayed: their error reaches the caller as before.
+
+The backoff sleep blocks the calling thread. That is fine in the threadpool
+(sync endpoints, scheduler jobs), but most endpoints here are `async def`
+and use the session on the event loop, where a sleep would stall every
+request of the worker. On the loop a query is therefore retried at most
+ON_LOOP_MAX_ATTEMPTS - 1 time(s), immediately and without sleeping.
+
+The retry budget allows RETRY_BUDGET_RATIO retries per successful query
+(bounded by RETRY_BUDGET_CAPACITY), so a prolonged outage fails fast
+instead of multiplying load on a recovering database. get_retry_stats()
+(shown on /health) counts retries, recoveries and give-ups by reason.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+import asyncio
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE / SQL Server / DB-Lib codes of faults worth retrying
+# (connection loss, failover, database moving or busy, resource throttling)
+TRANSIENT_ERROR_CODES = (
+    '08S01', '08001', '40613', '40197', '40501', '40540', '10053', '10054', '0x20',
+    '49918', '49919', '49920', '10928', '10929',
+)
+
+MAX_ATTEMPTS = 3
+# Attempts when called from a running event loop (no backoff sleep there)
+ON_LOOP_MAX_ATTEMPTS = 2
+BACKOFF_BASE_SECONDS = 0.1
+BACKOFF_MAX_SECONDS = 1.0
+
+# Retries earned per successful query, and the most that can be saved up
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_CAPACITY = 20.0
+
+GIVE_UP_ATTEMPTS = "attempts"
+GIVE_UP_BUDGET = "budget"
+GIVE_UP_WRITE = "write_transaction"
+GIVE_UP_PENDING = "pending_changes"
+
+
+def is_transient_error(error: BaseException) -> bool:
+    if not isinstance(error, DBAPIError):
+        return False
+    message = str(error.orig)
+    return any(code in message for code in TRANSIENT_ERROR_CODES)
+
+
+class RetryBudget:
+    """Token bucket shared by all sessions of the process."""
+
+    def __init__(self, ratio: float, capacity: float):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+_budget = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_CAPACITY)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "retries": 0,
+    "recovered": 0,
+    "gave_up": {GIVE_UP_ATTEMPTS: 0, GIVE_UP_BUDGET: 0, GIVE_UP_WRITE: 0, GIVE_UP_PENDING: 0},
+}
+
+
+def _count(key: str, reason: str = None) -> None:
+    with _stats_lock:
+        if reason is None:
+            _stats[key] += 1
+        else:
+            _stats[key][reason] += 1
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: spreads out the retries of requests that failed together
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class RetryingSession(Session):
+    """Session that replays read-only queries on transient faults (see module docstring)."""
+
+    # Set once the current transaction has written (or may have written) anything
+    _wrote = False
+
+    def execute(self, statement, *args, **kwargs):
+        if not getattr(statement, "is_select", False):
+            self._wrote = True
+            return super().execute(statement, *args, **kwargs)
+
+        attempt = 1
+        on_loop = _on_event_loop()
+        max_attempts = ON_LOOP_MAX_ATTEMPTS if on_loop else MAX_ATTEMPTS
+        while True:
+            try:
+                result = super().execute(statement, *args, **kwargs)
+            except DBAPIError as e:
+                if not is_transient_error(e):
+                    raise
+                reason = self._give_up_reason(attempt, max_attempts)
+                if reason is not None:
+                    _count("gave_up", reason)
+                    logger.warning(f"Transient database error, not retried ({reason}): {e.orig}")
+                    raise
+                # Never sleep on the event loop: it would stall every request of the worker
+                delay = 0.0 if on_loop else _backoff(attempt)
+                _count("retries")
+                logger.warning(f"Transient database error, retry {attempt}/{max_attempts - 1} "
+                               f"in {delay * 1000:.0f}ms: {e.orig}")
+                # Read-only transaction: rolling back loses nothing and releases the broken connection
+                self.rollback()
+                if delay:
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            _budget.deposit()
+            if attempt > 1:
+                _count("recovered")
+            return result
+
+    def _give_up_reason(self, attempt: int, max_attempts: int):
+        if self._wrote:
+            return GIVE_UP_WRITE
+        if self.new or self.dirty or self.deleted:
+            return GIVE_UP_PENDING
+        if attempt >= max_attempts:
+            return GIVE_UP_ATTEMPTS
+        if not _budget.withdraw():
+            return GIVE_UP_BUDGET
+        return None
+
+    def connection(self, *args, **kwargs):
+        # The caller may run anything on it
+        self._wrote = True
+        return super().connection(*args, **kwargs)
+
+    def bulk_insert_mappings(self, *args, **kwargs):
+        self._wrote = True
+        return super().bulk_insert_mappings(*args, **kwargs)
+
+    def bulk_update_mappings(self, *args, **kwargs):
+        self._wrote = True
+        return super().bulk_update_mappings(*args, **kwargs)
+
+    def bulk_save_objects(self, *args, **kwargs):
+        self._wrote = True
+        return super().bulk_save_objects(*args, **kwargs)
+
+
+@event.listens_for(RetryingSession, "before_flush")
+def _mark_flushed(session, flush_context, instances):
+    # Before, not after: a flush that fails half-way has still written
+    session._wrote = True
+
+
+@event.listens_for(RetryingSession, "after_transaction_end")
+def _reset_written(session, transaction):
+    if transaction.parent is None:
+        session._wrote = False
+
+
+def get_retry_stats() -> dict:
+    with _stats_lock:
+        return {
+            "retries": _stats["retries"],
+            "recovered": _stats["recovered"],
+            "gave_up": dict(_stats["gave_up"]),
+            "budget_tokens": round(_budget.tokens, 1),
+        }
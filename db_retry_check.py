@@ -0,0 +1,117 @@
+"""
+Read Retry Check
+================
+
+Verifies which queries db_retry.RetryingSession replays after a transient
+fault, using an in-memory SQLite database (no server needed). The next
+statement(s) matching a pattern are rewritten to fail with a message that
+carries a transient error code:
+
+- plain SELECT: retried, and the query succeeds
+- SELECT whose autoflush INSERT fails: not retried, the error reaches the
+  caller instead of a retry that succeeds without the lost INSERT
+- SELECT failing with an object pending under no_autoflush: not retried,
+  the object is not discarded by a rollback
+
+    python db_retry_check.py
+
+Exits non-zero when any case behaves differently.
+"""
+
+from sqlalchemy import Column, Integer, String, create_engine, event, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import declarative_base, sessionmaker
+import db_retry
+
+Base = declarative_base()
+
+
+class Note(Base):
+    __tablename__ = "note"
+    id = Column(Integer, primary_key=True)
+    text = Column(String(50))
+
+
+# Statements starting with this prefix fail while failures_left > 0
+_fault = {"prefix": None, "failures_left": 0}
+
+# A missing table named after a transient code: SQLite reports it as an
+# OperationalError whose message contains the code
+FAILING_STATEMENT = 'SELECT * FROM "40613 database unavailable"'
+
+
+def build_session_factory():
+    engine = create_engine("sqlite:///:memory:")
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def inject_fault(conn, cursor, statement, parameters, context, executemany):
+        if _fault["failures_left"] and statement.lstrip().upper().startswith(_fault["prefix"]):
+            _fault["failures_left"] -= 1
+            return FAILING_STATEMENT, ()
+        return statement, parameters
+
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, class_=db_retry.RetryingSession)
+
+
+def fail_next(prefix: str, times: int = 1) -> None:
+    _fault["prefix"] = prefix
+    _fault["failures_left"] = times
+
+
+def gave_up(reason: str) -> int:
+    return db_retry.get_retry_stats()["gave_up"][reason]
+
+
+def check_plain_select(Session) -> bool:
+    with Session() as db:
+        recovered = db_retry.get_retry_stats()["recovered"]
+        fail_next("SELECT")
+        rows = db.execute(select(Note)).scalars().all()
+        return rows == [] and db_retry.get_retry_stats()["recovered"] == recovered + 1
+
+
+def check_failed_autoflush(Session) -> bool:
+    with Session() as db:
+        before = gave_up(db_retry.GIVE_UP_WRITE)
+        db.add(Note(text="pending"))
+        fail_next("INSERT")
+        try:
+            db.execute(select(Note)).scalars().all()
+        except DBAPIError:
+            return gave_up(db_retry.GIVE_UP_WRITE) == before + 1
+        return False
+
+
+def check_pending_without_autoflush(Session) -> bool:
+    with Session() as db:
+        before = gave_up(db_retry.GIVE_UP_PENDING)
+        note = Note(text="pending")
+        db.add(note)
+        fail_next("SELECT")
+        try:
+            with db.no_autoflush:
+                db.execute(select(Note)).scalars().all()
+        except DBAPIError:
+            return gave_up(db_retry.GIVE_UP_PENDING) == before + 1 and note in db.new
+        return False
+
+
+def main() -> int:
+    Session = build_session_factory()
+    checks = [
+        ("plain SELECT, retried", check_plain_select),
+        ("failed autoflush, not retried", check_failed_autoflush),
+        ("pending changes, not retried", check_pending_without_autoflush),
+    ]
+    ok = True
+    for name, check in checks:
+        passed = check(Session)
+        ok = ok and passed
+        print(f"  {'PASS' if passed else 'FAIL'}  {name}")
+    print(f"  stats: {db_retry.get_retry_stats()}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+"""
+Login Throughput Benchmark
+==========================
+
+Measures the login path under a shift-start burst.
+
+In-process (default): runs a burst of concurrent bcrypt verifications on an
+event loop, once inline (the old login path) and once through the auth
+hashing pool (routers/auth.verify_password), while a heartbeat task
+measures how long the loop stalls. Also times repeated wrong-password
+logins answered by the failed-login cache. No database needed.
+
+    python login_benchmark.py --logins 40
+
+Against a running server: posts real logins to /auth/token with the given
+concurrency and reports throughput and latency percentiles.
+
+    python login_benchmark.py --url http://localhost:8080 \\
+        --username alice --password secret --logins 200 --concurrency 20
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import argparse
+import asyncio
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+HEARTBEAT_SECONDS = 0.01
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _heartbeat(stalls: List[float], stop: asyncio.Event) -> None:
+    """Record how late each tick fires: the time the loop was blocked."""
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_SECONDS
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        stalls.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _burst(verify, logins: int) -> dict:
+    stalls: List[float] = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.ensure_future(_heartbeat(stalls, stop))
+    await asyncio.sleep(HEARTBEAT_SECONDS * 2)
+    start_time = time.perf_counter()
+    await asyncio.gather(*[verify() for _ in range(logins)])
+    elapsed = time.perf_counter() - start_time
+    stop.set()
+    await heartbeat
+    return {
+        "logins_per_s": logins / elapsed,
+        "max_stall_ms": max(stalls, default=0.0) * 1000,
+        "p99_stall_ms": _percentile(stalls, 99) * 1000 if stalls else 0.0,
+    }
+
+
+async def run_in_process(logins: int) -> None:
+    from routers import auth
+
+    password = "benchmark-password"
+    hashed = auth.bcrypt_context.hash(password)
+
+    async def inline():
+        return auth.bcrypt_context.verify(password, hashed)
+
+    async def pooled():
+        return await auth.verify_password(password, hashed)
+
+    print(f"{logins} concurrent logins, {auth.HASH_WORKERS} hashing threads")
+    for name, verify in (("inline on event loop", inline), ("hashing pool", pooled)):
+        result = await _burst(verify, logins)
+        print(f"  {name:<22} {result['logins_per_s']:7.1f} logins/s   "
+              f"loop stall max {result['max_stall_ms']:7.1f}ms  p99 {result['p99_stall_ms']:7.1f}ms")
+
+    # Repeated wrong password: first attempt pays bcrypt, the rest hit the cache
+    auth.forget_failed_logins("benchmark")
+    timings = []
+    for _ in range(logins):
+        start_time = time.perf_counter()
+        if not auth.is_recent_failed_login("benchmark", "wrong"):
+            await auth.verify_password("wrong", hashed)
+            auth.remember_failed_login("benchmark", "wrong")
+        timings.append(time.perf_counter() - start_time)
+    print(f"  {'failed-login cache':<22} first {timings[0] * 1000:7.1f}ms   "
+          f"repeats median {statistics.median(timings[1:]) * 1000:.3f}ms")
+
+
+def run_against_server(url: str, username: str, password: str, logins: int, concurrency: int) -> None:
+    body = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    token_url = url.rstrip("/") + "/auth/token"
+
+    def login():
+        start_time = time.perf_counter()
+        request = urllib.request.Request(token_url, data=body, method="POST",
+                                         headers={"Content-Type": "application/x-www-form-urlencoded"})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        return status, time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: login(), range(logins)))
+    elapsed = time.perf_counter() - start_time
+
+    latencies = [latency for _, latency in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"{logins} logins, concurrency {concurrency}: {logins / elapsed:.1f} logins/s")
+    print(f"  latency p50 {_percentile(latencies, 50) * 1000:.0f}ms  "
+          f"p95 {_percentile(latencies, 95) * 1000:.0f}ms  p99 {_percentile(latencies, 99) * 1000:.0f}ms")
+    print(f"  status codes: {statuses}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark login throughput")
+    parser.add_argument("--logins", type=int, default=40, help="number of logins in the burst")
+    parser.add_argument("--url", help="server base URL; omit to benchmark in-process")
+    parser.add_argument("--username", help="login for --url")
+    parser.add_argument("--password", help="password for --url")
+    parser.add_argument("--concurrency", type=int, default=10, help="parallel clients for --url")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        if not args.username or not args.password:
+            parser.error("--url needs --username and --password")
+        run_against_server(args.url, args.username, args.password, args.logins, args.concurrency)
+    else:
+        asyncio.run(run_in_process(args.logins))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
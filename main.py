@@ -17,12 +17,14 @@ from routers import (auth, todos, admin, users, lead, site, contact, prospect_ty
                      LeaveApplication, SiteType, AmenitySite, visit, upload_excel, reports, visitors,WeeklySiteVisitReport,
                      ConversionReport, MonthlyBrokerReport, weekly_report, apiConfiguration, notificationconfiguration,
                      Roles, UsersRoles, Permissions, PermissionAssignment, PermissionFilters, PermissionFilterValues, FileTracker,
-                     scheduler_status, brochure)
+                     scheduler_status, brochure, dashboard, export, agenda)
 
 # Import WhatsApp chatbot router
 import whatsapp_chatbot
 
 from fastapi.middleware.cors import CORSMiddleware
+from routers.admission import AdmissionControlMiddleware
+from routers.query_deadline import QueryDeadlineMiddleware
 
 from fastapi.templating import Jinja2Templates
 import os
@@ -88,7 +90,10 @@ async def lifespan(_app: FastAPI):
 app = FastAPI(lifespan=lifespan)
 
 
-
+# Query deadlines, innermost: the budget starts once the request is admitted
+app.add_middleware(QueryDeadlineMiddleware)
+# Per-route-class concurrency limits; added before CORS so its headers also reach 503 rejections
+app.add_middleware(AdmissionControlMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -122,6 +127,11 @@ def health_check_detailed():
     """
     from database import test_database_connection
     from scheduler.score_updater_optimized import get_scheduler_status
+    from routers.reference_cache import get_cache_stats
+    from routers.admission import get_admission_stats
+    from routers.query_deadline import get_query_deadline_stats
+    from db_retry import get_retry_stats
+    from services.integration_clients import get_integration_stats
 
     db_ok = False
     try:
@@ -135,6 +145,11 @@ def health_check_detailed():
         'status': 'Healthy' if db_ok else 'Degraded',
         'database': 'Connected' if db_ok else 'Disconnected',
         'scheduler': scheduler_info.get('message', 'Unknown'),
+        'reference_cache': get_cache_stats(),
+        'admission': get_admission_stats(),
+        'query_deadlines': get_query_deadline_stats(),
+        'read_retries': get_retry_stats(),
+        'integrations': get_integration_stats(),
         'version': '1.0.0'
     }
 
@@ -182,6 +197,7 @@ def health_check_detailed():
 app.include_router(Account.router)
 app.include_router(action_item.router)
 app.include_router(admin.router)
+app.include_router(agenda.router)
 app.include_router(amenity.router)
 app.include_router(AmenitySite.router)
 app.include_router(auth.router)
@@ -190,7 +206,9 @@ app.include_router(apiConfiguration.router)
 app.include_router(brochure.router)
 app.include_router(contact.router)
 app.include_router(ConversionReport.router)
+app.include_router(dashboard.router)
 app.include_router(developer.router)
+app.include_router(export.router)
 app.include_router(Follow_Ups.router)
 app.include_router(home_api.router)
 app.include_router(infra.router)
@@ -0,0 +1,38 @@
+-- =============================================================================
+-- Migration 002: Per-site pre-aggregated lead counters
+-- =============================================================================
+-- One row per (SiteId, LeadStatus), maintained by services/lead_counters.py.
+-- Backs /leads/leads_aggregates, /leads/count/{status} and /leads/sitewisecount/.
+-- The table is populated on first use or by the next scoring scheduler run.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'LeadSiteCounters')
+BEGIN
+    CREATE TABLE LeadSiteCounters (
+        CounterId INT IDENTITY(1,1) PRIMARY KEY,
+        SiteId INT NULL REFERENCES site(SiteId),
+        LeadStatus NVARCHAR(100) NULL,
+        TotalCount INT NOT NULL DEFAULT 0,
+        UrgentCount INT NOT NULL DEFAULT 0,
+        DueTodayCount INT NOT NULL DEFAULT 0,
+        HighIntentCount INT NOT NULL DEFAULT 0,
+        OverdueCount INT NOT NULL DEFAULT 0,
+        CriticalChurnCount INT NOT NULL DEFAULT 0,
+        HighChurnCount INT NOT NULL DEFAULT 0,
+        HealthScoreSum BIGINT NOT NULL DEFAULT 0,
+        HealthScoreCount INT NOT NULL DEFAULT 0,
+        ConversionProbabilitySum DECIMAL(18,2) NOT NULL DEFAULT 0,
+        ConversionProbabilityCount INT NOT NULL DEFAULT 0,
+        UpdatedDate DATETIME NULL
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSiteCounters_SiteId')
+    CREATE INDEX IX_LeadSiteCounters_SiteId ON LeadSiteCounters (SiteId) INCLUDE (LeadStatus, TotalCount);
+GO
+
+-- Verification
+SELECT COUNT(*) AS counter_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'LeadSiteCounters';
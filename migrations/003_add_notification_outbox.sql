@@ -0,0 +1,40 @@
+-- =============================================================================
+-- Migration 003: Notification outbox
+-- =============================================================================
+-- Queue of outgoing WhatsApp notifications, written by /weekly_report/send_whatsapp
+-- and drained by services/notification_outbox.py (scheduler job + request kick-off).
+-- DedupeKey is unique so a repeated request cannot enqueue the same message twice.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'NotificationOutbox')
+BEGIN
+    CREATE TABLE NotificationOutbox (
+        OutboxId INT IDENTITY(1,1) PRIMARY KEY,
+        Channel NVARCHAR(20) NOT NULL DEFAULT 'WA',
+        ToNumber NVARCHAR(50) NOT NULL,
+        ConfigId INT NULL REFERENCES APIConfiguration(ConfigId),
+        ContentTemplateSID NVARCHAR(100) NULL,
+        ContentVariables NVARCHAR(MAX) NULL,
+        DedupeKey NVARCHAR(200) NOT NULL,
+        Status NVARCHAR(20) NOT NULL DEFAULT 'pending',
+        Attempts INT NOT NULL DEFAULT 0,
+        NextAttemptAt DATETIME NULL,
+        LastError NVARCHAR(500) NULL,
+        ProviderMessageSid NVARCHAR(100) NULL,
+        CreatedAt DATETIME NULL,
+        UpdatedAt DATETIME NULL,
+        SentAt DATETIME NULL,
+        CreatedById INT NULL REFERENCES users(id),
+        CONSTRAINT UQ_NotificationOutbox_DedupeKey UNIQUE (DedupeKey)
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_NotificationOutbox_Status_NextAttemptAt')
+    CREATE INDEX IX_NotificationOutbox_Status_NextAttemptAt ON NotificationOutbox (Status, NextAttemptAt);
+GO
+
+-- Verification
+SELECT COUNT(*) AS outbox_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'NotificationOutbox';
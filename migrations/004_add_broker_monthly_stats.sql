@@ -0,0 +1,43 @@
+-- =============================================================================
+-- Migration 004: Broker monthly stats
+-- =============================================================================
+-- One row per (BrokerId, SiteId, StatMonth), maintained by services/broker_stats.py.
+-- Backs /MonthlyBrokerReport/Top-Performig-Brokers and /Broker-Wise-Customers.
+-- The table is populated on first use or by the next scoring scheduler run.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'BrokerMonthlyStats')
+BEGIN
+    CREATE TABLE BrokerMonthlyStats (
+        StatsId INT IDENTITY(1,1) PRIMARY KEY,
+        BrokerId INT NOT NULL REFERENCES contact(ContactId),
+        SiteId INT NULL REFERENCES site(SiteId),
+        StatMonth DATE NOT NULL,
+        Leads INT NOT NULL DEFAULT 0,
+        Wins INT NOT NULL DEFAULT 0,
+        Losses INT NOT NULL DEFAULT 0,
+        Visits INT NOT NULL DEFAULT 0,
+        WinCustomers INT NOT NULL DEFAULT 0,
+        UpdatedDate DATETIME NULL
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_BrokerMonthlyStats_StatMonth')
+    CREATE INDEX IX_BrokerMonthlyStats_StatMonth ON BrokerMonthlyStats (StatMonth, SiteId)
+    INCLUDE (BrokerId, Leads, Wins, Losses, Visits, WinCustomers);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_BrokerMonthlyStats_BrokerId')
+    CREATE INDEX IX_BrokerMonthlyStats_BrokerId ON BrokerMonthlyStats (BrokerId);
+GO
+
+-- Supports the per-broker refresh after lead writes
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lead_BrokerId')
+    CREATE INDEX IX_lead_BrokerId ON lead (BrokerId) INCLUDE (SiteId, CreatedDate, LeadStatus, ContactId);
+GO
+
+-- Verification
+SELECT COUNT(*) AS broker_stats_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'BrokerMonthlyStats';
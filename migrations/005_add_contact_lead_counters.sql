@@ -0,0 +1,35 @@
+-- =============================================================================
+-- Migration 005: Per-contact lead counters
+-- =============================================================================
+-- One row per contact with leads, maintained by services/contact_counters.py.
+-- Backs sorting and paging of GET /contact/ by customer lead count.
+-- The table is populated on first use or by the next scoring scheduler run.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'ContactLeadCounters')
+BEGIN
+    CREATE TABLE ContactLeadCounters (
+        ContactId INT NOT NULL PRIMARY KEY,
+        CustomerLeadCount INT NOT NULL DEFAULT 0,
+        BrokerLeadCount INT NOT NULL DEFAULT 0,
+        OpenLeadCount INT NOT NULL DEFAULT 0,
+        LastActivityDate DATETIME NULL,
+        UpdatedDate DATETIME NULL
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ContactLeadCounters_CustomerLeadCount')
+    CREATE INDEX IX_ContactLeadCounters_CustomerLeadCount ON ContactLeadCounters (CustomerLeadCount DESC, ContactId)
+    INCLUDE (BrokerLeadCount, OpenLeadCount, LastActivityDate);
+GO
+
+-- Supports the per-contact refresh after lead writes
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lead_ContactId')
+    CREATE INDEX IX_lead_ContactId ON lead (ContactId) INCLUDE (LeadStatus, CreatedDate, UpdatedDate);
+GO
+
+-- Verification
+SELECT COUNT(*) AS contact_counter_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'ContactLeadCounters';
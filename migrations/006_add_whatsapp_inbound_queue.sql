@@ -0,0 +1,42 @@
+-- =============================================================================
+-- Migration 006: WhatsApp inbound message queue
+-- =============================================================================
+-- Inbound WhatsApp messages written by the webhook and processed by
+-- services/whatsapp_inbox.py (worker pool, one message at a time per phone).
+-- MessageSid is unique so Twilio webhook retries cannot queue a message twice.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'WhatsAppInboundMessage')
+BEGIN
+    CREATE TABLE WhatsAppInboundMessage (
+        InboundId INT IDENTITY(1,1) PRIMARY KEY,
+        MessageSid NVARCHAR(100) NOT NULL,
+        PhoneNumber NVARCHAR(50) NOT NULL,
+        ProfileName NVARCHAR(200) NULL,
+        Body NVARCHAR(MAX) NULL,
+        Status NVARCHAR(20) NOT NULL DEFAULT 'pending',
+        Attempts INT NOT NULL DEFAULT 0,
+        NextAttemptAt DATETIME NULL,
+        LastError NVARCHAR(500) NULL,
+        ReplyText NVARCHAR(MAX) NULL,
+        ReplyMessageSid NVARCHAR(100) NULL,
+        ReceivedAt DATETIME NOT NULL,
+        UpdatedAt DATETIME NULL,
+        ProcessedAt DATETIME NULL,
+        CONSTRAINT UQ_WhatsAppInboundMessage_MessageSid UNIQUE (MessageSid)
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_WhatsAppInboundMessage_Status_ReceivedAt')
+    CREATE INDEX IX_WhatsAppInboundMessage_Status_ReceivedAt ON WhatsAppInboundMessage (Status, ReceivedAt) INCLUDE (PhoneNumber, NextAttemptAt);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_WhatsAppInboundMessage_PhoneNumber')
+    CREATE INDEX IX_WhatsAppInboundMessage_PhoneNumber ON WhatsAppInboundMessage (PhoneNumber);
+GO
+
+-- Verification
+SELECT COUNT(*) AS inbound_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'WhatsAppInboundMessage';
@@ -0,0 +1,64 @@
+-- =============================================================================
+-- Migration 007: Normalized phone keys on contact
+-- =============================================================================
+-- PhoneKey holds ContactNo as E.164 digits (country code + number, no '+'),
+-- PhoneKeyRev the same digits reversed for "number ends with" searches.
+-- Both are indexed; phone lookups and phone filters use them instead of
+-- ContactNo = ... / ILIKE '%...%'. See services/phone_keys.py.
+--
+-- The backfill below mirrors normalize_phone(): a 10 digit national number
+-- gets the contact's country code (default 91) prepended. New and updated
+-- contacts get their keys from the application.
+-- =============================================================================
+
+IF COL_LENGTH('contact', 'PhoneKey') IS NULL
+    ALTER TABLE contact ADD PhoneKey NVARCHAR(20) NULL;
+GO
+
+IF COL_LENGTH('contact', 'PhoneKeyRev') IS NULL
+    ALTER TABLE contact ADD PhoneKeyRev NVARCHAR(20) NULL;
+GO
+
+-- Backfill in batches to keep the log and lock footprint small
+DECLARE @rows INT = 1;
+WHILE @rows > 0
+BEGIN
+    UPDATE TOP (5000) c
+    SET PhoneKey = k.PhoneKey,
+        PhoneKeyRev = REVERSE(k.PhoneKey)
+    FROM contact c
+    CROSS APPLY (
+        SELECT REPLACE(REPLACE(REPLACE(LTRIM(RTRIM(ISNULL(c.ContactCountryCode, ''))), '+', ''), ' ', ''), '-', '') AS CountryCode
+    ) cc
+    CROSS APPLY (
+        SELECT CASE
+            WHEN LEN(CAST(c.ContactNo AS VARCHAR(20))) <> 10 THEN CAST(c.ContactNo AS VARCHAR(20))
+            WHEN cc.CountryCode <> '' AND cc.CountryCode NOT LIKE '%[^0-9]%' THEN cc.CountryCode + CAST(c.ContactNo AS VARCHAR(20))
+            ELSE '91' + CAST(c.ContactNo AS VARCHAR(20))
+        END AS PhoneKey
+    ) k
+    WHERE c.ContactNo > 0
+      AND c.PhoneKey IS NULL;
+    SET @rows = @@ROWCOUNT;
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_contact_PhoneKey')
+    CREATE INDEX IX_contact_PhoneKey ON contact (PhoneKey) INCLUDE (ContactType);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_contact_PhoneKeyRev')
+    CREATE INDEX IX_contact_PhoneKeyRev ON contact (PhoneKeyRev) INCLUDE (ContactType);
+GO
+
+-- Verification: contacts with a number but no key (expect 0), duplicate numbers
+SELECT COUNT(*) AS contacts_missing_phone_key
+FROM contact
+WHERE ContactNo > 0 AND PhoneKey IS NULL;
+
+SELECT PhoneKey, COUNT(*) AS contact_count
+FROM contact
+WHERE PhoneKey IS NOT NULL
+GROUP BY PhoneKey
+HAVING COUNT(*) > 1
+ORDER BY contact_count DESC;
@@ -0,0 +1,37 @@
+-- =============================================================================
+-- Migration 008: Per-user agenda index
+-- =============================================================================
+-- One row per open, dated follow-up (FollowUps.UserId) or action item
+-- (ActionItem.AllotedToUserId), maintained by services/agenda.py.
+-- GET /agenda/ reads a user's overdue / today / this week items as range seeks
+-- on (UserId, DueDate). The table is populated on first use or by the next
+-- scoring scheduler run.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'AgendaItem')
+BEGIN
+    CREATE TABLE AgendaItem (
+        AgendaItemId INT IDENTITY(1,1) PRIMARY KEY,
+        UserId INT NOT NULL,
+        SourceType NVARCHAR(20) NOT NULL,
+        SourceId INT NOT NULL,
+        DueDate DATETIME NOT NULL,
+        Title NVARCHAR(255) NULL,
+        Status NVARCHAR(50) NULL,
+        LeadId INT NULL,
+        VisitId INT NULL,
+        UpdatedDate DATETIME NULL,
+        CONSTRAINT UQ_AgendaItem_Source UNIQUE (SourceType, SourceId)
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_AgendaItem_UserId_DueDate')
+    CREATE INDEX IX_AgendaItem_UserId_DueDate ON AgendaItem (UserId, DueDate)
+    INCLUDE (SourceType, SourceId, Title, Status, LeadId, VisitId);
+GO
+
+-- Verification
+SELECT COUNT(*) AS agenda_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'AgendaItem';
@@ -0,0 +1,82 @@
+-- =============================================================================
+-- Migration 009: Lead search projection
+-- =============================================================================
+-- One row per lead with the site / prospect type names, customer and broker
+-- names, contact types and reversed phone keys, scores and follow-up dates,
+-- maintained by services/lead_search.py. /leads/leads_full_detail and the lead
+-- export filter, count, sort and page on this table instead of joining site,
+-- prospect type and two contacts and aggregating FollowUps per request.
+-- The table is populated on first use or by the next scoring scheduler run.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'LeadSearchProjection')
+BEGIN
+    CREATE TABLE LeadSearchProjection (
+        LeadId INT NOT NULL PRIMARY KEY,
+        SiteId INT NULL,
+        SiteName NVARCHAR(255) NULL,
+        ProspectTypeId INT NULL,
+        ProspectTypeName NVARCHAR(255) NULL,
+        LeadName NVARCHAR(255) NULL,
+        LeadStatus NVARCHAR(50) NULL,
+        LeadSource NVARCHAR(100) NULL,
+        CreatedDate DATETIME NULL,
+        CustomerId INT NULL,
+        CustomerName NVARCHAR(512) NULL,
+        CustomerType NVARCHAR(50) NULL,
+        CustomerPhoneKeyRev NVARCHAR(20) NULL,
+        BrokerId INT NULL,
+        BrokerName NVARCHAR(512) NULL,
+        BrokerType NVARCHAR(50) NULL,
+        BrokerPhoneKeyRev NVARCHAR(20) NULL,
+        HealthScore INT NULL,
+        BuyingIntent INT NULL,
+        AIPriority INT NULL,
+        ChurnRisk NVARCHAR(50) NULL,
+        FollowUpStatus NVARCHAR(50) NULL,
+        OverdueDays INT NULL,
+        Budget FLOAT NULL,
+        NextFollowUpDate DATETIME NULL,
+        LastContactDate DATETIME NULL,
+        UpdatedDate DATETIME NULL
+    );
+END
+GO
+
+-- Site-scoped sort keys: the list always filters by the user's sites
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSearchProjection_Site_CreatedDate')
+    CREATE INDEX IX_LeadSearchProjection_Site_CreatedDate ON LeadSearchProjection (SiteId, CreatedDate);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSearchProjection_Site_LeadStatus')
+    CREATE INDEX IX_LeadSearchProjection_Site_LeadStatus ON LeadSearchProjection (SiteId, LeadStatus)
+    INCLUDE (CreatedDate);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSearchProjection_Site_AIPriority')
+    CREATE INDEX IX_LeadSearchProjection_Site_AIPriority ON LeadSearchProjection (SiteId, AIPriority);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSearchProjection_Site_HealthScore')
+    CREATE INDEX IX_LeadSearchProjection_Site_HealthScore ON LeadSearchProjection (SiteId, HealthScore);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSearchProjection_Site_NextFollowUpDate')
+    CREATE INDEX IX_LeadSearchProjection_Site_NextFollowUpDate ON LeadSearchProjection (SiteId, NextFollowUpDate);
+GO
+
+-- Number filters: "ends with" is a prefix seek on the reversed phone key
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSearchProjection_CustomerPhoneKeyRev')
+    CREATE INDEX IX_LeadSearchProjection_CustomerPhoneKeyRev ON LeadSearchProjection (CustomerPhoneKeyRev)
+    INCLUDE (SiteId, CustomerType);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LeadSearchProjection_BrokerPhoneKeyRev')
+    CREATE INDEX IX_LeadSearchProjection_BrokerPhoneKeyRev ON LeadSearchProjection (BrokerPhoneKeyRev)
+    INCLUDE (SiteId, BrokerType);
+GO
+
+-- Verification
+SELECT COUNT(*) AS lead_search_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'LeadSearchProjection';
@@ -0,0 +1,51 @@
+-- =============================================================================
+-- Migration 010: Primary visitor summary per visit
+-- =============================================================================
+-- One row per visit with its primary (earliest created, not deleted) visitor
+-- and its first customer and first broker visitor, with names and reversed
+-- phone keys, maintained by services/visit_visitors.py.
+-- /visit/Visit_full_details and the visit export join this table on VisitId
+-- instead of Visitors x contact. The table is populated on first use or by the
+-- next scoring scheduler run.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'VisitPrimaryVisitor')
+BEGIN
+    CREATE TABLE VisitPrimaryVisitor (
+        VisitId INT NOT NULL PRIMARY KEY,
+        VisitorsId INT NULL,
+        ContactId INT NULL,
+        VisitorName NVARCHAR(512) NULL,
+        ContactType NVARCHAR(50) NULL,
+        ContactNo BIGINT NULL,
+        LeadId INT NULL,
+        VisitorCount INT NOT NULL DEFAULT 0,
+        CustomerId INT NULL,
+        CustomerName NVARCHAR(512) NULL,
+        CustomerPhoneKeyRev NVARCHAR(20) NULL,
+        BrokerId INT NULL,
+        BrokerName NVARCHAR(512) NULL,
+        BrokerPhoneKeyRev NVARCHAR(20) NULL,
+        UpdatedDate DATETIME NULL
+    );
+END
+GO
+
+-- Number filters: "ends with" is a prefix seek on the reversed phone key
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VisitPrimaryVisitor_CustomerPhoneKeyRev')
+    CREATE INDEX IX_VisitPrimaryVisitor_CustomerPhoneKeyRev ON VisitPrimaryVisitor (CustomerPhoneKeyRev);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VisitPrimaryVisitor_BrokerPhoneKeyRev')
+    CREATE INDEX IX_VisitPrimaryVisitor_BrokerPhoneKeyRev ON VisitPrimaryVisitor (BrokerPhoneKeyRev);
+GO
+
+-- Refreshing the visits of an edited contact
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Visitors_ContactId_VisitId')
+    CREATE INDEX IX_Visitors_ContactId_VisitId ON visitors (ContactId) INCLUDE (VisitId);
+GO
+
+-- Verification
+SELECT COUNT(*) AS visit_primary_visitor_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'VisitPrimaryVisitor';
@@ -0,0 +1,67 @@
+-- =============================================================================
+-- Migration 011: Covering indexes for the hot read paths
+-- =============================================================================
+-- Indexes the lead list, lead 360, visit list and the scoring scheduler's
+-- aggregates rely on. Until now they existed only where someone had created
+-- them by hand. Every statement is guarded, so the script is a no-op on
+-- databases that already have an index of the same name.
+-- migrations/plan_check.py fails when a hot query stops seeking on these.
+-- =============================================================================
+
+-- Lead list: site-scoped, AI priority / created date sorts (lead.read_all_leads,
+-- leads_aggregates, scheduler)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lead_SiteId_AIPriority')
+    CREATE INDEX IX_lead_SiteId_AIPriority ON lead (SiteId, AIPriority)
+    INCLUDE (LeadStatus, HealthScore, CreatedDate);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lead_SiteId_CreatedDate')
+    CREATE INDEX IX_lead_SiteId_CreatedDate ON lead (SiteId, CreatedDate);
+GO
+
+-- Contact counters, broker stats and lead 360 look leads up by contact
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lead_ContactId')
+    CREATE INDEX IX_lead_ContactId ON lead (ContactId);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lead_BrokerId')
+    CREATE INDEX IX_lead_BrokerId ON lead (BrokerId);
+GO
+
+-- Next / last follow-up per lead (scheduler aggregates, lead search projection)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_FollowUps_LeadId_Status_NextFollowUpDate')
+    CREATE INDEX IX_FollowUps_LeadId_Status_NextFollowUpDate ON FollowUps (LeadId, Status, NextFollowUpDate)
+    INCLUDE (FollowUpDate);
+GO
+
+-- Visits of a lead (scheduler visit counts, lead 360)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_visitors_LeadId')
+    CREATE INDEX IX_visitors_LeadId ON visitors (LeadId)
+    INCLUDE (VisitId);
+GO
+
+-- Visitors of a visit in creation order (primary visitor summary, visit detail)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_visitors_VisitId_CreatedDate')
+    CREATE INDEX IX_visitors_VisitId_CreatedDate ON visitors (VisitId, CreatedDate)
+    INCLUDE (ContactId, LeadId, IsDeleted);
+GO
+
+-- Visit list: site-scoped, newest first
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Visit_SiteId_VisitDate')
+    CREATE INDEX IX_Visit_SiteId_VisitDate ON Visit (SiteId, VisitDate);
+GO
+
+-- Last two health snapshots per lead (scheduler velocity)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lead_velocity_snapshots_LeadId_SnapshotDate')
+    CREATE INDEX IX_lead_velocity_snapshots_LeadId_SnapshotDate ON lead_velocity_snapshots (LeadId, SnapshotDate)
+    INCLUDE (HealthScore);
+GO
+
+-- Verification
+SELECT name AS index_name, OBJECT_NAME(object_id) AS table_name
+FROM sys.indexes
+WHERE name IN (
+    'IX_lead_SiteId_AIPriority', 'IX_lead_SiteId_CreatedDate', 'IX_lead_ContactId', 'IX_lead_BrokerId',
+    'IX_FollowUps_LeadId_Status_NextFollowUpDate', 'IX_visitors_LeadId', 'IX_visitors_VisitId_CreatedDate',
+    'IX_Visit_SiteId_VisitDate', 'IX_lead_velocity_snapshots_LeadId_SnapshotDate'
+);
@@ -0,0 +1,54 @@
+-- =============================================================================
+-- Migration 012: Customer / broker filter keys for every visitor of a visit
+-- =============================================================================
+-- One row per customer or broker visitor (not deleted) of a visit, with the
+-- contact's full name and reversed phone key, maintained by
+-- services/visit_visitors.py. The customer and broker name / number filters of
+-- /visit/Visit_full_details and the visit export read this table, so a visit
+-- is found by any of its attendees, not only its first customer / broker.
+-- VisitPrimaryVisitor keeps the primary visitor for display; its first
+-- customer / broker columns (migration 010) are dropped. The table is
+-- populated on first use or by the next scoring scheduler run.
+-- =============================================================================
+
+IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'VisitVisitorKey')
+BEGIN
+    CREATE TABLE VisitVisitorKey (
+        VisitId INT NOT NULL,
+        VisitorsId INT NOT NULL,
+        ContactType NVARCHAR(50) NOT NULL,
+        Name NVARCHAR(512) NULL,
+        PhoneKeyRev NVARCHAR(20) NULL,
+        CONSTRAINT PK_VisitVisitorKey PRIMARY KEY (VisitId, VisitorsId)
+    );
+END
+GO
+
+-- Number filters: "ends with" is a prefix seek on the reversed phone key
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VisitVisitorKey_Type_PhoneKeyRev')
+    CREATE INDEX IX_VisitVisitorKey_Type_PhoneKeyRev ON VisitVisitorKey (ContactType, PhoneKeyRev) INCLUDE (VisitId);
+GO
+
+-- Name filters (contains): a scan of this narrow index instead of the table
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VisitVisitorKey_Type_Name')
+    CREATE INDEX IX_VisitVisitorKey_Type_Name ON VisitVisitorKey (ContactType, Name) INCLUDE (VisitId);
+GO
+
+-- First customer / broker columns of the summary are no longer read
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VisitPrimaryVisitor_CustomerPhoneKeyRev')
+    DROP INDEX IX_VisitPrimaryVisitor_CustomerPhoneKeyRev ON VisitPrimaryVisitor;
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_VisitPrimaryVisitor_BrokerPhoneKeyRev')
+    DROP INDEX IX_VisitPrimaryVisitor_BrokerPhoneKeyRev ON VisitPrimaryVisitor;
+GO
+
+IF COL_LENGTH('VisitPrimaryVisitor', 'CustomerId') IS NOT NULL
+    ALTER TABLE VisitPrimaryVisitor DROP COLUMN CustomerId, CustomerName, CustomerPhoneKeyRev,
+        BrokerId, BrokerName, BrokerPhoneKeyRev;
+GO
+
+-- Verification
+SELECT COUNT(*) AS visit_visitor_key_table_exists
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_NAME = 'VisitVisitorKey';
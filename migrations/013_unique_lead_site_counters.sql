@@ -0,0 +1,27 @@
+-- =============================================================================
+-- Migration 013: One LeadSiteCounters row per (SiteId, LeadStatus)
+-- =============================================================================
+-- services/lead_counters.py merges counter rows by (SiteId, LeadStatus). The
+-- unique index makes a concurrent refresh of the same site fail its insert
+-- (and retry) instead of adding a second row that doubles the site's counts.
+-- Duplicates left by earlier races are removed first; the next refresh of the
+-- site recomputes the surviving row.
+-- =============================================================================
+
+WITH ranked AS (
+    SELECT CounterId,
+           ROW_NUMBER() OVER (PARTITION BY SiteId, LeadStatus ORDER BY CounterId DESC) AS rn
+    FROM LeadSiteCounters
+)
+DELETE FROM LeadSiteCounters
+WHERE CounterId IN (SELECT CounterId FROM ranked WHERE rn > 1);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_LeadSiteCounters_SiteId_LeadStatus')
+    CREATE UNIQUE INDEX UX_LeadSiteCounters_SiteId_LeadStatus ON LeadSiteCounters (SiteId, LeadStatus);
+GO
+
+-- Verification
+SELECT COUNT(*) AS unique_counter_index_exists
+FROM sys.indexes
+WHERE name = 'UX_LeadSiteCounters_SiteId_LeadStatus';
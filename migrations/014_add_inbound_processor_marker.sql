@@ -0,0 +1,17 @@
+-- =============================================================================
+-- Migration 014: Mark inbound messages whose pipeline committed changes
+-- =============================================================================
+-- services/whatsapp_inbox.py sets ProcessorCommittedAt in the same transaction
+-- as the chatbot pipeline's own writes (leads, visits, context). A message
+-- whose pipeline committed but failed before its reply was stored is never run
+-- through the pipeline again, so a retry cannot create those records twice.
+-- =============================================================================
+
+IF COL_LENGTH('WhatsAppInboundMessage', 'ProcessorCommittedAt') IS NULL
+    ALTER TABLE WhatsAppInboundMessage ADD ProcessorCommittedAt DATETIME NULL;
+GO
+
+-- Verification
+SELECT COUNT(*) AS processor_marker_column_exists
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_NAME = 'WhatsAppInboundMessage' AND COLUMN_NAME = 'ProcessorCommittedAt';
@@ -0,0 +1,4 @@
+"""
+Versioned T-SQL schema migrations (NNN_description.sql), applied in order by
+migrations/runner.py and tracked in the SchemaMigrations table.
+"""
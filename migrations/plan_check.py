@@ -0,0 +1,206 @@
+"""
+Query Plan Regression Check
+===========================
+
+Captures the estimated execution plan (SET SHOWPLAN_XML ON - nothing is
+executed) of each hot query and fails when a plan reads a large table with a
+scan instead of a seek, or when an index the query relies on is missing.
+
+Scans of tables below MIN_SCAN_ROWS are accepted: the optimizer rightly
+scans small tables, and plans on a near-empty database say nothing.
+
+Run after migrations, against a database with production-like data:
+    python -m migrations.plan_check            # exit 1 on a regression
+    python -m migrations.plan_check --verbose  # also print every operator
+
+Add a HotQuery here when a new endpoint or job starts depending on an index.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+import argparse
+import logging
+import sys
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+# Tables with fewer (estimated) rows may be scanned
+MIN_SCAN_ROWS = 1000
+
+SCAN_OPERATORS = {"Table Scan", "Clustered Index Scan", "Index Scan"}
+
+_SHOWPLAN_NS = {"sp": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    sql: str
+    # Tables that must be read with seeks
+    seek_tables: Tuple[str, ...]
+    # Indexes (migration 011 and the table migrations) the plan is expected to use
+    indexes: Tuple[str, ...] = ()
+
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery(
+        "lead list by site, AI priority",
+        "SELECT TOP 20 LeadId, AIPriority FROM lead WHERE SiteId IN (1, 2, 3) ORDER BY AIPriority DESC",
+        ("lead",),
+        ("IX_lead_SiteId_AIPriority",),
+    ),
+    HotQuery(
+        "leads of a contact",
+        "SELECT LeadId FROM lead WHERE ContactId = 1 OR BrokerId = 1",
+        ("lead",),
+        ("IX_lead_ContactId", "IX_lead_BrokerId"),
+    ),
+    HotQuery(
+        "next open follow-up of a lead",
+        "SELECT MIN(NextFollowUpDate) FROM FollowUps WHERE LeadId = 1 AND Status <> 'Completed'",
+        ("FollowUps",),
+        ("IX_FollowUps_LeadId_Status_NextFollowUpDate",),
+    ),
+    HotQuery(
+        "visits of a lead",
+        "SELECT VisitId FROM visitors WHERE LeadId = 1",
+        ("visitors",),
+        ("IX_visitors_LeadId",),
+    ),
+    HotQuery(
+        "primary visitor of a visit",
+        "SELECT TOP 1 VisitorsId, ContactId FROM visitors WHERE VisitId = 1 ORDER BY CreatedDate",
+        ("visitors",),
+        ("IX_visitors_VisitId_CreatedDate",),
+    ),
+    HotQuery(
+        "visit list by site",
+        "SELECT TOP 20 VisitId FROM Visit WHERE SiteId IN (1, 2, 3) ORDER BY VisitDate DESC",
+        ("Visit",),
+        ("IX_Visit_SiteId_VisitDate",),
+    ),
+    HotQuery(
+        "recent health snapshots of a lead",
+        "SELECT TOP 2 HealthScore FROM lead_velocity_snapshots "
+        "WHERE LeadId = 1 AND SnapshotDate >= DATEADD(day, -15, GETDATE()) ORDER BY SnapshotDate DESC",
+        ("lead_velocity_snapshots",),
+        ("IX_lead_velocity_snapshots_LeadId_SnapshotDate",),
+    ),
+    HotQuery(
+        "contact by number suffix",
+        "SELECT ContactId FROM contact WHERE PhoneKeyRev LIKE '01234%'",
+        ("contact",),
+        ("IX_contact_PhoneKeyRev",),
+    ),
+    HotQuery(
+        "lead search page by site",
+        "SELECT TOP 20 LeadId FROM LeadSearchProjection WHERE SiteId = 1 ORDER BY CreatedDate DESC",
+        ("LeadSearchProjection",),
+        ("IX_LeadSearchProjection_Site_CreatedDate",),
+    ),
+    HotQuery(
+        "agenda of a user",
+        "SELECT SourceType, SourceId FROM AgendaItem WHERE UserId = 1 AND DueDate < DATEADD(day, 7, GETDATE())",
+        ("AgendaItem",),
+        ("IX_AgendaItem_UserId_DueDate",),
+    ),
+]
+
+
+@dataclass
+class PlanOperator:
+    physical_op: str
+    table: Optional[str]
+    index: Optional[str]
+    table_rows: float
+
+
+def _strip_brackets(name: Optional[str]) -> Optional[str]:
+    return name.strip("[]") if name else name
+
+
+def parse_plan(plan_xml: str) -> List[PlanOperator]:
+    """Access operators (scans / seeks) of a showplan, with the object they read."""
+    operators = []
+    root = ET.fromstring(plan_xml)
+    for rel_op in root.iter(f"{{{_SHOWPLAN_NS['sp']}}}RelOp"):
+        obj = None
+        # The object element belongs to the operator's own child (IndexScan, TableScan, ...)
+        for child in rel_op:
+            obj = child.find("sp:Object", _SHOWPLAN_NS)
+            if obj is not None:
+                break
+        if obj is None:
+            continue
+        rows = rel_op.get("TableCardinality") or rel_op.get("EstimatedRowsRead") or rel_op.get("EstimateRows") or 0
+        operators.append(PlanOperator(
+            physical_op=rel_op.get("PhysicalOp"),
+            table=_strip_brackets(obj.get("Table")),
+            index=_strip_brackets(obj.get("Index")),
+            table_rows=float(rows),
+        ))
+    return operators
+
+
+def capture_plan(engine: Engine, sql: str) -> str:
+    """Estimated plan XML for one statement; the statement is not executed."""
+    with engine.connect() as conn:
+        # SHOWPLAN_XML must be alone in its batch
+        conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+        try:
+            return conn.exec_driver_sql(sql).scalar()
+        finally:
+            conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+
+
+def existing_indexes(engine: Engine) -> set:
+    with engine.connect() as conn:
+        return {name for name, in conn.execute(text("SELECT name FROM sys.indexes WHERE name IS NOT NULL")).all()}
+
+
+def check_query(engine: Engine, query: HotQuery, indexes: set, verbose: bool = False) -> List[str]:
+    """Regressions found for one hot query (empty when the plan is fine)."""
+    problems = [f"missing index {index}" for index in query.indexes if index not in indexes]
+    seek_tables = {table.lower() for table in query.seek_tables}
+    for op in parse_plan(capture_plan(engine, query.sql)):
+        if verbose:
+            print(f"    {op.physical_op:<22} {op.table}.{op.index or '(heap)'}  ~{op.table_rows:.0f} rows")
+        if (op.physical_op in SCAN_OPERATORS and (op.table or "").lower() in seek_tables
+                and op.table_rows >= MIN_SCAN_ROWS):
+            problems.append(f"{op.physical_op} on {op.table} ({op.index or 'heap'}), "
+                            f"~{op.table_rows:.0f} rows")
+    return problems
+
+
+def run_checks(engine: Engine, verbose: bool = False) -> int:
+    """Check every hot query. Returns the number of queries that regressed."""
+    indexes = existing_indexes(engine)
+    failed = 0
+    for query in HOT_QUERIES:
+        try:
+            problems = check_query(engine, query, indexes, verbose)
+        except Exception as e:
+            problems = [f"plan capture failed: {e}"]
+        print(f"{'FAIL' if problems else 'ok  '}  {query.name}")
+        for problem in problems:
+            print(f"      - {problem}")
+        failed += bool(problems)
+    print(f"{len(HOT_QUERIES) - failed}/{len(HOT_QUERIES)} hot queries use their indexes")
+    return failed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fail when hot query plans regress to scans")
+    parser.add_argument("--verbose", action="store_true", help="print every access operator")
+    args = parser.parse_args(argv)
+
+    from database import engine
+
+    return 1 if run_checks(engine, verbose=args.verbose) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
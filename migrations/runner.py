@@ -0,0 +1,183 @@
+"""
+Schema Migration Runner
+=======================
+
+Applies migrations/NNN_description.sql in version order and records each one
+in the SchemaMigrations table (version, name, SHA-256 of the file, when and
+how long it took), so every environment can tell which schema it runs.
+
+Scripts are T-SQL batches separated by GO lines, as SSMS / sqlcmd expect.
+Each script runs in its own transaction; a failing batch rolls the script
+back and stops the run. The scripts guard every statement (IF NOT EXISTS),
+so a database migrated by hand before this runner existed can be brought
+under tracking by simply running it: already-applied scripts are no-ops.
+
+Usage:
+    python -m migrations.runner              # apply pending migrations
+    python -m migrations.runner --status     # list applied / pending
+    python -m migrations.runner --dry-run    # show what would run
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+import argparse
+import hashlib
+import logging
+import re
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent
+TRACKING_TABLE = "SchemaMigrations"
+
+_FILE_NAME = re.compile(r"^(\d{3})_(\w+)\.sql$")
+_GO_LINE = re.compile(r"^\s*GO\s*(?:--.*)?$", re.IGNORECASE | re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8-sig")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+    def batches(self) -> List[str]:
+        """The script split on GO separators, without empty batches."""
+        return [batch.strip() for batch in _GO_LINE.split(self.sql) if batch.strip()]
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Migration scripts in version order; duplicate versions are an error."""
+    migrations: Dict[int, Migration] = {}
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILE_NAME.match(path.name)
+        if not match:
+            logger.warning(f"Skipping {path.name}: not named NNN_description.sql")
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version:03d}: "
+                             f"{migrations[version].path.name}, {path.name}")
+        migrations[version] = Migration(version, match.group(2), path)
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def ensure_tracking_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = '{TRACKING_TABLE}')
+            CREATE TABLE {TRACKING_TABLE} (
+                Version INT NOT NULL PRIMARY KEY,
+                Name NVARCHAR(255) NOT NULL,
+                Checksum CHAR(64) NOT NULL,
+                AppliedDate DATETIME NOT NULL DEFAULT GETDATE(),
+                DurationMs INT NULL
+            )
+        """))
+
+
+def applied_migrations(engine: Engine) -> Dict[int, str]:
+    """Applied version -> recorded checksum."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT Version, Checksum FROM {TRACKING_TABLE}")).all()
+    return {version: checksum for version, checksum in rows}
+
+
+def apply_migration(engine: Engine, migration: Migration) -> int:
+    """Run one script in a transaction and record it. Returns the duration in ms."""
+    start_time = time.time()
+    with engine.begin() as conn:
+        for batch in migration.batches():
+            # exec_driver_sql: batches are plain T-SQL, no bind parameters
+            conn.exec_driver_sql(batch)
+        duration_ms = int((time.time() - start_time) * 1000)
+        conn.execute(
+            text(f"INSERT INTO {TRACKING_TABLE} (Version, Name, Checksum, AppliedDate, DurationMs) "
+                 f"VALUES (:version, :name, :checksum, GETDATE(), :duration_ms)"),
+            {"version": migration.version, "name": migration.name,
+             "checksum": migration.checksum, "duration_ms": duration_ms},
+        )
+    return duration_ms
+
+
+def migrate(engine: Engine, dry_run: bool = False) -> List[Migration]:
+    """
+    Apply every pending migration in order.
+
+    Scripts whose file changed after being applied are reported, not re-run:
+    a schema change belongs in a new migration.
+
+    Returns:
+        The migrations applied (or that would be applied on a dry run)
+    """
+    ensure_tracking_table(engine)
+    applied = applied_migrations(engine)
+    pending = []
+    for migration in discover_migrations():
+        recorded = applied.get(migration.version)
+        if recorded is None:
+            pending.append(migration)
+        elif recorded != migration.checksum:
+            logger.warning(f"Migration {migration.version:03d}_{migration.name} changed after it was applied")
+
+    for migration in pending:
+        if dry_run:
+            logger.info(f"Would apply {migration.path.name} ({len(migration.batches())} batches)")
+            continue
+        logger.info(f"Applying {migration.path.name}...")
+        duration_ms = apply_migration(engine, migration)
+        logger.info(f"Applied {migration.path.name} in {duration_ms}ms")
+
+    if not pending:
+        logger.info("Schema is up to date")
+    return pending
+
+
+def print_status(engine: Engine) -> None:
+    ensure_tracking_table(engine)
+    applied = applied_migrations(engine)
+    for migration in discover_migrations():
+        recorded = applied.get(migration.version)
+        if recorded is None:
+            state = "pending"
+        elif recorded != migration.checksum:
+            state = "applied (file changed since)"
+        else:
+            state = "applied"
+        print(f"{migration.version:03d}  {migration.name:<45} {state}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--dry-run", action="store_true", help="show pending migrations without running them")
+    args = parser.parse_args(argv)
+
+    # Imported here so discover_migrations() works without a database
+    from database import engine
+
+    if args.status:
+        print_status(engine)
+        return 0
+    try:
+        migrate(engine, dry_run=args.dry_run)
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
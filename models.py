@@ -6,6 +6,7 @@ from sqlalchemy.orm import relationship
 from sqlalchemy import Column
 from sqlalchemy import Integer
 from sqlalchemy import DateTime
+from sqlalchemy import Date
 from sqlalchemy import Time
 from sqlalchemy import Boolean
 from sqlalchemy import Double
@@ -14,6 +15,7 @@ from sqlalchemy import Float
 from sqlalchemy import Text
 from sqlalchemy import DECIMAL
 from sqlalchemy import JSON
+from sqlalchemy import Index, UniqueConstraint
 from typing import Optional
 
 
@@ -188,6 +190,9 @@ class  Contact(Base):
     Instagram = Column(String)
     Facebook = Column(String)
     Twitter = Column(String)
+    # Normalized ContactNo (E.164 digits) and its reverse, kept by services/phone_keys.py
+    PhoneKey = Column(String(20), nullable=True, index=True)
+    PhoneKeyRev = Column(String(20), nullable=True, index=True)
 
 
 
@@ -911,4 +916,215 @@ class Brochure(Base):
     CreatedById = Column(Integer, ForeignKey("users.id"))
     UpdatedById = Column(Integer, ForeignKey("users.id"))
     created_by = relationship("Users", foreign_keys=[CreatedById])
-    updated_by = relationship("Users", foreign_keys=[UpdatedById])
\ No newline at end of file
+    updated_by = relationship("Users", foreign_keys=[UpdatedById])
+
+class LeadSiteCounters(Base):
+    """
+    Pre-aggregated lead counters, one row per (SiteId, LeadStatus).
+    Maintained by services/lead_counters.py from lead writes and the scoring scheduler,
+    so dashboard aggregates read a handful of rows instead of scanning the lead table.
+    """
+    __tablename__ = "LeadSiteCounters"
+    # One row per pair: concurrent refreshes of a site cannot both insert it
+    __table_args__ = (Index("UX_LeadSiteCounters_SiteId_LeadStatus", "SiteId", "LeadStatus", unique=True),)
+
+    CounterId = Column(Integer(), primary_key=True, autoincrement=True)
+    SiteId = Column(Integer, ForeignKey("site.SiteId"), nullable=True, index=True)
+    LeadStatus = Column(String(100), nullable=True)
+    TotalCount = Column(Integer, nullable=False, default=0)
+    UrgentCount = Column(Integer, nullable=False, default=0)
+    DueTodayCount = Column(Integer, nullable=False, default=0)
+    HighIntentCount = Column(Integer, nullable=False, default=0)
+    OverdueCount = Column(Integer, nullable=False, default=0)
+    CriticalChurnCount = Column(Integer, nullable=False, default=0)
+    HighChurnCount = Column(Integer, nullable=False, default=0)
+    HealthScoreSum = Column(BigInteger, nullable=False, default=0)
+    HealthScoreCount = Column(Integer, nullable=False, default=0)
+    ConversionProbabilitySum = Column(DECIMAL(18, 2), nullable=False, default=0)
+    ConversionProbabilityCount = Column(Integer, nullable=False, default=0)
+    UpdatedDate = Column(DateTime)
+
+class NotificationOutbox(Base):
+    """
+    Outgoing notification queue. API calls only insert rows here; the dispatcher
+    in services/notification_outbox.py sends them, retries failures with backoff
+    and records the delivery status per recipient.
+    """
+    __tablename__ = "NotificationOutbox"
+
+    OutboxId = Column(Integer(), primary_key=True, autoincrement=True)
+    Channel = Column(String(20), nullable=False, default='WA')
+    ToNumber = Column(String(50), nullable=False)
+    ConfigId = Column(Integer, ForeignKey("APIConfiguration.ConfigId"), nullable=True)
+    ContentTemplateSID = Column(String(100), nullable=True)
+    ContentVariables = Column(Text, nullable=True)
+    DedupeKey = Column(String(200), nullable=False, unique=True)
+    Status = Column(String(20), nullable=False, default='pending', index=True)
+    Attempts = Column(Integer, nullable=False, default=0)
+    NextAttemptAt = Column(DateTime, nullable=True)
+    LastError = Column(String(500), nullable=True)
+    ProviderMessageSid = Column(String(100), nullable=True)
+    CreatedAt = Column(DateTime)
+    UpdatedAt = Column(DateTime)
+    SentAt = Column(DateTime, nullable=True)
+    CreatedById = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class BrokerMonthlyStats(Base):
+    """
+    Broker performance per (BrokerId, SiteId, StatMonth), by lead created month.
+    Maintained by services/broker_stats.py from lead writes and the scoring scheduler;
+    backs the MonthlyBrokerReport leaderboards.
+    """
+    __tablename__ = "BrokerMonthlyStats"
+
+    StatsId = Column(Integer(), primary_key=True, autoincrement=True)
+    BrokerId = Column(Integer, ForeignKey("contact.ContactId"), nullable=False, index=True)
+    SiteId = Column(Integer, ForeignKey("site.SiteId"), nullable=True)
+    StatMonth = Column(Date, nullable=False)
+    Leads = Column(Integer, nullable=False, default=0)
+    Wins = Column(Integer, nullable=False, default=0)
+    Losses = Column(Integer, nullable=False, default=0)
+    Visits = Column(Integer, nullable=False, default=0)
+    WinCustomers = Column(Integer, nullable=False, default=0)
+    UpdatedDate = Column(DateTime)
+
+class ContactLeadCounters(Base):
+    """
+    Lead counters per contact, as customer (Lead.ContactId) and as broker (Lead.BrokerId).
+    Maintained by services/contact_counters.py from lead writes and the scoring scheduler;
+    backs sorting and paging of the contact list. Contacts without leads have no row.
+    """
+    __tablename__ = "ContactLeadCounters"
+
+    # No FK to contact: a stale row must not block deleting the contact
+    ContactId = Column(Integer, primary_key=True, autoincrement=False)
+    CustomerLeadCount = Column(Integer, nullable=False, default=0)
+    BrokerLeadCount = Column(Integer, nullable=False, default=0)
+    OpenLeadCount = Column(Integer, nullable=False, default=0)
+    LastActivityDate = Column(DateTime, nullable=True)
+    UpdatedDate = Column(DateTime)
+
+class WhatsAppInboundMessage(Base):
+    """
+    Inbound WhatsApp message queue. The webhook only inserts rows here (deduped on
+    MessageSid) and returns; services/whatsapp_inbox.py runs the chatbot pipeline
+    and sends the reply, one message at a time per phone number.
+    """
+    __tablename__ = "WhatsAppInboundMessage"
+
+    InboundId = Column(Integer(), primary_key=True, autoincrement=True)
+    MessageSid = Column(String(100), nullable=False, unique=True)
+    PhoneNumber = Column(String(50), nullable=False, index=True)
+    ProfileName = Column(String(200), nullable=True)
+    Body = Column(Text, nullable=True)
+    Status = Column(String(20), nullable=False, default='pending', index=True)
+    Attempts = Column(Integer, nullable=False, default=0)
+    NextAttemptAt = Column(DateTime, nullable=True)
+    LastError = Column(String(500), nullable=True)
+    ReplyText = Column(Text, nullable=True)
+    ReplyMessageSid = Column(String(100), nullable=True)
+    ReceivedAt = Column(DateTime, nullable=False)
+    UpdatedAt = Column(DateTime)
+    ProcessedAt = Column(DateTime, nullable=True)
+    # Set with the pipeline's first commit; such a message is never run through it again
+    ProcessorCommittedAt = Column(DateTime, nullable=True)
+
+class AgendaItem(Base):
+    """
+    Open follow-ups and action items per assigned user, keyed by due date.
+    Maintained by services/agenda.py from follow-up/action-item writes and the
+    scoring scheduler; backs GET /agenda/. Closed and undated items have no row.
+    """
+    __tablename__ = "AgendaItem"
+    __table_args__ = (UniqueConstraint("SourceType", "SourceId", name="UQ_AgendaItem_Source"),)
+
+    AgendaItemId = Column(Integer(), primary_key=True, autoincrement=True)
+    UserId = Column(Integer, nullable=False)
+    # 'followup' (FollowUps.FollowUpsId) or 'action_item' (ActionItem.ActionItemId)
+    SourceType = Column(String(20), nullable=False)
+    SourceId = Column(Integer, nullable=False)
+    DueDate = Column(DateTime, nullable=False)
+    Title = Column(String(255), nullable=True)
+    Status = Column(String(50), nullable=True)
+    LeadId = Column(Integer, nullable=True)
+    VisitId = Column(Integer, nullable=True)
+    UpdatedDate = Column(DateTime)
+
+class LeadSearchProjection(Base):
+    """
+    One row per lead with the names, phone keys and scores the lead list filters
+    and sorts on, so /leads/leads_full_detail pages on a single table instead of
+    joining site, prospect type and two contacts per request.
+    Maintained by services/lead_search.py from lead/contact/follow-up writes and
+    the scoring scheduler.
+    """
+    __tablename__ = "LeadSearchProjection"
+
+    # No FK to lead: a stale row must not block deleting the lead
+    LeadId = Column(Integer, primary_key=True, autoincrement=False)
+    SiteId = Column(Integer, nullable=True)
+    SiteName = Column(String(255), nullable=True)
+    ProspectTypeId = Column(Integer, nullable=True)
+    ProspectTypeName = Column(String(255), nullable=True)
+    LeadName = Column(String(255), nullable=True)
+    LeadStatus = Column(String(50), nullable=True)
+    LeadSource = Column(String(100), nullable=True)
+    CreatedDate = Column(DateTime, nullable=True)
+    CustomerId = Column(Integer, nullable=True)
+    CustomerName = Column(String(512), nullable=True)
+    CustomerType = Column(String(50), nullable=True)
+    CustomerPhoneKeyRev = Column(String(20), nullable=True)
+    BrokerId = Column(Integer, nullable=True)
+    BrokerName = Column(String(512), nullable=True)
+    BrokerType = Column(String(50), nullable=True)
+    BrokerPhoneKeyRev = Column(String(20), nullable=True)
+    HealthScore = Column(Integer, nullable=True)
+    BuyingIntent = Column(Integer, nullable=True)
+    AIPriority = Column(Integer, nullable=True)
+    ChurnRisk = Column(String(50), nullable=True)
+    FollowUpStatus = Column(String(50), nullable=True)
+    OverdueDays = Column(Integer, nullable=True)
+    # COALESCE(RequestedAmount, QuotedAmount, 0) - the budget sort key
+    Budget = Column(Float, nullable=True)
+    # Earliest NextFollowUpDate of open follow-ups / latest FollowUpDate of completed ones
+    NextFollowUpDate = Column(DateTime, nullable=True)
+    LastContactDate = Column(DateTime, nullable=True)
+    UpdatedDate = Column(DateTime)
+
+class VisitPrimaryVisitor(Base):
+    """
+    One row per visit with its primary visitor (earliest created, not deleted)
+    and its visitor count, so /visit/Visit_full_details lists visits without
+    joining Visitors to contact.
+    Maintained by services/visit_visitors.py from visitor/contact writes and
+    the scoring scheduler.
+    """
+    __tablename__ = "VisitPrimaryVisitor"
+
+    # No FK to Visit: a stale row must not block deleting the visit
+    VisitId = Column(Integer, primary_key=True, autoincrement=False)
+    VisitorsId = Column(Integer, nullable=True)
+    ContactId = Column(Integer, nullable=True)
+    VisitorName = Column(String(512), nullable=True)
+    ContactType = Column(String(50), nullable=True)
+    ContactNo = Column(BigInteger, nullable=True)
+    LeadId = Column(Integer, nullable=True)
+    VisitorCount = Column(Integer, nullable=False, default=0)
+    UpdatedDate = Column(DateTime)
+
+class VisitVisitorKey(Base):
+    """
+    One row per customer or broker visitor (not deleted) of a visit, with the
+    contact's full name and reversed phone key, for the customer and broker
+    name / number filters of /visit/Visit_full_details and the visit export.
+    Maintained by services/visit_visitors.py together with VisitPrimaryVisitor.
+    """
+    __tablename__ = "VisitVisitorKey"
+
+    # No FK to Visit: a stale row must not block deleting the visit
+    VisitId = Column(Integer, primary_key=True, autoincrement=False)
+    VisitorsId = Column(Integer, primary_key=True, autoincrement=False)
+    # 'Customer' or 'Broker'
+    ContactType = Column(String(50), nullable=False)
+    Name = Column(String(512), nullable=True)
+    PhoneKeyRev = Column(String(20), nullable=True)
@@ -0,0 +1,155 @@
+"""
+Query Deadline Check
+====================
+
+Verifies that routers/query_deadline.py stops a runaway query, using an
+in-memory SQLite database (no server needed):
+
+- async endpoint: blocking SQL on the event loop, cancelled by the watchdog
+  thread at the deadline and answered with 504
+- sync endpoint: same query in the threadpool, cancelled at the deadline
+- disconnect: the client leaves while a sync GET's query runs
+- background task: a query started after the response, running past the
+  deadline while the server reports the completed response's disconnect,
+  is not cancelled
+
+    python query_deadline_check.py
+
+Exits non-zero when a query is not cancelled within its deadline plus
+TOLERANCE_SECONDS.
+"""
+
+from fastapi import BackgroundTasks, FastAPI
+from sqlalchemy import create_engine, event, text
+from routers import query_deadline
+import asyncio
+import time
+
+DEADLINE_SECONDS = 0.5
+TOLERANCE_SECONDS = 1.0
+
+# Counts to 10^9 - minutes of work unless interrupted
+SLOW_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+    "SELECT count(*) FROM c"
+)
+
+# Background work outliving the deadline: short queries for twice its length
+BACKGROUND_SECONDS = DEADLINE_SECONDS * 2
+
+background_result = {}
+
+
+def build_app() -> FastAPI:
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    # The module listens on the application engine; attach the same hooks here
+    event.listen(engine, "before_cursor_execute", query_deadline._before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", query_deadline._after_cursor_execute)
+    event.listen(engine, "handle_error", query_deadline._handle_cancelled_query)
+
+    app = FastAPI()
+    app.add_middleware(query_deadline.QueryDeadlineMiddleware)
+
+    @app.get("/check/async")
+    async def slow_async():
+        with engine.connect() as connection:
+            return {"count": connection.execute(text(SLOW_QUERY)).scalar()}
+
+    @app.get("/check/sync")
+    def slow_sync():
+        with engine.connect() as connection:
+            return {"count": connection.execute(text(SLOW_QUERY)).scalar()}
+
+    @app.get("/check/background")
+    def background(background_tasks: BackgroundTasks):
+        background_tasks.add_task(background_queries, engine)
+        return {"queued": True}
+
+    return app
+
+
+def background_queries(engine) -> None:
+    background_result.clear()
+    end_time = time.monotonic() + BACKGROUND_SECONDS
+    try:
+        with engine.connect() as connection:
+            while time.monotonic() < end_time:
+                connection.execute(text("SELECT 1"))
+                time.sleep(0.05)
+        background_result["ok"] = True
+    except Exception as e:
+        background_result["error"] = repr(e)
+
+
+async def request(app, path: str, disconnect_after: float = None):
+    """
+    Drive one GET through the ASGI app; returns (status or None, seconds).
+
+    disconnect_after: seconds until the client leaves; None never leaves and
+    0 leaves as soon as the response is complete, as servers report it.
+    """
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [], "http_version": "1.1", "scheme": "http", "root_path": "",
+        "server": ("check", 80), "client": ("check", 1),
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+    response_complete = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        if disconnect_after == 0:
+            await response_complete.wait()
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_complete.set()
+
+    start_time = time.monotonic()
+    await app(scope, receive, send)
+    status = next((m["status"] for m in sent if m["type"] == "http.response.start"), None)
+    return status, time.monotonic() - start_time
+
+
+async def run_checks() -> bool:
+    app = build_app()
+    query_deadline.DEADLINES[:0] = [
+        (None, "/check/async", DEADLINE_SECONDS),
+        (None, "/check/sync", DEADLINE_SECONDS),
+        (None, "/check/background", DEADLINE_SECONDS),
+    ]
+    checks = [
+        ("async endpoint, deadline", "/check/async", None, 504),
+        ("sync endpoint, deadline", "/check/sync", None, 504),
+        ("sync endpoint, disconnect", "/check/sync", DEADLINE_SECONDS / 2, None),
+    ]
+    ok = True
+    for name, path, disconnect_after, expected_status in checks:
+        status, seconds = await request(app, path, disconnect_after)
+        passed = status == expected_status and seconds <= DEADLINE_SECONDS + TOLERANCE_SECONDS
+        ok = ok and passed
+        print(f"  {'PASS' if passed else 'FAIL'}  {name:<28} status {status}  {seconds:.2f}s")
+
+    # The app call returns once the background task is done
+    status, seconds = await request(app, "/check/background", disconnect_after=0)
+    passed = status == 200 and background_result.get("ok", False)
+    ok = ok and passed
+    detail = background_result.get("error", "completed")
+    print(f"  {'PASS' if passed else 'FAIL'}  {'background task':<28} status {status}  {seconds:.2f}s  {detail}")
+    print(f"  cancelled: {query_deadline.get_query_deadline_stats()['cancelled']}")
+    return ok
+
+
+def main() -> int:
+    return 0 if asyncio.run(run_checks()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
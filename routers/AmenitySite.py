@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, AMENITY_SITE
 from datetime import datetime
 from schemas.schemas import AmenitySiteRequest
 
@@ -34,10 +35,10 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_amentity_site(user:user_dependency, db: db_dependency):
+async def read_amentity_site(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(AmenitySite).all()
+    return cached_list_response(request, AMENITY_SITE, lambda: db.query(AmenitySite).all())
 
 
 @router.get('/getsingleAmenitysite/{amenitysite_id}', status_code=status.HTTP_200_OK)
@@ -62,6 +63,7 @@ async def create_amenitysite(user: user_dependency, db:db_dependency, amenitysit
     )
     db.add(amenity_site)
     db.commit()
+    invalidate(AMENITY_SITE)
     if amenitysite_request is not None:
         return amenitysite_request
     raise HTTPException(status_code=404, detail='amenity site not found')
@@ -80,6 +82,7 @@ async def update_amenity_site(user: user_dependency, db: db_dependency, amenitys
     amenity_exist.IsActive=amenitysite_request.IsActive
     db.add(amenity_exist)
     db.commit()
+    invalidate(AMENITY_SITE)
 
 
 @router.delete("/deleteamenitysite/{amenitysite_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -90,4 +93,5 @@ async def delete_amenitysite (user: user_dependency, db: db_dependency, amenitys
     if amenity_model is None:
         raise HTTPException(status_code=404, detail="amenity site detail not found")
     db.query(AmenitySite).filter(AmenitySite.AmenitySiteId == amenitysite_id).delete()
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate(AMENITY_SITE)
\ No newline at end of file
@@ -11,6 +11,7 @@ from sqlalchemy import select, func, text, distinct, String, literal, Float, ext
     literal_column
 from database import SessionLocal
 from models import Visitors, Contact, Visit, Lead, Site
+from services.analytics_snapshot import query_snapshot, lead_filter_sql
 from .auth import get_current_user
 from datetime import datetime, timedelta
 from schemas.schemas import TargetsRequest
@@ -40,6 +41,23 @@ db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
+def snapshot_lead_counts(matched: str, base: str = "TRUE", **filters):
+    """
+    (total, matched) lead counts from the analytics snapshot, for the filter
+    set of lead_filter_sql(); None when the caller should query live.
+    String predicates compare the lowercase match columns (LeadStatusKey = 'win').
+    """
+    where, params = lead_filter_sql(**filters)
+    rows = query_snapshot(
+        f"SELECT count(*) AS total, count(*) FILTER (WHERE {matched}) AS matched "
+        f"FROM lead WHERE {base} AND {where}",
+        params, tables=("lead",),
+    )
+    if rows is None:
+        return None
+    return rows[0]["total"], rows[0]["matched"]
+
+
 @router.get("/monthly-leads")
 def get_monthly_leads(user: user_dependency,db: db_dependency,
     start_date: Optional[date] = Query(None),
@@ -132,25 +150,32 @@ def get_conversion_Rate_social_media(user: user_dependency,db: db_dependency,
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    query = db.query(Lead)
-
-    # Apply filters
-    if start_date:
-        query = query.filter(Lead.CreatedDate >= start_date)
-    if end_date:
-        query = query.filter(Lead.CreatedDate <= end_date)
-    if site_id:
-        query = query.filter(Lead.SiteId.in_(site_id))
-    if lead_source:
-        query = query.filter(Lead.LeadSource.in_(lead_source))
-    if lead_created_by_id:
-        query = query.filter(Lead.CreatedById == lead_created_by_id)
-    if broker_id:
-        query = query.filter(Lead.BrokerId == broker_id)
+    counts = snapshot_lead_counts(
+        "LeadSourceKey = 'social media'", start_date=start_date, end_date=end_date, site_id=site_id,
+        lead_source=lead_source, created_by_id=lead_created_by_id, broker_id=broker_id,
+    )
+    if counts is not None:
+        total_leads, social_media_leads = counts
+    else:
+        query = db.query(Lead)
+
+        # Apply filters
+        if start_date:
+            query = query.filter(Lead.CreatedDate >= start_date)
+        if end_date:
+            query = query.filter(Lead.CreatedDate <= end_date)
+        if site_id:
+            query = query.filter(Lead.SiteId.in_(site_id))
+        if lead_source:
+            query = query.filter(Lead.LeadSource.in_(lead_source))
+        if lead_created_by_id:
+            query = query.filter(Lead.CreatedById == lead_created_by_id)
+        if broker_id:
+            query = query.filter(Lead.BrokerId == broker_id)
 
-    # Clone query for total and social media
-    total_leads = query.count()
-    social_media_leads = query.filter(Lead.LeadSource == "Social Media").count()
+        # Clone query for total and social media
+        total_leads = query.count()
+        social_media_leads = query.filter(Lead.LeadSource == "Social Media").count()
 
     # Conversion Rate Calculation
     conversion_rate = (social_media_leads / total_leads * 100) if total_leads > 0 else 0
@@ -176,28 +201,35 @@ def get_broker_conversion_rate(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    # Base query: only leads with brokers
-    base_query = db.query(Lead).filter(Lead.BrokerId.isnot(None))
-
-    # Apply filters
-    if start_date:
-        base_query = base_query.filter(Lead.CreatedDate >= start_date)
-    if end_date:
-        base_query = base_query.filter(Lead.CreatedDate <= end_date)
-    if site_id:
-        base_query = base_query.filter(Lead.SiteId.in_(site_id))
-    if lead_source:
-        base_query = base_query.filter(Lead.LeadSource.in_(lead_source))
-    if lead_created_by_id:
-        base_query = base_query.filter(Lead.CreatedById == lead_created_by_id)
-    if broker_id:
-        base_query = base_query.filter(Lead.BrokerId == broker_id)
+    counts = snapshot_lead_counts(
+        "LeadStatusKey = 'win'", base="BrokerId IS NOT NULL", start_date=start_date, end_date=end_date,
+        site_id=site_id, lead_source=lead_source, created_by_id=lead_created_by_id, broker_id=broker_id,
+    )
+    if counts is not None:
+        total_broker_leads, broker_win_leads = counts
+    else:
+        # Base query: only leads with brokers
+        base_query = db.query(Lead).filter(Lead.BrokerId.isnot(None))
+
+        # Apply filters
+        if start_date:
+            base_query = base_query.filter(Lead.CreatedDate >= start_date)
+        if end_date:
+            base_query = base_query.filter(Lead.CreatedDate <= end_date)
+        if site_id:
+            base_query = base_query.filter(Lead.SiteId.in_(site_id))
+        if lead_source:
+            base_query = base_query.filter(Lead.LeadSource.in_(lead_source))
+        if lead_created_by_id:
+            base_query = base_query.filter(Lead.CreatedById == lead_created_by_id)
+        if broker_id:
+            base_query = base_query.filter(Lead.BrokerId == broker_id)
 
-    # Total broker leads after filtering
-    total_broker_leads = base_query.count()
+        # Total broker leads after filtering
+        total_broker_leads = base_query.count()
 
-    # Broker wins after filtering
-    broker_win_leads = base_query.filter(Lead.LeadStatus == "Win").count()
+        # Broker wins after filtering
+        broker_win_leads = base_query.filter(Lead.LeadStatus == "Win").count()
 
     # Conversion rate calculation
     conversion_rate = (broker_win_leads / total_broker_leads * 100) if total_broker_leads > 0 else 0
@@ -223,25 +255,35 @@ async def conversion_rate(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    filter_conditions = []
+    # CreatedBy filters even when 0 is passed here (an int, safe to inline)
+    counts = snapshot_lead_counts(
+        "LeadStatusKey = 'win'",
+        base=f"CreatedById = {int(lead_created_by_id)}" if lead_created_by_id is not None else "TRUE",
+        start_date=start_date, end_date=end_date, site_id=site_id, lead_source=lead_source,
+        broker_id=broker_id,
+    )
+    if counts is not None:
+        total_leads, win_leads = counts
+    else:
+        filter_conditions = []
 
-    # Optional CreatedBy filter (only if passed)
-    if lead_created_by_id is not None:
-        filter_conditions.append(Lead.CreatedById == lead_created_by_id)
+        # Optional CreatedBy filter (only if passed)
+        if lead_created_by_id is not None:
+            filter_conditions.append(Lead.CreatedById == lead_created_by_id)
 
-    if site_id:
-        filter_conditions.append(Lead.SiteId.in_(site_id))
-    if lead_source:
-        filter_conditions.append(Lead.LeadSource.in_(lead_source))
-    if broker_id:
-        filter_conditions.append(Lead.BrokerId == broker_id)
-    if start_date:
-        filter_conditions.append(Lead.CreatedDate >= start_date)
-    if end_date:
-        filter_conditions.append(Lead.CreatedDate <= end_date)
+        if site_id:
+            filter_conditions.append(Lead.SiteId.in_(site_id))
+        if lead_source:
+            filter_conditions.append(Lead.LeadSource.in_(lead_source))
+        if broker_id:
+            filter_conditions.append(Lead.BrokerId == broker_id)
+        if start_date:
+            filter_conditions.append(Lead.CreatedDate >= start_date)
+        if end_date:
+            filter_conditions.append(Lead.CreatedDate <= end_date)
 
-    total_leads = db.query(Lead).filter(*filter_conditions).count()
-    win_leads = db.query(Lead).filter(*filter_conditions, Lead.LeadStatus == 'Win').count()
+        total_leads = db.query(Lead).filter(*filter_conditions).count()
+        win_leads = db.query(Lead).filter(*filter_conditions, Lead.LeadStatus == 'Win').count()
 
     win_percentage = (win_leads / total_leads) * 100 if total_leads > 0 else 0.0
 
@@ -334,6 +376,17 @@ def get_weekly_lead_Overview(
     if not end_date:
         end_date = today
 
+    where, params = lead_filter_sql(start_date, end_date, site_id, lead_source, created_by_id, broker_id)
+    snapshot_rows = query_snapshot(
+        # Sources differing only in case / trailing spaces form one group, as on SQL Server
+        f"SELECT min(LeadSource) AS LeadSource, count(*) AS TotalLeads FROM lead "
+        f"WHERE CreatedDate IS NOT NULL AND {where} "
+        f"GROUP BY LeadSourceKey ORDER BY LeadSourceKey NULLS FIRST",
+        params, tables=("lead",),
+    )
+    if snapshot_rows is not None:
+        return snapshot_rows
+
     filters = [
         Lead.CreatedDate.isnot(None),
         Lead.CreatedDate >= start_date,
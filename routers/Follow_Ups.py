@@ -10,6 +10,9 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.paging_utils import PageParams, model_columns, paged_response
+from services.agenda import refresh_agenda
+from services.lead_search import refresh_lead_search
 from datetime import datetime
 from schemas.schemas import FollowUpsRequest
 
@@ -36,10 +39,12 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_follow_ups(user:user_dependency, db: db_dependency):
+async def read_follow_ups(user:user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(FollowUps).all()
+    if page.unpaged:
+        return db.query(FollowUps).all()
+    return paged_response(db.query(FollowUps), FollowUps.FollowUpsId, model_columns(FollowUps), page, "Follow_Ups")
 
 
 @router.get('/getsinglefollowups/{follow_id}', status_code=status.HTTP_200_OK)
@@ -200,6 +205,8 @@ async def create_follow_ups(user: user_dependency, db: db_dependency, followups_
     db.add(action_item)
     db.commit()
     db.refresh(action_item)
+    refresh_agenda(db, followup_ids=[followups.FollowUpsId], action_item_ids=[action_item.ActionItemId])
+    refresh_lead_search(db, [followups_request.LeadId])
 
     return {
         "FollowupsID": followups.FollowUpsId,
@@ -214,6 +221,7 @@ async def update_follow_ups(user: user_dependency, db: db_dependency, follow_id:
     followups_exist = db.query(FollowUps).filter(FollowUps.FollowUpsId == follow_id ).first()
     if followups_exist is None:
         raise HTTPException(status_code=404, detail="follow ups detail not found")
+    previous_lead_id = followups_exist.LeadId
     followups_exist.LeadId=followups_request.LeadId
     followups_exist.VisitId=followups_request.VisitId
     followups_exist.UserId=followups_request.UserId
@@ -227,6 +235,8 @@ async def update_follow_ups(user: user_dependency, db: db_dependency, follow_id:
     # followups_exist.CreatedById=followups_request.CreatedById
     db.add(followups_exist)
     db.commit()
+    refresh_agenda(db, followup_ids=[follow_id])
+    refresh_lead_search(db, [previous_lead_id, followups_request.LeadId])
 
 
 @router.delete("/deletefollowups/{follow_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -236,8 +246,11 @@ async def delete_followups (user: user_dependency, db: db_dependency, follow_id
     follow_model = db.query(FollowUps).filter(FollowUps.FollowUpsId == follow_id).first()
     if follow_model is None:
         raise HTTPException(status_code=404, detail="follow ups detail not found")
+    lead_id = follow_model.LeadId
     db.query(FollowUps).filter(FollowUps.FollowUpsId == follow_id).delete()
     db.commit()
+    refresh_agenda(db, followup_ids=[follow_id])
+    refresh_lead_search(db, [lead_id])
 
 
 
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.paging_utils import PageParams, model_columns, paged_response
 from datetime import datetime
 from schemas.schemas import LeavesRequest
 
@@ -34,10 +35,12 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_leave_application(user:user_dependency, db: db_dependency):
+async def read_leave_application(user:user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(LeaveApplication).all()
+    if page.unpaged:
+        return db.query(LeaveApplication).all()
+    return paged_response(db.query(LeaveApplication), LeaveApplication.LeaveApplicationId, model_columns(LeaveApplication), page, "LeaveApplication")
 
 
 @router.get('/getsingleleaveapplication/{leave_id}', status_code=status.HTTP_200_OK)
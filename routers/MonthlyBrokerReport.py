@@ -10,7 +10,9 @@ from typing import Annotated, Optional, List
 from sqlalchemy.orm import Session, joinedload, load_only, aliased
 from sqlalchemy import select, func, text, distinct, and_, case, tuple_, String, literal, Float, literal_column
 from database import SessionLocal
-from models import  Visitors, Contact, Visit, Users,Lead, Site
+from models import  Visitors, Contact, Visit, Users,Lead, Site, BrokerMonthlyStats
+from services.broker_stats import ensure_broker_stats
+from services.analytics_snapshot import query_snapshot
 from .auth import get_current_user
 from datetime import datetime, timedelta
 from schemas.schemas import TargetsRequest
@@ -40,6 +42,20 @@ db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
+def stats_month_range(start_date: date, end_date: date):
+    """
+    Month range (first, last month start) when [start_date, end_date] covers whole
+    months (the current month counts as whole up to today), else None.
+    BrokerMonthlyStats can only answer month-aligned ranges.
+    """
+    if start_date.day != 1 or end_date < start_date:
+        return None
+    month_end = (end_date.replace(day=1) + relativedelta(months=1)) - timedelta(days=1)
+    if end_date != month_end and end_date < get_date():
+        return None
+    return start_date, end_date.replace(day=1)
+
+
 @router.get("/Total-Broker-Leads")
 async def total_broker_leads(user: user_dependency,db: db_dependency,
     start_date: Optional[date] = Query(None),
@@ -212,6 +228,50 @@ async def Top_Performing_Brokers(user: user_dependency,db: db_dependency,
     if not end_date:
         end_date = today
     try:
+        month_range = stats_month_range(start_date, end_date)
+        if month_range:
+            # Whole months: top-N over the pre-aggregated broker stats
+            ensure_broker_stats(db)
+            broker_name = (Contact.ContactFName + ' ' + func.coalesce(Contact.ContactLName, '')).label('BrokerName')
+            total_wins = func.sum(BrokerMonthlyStats.Wins)
+            total_leads = func.sum(BrokerMonthlyStats.Leads)
+            conversion_rate = cast(100.0 * total_wins / func.nullif(total_leads, 0), Float).label('ConversionRate')
+
+            query = db.query(
+                broker_name,
+                total_leads.label('TotalLeads'),
+                total_wins.label('Wins'),
+                func.sum(BrokerMonthlyStats.Losses).label('Losts'),
+                func.sum(BrokerMonthlyStats.Visits).label('SiteVisits'),
+                conversion_rate
+            ).join(
+                Contact, Contact.ContactId == BrokerMonthlyStats.BrokerId
+            ).filter(
+                Contact.ContactType == 'Broker',
+                BrokerMonthlyStats.StatMonth >= month_range[0],
+                BrokerMonthlyStats.StatMonth <= month_range[1]
+            )
+            if site_id:
+                query = query.filter(BrokerMonthlyStats.SiteId.in_(site_id))
+            if broker_id:
+                query = query.filter(BrokerMonthlyStats.BrokerId == broker_id)
+
+            results = query.group_by(
+                BrokerMonthlyStats.BrokerId, Contact.ContactFName, Contact.ContactLName
+            ).order_by(conversion_rate.desc()).limit(5).all()
+
+            return [
+                {
+                    "BrokerName": broker.BrokerName,
+                    "TotalLeads": broker.TotalLeads,
+                    "Wins": broker.Wins,
+                    "Losts": broker.Losts,
+                    "SiteVisits": broker.SiteVisits,
+                    "ConversionRate": round(broker.ConversionRate or 0, 2)
+                }
+                for broker in results
+            ]
+
         # Broker Full Name
         broker_name = (Contact.ContactFName + ' ' + func.coalesce(Contact.ContactLName, '')).label('BrokerName')
 
@@ -359,6 +419,36 @@ async def broker_visitors(
         if not end_date:
             end_date = today
 
+        # Analytics snapshot first; the live query below is the fallback
+        conditions = ["v.CreatedDate >= $start_date", "v.CreatedDate <= $end_date"]
+        params = {"start_date": start_date, "end_date": end_date}
+        if site_id:
+            conditions.append("list_contains($site_id, vi.SiteId)")
+            params["site_id"] = list(site_id)
+        if broker_id:
+            conditions.append("c.ContactId = $broker_id")
+            params["broker_id"] = broker_id
+        snapshot_rows = query_snapshot(
+            "SELECT c.ContactId, c.ContactType, CAST(date_trunc('month', v.CreatedDate) AS DATE) AS Month, "
+            "count(*) AS BrokerVisitorCount "
+            "FROM visitors v "
+            "JOIN contact c ON c.ContactId = v.ContactId AND c.ContactTypeKey = 'broker' "
+            "JOIN visit vi ON vi.VisitId = v.VisitId "
+            f"WHERE {' AND '.join(conditions)} "
+            "GROUP BY ALL ORDER BY Month, c.ContactId",
+            params, tables=("visitors", "contact", "visit"),
+        )
+        if snapshot_rows is not None:
+            return [
+                {
+                    "BrokerId": row["ContactId"],
+                    "ContactType": row["ContactType"],
+                    "Month": row["Month"].strftime('%Y-%m-%d'),
+                    "BrokerVisitorCount": row["BrokerVisitorCount"]
+                }
+                for row in snapshot_rows
+            ]
+
         # DATEFROMPARTS equivalent
         month_start = func.datefromparts(
             func.year(Visitors.CreatedDate),
@@ -538,6 +628,45 @@ async def broker_wise_customers(
     if not end_date:
         end_date = today
 
+    month_range = stats_month_range(start_date, end_date)
+    if month_range:
+        # Whole months: top-N over the pre-aggregated broker stats
+        ensure_broker_stats(db)
+        customer_count = func.sum(BrokerMonthlyStats.WinCustomers)
+        query = db.query(
+            BrokerMonthlyStats.BrokerId,
+            Contact.ContactFName,
+            customer_count.label("CustomerCount")
+        ).outerjoin(
+            Contact,
+            and_(
+                Contact.ContactId == BrokerMonthlyStats.BrokerId,
+                Contact.ContactType == 'broker'
+            )
+        ).filter(
+            BrokerMonthlyStats.WinCustomers > 0,
+            BrokerMonthlyStats.StatMonth >= month_range[0],
+            BrokerMonthlyStats.StatMonth <= month_range[1]
+        )
+        if site_id:
+            query = query.filter(BrokerMonthlyStats.SiteId.in_(site_id))
+        if broker_id:
+            query = query.filter(BrokerMonthlyStats.BrokerId == broker_id)
+
+        results = query.group_by(
+            BrokerMonthlyStats.BrokerId, Contact.ContactFName
+        ).order_by(customer_count.desc()).limit(5).all()
+
+        return [
+            {
+                "BrokerId": row.BrokerId,
+                "LeadStatus": "Win",
+                "BrokerFName": row.ContactFName,
+                "CustomerCount": row.CustomerCount
+            }
+            for row in results
+        ]
+
     query = db.query(
         Lead.BrokerId,
         Lead.LeadStatus,
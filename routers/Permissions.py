@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, PERMISSION
 from datetime import datetime
 from schemas.schemas import PermissionsRequest
 
@@ -33,10 +34,10 @@ db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 @router.get('/')
-async def read_Permissions(user:user_dependency, db: db_dependency):
+async def read_Permissions(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(Permission).all()
+    return cached_list_response(request, PERMISSION, lambda: db.query(Permission).all())
 
 
 
@@ -59,6 +60,7 @@ async def create_Permission(user: user_dependency, db: db_dependency, Permission
     Permission_model = Permission(**Permission_request.dict(),  CreatedAt=get_time(), UpdatedAt=get_time())
     db.add( Permission_model)
     db.commit()
+    invalidate(PERMISSION)
     db.refresh( Permission_model)  # This ensures we get the generated ID
     # Return the created lead with LeadId
     return {"Permission-id":Permission_model.PermissionId }
@@ -90,4 +92,5 @@ async def delete_Permission (user: user_dependency, db: db_dependency, Permissio
     if  Permission_model is None:
         raise HTTPException(status_code=404, detail=" Permission  not found")
     db.query(Permission).filter(Permission.PermissionId == Permission_id).delete()
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate(PERMISSION)
\ No newline at end of file
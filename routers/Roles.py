@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, ROLE
 from datetime import datetime
 from schemas.schemas import RolesRequest
 
@@ -33,10 +34,10 @@ db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 @router.get('/')
-async def read_Roles(user:user_dependency, db: db_dependency):
+async def read_Roles(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(Role).all()
+    return cached_list_response(request, ROLE, lambda: db.query(Role).all())
 
 
 #
@@ -268,6 +269,7 @@ async def create_roles(user: user_dependency, db: db_dependency, role_request: R
 
         # 7. Commit once
         db.commit()
+        invalidate(ROLE)
 
         return {
             "role_id": role_model.RoleId,
@@ -312,6 +314,7 @@ async def update_Roles (user: user_dependency,db: db_dependency,role_id: int, ro
     existing_role.UpdatedDate = get_time()
     db.add(existing_role)
     db.commit()
+    invalidate(ROLE)
 
 
 
@@ -365,6 +368,7 @@ async def delete_roles (user: user_dependency, db: db_dependency, role_id : int
         # 3. Finally delete the role
         db.delete(roles_model)
         db.commit()
+        invalidate(ROLE)
         return {"message": "Role deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, SITE_TYPE
 from datetime import datetime
 from schemas.schemas import SiteTypeRequest
 
@@ -34,10 +35,10 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_Site_type(user:user_dependency, db: db_dependency):
+async def read_Site_type(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(SiteType).all()
+    return cached_list_response(request, SITE_TYPE, lambda: db.query(SiteType).all())
 
 
 @router.get('/getsinglesitetype/{site_id}', status_code=status.HTTP_200_OK)
@@ -59,6 +60,7 @@ async def create_site_type(user: user_dependency, db:db_dependency, site_request
     )
     db.add(site_type)
     db.commit()
+    invalidate(SITE_TYPE)
     db.refresh(site_type)
     return site_type
 
@@ -73,6 +75,7 @@ async def update_sitetype(user: user_dependency, db: db_dependency, site_id: int
     site_exist.SiteType=site_request.SiteType
     db.add(site_exist)
     db.commit()
+    invalidate(SITE_TYPE)
 
 
 @router.delete("/deletesitetype/{site_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -83,4 +86,5 @@ async def delete_site_type (user: user_dependency, db: db_dependency, site_id :
     if site_model is None:
         raise HTTPException(status_code=404, detail="site type detail not found")
     db.query(SiteType).filter(SiteType.SiteTypeId == site_id).delete()
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate(SITE_TYPE)
\ No newline at end of file
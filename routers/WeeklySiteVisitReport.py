@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session, joinedload, load_only, aliased
 from sqlalchemy import select, func, text, distinct, and_, case, literal_column, desc
 from database import SessionLocal
 from models import  Visitors, Contact, Visit, Users
+from services.analytics_snapshot import query_snapshot
 from .auth import get_current_user
 from datetime import datetime, timedelta
 from schemas.schemas import TargetsRequest
@@ -309,6 +310,59 @@ def get_Visit_Trends(
         next_month = today.replace(day=28) + timedelta(days=4)
         end_date = next_month - timedelta(days=next_month.day)
 
+    results = visit_trends_from_snapshot(start_date, end_date, site_id, broker_id, customer_id)
+    if results is None:
+        results = visit_trends_live(db, start_date, end_date, site_id, broker_id, customer_id)
+
+    current_week_number = today.isocalendar()[1]
+
+    response = []
+    for row in results:
+        # Check if this is the current week
+        week_number = row["WeekStartDate"].isocalendar()[1]
+        is_current_week = (week_number == current_week_number)
+
+        response.append({
+            "WeekNumber": row["WeekNumber"],
+            "WeekStartDate": row["WeekStartDate"],
+            "TotalVisits": row["TotalVisits"],
+            "CurrentWeekTotalVisits": row["TotalVisits"] if is_current_week else 0
+        })
+
+    return response
+
+
+def visit_trends_from_snapshot(start_date, end_date, site_id, broker_id, customer_id):
+    """Weekly visit counts from the analytics snapshot; None when it cannot answer."""
+    conditions = ["v.VisitDate >= $start_date", "v.VisitDate <= $end_date"]
+    params = {"start_date": start_date, "end_date": end_date}
+    if site_id:
+        conditions.append("list_contains($site_id, v.SiteId)")
+        params["site_id"] = list(site_id)
+    if broker_id:
+        conditions.append("c.ContactTypeKey = 'broker' AND c.ContactId = $broker_id")
+        params["broker_id"] = broker_id
+    if customer_id:
+        conditions.append("c.ContactTypeKey = 'customer' AND c.ContactId = $customer_id")
+        params["customer_id"] = customer_id
+    # Same buckets as DATEADD(WEEK, DATEDIFF(WEEK, 0, VisitDate), 0) on SQL Server:
+    # weeks start on Monday, but DATEDIFF(WEEK) counts Sunday boundaries, so a
+    # Sunday belongs to the week starting the next day
+    return query_snapshot(
+        "SELECT row_number() OVER (ORDER BY WeekStartDate) AS WeekNumber, WeekStartDate, TotalVisits FROM ("
+        "SELECT CAST(date_trunc('week', CAST(v.VisitDate AS DATE) + INTERVAL 1 DAY) AS TIMESTAMP) AS WeekStartDate, "
+        "count(DISTINCT v.VisitId) AS TotalVisits "
+        "FROM visit v "
+        "LEFT JOIN visitors vs ON vs.VisitId = v.VisitId "
+        "LEFT JOIN contact c ON c.ContactId = vs.ContactId "
+        f"WHERE {' AND '.join(conditions)} "
+        "GROUP BY WeekStartDate) "
+        "ORDER BY WeekStartDate",
+        params, tables=("visit", "visitors", "contact"),
+    )
+
+
+def visit_trends_live(db: Session, start_date, end_date, site_id, broker_id, customer_id):
     CustomerContact = aliased(Contact)
 
     week_start_expr = func.DATEADD(
@@ -356,22 +410,7 @@ def get_Visit_Trends(
         subquery.c.TotalVisits
     ).all()
 
-    current_week_number = today.isocalendar()[1]
-
-    response = []
-    for row in results:
-        # Check if this is the current week
-        week_number = row.WeekStartDate.isocalendar()[1]
-        is_current_week = (week_number == current_week_number)
-
-        response.append({
-            "WeekNumber": row.WeekNumber,
-            "WeekStartDate": row.WeekStartDate,
-            "TotalVisits": row.TotalVisits,
-            "CurrentWeekTotalVisits": row.TotalVisits if is_current_week else 0
-        })
-
-    return response
+    return [row._asdict() for row in results]
 
 
 
@@ -10,6 +10,8 @@ from sqlalchemy import  select, func
 from database import SessionLocal
 from models import ActionItem, Lead, Contact, Site, Users
 from .auth import get_current_user
+from routers.paging_utils import PageParams, model_columns, paged_response
+from services.agenda import refresh_agenda
 from datetime import datetime
 from schemas.schemas import ActionItemRequest
 
@@ -36,10 +38,12 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_action_item(user:user_dependency, db: db_dependency):
+async def read_action_item(user:user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query( ActionItem).all()
+    if page.unpaged:
+        return db.query( ActionItem).all()
+    return paged_response(db.query(ActionItem), ActionItem.ActionItemId, model_columns(ActionItem), page, "action_item")
 
 
 
@@ -88,6 +92,7 @@ async def create_action_item(user: user_dependency, db:db_dependency, action_ite
     db.add(new_action_item)
     db.commit()
     db.refresh(new_action_item)
+    refresh_agenda(db, action_item_ids=[new_action_item.ActionItemId])
     return {"ActionItemId": new_action_item.ActionItemId}
 
 
@@ -112,6 +117,7 @@ async def update_action_item(user: user_dependency, db: db_dependency, action_it
         action_item_exist.ActualEndDate = get_time()
     db.add(action_item_exist)
     db.commit()
+    refresh_agenda(db, action_item_ids=[action_item_id])
 
 
 
@@ -127,6 +133,7 @@ async def delete_action_item (user: user_dependency, db: db_dependency, action_i
         raise HTTPException(status_code=404, detail="action item not found")
     db.query(ActionItem).filter(ActionItem.ActionItemId == action_item_id).delete()
     db.commit()
+    refresh_agenda(db, action_item_ids=[action_item_id])
 
 
 
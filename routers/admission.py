@@ -0,0 +1,237 @@
+"""
+Admission Control
+=================
+
+Bulkheads that keep heavy endpoints from starving interactive CRUD.
+
+Every API request belongs to one route class:
+
+- bulk_import:     Excel uploads (/Employee/upload_excel/, /Employee/upload_excel2/)
+- llm:             brochure uploads (vision extraction through Groq)
+- dashboard_batch: POST /dashboard/batch, which runs up to
+                   dashboard.MAX_CONCURRENT_WIDGETS widgets at once, each on
+                   its own connection
+- heavy_report:    report routers, other dashboard endpoints, exports, the
+                   /leads/ dump
+- interactive:     everything else
+
+Each class has its own concurrency limit and wait queue. A request over the
+limit waits in its class's queue for up to queue_timeout seconds; when the
+queue is full or the wait times out it gets 503 with a Retry-After header
+instead of queueing on the shared connection pool (database.engine: 5 + 10
+overflow connections, 30 s pool_timeout). The non-interactive classes are
+sized by the connections their requests hold (see BULKHEADS) and together
+stay under the pool size, so a burst of uploads or report widgets leaves
+connections free for interactive calls.
+
+Waiting happens on the event loop, before the request reaches a worker
+thread, so queued requests hold neither a thread nor a connection.
+
+Limits are per process. get_admission_stats() (shown on /health) reports
+active and queued requests, peak queue depth, rejections and average wait
+per class.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Optional
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+BULK_IMPORT = "bulk_import"
+LLM = "llm"
+DASHBOARD_BATCH = "dashboard_batch"
+HEAVY_REPORT = "heavy_report"
+INTERACTIVE = "interactive"
+
+
+@dataclass
+class Bulkhead:
+    name: str
+    # Requests running at once
+    limit: int
+    # Requests waiting for a slot; more are rejected immediately
+    max_queue: int
+    # Longest wait for a slot before rejecting (seconds)
+    queue_timeout: float
+    # Retry-After sent with a rejection (seconds)
+    retry_after: int
+
+    active: int = 0
+    peak_queued: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    total_wait: float = 0.0
+    _waiters: Deque[asyncio.Future] = field(default_factory=deque, repr=False)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed. False means rejected."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.peak_queued = max(self.peak_queued, len(self._waiters))
+        start_time = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._discard(waiter):
+                # The slot was handed over just as the wait expired
+                self.active -= 1
+                self._wake_next()
+            self.timed_out += 1
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if not self._discard(waiter):
+                self.active -= 1
+                self._wake_next()
+            raise
+        finally:
+            self.total_wait += time.monotonic() - start_time
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._wake_next()
+
+    def _wake_next(self) -> None:
+        # Hand the freed slot straight to the oldest waiter, so new arrivals
+        # cannot overtake the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+                return
+
+    def _discard(self, waiter: asyncio.Future) -> bool:
+        """Drop a waiter that never got its slot. False if it was already granted one."""
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return False
+        waiter.cancel()
+        return True
+
+    def stats(self) -> dict:
+        waits = self.admitted + self.timed_out
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.total_wait / waits * 1000, 2) if waits else 0.0,
+        }
+
+
+# Connections held at the limit: bulk_import 1, llm 2, dashboard_batch 4 (one
+# batch, MAX_CONCURRENT_WIDGETS widget sessions; it releases its request
+# session before the fan-out), heavy_report 4 - 11 of the 15 pool connections,
+# leaving at least 4 for interactive requests
+BULKHEADS = {
+    BULK_IMPORT: Bulkhead(BULK_IMPORT, limit=1, max_queue=2, queue_timeout=5, retry_after=60),
+    LLM: Bulkhead(LLM, limit=2, max_queue=4, queue_timeout=10, retry_after=30),
+    DASHBOARD_BATCH: Bulkhead(DASHBOARD_BATCH, limit=1, max_queue=8, queue_timeout=15, retry_after=5),
+    HEAVY_REPORT: Bulkhead(HEAVY_REPORT, limit=4, max_queue=16, queue_timeout=10, retry_after=5),
+    INTERACTIVE: Bulkhead(INTERACTIVE, limit=32, max_queue=128, queue_timeout=15, retry_after=2),
+}
+
+# (route class, HTTP method or None for any, path, exact match); first match wins
+ROUTE_CLASSES = [
+    (BULK_IMPORT, "POST", "/Employee/upload_excel", False),
+    (LLM, "POST", "/brochure/upload", False),
+    (DASHBOARD_BATCH, "POST", "/dashboard/batch", True),
+    (HEAVY_REPORT, "GET", "/leads/", True),
+    (HEAVY_REPORT, "GET", "/leads/leads_aggregates", True),
+    (HEAVY_REPORT, None, "/ConversionReport/", False),
+    (HEAVY_REPORT, None, "/MonthlyBrokerReport/", False),
+    (HEAVY_REPORT, None, "/WeeklySiteVisitReport/", False),
+    (HEAVY_REPORT, None, "/weekly_report/", False),
+    (HEAVY_REPORT, None, "/home_api/", False),
+    (HEAVY_REPORT, None, "/dashboard/", False),
+    (HEAVY_REPORT, None, "/export/", False),
+]
+
+# Never limited: health checks and static frontend assets
+EXEMPT_PATHS = ("/healthy", "/health", "/favicon.ico")
+EXEMPT_PREFIXES = ("/_next/", "/assets/", "/fonts/", "/logo/")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Route class of a request, or None when it is not admission-controlled."""
+    if method == "OPTIONS" or path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES):
+        return None
+    for name, route_method, route_path, exact in ROUTE_CLASSES:
+        if route_method and route_method != method:
+            continue
+        if path == route_path if exact else path.startswith(route_path):
+            return name
+    return INTERACTIVE
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying the bulkhead of each request's route class."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        bulkhead = BULKHEADS[name]
+        if not await bulkhead.acquire():
+            logger.warning(f"Admission rejected {scope['method']} {scope['path']} "
+                           f"({name}: {bulkhead.active} active, {bulkhead.queued} queued)")
+            await _send_rejection(send, bulkhead)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release()
+
+
+async def _send_rejection(send, bulkhead: Bulkhead) -> None:
+    body = json.dumps({
+        "detail": f"Server busy ({bulkhead.name} requests at capacity), retry in {bulkhead.retry_after}s"
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(bulkhead.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def get_admission_stats() -> dict:
+    return {name: bulkhead.stats() for name, bulkhead in BULKHEADS.items()}
@@ -0,0 +1,111 @@
+"""
+Agenda API
+==========
+
+GET /agenda/ - the current user's open follow-ups and action items, bucketed
+into overdue, today and the rest of this week (through Sunday).
+
+Served from the AgendaItem index (services/agenda.py): every bucket is a range
+seek on (UserId, DueDate), so the cost follows the number of items returned,
+not the size of FollowUps / ActionItem.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pytz import timezone
+from typing import Annotated
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from datetime import datetime, timedelta
+from database import SessionLocal
+from models import AgendaItem, Lead
+from .auth import get_current_user
+from services.agenda import ensure_agenda
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/agenda",
+    tags=['agenda']
+)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_time():
+    ind_time = datetime.now(timezone("Asia/Kolkata"))
+    return ind_time
+
+
+db_dependency = Annotated[Session, Depends(get_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+def _bucket_items(db: Session, user_id: int, start, end, limit: int, newest_first: bool = False):
+    query = db.query(
+        AgendaItem.SourceType,
+        AgendaItem.SourceId,
+        AgendaItem.Title,
+        AgendaItem.Status,
+        AgendaItem.DueDate,
+        AgendaItem.LeadId,
+        Lead.LeadName,
+        AgendaItem.VisitId,
+    ).outerjoin(Lead, Lead.LeadId == AgendaItem.LeadId).filter(AgendaItem.UserId == user_id)
+    if start is not None:
+        query = query.filter(AgendaItem.DueDate >= start)
+    query = query.filter(AgendaItem.DueDate < end)
+    order = AgendaItem.DueDate.desc() if newest_first else AgendaItem.DueDate
+    return [dict(row._mapping) for row in query.order_by(order, AgendaItem.AgendaItemId).limit(limit).all()]
+
+
+@router.get("/")
+async def read_agenda(
+    user: user_dependency,
+    db: db_dependency,
+    limit: int = Query(100, ge=1, le=500),
+):
+    """
+    Items owed by the current user. Each bucket returns at most `limit` items
+    (overdue: most recently due first); counts are the full bucket sizes.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    start_time = time.time()
+    ensure_agenda(db)
+
+    user_id = user.get('id')
+    today_start = get_time().replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    tomorrow_start = today_start + timedelta(days=1)
+    # Monday of next week
+    week_end = today_start + timedelta(days=7 - today_start.weekday())
+
+    counts = db.query(
+        func.sum(case((AgendaItem.DueDate < today_start, 1), else_=0)).label("overdue"),
+        func.sum(case(((AgendaItem.DueDate >= today_start) & (AgendaItem.DueDate < tomorrow_start), 1), else_=0)).label("today"),
+        func.sum(case((AgendaItem.DueDate >= tomorrow_start, 1), else_=0)).label("this_week"),
+    ).filter(AgendaItem.UserId == user_id, AgendaItem.DueDate < week_end).one()
+
+    response = {
+        "UserId": user_id,
+        "date": today_start.date().isoformat(),
+        "counts": {
+            "overdue": counts.overdue or 0,
+            "today": counts.today or 0,
+            "this_week": counts.this_week or 0,
+        },
+        "overdue": _bucket_items(db, user_id, None, today_start, limit, newest_first=True) if counts.overdue else [],
+        "today": _bucket_items(db, user_id, today_start, tomorrow_start, limit) if counts.today else [],
+        "this_week": _bucket_items(db, user_id, tomorrow_start, week_end, limit) if counts.this_week else [],
+    }
+    logger.info(f"Agenda for user {user_id}: {sum(response['counts'].values())} items in "
+                f"{(time.time() - start_time) * 1000:.2f}ms")
+    return response
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, AMENITY
 from datetime import datetime
 from schemas.schemas import AmenityRequest
 
@@ -34,10 +35,10 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_amenity(user:user_dependency, db: db_dependency):
+async def read_amenity(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(Amenity).all()
+    return cached_list_response(request, AMENITY, lambda: db.query(Amenity).all())
 
 
 
@@ -63,6 +64,7 @@ async def create_amenity(user: user_dependency, db:db_dependency, amenity_reques
     )
     db.add(new_amenity)
     db.commit()
+    invalidate(AMENITY)
     db.refresh(new_amenity)
     return new_amenity
 
@@ -79,6 +81,7 @@ async def update_amenity(user: user_dependency, db: db_dependency, amenity_id: i
     amenity_exist.AmenityName=amenity_request.AmenityName
     db.add(amenity_exist)
     db.commit()
+    invalidate(AMENITY)
 
 
 
@@ -90,4 +93,5 @@ async def delete_amenity (user: user_dependency, db: db_dependency, amenity_id :
     if amenity_model is None:
         raise HTTPException(status_code=404, detail="Amenity not found")
     db.query(Amenity).filter(Amenity.AmenityId == amenity_id).delete()
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate(AMENITY)
\ No newline at end of file
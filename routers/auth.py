@@ -11,6 +11,15 @@ from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt , JWTError
 from datetime import timedelta, datetime, timezone
 from schemas.schemas import RolesRequest
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
 
 router = APIRouter(
     prefix="/auth",
@@ -32,6 +41,66 @@ db_dependency = Annotated[Session, Depends(get_db)]
 bcrypt_context = CryptContext(schemes=['bcrypt'],deprecated='auto')
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
 
+# bcrypt costs tens to hundreds of ms of CPU per call. It runs on this bounded
+# pool (bcrypt releases the GIL, so the threads hash in parallel) instead of
+# on the event loop, where a login burst would stall every other request.
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+
+# Failed logins are remembered briefly, so retries of the same wrong
+# credentials (double submits, scripted guessing) skip the DB and bcrypt
+FAILED_LOGIN_TTL_SECONDS = 30
+FAILED_LOGIN_CACHE_SIZE = 10000
+# Keys are HMACs under a per-process secret; passwords are never stored
+_failed_login_secret = secrets.token_bytes(32)
+_failed_logins = {}  # key -> (username, expiry)
+_failed_logins_lock = threading.Lock()
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        _hash_executor, bcrypt_context.verify, password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, bcrypt_context.hash, password)
+
+
+def _failed_login_key(username: str, password: str) -> bytes:
+    return hmac.new(_failed_login_secret, f"{username}\0{password}".encode(), hashlib.sha256).digest()
+
+
+def is_recent_failed_login(username: str, password: str) -> bool:
+    key = _failed_login_key(username, password)
+    with _failed_logins_lock:
+        entry = _failed_logins.get(key)
+        if entry is None:
+            return False
+        if entry[1] < time.monotonic():
+            del _failed_logins[key]
+            return False
+        return True
+
+
+def remember_failed_login(username: str, password: str) -> None:
+    now = time.monotonic()
+    with _failed_logins_lock:
+        if len(_failed_logins) >= FAILED_LOGIN_CACHE_SIZE:
+            for key in [key for key, (_, expiry) in _failed_logins.items() if expiry < now]:
+                del _failed_logins[key]
+            while len(_failed_logins) >= FAILED_LOGIN_CACHE_SIZE:
+                # Dicts keep insertion order: drop the oldest entry
+                del _failed_logins[next(iter(_failed_logins))]
+        _failed_logins[_failed_login_key(username, password)] = (username, now + FAILED_LOGIN_TTL_SECONDS)
+
+
+def forget_failed_logins(username: str) -> None:
+    """Drop a user's cached failures (their password changed)."""
+    with _failed_logins_lock:
+        for key in [key for key, (name, _) in _failed_logins.items() if name == username]:
+            del _failed_logins[key]
+
+
 def authenticate_user(username:str, password:str, db):
     user = db.query (Users).filter(Users.username == username).first()
     if not user:
@@ -40,6 +109,17 @@ def authenticate_user(username:str, password:str, db):
         return False
     return user
 
+
+async def authenticate_user_async(username: str, password: str, db):
+    """authenticate_user() without blocking the event loop, with the failed-login cache."""
+    if is_recent_failed_login(username, password):
+        return False
+    user = await run_in_threadpool(lambda: db.query(Users).filter(Users.username == username).first())
+    if not user or not await verify_password(password, user.hashedpassword):
+        remember_failed_login(username, password)
+        return False
+    return user
+
 def create_access_token(username:str, user_id: int, role: str,expires_delta:timedelta):
     encode = {'sub':username,'id':user_id, 'role':role}
     expires = datetime.now(timezone.utc) +expires_delta
@@ -81,7 +161,7 @@ class Token(BaseModel):
 
 @router.post ("/token",response_model=Token,status_code=status.HTTP_200_OK)
 async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm,Depends()],db:db_dependency):
-    user = authenticate_user(form_data.username,form_data.password,db)
+    user = await authenticate_user_async(form_data.username,form_data.password,db)
     if not user:
         raise HTTPException (status_code=status.HTTP_401_UNAUTHORIZED,detail='Could not validate user')
     token = create_access_token(user.username, user.id, user.role,  timedelta(days=3650))
@@ -9,7 +9,7 @@ from .auth import get_current_user
 from datetime import datetime
 import os
 import logging
-from groq import Groq
+from services.integration_clients import get_groq_client
 import json
 import tempfile
 import pdf2image
@@ -55,7 +55,7 @@ def extract_text_from_pdf(file_content: bytes) -> str:
     Handles image-based PDFs by converting pages to images.
     """
     try:
-        groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        groq_client = get_groq_client()
 
         # Save PDF to temporary file for processing
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
@@ -156,7 +156,7 @@ def extract_structured_data_with_groq(raw_text: str) -> dict:
     Use Groq AI to extract structured data from brochure text.
     """
     try:
-        groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        groq_client = get_groq_client()
         model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
 
         # Limit text to avoid token limits
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException,status, Query
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
-from models import Lead,Contact, ProspectType, Site
+from models import Lead,Contact, ProspectType, Site, ContactLeadCounters
 from typing import Annotated, Optional
 from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import select, func, String
@@ -12,6 +12,10 @@ from datetime import datetime
 from schemas.schemas import ContactRequest
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
+from services.contact_counters import ensure_contact_counters
+from services.phone_keys import phone_ends_with, find_duplicate_contacts
+from services.lead_search import refresh_lead_search
+from services.visit_visitors import refresh_visit_visitors
 
 # import redis  # Commented out - not currently used
 import json
@@ -154,25 +158,8 @@ async def read_contact(user: user_dependency,db: db_dependency,sIndex: int = Que
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    # ✅ Subquery for Customer lead counts (Lead.ContactId)
-    customer_lead_counts_subq = (
-        db.query(
-            Lead.ContactId.label("contactid"),
-            func.count().label("customer_leadcount")
-        )
-        .group_by(Lead.ContactId)
-        .subquery()
-    )
-
-    # ✅ Subquery for Broker lead counts (Lead.BrokerId)
-    broker_lead_counts_subq = (
-        db.query(
-            Lead.BrokerId.label("contactid"),
-            func.count().label("broker_leadcount")
-        )
-        .group_by(Lead.BrokerId)
-        .subquery()
-    )
+    # Lead counts come from the maintained ContactLeadCounters table
+    ensure_contact_counters(db)
 
     # ✅ Step 1: Base query with filters
     contact_query = db.query(Contact)
@@ -180,7 +167,7 @@ async def read_contact(user: user_dependency,db: db_dependency,sIndex: int = Que
     if query:
         contact_query = contact_query.filter(
             or_(
-                Contact.ContactNo.ilike(f"%{query}%"),
+                phone_ends_with(query),
                 Contact.ContactFName.ilike(f"%{query}%"),
                 Contact.ContactLName.ilike(f"%{query}%"),
                 func.cast(Contact.ContactId, String).ilike(f"%{query}%"),
@@ -208,16 +195,18 @@ async def read_contact(user: user_dependency,db: db_dependency,sIndex: int = Que
         offset = 0
         sIndex = 1
 
-    # ✅ Step 2: Join both subqueries
+    # ✅ Step 2: Join the counter rows and page on the indexed count
+    customer_leadcount_column = func.coalesce(ContactLeadCounters.CustomerLeadCount, 0)
     result = (
         contact_query
-        .outerjoin(customer_lead_counts_subq, Contact.ContactId == customer_lead_counts_subq.c.contactid)
-        .outerjoin(broker_lead_counts_subq, Contact.ContactId == broker_lead_counts_subq.c.contactid)
+        .outerjoin(ContactLeadCounters, Contact.ContactId == ContactLeadCounters.ContactId)
         .add_columns(
-            func.coalesce(customer_lead_counts_subq.c.customer_leadcount, 0).label("customer_leadcount"),
-            func.coalesce(broker_lead_counts_subq.c.broker_leadcount, 0).label("broker_leadcount")
+            customer_leadcount_column.label("customer_leadcount"),
+            func.coalesce(ContactLeadCounters.BrokerLeadCount, 0).label("broker_leadcount"),
+            func.coalesce(ContactLeadCounters.OpenLeadCount, 0).label("open_leadcount"),
+            ContactLeadCounters.LastActivityDate.label("last_activity")
         )
-        .order_by(func.coalesce(customer_lead_counts_subq.c.customer_leadcount, 0).desc())
+        .order_by(customer_leadcount_column.desc(), Contact.ContactId)
         .offset(offset)
         .limit(limit)
         .all()
@@ -228,9 +217,11 @@ async def read_contact(user: user_dependency,db: db_dependency,sIndex: int = Que
         {
             **contact.__dict__,
             "customer_leadcount": customer_leadcount,
-            "broker_leadcount": broker_leadcount
+            "broker_leadcount": broker_leadcount,
+            "open_leadcount": open_leadcount,
+            "last_activity": last_activity
         }
-        for contact, customer_leadcount, broker_leadcount in result
+        for contact, customer_leadcount, broker_leadcount, open_leadcount, last_activity in result
     ]
 
     for item in response:
@@ -281,8 +272,8 @@ async def create_contact(user: user_dependency, db: db_dependency,
                          contact_request: ContactRequest):
     if user is None:
         raise HTTPException(status_code=401, detail='Authentication Failed')
-    # Check if ContactNo already exists
-    existing_contact = db.query(Contact).filter(Contact.ContactNo == contact_request.ContactNo).first()
+    # Check if ContactNo already exists (in any format)
+    existing_contact = find_duplicate_contacts(db, contact_request.ContactNo, contact_request.ContactCountryCode)
     if existing_contact:
         raise HTTPException(status_code=400, detail='Contact with this ContactNo already exists.')
     # Proceed to create new contact
@@ -305,8 +296,8 @@ async def update_contact (user: user_dependency,db: db_dependency,contact_id: in
         raise HTTPException (status_code=404, detail="contact not found")
 
         # Check if ContactNo already exists for a different contact
-    duplicate_contact = db.query(Contact).filter(
-    Contact.ContactNo == contact_request.ContactNo,Contact.ContactId != contact_id).first()
+    duplicate_contact = find_duplicate_contacts(
+        db, contact_request.ContactNo, contact_request.ContactCountryCode, exclude_contact_id=contact_id)
     if duplicate_contact:
         raise HTTPException(status_code=400, detail="Another contact with this ContactNo already exists.")
     # print(contact_request.ContactFName)
@@ -322,6 +313,9 @@ async def update_contact (user: user_dependency,db: db_dependency,contact_id: in
     existing_contact.ContactCountryCode  = contact_request.ContactCountryCode
     db.add(existing_contact)
     db.commit()
+    # Names and phone keys are copied into the contact's lead search rows and visit summaries
+    refresh_lead_search(db, contact_ids=[contact_id])
+    refresh_visit_visitors(db, contact_ids=[contact_id])
 
 
 
@@ -418,7 +412,7 @@ async def contact_search(user:user_dependency,db: db_dependency,query: Optional[
     if query:
         contact_query = contact_query.filter(
             or_(
-                Contact.ContactNo.ilike(f"%{query}%"),
+                phone_ends_with(query),
                 Contact.ContactFName.ilike(f"%{query}%"),
                 Contact.ContactLName.ilike(f"%{query}%"),
                 Contact.ContactId.ilike(f"%{query}%"),
@@ -448,6 +442,41 @@ async def contact_search(user:user_dependency,db: db_dependency,query: Optional[
     return results
 
 
+@router.get("/duplicates")
+async def contact_duplicates(user: user_dependency, db: db_dependency, limit: int = Query(100, ge=1, le=1000)):
+    """Contacts sharing a normalized phone number, grouped by number (largest groups first)."""
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    duplicate_keys = (
+        db.query(Contact.PhoneKey, func.count(Contact.ContactId).label("contact_count"))
+        .filter(Contact.PhoneKey.isnot(None))
+        .group_by(Contact.PhoneKey)
+        .having(func.count(Contact.ContactId) > 1)
+        .order_by(func.count(Contact.ContactId).desc(), Contact.PhoneKey)
+        .limit(limit)
+        .all()
+    )
+    keys = [key for key, _ in duplicate_keys]
+    contacts = (
+        db.query(Contact.ContactId, Contact.ContactFName, Contact.ContactLName, Contact.ContactNo,
+                 Contact.ContactCountryCode, Contact.ContactType, Contact.CreatedDate, Contact.PhoneKey)
+        .filter(Contact.PhoneKey.in_(keys))
+        .order_by(Contact.ContactId)
+        .all()
+    ) if keys else []
+
+    by_key = {key: [] for key in keys}
+    for contact in contacts:
+        row = dict(contact._mapping)
+        by_key[row.pop("PhoneKey")].append(row)
+
+    return [
+        {"PhoneKey": key, "contact_count": count, "contacts": by_key[key]}
+        for key, count in duplicate_keys
+    ]
+
+
 
 @router.get("/count/{statustext}")
 async def get_lead_count_by_contactId(user: user_dependency,db: db_dependency, statustext: str,contact_id: int = Query(..., alias="ContactId")):
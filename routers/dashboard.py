@@ -0,0 +1,179 @@
+"""
+Dashboard Batch API
+===================
+
+Serves several dashboard/report widgets in one request.
+
+The home page and report pages used to call a dozen widget endpoints in
+parallel, each paying for its own auth check, session and site-access lookup.
+POST /dashboard/batch resolves the user and their site access once, runs the
+requested widgets concurrently (each on its own pooled connection) and returns
+one combined payload keyed by widget id.
+
+Widget ids are the existing endpoint paths, e.g. "/ConversionReport/monthly-leads",
+so the frontend can switch a page over without renaming anything.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from typing import Annotated, Callable, Dict
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from .auth import get_current_user
+from schemas.schemas import DashboardBatchRequest
+from routers.security_utils import get_user_site_ids
+from routers import home_api, ConversionReport, WeeklySiteVisitReport, MonthlyBrokerReport
+import asyncio
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=['dashboard']
+)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+db_dependency = Annotated[Session, Depends(get_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+# Widgets of one batch running at the same time - keeps a single batch from
+# taking over the shared connection pool (pool_size + max_overflow = 15).
+# The dashboard_batch bulkhead (routers/admission.py) is sized from it.
+MAX_CONCURRENT_WIDGETS = 4
+
+# Report endpoints name the same filter differently; map their parameter names
+# to the shared filter names of DashboardBatchRequest
+FILTER_ALIASES = {
+    "Broker_id": "broker_id",
+    "customer_id": "contact_id",
+    "lead_created_by_id": "created_by_id",
+}
+
+
+def _report_widgets() -> Dict[str, Callable]:
+    """Collect every GET endpoint of the report routers, keyed by its path."""
+    widgets = {}
+    for report_router in (ConversionReport.router, WeeklySiteVisitReport.router, MonthlyBrokerReport.router):
+        for route in report_router.routes:
+            if "GET" in getattr(route, "methods", set()):
+                widgets[route.path] = route.endpoint
+    return widgets
+
+
+REPORT_WIDGETS = _report_widgets()
+
+# Home widgets share one month-boundary calculation per batch
+HOME_WIDGETS = {
+    "/home_api/": lambda db, user_id, month: home_api.monthly_targets_data(db, user_id, *month),
+    "/home_api/monthly_conversions": lambda db, user_id, month: home_api.monthly_conversions_data(db, user_id, *month),
+    "/home_api/overall_conversion_rate": lambda db, user_id, month: home_api.overall_conversion_rate_data(db, user_id),
+}
+
+
+def _report_kwargs(endpoint: Callable, filters: dict) -> dict:
+    """
+    Build explicit keyword arguments for a report endpoint.
+
+    Every filter parameter is passed explicitly - the endpoints' defaults are
+    FastAPI Query() markers, which are only resolved when called over HTTP.
+    """
+    kwargs = {}
+    for name in inspect.signature(endpoint).parameters:
+        if name in ("user", "db"):
+            continue
+        kwargs[name] = filters.get(FILTER_ALIASES.get(name, name))
+    return kwargs
+
+
+def _run_widget(widget_id: str, user: dict, filters: dict, month: tuple):
+    """Run one widget on its own session (and so its own pooled connection)."""
+    db = SessionLocal()
+    try:
+        if widget_id in HOME_WIDGETS:
+            return HOME_WIDGETS[widget_id](db, user.get('id'), month)
+
+        endpoint = REPORT_WIDGETS[widget_id]
+        result = endpoint(user, db, **_report_kwargs(endpoint, filters))
+        if inspect.iscoroutine(result):
+            # async report endpoints do blocking DB work only; drive them in this worker thread
+            result = asyncio.run(result)
+        return result
+    finally:
+        db.close()
+
+
+@router.get("/widgets")
+async def list_widgets(user: user_dependency):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    return {"widgets": sorted(HOME_WIDGETS) + sorted(REPORT_WIDGETS)}
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def batch_widgets(user: user_dependency, db: db_dependency, batch_request: DashboardBatchRequest):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    start_time = time.time()
+
+    unknown = [w for w in batch_request.widgets if w not in HOME_WIDGETS and w not in REPORT_WIDGETS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown widget id(s): {', '.join(unknown)}")
+
+    # Site access is resolved once for the whole batch and applied to every widget
+    allowed_site_ids = get_user_site_ids(user, db)
+    if not allowed_site_ids:
+        raise HTTPException(status_code=403, detail="No site access assigned for this user")
+
+    filters = batch_request.dict(exclude={"widgets"})
+    if filters.get("site_id"):
+        filters["site_id"] = [site_id for site_id in filters["site_id"] if site_id in allowed_site_ids]
+        if not filters["site_id"]:
+            raise HTTPException(status_code=403, detail="No access to the requested site(s)")
+    else:
+        filters["site_id"] = allowed_site_ids
+
+    # The widgets use their own sessions; hand this connection back to the
+    # pool instead of holding it through the fan-out
+    db.close()
+
+    month = home_api.get_month_bounds()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_WIDGETS)
+
+    async def run(widget_id: str):
+        widget_start = time.time()
+        async with semaphore:
+            try:
+                data = await run_in_threadpool(_run_widget, widget_id, user, filters, month)
+                result = {"data": data, "statusCode": 200}
+            except HTTPException as e:
+                result = {"error": e.detail, "statusCode": e.status_code}
+            except Exception as e:
+                logger.error(f"Dashboard widget {widget_id} failed: {e}", exc_info=True)
+                result = {"error": "Widget failed", "statusCode": 500}
+        result["elapsedMs"] = round((time.time() - widget_start) * 1000, 2)
+        return widget_id, result
+
+    # dict.fromkeys drops duplicate ids while keeping the requested order
+    results = await asyncio.gather(*[run(widget_id) for widget_id in dict.fromkeys(batch_request.widgets)])
+
+    total_time = (time.time() - start_time) * 1000
+    logger.info(f"POST /dashboard/batch: {len(results)} widgets in {total_time:.2f}ms")
+
+    return {
+        "widgets": dict(results),
+        "elapsedMs": round(total_time, 2),
+        "message": "Widgets loaded successfully",
+        "statusCode": 200
+    }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, DEVELOPER
 from datetime import datetime
 from schemas.schemas import DeveloperRequest
 
@@ -34,10 +35,10 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_developer(user:user_dependency, db: db_dependency):
+async def read_developer(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(Developer).all()
+    return cached_list_response(request, DEVELOPER, lambda: db.query(Developer).all())
 
 
 @router.get('/getsinglesitedeveloper/{developer_id}', status_code=status.HTTP_200_OK)
@@ -70,6 +71,7 @@ async def create_developer(user: user_dependency, db:db_dependency, developer_re
     )
     db.add(developer)
     db.commit()
+    invalidate(DEVELOPER)
     if developer_request is not None:
         return developer_request
     raise HTTPException(status_code=404, detail='developer not found')
@@ -96,6 +98,7 @@ async def update_developer(user: user_dependency, db: db_dependency, dev_id: int
     dev_exist.CreatedById=developer_request.CreatedById
     db.add(dev_exist)
     db.commit()
+    invalidate(DEVELOPER)
 
 
 @router.delete("/deletedeveloper/{dev_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -106,4 +109,5 @@ async def delete_developer (user: user_dependency, db: db_dependency, dev_id : i
     if dev_model is None:
         raise HTTPException(status_code=404, detail="developer detail not found")
     db.query(Developer).filter(Developer.DeveloperId == dev_id).delete()
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate(DEVELOPER)
\ No newline at end of file
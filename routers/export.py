@@ -0,0 +1,385 @@
+"""
+Export API
+==========
+
+Streams filtered leads, visits and contacts as CSV, NDJSON or XLSX.
+
+The exports take the same filters as /leads/leads_full_detail,
+/visit/Visit_full_details/ and /contact/, and reuse their filter code so an
+export always matches what the list screen shows.
+
+Rows are read through a server-side cursor (yield_per) as flat column tuples
+and written out as they arrive, so memory stays constant whatever the row
+count and CSV / NDJSON bytes start flowing with the first batch. XLSX cannot
+be written incrementally to the client (the file is a zip archive); it is built
+with openpyxl's write-only workbook in a spooled temp file and then streamed.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Iterator, List, Optional
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, or_, String
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from database import SessionLocal
+from models import Lead, Visit, Contact, ContactLeadCounters, Site, Infra, InfraUnit, ProspectType, Users, VisitPrimaryVisitor
+from .auth import get_current_user
+from routers.security_utils import get_user_site_ids
+from routers.paging_utils import json_value, stream_query_rows
+from services.phone_keys import phone_ends_with
+from routers.lead import apply_lead_filters, apply_lead_sort
+from routers.visit import apply_visit_filters
+from services.contact_counters import ensure_contact_counters
+from services.lead_search import ensure_lead_search
+from services.visit_visitors import ensure_visit_visitors
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/export",
+    tags=['export']
+)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+db_dependency = Annotated[Session, Depends(get_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+# Rows fetched per round-trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# XLSX is spooled in memory up to this size, then to a temp file on disk
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+XLSX_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _csv_body(columns: List[str], rows: Iterator[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for n, row in enumerate(rows, 1):
+        writer.writerow([json_value(value) for value in row])
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def _ndjson_body(columns: List[str], rows: Iterator[tuple]) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: json_value(value) for column, value in zip(columns, row)}, default=str))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _xlsx_body(columns: List[str], rows: Iterator[tuple], sheet_title: str) -> Iterator[bytes]:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([json_value(value) for value in row])
+
+    with SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES) as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(XLSX_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _export_response(query, columns: List[str], export_format: str, name: str) -> StreamingResponse:
+    rows = stream_query_rows(query, name, EXPORT_BATCH_SIZE)
+    if export_format == "csv":
+        body = _csv_body(columns, rows)
+    elif export_format == "ndjson":
+        body = _ndjson_body(columns, rows)
+    else:
+        body = _xlsx_body(columns, rows, name)
+
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _check_format(export_format: str) -> str:
+    export_format = (export_format or "").lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    return export_format
+
+
+def _full_name(first_name, last_name):
+    return func.coalesce(first_name, '') + ' ' + func.coalesce(last_name, '')
+
+
+@router.get("/leads")
+async def export_leads(
+    user: user_dependency,
+    db: db_dependency,
+    format: str = Query("csv"),
+    LeadStatus: Optional[list[str]] = Query(None),
+    LeadSource: Optional[list[str]] = Query(None),
+    SiteName: Optional[list[str]] = Query(None),
+    ProspectTypeName: Optional[list[str]] = Query(None),
+    BrokerName: Optional[list[str]] = Query(None),
+    BrokerNumber: Optional[list[str]] = Query(None),
+    CustomerName: Optional[list[str]] = Query(None),
+    CustomerNo: Optional[list[str]] = Query(None),
+    StartDate: Optional[str] = Query(None),
+    EndDate: Optional[str] = Query(None),
+    HealthScoreMin: Optional[int] = Query(None),
+    HealthScoreMax: Optional[int] = Query(None),
+    ChurnRisk: Optional[list[str]] = Query(None),
+    FollowUpStatus: Optional[list[str]] = Query(None),
+    BuyingIntentMin: Optional[int] = Query(None),
+    BuyingIntentMax: Optional[int] = Query(None),
+    OverdueDaysMin: Optional[int] = Query(None),
+    OverdueDaysMax: Optional[int] = Query(None),
+    sortBy: Optional[str] = Query("created_date_desc"),
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    export_format = _check_format(format)
+
+    allowed_site_ids = get_user_site_ids(user, db)
+    if not allowed_site_ids:
+        raise HTTPException(status_code=403, detail="No site access assigned for this user")
+
+    ensure_lead_search(db)
+    query = db.query(Lead).filter(Lead.SiteId.in_(allowed_site_ids))
+    query, _ = apply_lead_filters(
+        query,
+        LeadStatus=LeadStatus,
+        LeadSource=LeadSource,
+        SiteName=SiteName,
+        ProspectTypeName=ProspectTypeName,
+        BrokerName=BrokerName,
+        BrokerNumber=BrokerNumber,
+        CustomerName=CustomerName,
+        CustomerNo=CustomerNo,
+        StartDate=StartDate,
+        EndDate=EndDate,
+        HealthScoreMin=HealthScoreMin,
+        HealthScoreMax=HealthScoreMax,
+        ChurnRisk=ChurnRisk,
+        FollowUpStatus=FollowUpStatus,
+        BuyingIntentMin=BuyingIntentMin,
+        BuyingIntentMax=BuyingIntentMax,
+        OverdueDaysMin=OverdueDaysMin,
+        OverdueDaysMax=OverdueDaysMax,
+    )
+    query, sort_orders = apply_lead_sort(db, query, sortBy)
+
+    # Flat projection - related names come from outer joins, not per-row relationship loads
+    ExportSite = aliased(Site)
+    ExportProspectType = aliased(ProspectType)
+    ExportCustomer = aliased(Contact)
+    ExportBroker = aliased(Contact)
+    ExportCreatedBy = aliased(Users)
+    ExportUnit = aliased(InfraUnit)
+    columns = {
+        "LeadId": Lead.LeadId,
+        "LeadName": Lead.LeadName,
+        "LeadStatus": Lead.LeadStatus,
+        "LeadSource": Lead.LeadSource,
+        "LeadType": Lead.LeadType,
+        "SiteName": ExportSite.SiteName,
+        "ProspectType": ExportProspectType.ProspectTypeName,
+        "CustomerId": Lead.ContactId,
+        "CustomerName": _full_name(ExportCustomer.ContactFName, ExportCustomer.ContactLName),
+        "CustomerNo": ExportCustomer.ContactNo,
+        "CustomerEmail": ExportCustomer.ContactEmail,
+        "BrokerId": Lead.BrokerId,
+        "BrokerName": _full_name(ExportBroker.ContactFName, ExportBroker.ContactLName),
+        "BrokerNo": ExportBroker.ContactNo,
+        "SuggestedUnit": ExportUnit.UnitNumber,
+        "QuotedAmount": Lead.QuotedAmount,
+        "RequestedAmount": Lead.RequestedAmount,
+        "ClosedAmount": Lead.ClosedAmount,
+        "BuyingIntent": Lead.BuyingIntent,
+        "LeadPriority": Lead.LeadPriority,
+        "HealthScore": Lead.HealthScore,
+        "AIPriority": Lead.AIPriority,
+        "ChurnRisk": Lead.ChurnRisk,
+        "FollowUpStatus": Lead.FollowUpStatus,
+        "OverdueDays": Lead.OverdueDays,
+        "CreatedBy": _full_name(ExportCreatedBy.FirstName, ExportCreatedBy.LastName),
+        "CreatedDate": Lead.CreatedDate,
+        "UpdatedDate": Lead.UpdatedDate,
+        "LeadClosedDate": Lead.LeadClosedDate,
+    }
+    query = (
+        query.with_entities(*[column.label(name) for name, column in columns.items()])
+        .outerjoin(ExportSite, ExportSite.SiteId == Lead.SiteId)
+        .outerjoin(ExportProspectType, ExportProspectType.ProspectTypeId == Lead.ProspectTypeId)
+        .outerjoin(ExportCustomer, ExportCustomer.ContactId == Lead.ContactId)
+        .outerjoin(ExportBroker, ExportBroker.ContactId == Lead.BrokerId)
+        .outerjoin(ExportCreatedBy, ExportCreatedBy.id == Lead.CreatedById)
+        .outerjoin(ExportUnit, ExportUnit.InfraUnitId == Lead.SuggestedUnitId)
+        .order_by(*sort_orders, Lead.LeadId)
+    )
+
+    return _export_response(query, list(columns), export_format, "leads")
+
+
+@router.get("/visits")
+async def export_visits(
+    user: user_dependency,
+    db: db_dependency,
+    format: str = Query("csv"),
+    VisitStatus: Optional[list[str]] = Query(None),
+    VisitOutlook: Optional[list[str]] = Query(None),
+    Purpose: Optional[list[str]] = Query(None),
+    SiteName: Optional[list[str]] = Query(None),
+    StartDate: Optional[str] = Query(None),
+    EndDate: Optional[str] = Query(None),
+    BrokerName: Optional[list[str]] = Query(None),
+    BrokerNumber: Optional[list[str]] = Query(None),
+    CustomerName: Optional[list[str]] = Query(None),
+    CustomerNo: Optional[list[str]] = Query(None),
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    export_format = _check_format(format)
+
+    allowed_site_ids = get_user_site_ids(user, db)
+    if not allowed_site_ids:
+        raise HTTPException(status_code=403, detail="No site access assigned for this user")
+
+    ensure_visit_visitors(db)
+    query = db.query(Visit).filter(Visit.SiteId.in_(allowed_site_ids))
+    query, _ = apply_visit_filters(
+        db,
+        query,
+        VisitStatus=VisitStatus,
+        VisitOutlook=VisitOutlook,
+        Purpose=Purpose,
+        SiteName=SiteName,
+        StartDate=StartDate,
+        EndDate=EndDate,
+        BrokerName=BrokerName,
+        BrokerNumber=BrokerNumber,
+        CustomerName=CustomerName,
+        CustomerNo=CustomerNo,
+    )
+
+    ExportSite = aliased(Site)
+    ExportInfra = aliased(Infra)
+    ExportCreatedBy = aliased(Users)
+    columns = {
+        "VisitId": Visit.VisitId,
+        "VisitDate": Visit.VisitDate,
+        "VisitStatus": Visit.VisitStatus,
+        "VisitOutlook": Visit.VisitOutlook,
+        "Purpose": Visit.Purpose,
+        "SiteName": ExportSite.SiteName,
+        "InfraName": ExportInfra.InfraName,
+        # Primary visitor = earliest created, non-deleted visitor of the visit (as on Visit_full_details)
+        "VisitorName": VisitPrimaryVisitor.VisitorName,
+        "VisitorContactId": VisitPrimaryVisitor.ContactId,
+        "VisitorContactType": VisitPrimaryVisitor.ContactType,
+        "VisitorContactNo": VisitPrimaryVisitor.ContactNo,
+        "VisitorLeadId": VisitPrimaryVisitor.LeadId,
+        "VisitorCount": func.coalesce(VisitPrimaryVisitor.VisitorCount, 0),
+        "SalesPersonId": Visit.SalesPersonId,
+        "CreatedBy": _full_name(ExportCreatedBy.FirstName, ExportCreatedBy.LastName),
+        "CreatedDate": Visit.CreatedDate,
+        "UpdatedDate": Visit.UpdatedDate,
+    }
+    query = (
+        query.with_entities(*[column.label(name) for name, column in columns.items()])
+        .outerjoin(ExportSite, ExportSite.SiteId == Visit.SiteId)
+        .outerjoin(ExportInfra, ExportInfra.InfraId == Visit.InfraId)
+        .outerjoin(VisitPrimaryVisitor, VisitPrimaryVisitor.VisitId == Visit.VisitId)
+        .outerjoin(ExportCreatedBy, ExportCreatedBy.id == Visit.CreatedById)
+        .order_by(Visit.VisitDate.desc(), Visit.VisitId.desc())
+    )
+
+    return _export_response(query, list(columns), export_format, "visits")
+
+
+@router.get("/contacts")
+async def export_contacts(
+    user: user_dependency,
+    db: db_dependency,
+    format: str = Query("csv"),
+    query: Optional[str] = Query(None),
+    contact_type: Optional[str] = Query(None),
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    export_format = _check_format(format)
+
+    ensure_contact_counters(db)
+
+    columns = {
+        "ContactId": Contact.ContactId,
+        "ContactFName": Contact.ContactFName,
+        "ContactLName": Contact.ContactLName,
+        "ContactNo": Contact.ContactNo,
+        "ContactCountryCode": Contact.ContactCountryCode,
+        "ContactEmail": Contact.ContactEmail,
+        "ContactType": Contact.ContactType,
+        "ContactCity": Contact.ContactCity,
+        "ContactState": Contact.ContactState,
+        "leadcount": func.coalesce(ContactLeadCounters.CustomerLeadCount, 0),
+        "broker_leadcount": func.coalesce(ContactLeadCounters.BrokerLeadCount, 0),
+        "open_leadcount": func.coalesce(ContactLeadCounters.OpenLeadCount, 0),
+        "last_activity": ContactLeadCounters.LastActivityDate,
+        "CreatedDate": Contact.CreatedDate,
+        "UpdatedDate": Contact.UpdatedDate,
+    }
+    contact_query = (
+        db.query(*[column.label(name) for name, column in columns.items()])
+        .outerjoin(ContactLeadCounters, ContactLeadCounters.ContactId == Contact.ContactId)
+    )
+
+    # Same filters as /contact/
+    if query:
+        contact_query = contact_query.filter(
+            or_(
+                phone_ends_with(query),
+                Contact.ContactFName.ilike(f"%{query}%"),
+                Contact.ContactLName.ilike(f"%{query}%"),
+                func.cast(Contact.ContactId, String).ilike(f"%{query}%"),
+                (Contact.ContactFName + ' ' + Contact.ContactLName).ilike(f"%{query}%")
+            )
+        )
+
+    if contact_type:
+        contact_query = contact_query.filter(Contact.ContactType.ilike(f"%{contact_type}%"))
+
+    contact_query = contact_query.order_by(
+        func.coalesce(ContactLeadCounters.CustomerLeadCount, 0).desc(), Contact.ContactId
+    )
+
+    return _export_response(contact_query, list(columns), export_format, "contacts")
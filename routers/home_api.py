@@ -7,7 +7,7 @@ from pydantic import BaseModel,Field
 # from models import Lead, Contact, ProspectType, Site
 from typing import Annotated
 from sqlalchemy.orm import Session,joinedload, load_only
-from sqlalchemy import  select, func
+from sqlalchemy import  select, func, case
 from database import SessionLocal
 from models import Targets, Lead
 from .auth import get_current_user
@@ -48,10 +48,8 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 
-@router.get('/')
-async def monthly_targets(user: user_dependency, db: db_dependency):
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
+def get_month_bounds():
+    """Return (first_day, last_day) of the current month."""
     try:
         today = datetime.now().date()
         month_start_date = today.replace(day=1)
@@ -60,18 +58,65 @@ async def monthly_targets(user: user_dependency, db: db_dependency):
         month_end_date = datetime(next_year, next_month, 1).date() - timedelta(days=1)
     except ValueError:
         raise HTTPException(status_code=400, detail="Error calculating month start and end dates")
-    query = db.query(Targets).filter(Targets.TargetId == user.get('id'),
+    return month_start_date, month_end_date
+
+
+def _month_targets(db: Session, user_id: int, month_start_date, month_end_date):
+    return db.query(Targets).filter(Targets.TargetId == user_id,
         Targets.TargetType == 'count',
         Targets.TargetStartDate >= month_start_date,
-        Targets.TargetEndDate <= month_end_date)
-    # results = query.all()
-    # return {"targetNO": [target.TargetNo for target in results]}
-    results = query.all()
+        Targets.TargetEndDate <= month_end_date).all()
+
+
+def monthly_targets_data(db: Session, user_id: int, month_start_date, month_end_date):
+    results = _month_targets(db, user_id, month_start_date, month_end_date)
     if not results:  # If no matching targets, return [0]
         return {"targetNO": [0]}
     return {"targetNO": [target.TargetNo for target in results]}
 
 
+def monthly_conversions_data(db: Session, user_id: int, month_start_date, month_end_date):
+    win_count = db.query(Lead).filter(
+        Lead.CreatedById == user_id,
+        Lead.CreatedDate >= month_start_date,
+        Lead.LeadClosedDate <= month_end_date,
+        Lead.LeadStatus == 'Win'
+    ).count()
+    targets = _month_targets(db, user_id, month_start_date, month_end_date)
+    target_numbers = [target.TargetNo for target in targets]
+    total_target = sum(target_numbers)
+    if total_target == 0:
+        target_rate = 0.0
+    else:
+        target_rate = (win_count / total_target) * 100
+
+    return {
+        "win_count": win_count,
+        "target_rate": target_rate
+    }
+
+
+def overall_conversion_rate_data(db: Session, user_id: int):
+    # Total and won leads in one pass over the user's leads
+    total_leads, wins = db.query(
+        func.count(Lead.LeadId),
+        func.count(case((Lead.LeadStatus == 'Win', 1)))
+    ).filter(Lead.CreatedById == user_id).one()
+    if total_leads > 0 :
+        win_percentage = (wins / total_leads) * 100
+    else:
+        win_percentage = 0.0
+    return { 'overall_conversion_rate': win_percentage }
+
+
+@router.get('/')
+async def monthly_targets(user: user_dependency, db: db_dependency):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    month_start_date, month_end_date = get_month_bounds()
+    return monthly_targets_data(db, user.get('id'), month_start_date, month_end_date)
+
+
 
 
 
@@ -103,38 +148,8 @@ async def monthly_targets(user: user_dependency, db: db_dependency):
 async def monthly_conversions(user: user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    try:
-        today = datetime.now().date()
-        month_start_date = today.replace(day=1)
-        next_month = (today.month % 12) + 1
-        next_year = today.year + (1 if today.month == 12 else 0)
-        month_end_date = datetime(next_year, next_month, 1).date() - timedelta(days=1)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Error calculating month start and end dates")
-    win_count = db.query(Lead).filter(
-        Lead.CreatedById == user.get('id'),
-        Lead.CreatedDate >= month_start_date,
-        Lead.LeadClosedDate <= month_end_date,
-        Lead.LeadStatus == 'Win'
-    ).count()
-    target_query = db.query(Targets).filter(
-        Targets.TargetId == user.get('id'),
-        Targets.TargetType == 'count',
-        Targets.TargetStartDate >= month_start_date,
-        Targets.TargetEndDate <= month_end_date
-    )
-    targets = target_query.all()
-    target_numbers = [target.TargetNo for target in targets]
-    total_target = sum(target_numbers)
-    if total_target == 0:
-        target_rate = 0.0
-    else:
-        target_rate = (win_count / total_target) * 100
-
-    return {
-        "win_count": win_count,
-        "target_rate": target_rate
-    }
+    month_start_date, month_end_date = get_month_bounds()
+    return monthly_conversions_data(db, user.get('id'), month_start_date, month_end_date)
 
 
 
@@ -143,12 +158,4 @@ async def monthly_conversions(user: user_dependency, db: db_dependency):
 async def overall_conversion_rate(user: user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    user_id = user.get('id')
-    total_leads = db.query(Lead).filter(Lead.CreatedById == user_id).count()
-    wins = db.query(Lead).filter(Lead.CreatedById == user_id,Lead.LeadStatus == 'Win').count()
-    if total_leads > 0 :
-        win_percentage = (wins / total_leads) * 100
-    else:
-        win_percentage = 0.0
-    return { 'overall_conversion_rate': win_percentage }
-
+    return overall_conversion_rate_data(db, user.get('id'))
@@ -1,6 +1,6 @@
 from string import ascii_uppercase
 
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, INFRA
 from datetime import datetime
 from schemas.schemas import InfraRequest
 
@@ -36,10 +37,12 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_infra(user:user_dependency, db: db_dependency):
+async def read_infra(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(Infra).options(joinedload(Infra.site).load_only(Site.SiteName)).all()
+    return cached_list_response(
+        request, INFRA, lambda: db.query(Infra).options(joinedload(Infra.site).load_only(Site.SiteName)).all()
+    )
 
 
 @router.get('/getsingleinfra/{infra_id}', status_code=status.HTTP_200_OK)
@@ -80,6 +83,7 @@ async def create_infra(user: user_dependency, db:db_dependency, infra_request:In
     new_infra = Infra(**infra_request.dict(), CreatedById=user.get('id'),  CreatedDate=get_time(),  UpdatedDate=get_time())
     db.add(new_infra)
     db.commit()
+    invalidate(INFRA)
     db.refresh( new_infra)
     return {"InfraId": new_infra.InfraId}
 
@@ -103,6 +107,7 @@ async def update_infra(user: user_dependency, db: db_dependency, infra_id: int,
     infra_exist.UpdatedDate= get_time()
     db.add(infra_exist)
     db.commit()
+    invalidate(INFRA)
 
 
 # @router.delete("/deleteinfra/{infra_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -174,4 +179,5 @@ async def delete_infra(user: user_dependency, db: db_dependency, infra_id: int =
         )
     # Delete Infra safely
     db.delete(infra_model)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate(INFRA)
\ No newline at end of file
@@ -1,4 +1,3 @@
-from operator import and_
 from string import ascii_uppercase
 
 from fastapi import APIRouter, Depends, HTTPException,status, Query
@@ -8,12 +7,14 @@ from pydantic import BaseModel,Field
 from models import Lead, Contact, ProspectType, Site, InfraUnit, SiteInfra, Infra
 from typing import Annotated, Optional, List
 from sqlalchemy.orm import Session,joinedload, load_only
-from sqlalchemy import select, func, text
+from sqlalchemy import select, func, text, insert
+from sqlalchemy.exc import SQLAlchemyError
 from database import SessionLocal
 from .auth import get_current_user
+from routers.paging_utils import PageParams, model_columns, paged_response
 from datetime import datetime
 from schemas.schemas import InfraUnitRequest
-from sqlalchemy import or_
+from services.inventory_index import get_inventory_index, invalidate_inventory
 
 
 router = APIRouter(
@@ -38,10 +39,12 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_infra_unit(user:user_dependency, db: db_dependency):
+async def read_infra_unit(user:user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(InfraUnit).all()
+    if page.unpaged:
+        return db.query(InfraUnit).all()
+    return paged_response(db.query(InfraUnit), InfraUnit.InfraUnitId, model_columns(InfraUnit), page, "infra_unit")
 
 
 
@@ -115,47 +118,55 @@ async def create_infra_unit(user: user_dependency,db: db_dependency,infraunit_re
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    infraunit_objects = [InfraUnit(**request.dict(),CreatedById=user.get("id"),CreatedDate=get_time(),UpdateDate=get_time())
-        for request in infraunit_request
-    ]
-    db.add_all(infraunit_objects)
-    db.commit()
+    if not infraunit_request:
+        return {
+            "message": "0 InfraUnits and 0 SiteInfra records created successfully",
+            "infraunit_ids": [],
+            "siteinfra_ids": []
+        }
+
+    # Step 1: Resolve the SiteId of every InfraId in one query, before inserting anything
+    infra_ids = {request.InfraId for request in infraunit_request}
+    infra_site_ids = dict(db.query(Infra.InfraId, Infra.SiteId).filter(Infra.InfraId.in_(infra_ids)).all())
+    missing_infra_ids = sorted(infra_ids - infra_site_ids.keys())
+    if missing_infra_ids:
+        raise HTTPException(status_code=404, detail=f"InfraId {', '.join(map(str, missing_infra_ids))} not found")
+
+    now = get_time()
+    try:
+        # Step 2: Multi-row insert of the units, ids returned in request order
+        created_infraunit_ids = db.scalars(
+            insert(InfraUnit).returning(InfraUnit.InfraUnitId, sort_by_parameter_order=True),
+            [
+                {**request.dict(), "CreatedById": user.get("id"), "CreatedDate": now, "UpdateDate": now}
+                for request in infraunit_request
+            ]
+        ).all()
+
+        # Step 3: Auto create SiteInfra for each InfraUnit, same transaction
+        created_siteinfra_ids = db.scalars(
+            insert(SiteInfra).returning(SiteInfra.SiteInfraId, sort_by_parameter_order=True),
+            [
+                {
+                    "SiteId": infra_site_ids[request.InfraId],
+                    "InfraId": request.InfraId,
+                    "InfraUnitId": infraunit_id,
+                    "InfraType": request.InfraType,   # use value from InfraUnit
+                    "Active": request.Active,         # use value from InfraUnit
+                    "CreatedDate": now,
+                    "UpdatedDate": now,
+                    "CreatedById": user.get("id")
+                }
+                for request, infraunit_id in zip(infraunit_request, created_infraunit_ids)
+            ]
+        ).all()
 
-    # refresh to get InfraUnitId values
-    for obj in infraunit_objects:
-        db.refresh(obj)
-
-    created_infraunit_ids = [obj.InfraUnitId for obj in infraunit_objects]
-
-    # Step 2: Auto create SiteInfra for each InfraUnit
-    siteinfra_objects = []
-    for infraunit in infraunit_objects:
-        # get SiteId from Infra table using InfraId
-        infra_record = db.query(Infra).filter(Infra.InfraId == infraunit.InfraId).first()
-        if not infra_record:
-            raise HTTPException(status_code=404, detail=f"InfraId {infraunit.InfraId} not found")
-
-        siteinfra_objects.append(
-            SiteInfra(
-                SiteId=infra_record.SiteId,
-                InfraId=infraunit.InfraId,
-                InfraUnitId=infraunit.InfraUnitId,
-                InfraType=infraunit.InfraType,   # use value from InfraUnit
-                Active=infraunit.Active,         # use value from InfraUnit
-                CreatedDate=get_time(),
-                UpdatedDate=get_time(),
-                CreatedById=user.get("id")
-            )
-        )
-
-    if siteinfra_objects:
-        db.add_all(siteinfra_objects)
         db.commit()
-        for obj in siteinfra_objects:
-            db.refresh(obj)
-        created_siteinfra_ids = [obj.SiteInfraId for obj in siteinfra_objects]
-    else:
-        created_siteinfra_ids = []
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create InfraUnits: {str(e)}")
+
+    invalidate_inventory(set(infra_site_ids.values()))
 
     return {
         "message": f"{len(created_infraunit_ids)} InfraUnits and {len(created_siteinfra_ids)} SiteInfra records created successfully",
@@ -204,6 +215,7 @@ async def update_infra_unit(user: user_dependency, db: db_dependency, infra_unit
     # infra_unit_exist.CreatedById = infraunit_request.CreatedById
     db.add(infra_unit_exist)
     db.commit()
+    invalidate_inventory()
 
 
 
@@ -218,6 +230,7 @@ async def delete_infra_unit (user: user_dependency, db: db_dependency, infra_uni
         raise HTTPException(status_code=404, detail="infra unit not found")
     db.query(InfraUnit).filter(InfraUnit.InfraUnitId == infra_unit_id).delete()
     db.commit()
+    invalidate_inventory()
 
 
 
@@ -238,69 +251,26 @@ async def search(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    # query_set = db.query(InfraUnit)
-    # filters = []
-
-    if site_id is not None:
-        query_set = db.query(InfraUnit).outerjoin(SiteInfra,
-        and_( InfraUnit.InfraId == SiteInfra.InfraId, InfraUnit.InfraUnitId == SiteInfra.InfraUnitId)) \
-            .filter(SiteInfra.SiteId == site_id)
-    else:
-        query_set = db.query(InfraUnit)
-
-    filters = []
-
-    if query:
-        try:
-            query_as_int = int(query)
-            filters.append(or_(
-                InfraUnit.FloorNumber == query_as_int,
-                InfraUnit.UnitNumber == query_as_int
-            ))
-        except ValueError:
-            try:
-                query_as_float = float(query)
-                filters.append(InfraUnit.UnitSize == query_as_float)
-            except ValueError:
-                filters.append(or_(
-                    InfraUnit.AvailabilityStatus.ilike(f"%{query}%"),
-                    InfraUnit.Direction.ilike(f"%{query}%"),
-                    InfraUnit.UnitType.ilike(f"%{query}%"),
-                    InfraUnit.View.ilike(f"%{query}%")
-                ))
-
-    if floor_number is not None:
-        filters.append(InfraUnit.FloorNumber == floor_number)
-    if direction:
-        filters.append(InfraUnit.Direction.ilike(f"%{direction}%"))
-    if unit_type:
-        filters.append(InfraUnit.UnitType.ilike(f"%{unit_type}%"))
-    if view:
-        filters.append(InfraUnit.View.ilike(f"%{view}%"))
-
-    # if site_id is not None:
-    #     filters.append(InfraUnit.SiteId == site_id)
-
-    if filters:
-        query_set = query_set.filter(*filters)
-
-    infra_units = query_set.all()
+    # Served from the in-memory inventory index (services/inventory_index.py)
+    index = get_inventory_index(db, site_id)
+    matches = index.match(query=query, floor_number=floor_number, direction=direction,
+                          unit_type=unit_type, view=view)
 
     results = [
         {
             "type": "infra_unit",
             "data": {
-                "FloorNumber": unit.FloorNumber,
-                "UnitNumber": unit.UnitNumber,
-                "UnitSize": unit.UnitSize,
-                "AvailabilityStatus": unit.AvailabilityStatus,
-                "Direction": unit.Direction,
-                "UnitType": unit.UnitType,
-                "View": unit.View,
-                "InfraUnitId": unit.InfraUnitId
+                "FloorNumber": unit["FloorNumber"],
+                "UnitNumber": unit["UnitNumber"],
+                "UnitSize": unit["UnitSize"],
+                "AvailabilityStatus": unit["AvailabilityStatus"],
+                "Direction": unit["Direction"],
+                "UnitType": unit["UnitType"],
+                "View": unit["View"],
+                "InfraUnitId": unit["InfraUnitId"]
             }
         }
-        for unit in infra_units
+        for unit in index.rows(matches)
     ]
 
     # if not results:
@@ -324,69 +294,66 @@ async def search(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    # query_set = db.query(InfraUnit)
-    # filters = []
-
-    if site_id is not None:
-        query_set = db.query(InfraUnit).outerjoin(SiteInfra,
-        and_( InfraUnit.InfraId == SiteInfra.InfraId, InfraUnit.InfraUnitId == SiteInfra.InfraUnitId)) \
-            .filter(SiteInfra.SiteId == site_id)
-    else:
-        query_set = db.query(InfraUnit)
-
-    filters = []
-
-    if query:
-        try:
-            query_as_int = int(query)
-            filters.append(or_(
-                InfraUnit.FloorNumber == query_as_int,
-                InfraUnit.UnitNumber == query_as_int
-            ))
-        except ValueError:
-            try:
-                query_as_float = float(query)
-                filters.append(InfraUnit.UnitSize == query_as_float)
-            except ValueError:
-                filters.append(or_(
-                    InfraUnit.AvailabilityStatus.ilike(f"%{query}%"),
-                    InfraUnit.Direction.ilike(f"%{query}%"),
-                    InfraUnit.UnitType.ilike(f"%{query}%"),
-                    InfraUnit.View.ilike(f"%{query}%")
-                ))
-
-    if floor_number is not None:
-        filters.append(InfraUnit.FloorNumber == floor_number)
-    if direction:
-        filters.append(InfraUnit.Direction.ilike(f"%{direction}%"))
-    if unit_type:
-        filters.append(InfraUnit.UnitType.ilike(f"%{unit_type}%"))
-    if view:
-        filters.append(InfraUnit.View.ilike(f"%{view}%"))
-
-    # if site_id is not None:
-    #     filters.append(InfraUnit.SiteId == site_id)
-
-    if filters:
-        query_set = query_set.filter(*filters)
-
-    infra_units = query_set.all()
+    # Served from the in-memory inventory index (services/inventory_index.py)
+    index = get_inventory_index(db, site_id)
+    matches = index.match(query=query, floor_number=floor_number, direction=direction,
+                          unit_type=unit_type, view=view)
 
     results = [
         {
-                "FloorNumber": unit.FloorNumber,
-                "UnitNumber": unit.UnitNumber,
-                "UnitSize": unit.UnitSize,
-                "AvailabilityStatus": unit.AvailabilityStatus,
-                "Direction": unit.Direction,
-                "UnitType": unit.UnitType,
-                "View": unit.View,
-                "InfraUnitId": unit.InfraUnitId,
-                "InfraId": unit.InfraId
+                "FloorNumber": unit["FloorNumber"],
+                "UnitNumber": unit["UnitNumber"],
+                "UnitSize": unit["UnitSize"],
+                "AvailabilityStatus": unit["AvailabilityStatus"],
+                "Direction": unit["Direction"],
+                "UnitType": unit["UnitType"],
+                "View": unit["View"],
+                "InfraUnitId": unit["InfraUnitId"],
+                "InfraId": unit["InfraId"]
         }
-        for unit in infra_units
+        for unit in index.rows(matches)
     ]
 
     # if not results:
     #     raise HTTPException(status_code=404, detail="No matching records found")
     return results
+
+
+
+
+@router.get('/facet_search')
+async def facet_search(
+    user: user_dependency,
+    db: db_dependency,
+    query: Optional[str] = Query(None, title="General Search"),
+    floor_number: Optional[int] = Query(None, title="Floor Number"),
+    direction: Optional[str] = Query(None, title="Direction"),
+    unit_type: Optional[str] = Query(None, title="Unit Type"),
+    view: Optional[str] = Query(None, title="View"),
+    availability: Optional[str] = Query(None, title="Availability Status"),
+    min_size: Optional[float] = Query(None, title="Minimum Unit Size"),
+    max_size: Optional[float] = Query(None, title="Maximum Unit Size"),
+    site_id: Optional[int] = Query(None, title="Site ID"),
+    sIndex: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Combined unit filters with facet counts (per floor, direction, unit type,
+    view and availability within the matching units) and paging.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    index = get_inventory_index(db, site_id)
+    matches = index.match(query=query, floor_number=floor_number, direction=direction, unit_type=unit_type,
+                          view=view, availability=availability, min_size=min_size, max_size=max_size)
+    total_records = matches.bit_count()
+
+    return {
+        "data": index.rows(matches, sIndex, limit),
+        "facets": index.facets(matches),
+        "total_records": total_records,
+        "sIndex": sIndex,
+        "limit": limit,
+        "nextIndex": sIndex + limit if sIndex + limit < total_records else None
+    }
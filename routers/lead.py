@@ -1,13 +1,13 @@
-from sqlalchemy import or_, and_, desc, asc, case
+from sqlalchemy import or_, and_, desc, asc
 
 
 from fastapi import APIRouter, Depends, HTTPException,status
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
-from models import Lead, Contact, ProspectType, Site, InfraUnit, FollowUps, Users
+from models import Lead, Contact, ProspectType, Site, InfraUnit, FollowUps, Users, LeadSiteCounters, Visit, Visitors, Infra, ActionItem, LeadHistory, LeadSearchProjection
 from typing import Annotated, Optional
-from sqlalchemy.orm import Session, joinedload, selectinload, load_only, aliased
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
@@ -16,6 +16,11 @@ from datetime import datetime
 
 from fastapi import Query
 from routers.security_utils import get_user_site_ids
+from services.lead_counters import refresh_site_counters, ensure_site_counters
+from services.broker_stats import refresh_broker_stats
+from services.contact_counters import refresh_contact_counters
+from services.phone_keys import reversed_key_ends_with
+from services.lead_search import refresh_lead_search, ensure_lead_search
 
 # PERFORMANCE DEBUG: Add timing and logging
 import time
@@ -231,7 +236,7 @@ async def read_all_leads (user:user_dependency, db: db_dependency):
     logger.info(f"Site access check: {(site_check_time - auth_time)*1000:.2f}ms")
     logger.info(f"User has access to {len(allowed_site_ids)} sites")
 
-    # Execute main query (without eager loading for now - needs indexes first)
+    # Execute main query (site seek on IX_lead_SiteId_AIPriority, migration 011)
     query_start = time.time()
     leads = db.query(Lead).filter(Lead.SiteId.in_(allowed_site_ids)).all()
     query_end = time.time()
@@ -279,6 +284,10 @@ async def create_leads(user: user_dependency, db: db_dependency, lead_request: L
     db.add(todo_model)
     db.commit()
     db.refresh(todo_model)  # This ensures we get the generated ID
+    refresh_site_counters(db, [todo_model.SiteId])
+    refresh_broker_stats(db, [todo_model.BrokerId])
+    refresh_contact_counters(db, [todo_model.ContactId, todo_model.BrokerId])
+    refresh_lead_search(db, [todo_model.LeadId])
     # Return the created lead with LeadId
     return {"LeadId": todo_model.LeadId}
 
@@ -293,6 +302,9 @@ async def update_leads (user: user_dependency,db: db_dependency,leadid: int ,lea
     lead_model = db.query(Lead).filter(Lead.LeadId==leadid, Lead.SiteId.in_(allowed_site_ids)).first()
     if lead_model is None:
         raise HTTPException (status_code=404, detail="Lead not found")
+    previous_site_id = lead_model.SiteId
+    previous_broker_id = lead_model.BrokerId
+    previous_contact_id = lead_model.ContactId
     lead_model.LeadName = lead_request.LeadName
     lead_model.ContactId = lead_request.ContactId
     lead_model.SiteId = lead_request.SiteId
@@ -320,6 +332,10 @@ async def update_leads (user: user_dependency,db: db_dependency,leadid: int ,lea
     lead_model.UpdatedDate = get_time()
     db.add(lead_model)
     db.commit()
+    refresh_site_counters(db, [previous_site_id, lead_request.SiteId])
+    refresh_broker_stats(db, [previous_broker_id, lead_request.BrokerId])
+    refresh_contact_counters(db, [previous_contact_id, lead_request.ContactId, previous_broker_id, lead_request.BrokerId])
+    refresh_lead_search(db, [leadid])
 
 
 @router.patch("/LeadUpdate/{leadid}", status_code=status.HTTP_204_NO_CONTENT)
@@ -332,6 +348,9 @@ async def update_leads(user: user_dependency,db: db_dependency,leadid: int,lead_
     lead_model = db.query(Lead).filter(Lead.LeadId == leadid, Lead.SiteId.in_(allowed_site_ids)).first()
     if lead_model is None:
         raise HTTPException(status_code=404, detail="Lead not found")
+    previous_site_id = lead_model.SiteId
+    previous_broker_id = lead_model.BrokerId
+    previous_contact_id = lead_model.ContactId
     update_data = lead_request.dict(exclude_unset=True)
     lead_status = update_data.get("LeadStatus")
     if lead_status in ["Win", "Lost"]:
@@ -341,6 +360,10 @@ async def update_leads(user: user_dependency,db: db_dependency,leadid: int,lead_
     lead_model.UpdatedDate = get_time()
     db.add(lead_model)
     db.commit()
+    refresh_site_counters(db, [previous_site_id, lead_model.SiteId])
+    refresh_broker_stats(db, [previous_broker_id, lead_model.BrokerId])
+    refresh_contact_counters(db, [previous_contact_id, lead_model.ContactId, previous_broker_id, lead_model.BrokerId])
+    refresh_lead_search(db, [leadid])
 
 
 
@@ -353,8 +376,15 @@ async def delete_leads (user:user_dependency, db: db_dependency,leadid: int =Pat
     lead_model = db.query(Lead).filter(Lead.LeadId==leadid).filter(Lead.CreatedById == user.get('id')).first()
     if lead_model is None:
         raise HTTPException (status_code=404, detail="Lead not found")
+    site_id = lead_model.SiteId
+    broker_id = lead_model.BrokerId
+    contact_id = lead_model.ContactId
     db.query(Lead).filter(Lead.LeadId==leadid).delete()
     db.commit()
+    refresh_site_counters(db, [site_id])
+    refresh_broker_stats(db, [broker_id])
+    refresh_contact_counters(db, [contact_id, broker_id])
+    refresh_lead_search(db, [leadid])
 
 
 @router.patch("/SoftDeleteLead/{leadid}", status_code=status.HTTP_200_OK)
@@ -466,8 +496,13 @@ async def read_paginationbuyerwise_leads (user:user_dependency, db: db_dependenc
 async def get_lead_count(user:user_dependency, db: db_dependency,statustext: str):
     if user is None:
         raise HTTPException (status_code=401, detail='Authentication Failed')
-    lead_count = db.query(Lead).filter(Lead.LeadStatus==statustext).count()
-    return {"lead_count": lead_count}
+    ensure_site_counters(db)
+    lead_count = (
+        db.query(func.coalesce(func.sum(LeadSiteCounters.TotalCount), 0))
+        .filter(LeadSiteCounters.LeadStatus == statustext)
+        .scalar()
+    )
+    return {"lead_count": int(lead_count)}
 
 
 # @router.get("/sitewisecount/")
@@ -487,15 +522,18 @@ async def get_lead_count(user:user_dependency, db: db_dependency,statustext: str
 async def get_lead_count_by_site(user: user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
+    ensure_site_counters(db)
+    # Reads the per-site counter rows instead of grouping the lead table
     query = (
         db.query(
-            Site.SiteName, Lead.LeadStatus, func.count(Lead.LeadId).label("lead_count")
+            Site.SiteName,
+            LeadSiteCounters.LeadStatus,
+            func.sum(LeadSiteCounters.TotalCount).label("lead_count")
         )
-        .join(Lead, Site.SiteId == Lead.SiteId)
-        .group_by(Site.SiteName, Lead.LeadStatus)
+        .join(LeadSiteCounters, Site.SiteId == LeadSiteCounters.SiteId)
+        .group_by(Site.SiteName, LeadSiteCounters.LeadStatus)
     )
     result = query.all()
-    print(result)
     output = {}
     for row in result:
         site_name = row[0]
@@ -529,6 +567,130 @@ async def read_leads_details(user: user_dependency,db: db_dependency,lead_id: in
     raise HTTPException(status_code=404, detail='Lead not found')
 
 
+@router.get("/lead_360/{lead_id}", status_code=status.HTTP_200_OK)
+async def read_lead_360(user: user_dependency, db: db_dependency, lead_id: int = Path(gt=0)):
+    """
+    Everything the lead detail page shows, in one document.
+
+    Replaces the getleaddetails, follow-Ups-by-leadId, visit_leads,
+    visitors_and_visit_leads and action item calls with a fixed number of
+    queries: lead (with contact, broker, site, prospect type, creator and
+    suggested unit joined), visitors, visits (IN on the visitors' VisitIds),
+    follow-ups, action items and history - whatever the lead's size.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail='Authentication Failed')
+
+    start_time = time.time()
+
+    allowed_site_ids = get_user_site_ids(user, db)
+    if not allowed_site_ids:
+        raise HTTPException(status_code=403, detail="No site access assigned for this user")
+
+    lead_model = db.query(Lead).options(
+        joinedload(Lead.contacts),
+        joinedload(Lead.prospecttypes),
+        joinedload(Lead.site),
+        joinedload(Lead.broker),
+        joinedload(Lead.created_by).load_only(Users.id, Users.FirstName, Users.LastName, Users.Email),
+        joinedload(Lead.suggestedunit)
+    ).filter(
+        Lead.LeadId == lead_id,
+        Lead.SiteId.in_(allowed_site_ids)
+    ).first()
+    if lead_model is None:
+        raise HTTPException(status_code=404, detail='Lead not found')
+
+    visitors_rows = (
+        db.query(Visitors, Contact)
+        .outerjoin(Contact, Visitors.ContactId == Contact.ContactId)
+        .filter(Visitors.LeadId == lead_id)
+        .order_by(Visitors.CreatedDate.asc())
+        .all()
+    )
+    visit_ids = list(dict.fromkeys(visitor.VisitId for visitor, _ in visitors_rows if visitor.VisitId is not None))
+
+    visits = []
+    if visit_ids:
+        visits = (
+            db.query(Visit)
+            .options(
+                joinedload(Visit.site).load_only(Site.SiteId, Site.SiteName, Site.SiteAddress),
+                joinedload(Visit.infra).load_only(Infra.InfraId, Infra.InfraName, Infra.InfraCategory)
+            )
+            .filter(Visit.VisitId.in_(visit_ids))
+            .order_by(Visit.VisitDate.desc())
+            .all()
+        )
+
+    follow_ups = (
+        db.query(FollowUps)
+        .options(joinedload(FollowUps.user).load_only(Users.id, Users.FirstName, Users.LastName, Users.Email, Users.ContactNo))
+        .filter(FollowUps.LeadId == lead_id)
+        .order_by(FollowUps.FollowUpDate.desc())
+        .all()
+    )
+
+    # Action items raised on the lead itself or on one of its visits
+    action_item_filter = ActionItem.LeadId == lead_id
+    if visit_ids:
+        action_item_filter = or_(action_item_filter, ActionItem.VisitId.in_(visit_ids))
+    action_items = (
+        db.query(ActionItem)
+        .options(joinedload(ActionItem.alloted_to_user_id).load_only(Users.id, Users.FirstName, Users.LastName))
+        .filter(action_item_filter)
+        .order_by(ActionItem.CreatedDate.desc())
+        .all()
+    )
+
+    history = (
+        db.query(LeadHistory)
+        .filter(LeadHistory.LeadId == lead_id)
+        .order_by(LeadHistory.LeadHistoryId.desc())
+        .all()
+    )
+
+    logger.info(f"GET /leads/lead_360/{lead_id}: {len(visits)} visits, {len(visitors_rows)} visitors, "
+                f"{len(follow_ups)} follow-ups, {len(action_items)} action items in "
+                f"{(time.time() - start_time) * 1000:.2f}ms")
+
+    return {
+        "lead": lead_model,
+        "visits": visits,
+        "visitors": [
+            {
+                **{column.key: getattr(visitor, column.key) for column in Visitors.__table__.columns},
+                "VisitorName": f"{contact.ContactFName or ''} {contact.ContactLName or ''}".strip() if contact else None,
+                "ContactNo": contact.ContactNo if contact else None,
+                "ContactType": contact.ContactType if contact else None,
+            }
+            for visitor, contact in visitors_rows
+        ],
+        "follow_ups": [
+            {
+                "FollowUpsId": f.FollowUpsId,
+                "LeadId": f.LeadId,
+                "VisitId": f.VisitId,
+                "FollowUpType": f.FollowUpType,
+                "Status": f.Status,
+                "Notes": f.Notes,
+                "FollowUpDate": f.FollowUpDate,
+                "NextFollowUpDate": f.NextFollowUpDate,
+                "User": {
+                    "UserId": f.user.id,
+                    "FirstName": f.user.FirstName,
+                    "LastName": f.user.LastName,
+                    "Email": f.user.Email,
+                    "ContactNo": f.user.ContactNo
+                } if f.user else None
+            }
+            for f in follow_ups
+        ],
+        "action_items": action_items,
+        "history": history
+    }
+
+
 
 
 
@@ -760,250 +922,256 @@ async def read_leads_details(user: user_dependency,db: db_dependency,lead_id: in
 # ----------------------------------------------------------------------------------------------------------
 
 
-@router.get("/leads_full_detail", status_code=status.HTTP_200_OK)
-async def read_leads_full_details(
-    user: user_dependency,
-    db: db_dependency,
-    sIndex: int = Query(1, alias="sIndex"),
-    limit: int = Query(20),
-    LeadStatus: Optional[list[str]] = Query(None),
-    LeadSource: Optional[list[str]] = Query(None),
-    SiteName: Optional[list[str]] = Query(None),
-    ProspectTypeName: Optional[list[str]] = Query(None),
-    BrokerName: Optional[list[str]] = Query(None),
-    BrokerNumber: Optional[list[str]] = Query(None),
-    CustomerName: Optional[list[str]] = Query(None),
-    CustomerNo: Optional[list[str]] = Query(None),
-    StartDate: Optional[str] = Query(None),
-    EndDate: Optional[str] = Query(None),
-    # NEW: Intelligence filters with dynamic ranges
-    HealthScoreMin: Optional[int] = Query(None),  # Minimum health score (0-100)
-    HealthScoreMax: Optional[int] = Query(None),  # Maximum health score (0-100)
-    ChurnRisk: Optional[list[str]] = Query(None),   # low, medium, high, critical
-    FollowUpStatus: Optional[list[str]] = Query(None),  # overdue, today, this_week, scheduled, none
-    BuyingIntentMin: Optional[int] = Query(None),  # Minimum buying intent (0-10)
-    BuyingIntentMax: Optional[int] = Query(None),  # Maximum buying intent (0-10)
-    OverdueDaysMin: Optional[int] = Query(None),  # Minimum overdue days
-    OverdueDaysMax: Optional[int] = Query(None),  # Maximum overdue days
-    sortBy: Optional[str] = Query("created_date_desc"),  # ai_priority, health_score_asc, health_score_desc, buying_intent_desc, created_date_desc, created_date_asc, lead_name_asc, budget_desc, follow_up_date, last_contact_date
+def _name_conditions(column, names: list[str]):
+    """Substring matches of each non-empty name against a stored full name."""
+    return [column.ilike(f"%{name.strip()}%") for name in names if name.strip()]
+
+
+def apply_lead_filters(
+    query,
+    LeadStatus: Optional[list[str]] = None,
+    LeadSource: Optional[list[str]] = None,
+    SiteName: Optional[list[str]] = None,
+    ProspectTypeName: Optional[list[str]] = None,
+    BrokerName: Optional[list[str]] = None,
+    BrokerNumber: Optional[list[str]] = None,
+    CustomerName: Optional[list[str]] = None,
+    CustomerNo: Optional[list[str]] = None,
+    StartDate: Optional[str] = None,
+    EndDate: Optional[str] = None,
+    HealthScoreMin: Optional[int] = None,
+    HealthScoreMax: Optional[int] = None,
+    ChurnRisk: Optional[list[str]] = None,
+    FollowUpStatus: Optional[list[str]] = None,
+    BuyingIntentMin: Optional[int] = None,
+    BuyingIntentMax: Optional[int] = None,
+    OverdueDaysMin: Optional[int] = None,
+    OverdueDaysMax: Optional[int] = None,
+    from_projection: bool = False,
 ):
+    """
+    Apply the leads_full_detail filter set to a Lead query.
+    Shared with the lead export so both return the same rows.
 
-    # PERFORMANCE DEBUG: Start comprehensive timing
-    start_time = time.time()
-    logger.info("="*80)
-    logger.info("GET /leads/leads_full_detail - Starting request")
-    logger.info(f"Parameters: sIndex={sIndex}, limit={limit}, sortBy={sortBy}")
-    logger.info(f"Filters: LeadStatus={LeadStatus}, LeadSource={LeadSource}, SiteName={SiteName}")
-
-    if user is None:
-        raise HTTPException(status_code=401, detail='Authentication Failed')
-
-    auth_time = time.time()
-    logger.info(f"[1] Authentication: {(auth_time - start_time)*1000:.2f}ms")
-
-    allowed_site_ids = get_user_site_ids(user, db)
-    if not allowed_site_ids:
-        raise HTTPException(status_code=403, detail="No site access assigned for this user")
-
-    site_check_time = time.time()
-    logger.info(f"[2] Site access check: {(site_check_time - auth_time)*1000:.2f}ms - {len(allowed_site_ids)} sites")
-
-    offset = max(sIndex - 1, 0)
-
-    # Create aliases for contact table to avoid conflicts when joining multiple times
-    BrokerContact = aliased(Contact)
-    CustomerContact = aliased(Contact)
-
-    # PERFORMANCE FIX: Use selectinload instead of joinedload
-    # selectinload uses separate queries (N+1 style) which is MUCH faster than
-    # massive JOINs with cartesian products when dealing with multiple relationships
-    query = db.query(Lead).options(
-        selectinload(Lead.contacts).load_only(
-            Contact.ContactId, Contact.ContactFName, Contact.ContactLName,
-            Contact.ContactEmail, Contact.ContactNo,
-            Contact.ContactType
-        ),
-        selectinload(Lead.prospecttypes),
-        selectinload(Lead.site),
-        selectinload(Lead.broker),
-        selectinload(Lead.created_by),
-        selectinload(Lead.suggestedunit).load_only(
-            InfraUnit.InfraUnitId, InfraUnit.UnitNumber
-        )
-    )
+    Every predicate reads LeadSearchProjection (services/lead_search.py), so
+    site, prospect type, customer and broker filters need no joins. A Lead
+    query is joined to the projection once; pass from_projection=True when
+    the query already selects from LeadSearchProjection.
 
-    # Filter by allowed sites first
-    query = query.filter(Lead.SiteId.in_(allowed_site_ids))
+    Returns:
+        (filtered query, whether any filter was applied)
+    """
+    P = LeadSearchProjection
+    if not from_projection:
+        query = query.join(P, P.LeadId == Lead.LeadId)
 
     # Track if any filter was applied
     filter_applied = False
 
     if LeadStatus:
         filter_applied = True
-        query = query.filter(Lead.LeadStatus.in_(LeadStatus))
+        query = query.filter(P.LeadStatus.in_(LeadStatus))
     if LeadSource:
         filter_applied = True
-        query = query.filter(Lead.LeadSource.in_(LeadSource))
+        query = query.filter(P.LeadSource.in_(LeadSource))
     if SiteName:
         filter_applied = True
-        query = query.join(Lead.site).filter(
-            or_(*[Site.SiteName.ilike(f"%{name}%") for name in SiteName])
-        )
+        query = query.filter(or_(*[P.SiteName.ilike(f"%{name}%") for name in SiteName]))
     if ProspectTypeName:
         filter_applied = True
-        query = query.join(Lead.prospecttypes).filter(
-            or_(*[ProspectType.ProspectTypeName.ilike(f"%{name}%") for name in ProspectTypeName])
-        )
+        query = query.filter(or_(*[P.ProspectTypeName.ilike(f"%{name}%") for name in ProspectTypeName]))
     if BrokerName:
         filter_applied = True
-        query = query.join(BrokerContact, Lead.broker)
-        # Build a list of OR conditions for each name in the list
-        name_conditions = []
-        for name in BrokerName:
-            # Strip whitespace from the search term
-            name = name.strip()
-            if not name:  # Skip empty strings
-                continue
-            # Check if it matches first name, last name, or full name (first + last)
-            name_conditions.append(
-                or_(
-                    BrokerContact.ContactFName.ilike(f"%{name}%"),
-                    BrokerContact.ContactLName.ilike(f"%{name}%"),
-                    (BrokerContact.ContactFName + ' ' + BrokerContact.ContactLName).ilike(f"%{name}%")
-                )
-            )
+        # Leads with a broker; "first", "last" and "first last" all match the stored full name
+        query = query.filter(P.BrokerId.isnot(None))
+        name_conditions = _name_conditions(P.BrokerName, BrokerName)
         if name_conditions:  # Only filter if we have valid conditions
             query = query.filter(or_(*name_conditions))
     if BrokerNumber:
         filter_applied = True
-        query = query.join(BrokerContact, Lead.broker).filter(
+        query = query.filter(
             and_(
-                BrokerContact.ContactType == 'Broker',
-                or_(*[BrokerContact.ContactNo.ilike(f"%{num}%") for num in BrokerNumber])
+                P.BrokerType == 'Broker',
+                or_(*[reversed_key_ends_with(P.BrokerPhoneKeyRev, num) for num in BrokerNumber])
             )
         )
     if CustomerName:
         filter_applied = True
-        query = query.join(CustomerContact, Lead.contacts)
-        # Build a list of OR conditions for each name in the list
-        name_conditions = []
-        for name in CustomerName:
-            # Strip whitespace from the search term
-            name = name.strip()
-            if not name:  # Skip empty strings
-                continue
-            # Check if it matches first name, last name, or full name (first + last)
-            name_conditions.append(
-                or_(
-                    CustomerContact.ContactFName.ilike(f"%{name}%"),
-                    CustomerContact.ContactLName.ilike(f"%{name}%"),
-                    (CustomerContact.ContactFName + ' ' + CustomerContact.ContactLName).ilike(f"%{name}%")
-                )
-            )
+        query = query.filter(P.CustomerId.isnot(None))
+        name_conditions = _name_conditions(P.CustomerName, CustomerName)
         if name_conditions:  # Only filter if we have valid conditions
             query = query.filter(
                 and_(
-                    CustomerContact.ContactType == 'Customer',
+                    P.CustomerType == 'Customer',
                     or_(*name_conditions)
                 )
             )
     if CustomerNo:
         filter_applied = True
-        query = query.join(CustomerContact, Lead.contacts).filter(
+        query = query.filter(
             and_(
-                CustomerContact.ContactType == 'Customer',
-                or_(*[CustomerContact.ContactNo.ilike(f"%{num}%") for num in CustomerNo])
+                P.CustomerType == 'Customer',
+                or_(*[reversed_key_ends_with(P.CustomerPhoneKeyRev, num) for num in CustomerNo])
             )
         )
 
-    if StartDate and EndDate:
-        filter_applied = True
-        try:
-            start_date = datetime.strptime(StartDate, "%Y-%m-%d")
-            end_date = datetime.strptime(EndDate, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            query = query.filter(
-                and_(
-                    Lead.CreatedDate >= start_date,
-                    Lead.CreatedDate <= end_date
-                )
-            )
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
-    elif StartDate:
-        filter_applied = True
-        try:
-            start_date = datetime.strptime(StartDate, "%Y-%m-%d")
-            query = query.filter(Lead.CreatedDate >= start_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
-    elif EndDate:
+    if StartDate or EndDate:
         filter_applied = True
         try:
-            end_date = datetime.strptime(EndDate, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            query = query.filter(Lead.CreatedDate <= end_date)
+            if StartDate:
+                start_date = datetime.strptime(StartDate, "%Y-%m-%d")
+                query = query.filter(P.CreatedDate >= start_date)
+            if EndDate:
+                end_date = datetime.strptime(EndDate, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+                query = query.filter(P.CreatedDate <= end_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
 
-    # NEW: Intelligence filters with dynamic min-max ranges
+    # Intelligence filters with dynamic min-max ranges
     if HealthScoreMin is not None or HealthScoreMax is not None:
         filter_applied = True
-        if HealthScoreMin is not None and HealthScoreMax is not None:
-            # Both min and max provided
-            query = query.filter(and_(
-                Lead.HealthScore >= HealthScoreMin,
-                Lead.HealthScore <= HealthScoreMax
-            ))
-        elif HealthScoreMin is not None:
-            # Only min provided
-            query = query.filter(Lead.HealthScore >= HealthScoreMin)
-        elif HealthScoreMax is not None:
-            # Only max provided
-            query = query.filter(Lead.HealthScore <= HealthScoreMax)
+        if HealthScoreMin is not None:
+            query = query.filter(P.HealthScore >= HealthScoreMin)
+        if HealthScoreMax is not None:
+            query = query.filter(P.HealthScore <= HealthScoreMax)
 
     if ChurnRisk:
         filter_applied = True
-        query = query.filter(Lead.ChurnRisk.in_(ChurnRisk))
+        query = query.filter(P.ChurnRisk.in_(ChurnRisk))
 
     if FollowUpStatus:
         filter_applied = True
-        query = query.filter(Lead.FollowUpStatus.in_(FollowUpStatus))
+        query = query.filter(P.FollowUpStatus.in_(FollowUpStatus))
 
     if BuyingIntentMin is not None or BuyingIntentMax is not None:
         filter_applied = True
-        if BuyingIntentMin is not None and BuyingIntentMax is not None:
-            # Both min and max provided
-            query = query.filter(and_(
-                Lead.BuyingIntent >= BuyingIntentMin,
-                Lead.BuyingIntent <= BuyingIntentMax
-            ))
-        elif BuyingIntentMin is not None:
-            # Only min provided
-            query = query.filter(Lead.BuyingIntent >= BuyingIntentMin)
-        elif BuyingIntentMax is not None:
-            # Only max provided
-            query = query.filter(Lead.BuyingIntent <= BuyingIntentMax)
+        if BuyingIntentMin is not None:
+            query = query.filter(P.BuyingIntent >= BuyingIntentMin)
+        if BuyingIntentMax is not None:
+            query = query.filter(P.BuyingIntent <= BuyingIntentMax)
 
     if OverdueDaysMin is not None or OverdueDaysMax is not None:
         filter_applied = True
-        if OverdueDaysMin is not None and OverdueDaysMax is not None:
-            # Both min and max provided
-            query = query.filter(and_(
-                Lead.OverdueDays >= OverdueDaysMin,
-                Lead.OverdueDays <= OverdueDaysMax
-            ))
-        elif OverdueDaysMin is not None:
-            # Only min provided
-            query = query.filter(Lead.OverdueDays >= OverdueDaysMin)
-        elif OverdueDaysMax is not None:
-            # Only max provided
-            query = query.filter(Lead.OverdueDays <= OverdueDaysMax)
+        if OverdueDaysMin is not None:
+            query = query.filter(P.OverdueDays >= OverdueDaysMin)
+        if OverdueDaysMax is not None:
+            query = query.filter(P.OverdueDays <= OverdueDaysMax)
+
+    return query, filter_applied
+
+
+def apply_lead_sort(db: Session, query, sortBy: Optional[str]):
+    """
+    Resolve a leads_full_detail sortBy value to ORDER BY clauses on
+    LeadSearchProjection (joined by apply_lead_filters). The follow-up sorts
+    read the projection's stored NextFollowUpDate / LastContactDate instead
+    of aggregating FollowUps per request.
+
+    Returns:
+        (query, list of order_by clauses)
+    """
+    P = LeadSearchProjection
+    # Dictionary lookup instead of an if-elif chain
+    # NULLs are sorted first by default in SQL Server (which is fine for our use case)
+    SORT_CONFIGURATIONS = {
+        "ai_priority": [desc(P.AIPriority)],
+        "health_score_asc": [asc(P.HealthScore)],
+        "health_score_desc": [desc(P.HealthScore)],
+        "buying_intent_desc": [desc(P.BuyingIntent)],
+        "created_date_desc": [desc(P.CreatedDate)],
+        "created_date_asc": [asc(P.CreatedDate)],
+        "lead_name_asc": [asc(P.LeadName)],
+        "budget_desc": [desc(P.Budget)],
+        # Follow-up Date - earliest first
+        "follow_up_date": [asc(P.NextFollowUpDate)],
+        # Last Contact Date - most recent first
+        "last_contact_date": [desc(P.LastContactDate)],
+    }
+    # Default to ai_priority if sortBy is not a known key
+    return query, SORT_CONFIGURATIONS.get(sortBy, SORT_CONFIGURATIONS["ai_priority"])
+
+
+@router.get("/leads_full_detail", status_code=status.HTTP_200_OK)
+def read_leads_full_details(
+    user: user_dependency,
+    db: db_dependency,
+    sIndex: int = Query(1, alias="sIndex"),
+    limit: int = Query(20),
+    LeadStatus: Optional[list[str]] = Query(None),
+    LeadSource: Optional[list[str]] = Query(None),
+    SiteName: Optional[list[str]] = Query(None),
+    ProspectTypeName: Optional[list[str]] = Query(None),
+    BrokerName: Optional[list[str]] = Query(None),
+    BrokerNumber: Optional[list[str]] = Query(None),
+    CustomerName: Optional[list[str]] = Query(None),
+    CustomerNo: Optional[list[str]] = Query(None),
+    StartDate: Optional[str] = Query(None),
+    EndDate: Optional[str] = Query(None),
+    # NEW: Intelligence filters with dynamic ranges
+    HealthScoreMin: Optional[int] = Query(None),  # Minimum health score (0-100)
+    HealthScoreMax: Optional[int] = Query(None),  # Maximum health score (0-100)
+    ChurnRisk: Optional[list[str]] = Query(None),   # low, medium, high, critical
+    FollowUpStatus: Optional[list[str]] = Query(None),  # overdue, today, this_week, scheduled, none
+    BuyingIntentMin: Optional[int] = Query(None),  # Minimum buying intent (0-10)
+    BuyingIntentMax: Optional[int] = Query(None),  # Maximum buying intent (0-10)
+    OverdueDaysMin: Optional[int] = Query(None),  # Minimum overdue days
+    OverdueDaysMax: Optional[int] = Query(None),  # Maximum overdue days
+    sortBy: Optional[str] = Query("created_date_desc"),  # ai_priority, health_score_asc, health_score_desc, buying_intent_desc, created_date_desc, created_date_asc, lead_name_asc, budget_desc, follow_up_date, last_contact_date
+):
+
+    # PERFORMANCE DEBUG: Start comprehensive timing
+    start_time = time.time()
+    logger.info("="*80)
+    logger.info("GET /leads/leads_full_detail - Starting request")
+    logger.info(f"Parameters: sIndex={sIndex}, limit={limit}, sortBy={sortBy}")
+    logger.info(f"Filters: LeadStatus={LeadStatus}, LeadSource={LeadSource}, SiteName={SiteName}")
+
+    if user is None:
+        raise HTTPException(status_code=401, detail='Authentication Failed')
+
+    auth_time = time.time()
+    logger.info(f"[1] Authentication: {(auth_time - start_time)*1000:.2f}ms")
+
+    allowed_site_ids = get_user_site_ids(user, db)
+    if not allowed_site_ids:
+        raise HTTPException(status_code=403, detail="No site access assigned for this user")
+
+    site_check_time = time.time()
+    logger.info(f"[2] Site access check: {(site_check_time - auth_time)*1000:.2f}ms - {len(allowed_site_ids)} sites")
+
+    offset = max(sIndex - 1, 0)
+
+    # Filter, count and page on the search projection alone - no joins to
+    # site / prospect type / contact and no follow-up aggregation per request
+    ensure_lead_search(db)
+    query = db.query(LeadSearchProjection.LeadId).filter(LeadSearchProjection.SiteId.in_(allowed_site_ids))
+
+    query, filter_applied = apply_lead_filters(
+        query,
+        LeadStatus=LeadStatus,
+        LeadSource=LeadSource,
+        SiteName=SiteName,
+        ProspectTypeName=ProspectTypeName,
+        BrokerName=BrokerName,
+        BrokerNumber=BrokerNumber,
+        CustomerName=CustomerName,
+        CustomerNo=CustomerNo,
+        StartDate=StartDate,
+        EndDate=EndDate,
+        HealthScoreMin=HealthScoreMin,
+        HealthScoreMax=HealthScoreMax,
+        ChurnRisk=ChurnRisk,
+        FollowUpStatus=FollowUpStatus,
+        BuyingIntentMin=BuyingIntentMin,
+        BuyingIntentMax=BuyingIntentMax,
+        OverdueDaysMin=OverdueDaysMin,
+        OverdueDaysMax=OverdueDaysMax,
+        from_projection=True,
+    )
 
     query_build_time = time.time()
     logger.info(f"[3] Query building (with filters): {(query_build_time - site_check_time)*1000:.2f}ms")
 
-    # BUG FIX: Use query.count() to include ALL filters AND JOINs
-    # Previous approach only copied WHERE conditions but missed JOINs entirely,
-    # causing wrong counts when filtering by Customer/Broker/Site/ProspectType
     count_start = time.time()
     total_records = query.count()
     count_end = time.time()
@@ -1016,67 +1184,31 @@ async def read_leads_full_details(
             detail="No records found for the given filter(s)."
         )
 
-    # PERFORMANCE OPTIMIZATION: Dictionary-based sorting (O(1) lookup vs O(n) if-elif chain)
-    # Cleaner, faster, and more maintainable than long if-elif chains
-    from sqlalchemy import func as sqlfunc
-
-    # Dictionary mapping for simple sort configurations (no query modifications needed)
-    # PERFORMANCE: Direct column sorting - SQL Server handles NULLs automatically
-    # NULLs are sorted first by default in SQL Server (which is fine for our use case)
-    SORT_CONFIGURATIONS = {
-        "ai_priority": lambda: [desc(Lead.AIPriority)],
-        "health_score_asc": lambda: [asc(Lead.HealthScore)],
-        "health_score_desc": lambda: [desc(Lead.HealthScore)],
-        "buying_intent_desc": lambda: [desc(Lead.BuyingIntent)],
-        "created_date_desc": lambda: [desc(Lead.CreatedDate)],
-        "created_date_asc": lambda: [asc(Lead.CreatedDate)],
-        "lead_name_asc": lambda: [asc(Lead.LeadName)],
-        "budget_desc": lambda: [desc(sqlfunc.coalesce(Lead.RequestedAmount, Lead.QuotedAmount, 0))],
-    }
+    query, sort_orders = apply_lead_sort(db, query, sortBy)
 
-    # Handle complex sorts that require query modifications (subqueries/joins)
-    if sortBy == "follow_up_date":
-        # Follow-up Date - earliest first, NULLs last
-        next_followup_subquery = (
-            db.query(
-                FollowUps.LeadId,
-                func.min(FollowUps.NextFollowUpDate).label('next_followup')
-            )
-            .filter(FollowUps.Status != 'Completed')
-            .group_by(FollowUps.LeadId)
-            .subquery()
-        )
-        query = query.outerjoin(
-            next_followup_subquery,
-            Lead.LeadId == next_followup_subquery.c.LeadId
-        )
-        sort_orders = [asc(next_followup_subquery.c.next_followup)]
-    elif sortBy == "last_contact_date":
-        # Last Contact Date - most recent first (DESC)
-        last_followup_subquery = (
-            db.query(
-                FollowUps.LeadId,
-                func.max(FollowUps.FollowUpDate).label('last_contact')
-            )
-            .filter(FollowUps.Status == 'Completed')
-            .group_by(FollowUps.LeadId)
-            .subquery()
-        )
-        query = query.outerjoin(
-            last_followup_subquery,
-            Lead.LeadId == last_followup_subquery.c.LeadId
-        )
-        sort_orders = [desc(last_followup_subquery.c.last_contact)]
-    else:
-        # Use dictionary lookup for all other sorts (O(1) constant time lookup!)
-        # Default to ai_priority if sortBy is not found in dictionary
-        sort_func = SORT_CONFIGURATIONS.get(sortBy, SORT_CONFIGURATIONS["ai_priority"])
-        sort_orders = sort_func()
-
-    # Apply sorting with NULL handling for SQL Server
-    # PERFORMANCE DEBUG: Measure main query with sorting and pagination
+    # PERFORMANCE DEBUG: Measure page query with sorting and pagination
     main_query_start = time.time()
-    lead_details = query.order_by(*sort_orders).offset(offset).limit(limit).all()
+    page_ids = [lead_id for lead_id, in query.order_by(*sort_orders, LeadSearchProjection.LeadId)
+                .offset(offset).limit(limit).all()]
+
+    # Load only the page's leads; selectinload keeps each relationship to one extra query
+    leads_by_id = {}
+    if page_ids:
+        leads_by_id = {lead.LeadId: lead for lead in db.query(Lead).options(
+            selectinload(Lead.contacts).load_only(
+                Contact.ContactId, Contact.ContactFName, Contact.ContactLName,
+                Contact.ContactEmail, Contact.ContactNo,
+                Contact.ContactType
+            ),
+            selectinload(Lead.prospecttypes),
+            selectinload(Lead.site),
+            selectinload(Lead.broker),
+            selectinload(Lead.created_by),
+            selectinload(Lead.suggestedunit).load_only(
+                InfraUnit.InfraUnitId, InfraUnit.UnitNumber
+            )
+        ).filter(Lead.LeadId.in_(page_ids)).all()}
+    lead_details = [leads_by_id[lead_id] for lead_id in page_ids if lead_id in leads_by_id]
     main_query_end = time.time()
     logger.info(f"[5] Main query execution (sort + pagination): {(main_query_end - main_query_start)*1000:.2f}ms - {len(lead_details)} leads returned")
 
@@ -1124,43 +1256,41 @@ async def get_leads_aggregates(
     site_check_time = time.time()
     logger.info(f"[2] Site access check: {(site_check_time - auth_time)*1000:.2f}ms - {len(allowed_site_ids)} sites")
 
-    # Calculate aggregates using a single efficient query
+    # Combine the pre-aggregated per-site counter rows (a handful of rows per site)
     aggregates_start = time.time()
-
-    # Build aggregate query with only site-based filtering
-    aggregate_query = db.query(
-        # Count aggregates using CASE statements (conditional counting)
-        func.count(case((and_(Lead.HealthScore < 40, Lead.OverdueDays > 3), 1))).label('urgentCount'),
-        func.count(case((Lead.FollowUpStatus == 'today', 1))).label('dueTodayCount'),
-        func.count(case((Lead.BuyingIntent >= 8, 1))).label('highIntentCount'),
-        func.count(case((Lead.FollowUpStatus == 'overdue', 1))).label('overdueCount'),
-        func.count(case((Lead.ChurnRisk == 'critical', 1))).label('criticalChurnCount'),
-        func.count(case((Lead.ChurnRisk == 'high', 1))).label('highChurnCount'),
-        # Average aggregates
-        func.avg(Lead.HealthScore).label('avgHealthScore'),
-        func.avg(Lead.ConversionProbability).label('avgConversionProbability'),
-        # Total count
-        func.count(Lead.LeadId).label('totalCount')
-    )
-
-    # Apply only site-based filtering
-    aggregate_query = aggregate_query.filter(Lead.SiteId.in_(allowed_site_ids))
-
-    aggregate_result = aggregate_query.first()
+    ensure_site_counters(db)
+
+    aggregate_result = db.query(
+        func.sum(LeadSiteCounters.UrgentCount).label('urgentCount'),
+        func.sum(LeadSiteCounters.DueTodayCount).label('dueTodayCount'),
+        func.sum(LeadSiteCounters.HighIntentCount).label('highIntentCount'),
+        func.sum(LeadSiteCounters.OverdueCount).label('overdueCount'),
+        func.sum(LeadSiteCounters.CriticalChurnCount).label('criticalChurnCount'),
+        func.sum(LeadSiteCounters.HighChurnCount).label('highChurnCount'),
+        # Sums and counts - averages are derived below so they stay exact across sites
+        func.sum(LeadSiteCounters.HealthScoreSum).label('healthScoreSum'),
+        func.sum(LeadSiteCounters.HealthScoreCount).label('healthScoreCount'),
+        func.sum(LeadSiteCounters.ConversionProbabilitySum).label('conversionProbabilitySum'),
+        func.sum(LeadSiteCounters.ConversionProbabilityCount).label('conversionProbabilityCount'),
+        func.sum(LeadSiteCounters.TotalCount).label('totalCount')
+    ).filter(LeadSiteCounters.SiteId.in_(allowed_site_ids)).first()
 
     aggregates_end = time.time()
     logger.info(f"[3] Aggregates query execution: {(aggregates_end - aggregates_start)*1000:.2f}ms")
 
+    health_count = aggregate_result.healthScoreCount or 0
+    conversion_count = aggregate_result.conversionProbabilityCount or 0
+
     aggregates = {
-        "urgentCount": aggregate_result.urgentCount or 0,
-        "dueTodayCount": aggregate_result.dueTodayCount or 0,
-        "highIntentCount": aggregate_result.highIntentCount or 0,
-        "overdueCount": aggregate_result.overdueCount or 0,
-        "criticalChurnCount": aggregate_result.criticalChurnCount or 0,
-        "highChurnCount": aggregate_result.highChurnCount or 0,
-        "avgHealthScore": float(aggregate_result.avgHealthScore) if aggregate_result.avgHealthScore else 0,
-        "avgConversionProbability": float(aggregate_result.avgConversionProbability) if aggregate_result.avgConversionProbability else 0,
-        "totalCount": aggregate_result.totalCount or 0
+        "urgentCount": int(aggregate_result.urgentCount or 0),
+        "dueTodayCount": int(aggregate_result.dueTodayCount or 0),
+        "highIntentCount": int(aggregate_result.highIntentCount or 0),
+        "overdueCount": int(aggregate_result.overdueCount or 0),
+        "criticalChurnCount": int(aggregate_result.criticalChurnCount or 0),
+        "highChurnCount": int(aggregate_result.highChurnCount or 0),
+        "avgHealthScore": float(aggregate_result.healthScoreSum) / health_count if health_count else 0,
+        "avgConversionProbability": float(aggregate_result.conversionProbabilitySum) / conversion_count if conversion_count else 0,
+        "totalCount": int(aggregate_result.totalCount or 0)
     }
 
     total_time = time.time() - start_time
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.paging_utils import PageParams, model_columns, paged_response
 from datetime import datetime
 from schemas.schemas import LeadHistoryRequest
 
@@ -34,10 +35,12 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_lead_history(user:user_dependency, db: db_dependency):
+async def read_lead_history(user:user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(LeadHistory).all()
+    if page.unpaged:
+        return db.query(LeadHistory).all()
+    return paged_response(db.query(LeadHistory), LeadHistory.LeadHistoryId, model_columns(LeadHistory), page, "lead_history")
 
 
 
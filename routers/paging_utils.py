@@ -0,0 +1,163 @@
+"""
+Paging Utilities
+================
+
+Shared keyset paging, column projection and JSON streaming for the "read all"
+list endpoints (GET / of action_item, Follow_Ups, visit, infra_unit, ...).
+
+Every list endpoint accepts the same query parameters:
+
+- limit:   rows per page (default 100, max 1000)
+- cursor:  primary key of the last row of the previous page; rows after it
+           are returned. Use the nextCursor of the previous response.
+- fields:  comma separated column names to return (default: all columns)
+- stream:  stream every row after cursor as one JSON array instead of a page
+- unpaged: old behavior - the full ORM result in one list. Kept only for
+           callers that have not moved to paging yet.
+
+A page is {"data": [...], "limit": limit, "nextCursor": <key or None>}.
+Pages are read with WHERE key > cursor ORDER BY key, so page N costs the same
+as page 1 (no OFFSET scan). Streamed arrays are read through a server-side
+cursor on a session owned by the response, so memory stays flat.
+"""
+
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Iterable, Iterator, Optional
+from sqlalchemy import inspect
+from datetime import datetime, date
+from decimal import Decimal
+from database import SessionLocal
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+# Rows fetched per round-trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 1000
+
+
+class PageParams:
+    """Query parameters shared by every paged list endpoint (use with Depends())."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        cursor: Optional[int] = Query(None),
+        fields: Optional[str] = Query(None),
+        stream: bool = Query(False),
+        unpaged: bool = Query(False),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.stream = stream
+        self.unpaged = unpaged
+
+
+def model_columns(model, exclude: Iterable[str] = ()) -> Dict[str, object]:
+    """All mapped columns of a model keyed by attribute name, minus exclude."""
+    return {
+        attr.key: getattr(model, attr.key)
+        for attr in inspect(model).column_attrs
+        if attr.key not in exclude
+    }
+
+
+def json_value(value):
+    """Convert a column value to a JSON friendly value."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def stream_query_rows(query, name: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[tuple]:
+    """
+    Run a column query on its own session through a server-side cursor.
+
+    The request session is closed once the endpoint returns, so the generator
+    binds the prepared query to a session it owns for the life of the response.
+    """
+    db = SessionLocal()
+    start_time = time.time()
+    count = 0
+    try:
+        result = query.with_session(db).execution_options(yield_per=batch_size, stream_results=True)
+        for row in result:
+            count += 1
+            yield row
+    finally:
+        db.close()
+        logger.info(f"Stream {name}: {count} rows in {(time.time() - start_time) * 1000:.2f}ms")
+
+
+def _select_columns(columns: Dict[str, object], key_name: str, fields: Optional[str]) -> Dict[str, object]:
+    if not fields:
+        return columns
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in columns]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(columns)}"
+        )
+    # The key column is always returned so the client can page on
+    return {name: columns[name] for name in dict.fromkeys([key_name] + requested)}
+
+
+def _json_array(names, rows: Iterator[tuple]) -> Iterator[str]:
+    yield "["
+    batch = []
+    first = True
+    for row in rows:
+        item = json.dumps({name: json_value(value) for name, value in zip(names, row)}, default=str)
+        batch.append(item if first else "," + item)
+        first = False
+        if len(batch) == STREAM_BATCH_SIZE:
+            yield "".join(batch)
+            batch = []
+    batch.append("]")
+    yield "".join(batch)
+
+
+def paged_response(query, key_column, columns: Dict[str, object], page: PageParams, name: str):
+    """
+    Page (or stream) a filtered query as projected rows ordered by key_column.
+
+    Args:
+        query: Query carrying the endpoint's filters and joins
+        key_column: unique, ordered column used as the cursor (usually the PK)
+        columns: projectable columns, name -> column expression
+        page: the endpoint's PageParams
+        name: label for logs
+    """
+    key_name = next((n for n, column in columns.items() if column is key_column), key_column.key)
+    selected = _select_columns(columns, key_name, page.fields)
+    if key_name not in selected:
+        selected = {key_name: key_column, **selected}
+
+    query = query.with_entities(*[column.label(n) for n, column in selected.items()])
+    if page.cursor is not None:
+        query = query.filter(key_column > page.cursor)
+    query = query.order_by(key_column)
+
+    if page.stream:
+        return StreamingResponse(
+            _json_array(list(selected), stream_query_rows(query, name)),
+            media_type="application/json"
+        )
+
+    rows = query.limit(page.limit + 1).all()
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+    data = [dict(row._mapping) for row in rows]
+    return {
+        "data": data,
+        "limit": page.limit,
+        "nextCursor": data[-1][key_name] if has_more else None
+    }
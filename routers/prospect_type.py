@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, PROSPECT_TYPE
+from services.lead_search import refresh_lead_search
 from datetime import datetime
 from schemas.schemas import ProspectTypeRequest
 
@@ -34,10 +36,10 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get("/")
-async def read_prospect_type(user:user_dependency, db: db_dependency):
+async def read_prospect_type(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException (status_code=401, detail='Authentication Failed')
-    return db.query(ProspectType).all()
+    return cached_list_response(request, PROSPECT_TYPE, lambda: db.query(ProspectType).all())
 
 
 
@@ -62,6 +64,7 @@ async def create_prospect(user: user_dependency, db: db_dependency,
     )
     db.add(new_prospect)
     db.commit()
+    invalidate(PROSPECT_TYPE)
     db.refresh(new_prospect)
     return new_prospect
 
@@ -77,6 +80,8 @@ async def update_prospect (user: user_dependency,db: db_dependency , prospect_id
     existing_prospect.ProspectTypeName = prospect_request.ProspectTypeName
     db.add(existing_prospect)
     db.commit()
+    invalidate(PROSPECT_TYPE)
+    refresh_lead_search(db, prospect_type_ids=[prospect_id])
 
 
 @router.delete("/deleteprospect/{prospect_id}", status_code=status.HTTP_204_NO_CONTENT )
@@ -88,3 +93,4 @@ async def delete_prospect (user:user_dependency, db: db_dependency, prospect_id
         raise HTTPException (status_code=404, detail="prospect not found")
     db.query(ProspectType).filter(ProspectType.ProspectTypeId == prospect_id).delete()
     db.commit()
+    invalidate(PROSPECT_TYPE)
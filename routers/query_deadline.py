@@ -0,0 +1,350 @@
+"""
+Query Deadlines
+===============
+
+Bounds how long a request's database queries may run, and stops them when
+the client goes away.
+
+Each API request gets a deadline from DEADLINES (first matching method and
+path prefix, else DEFAULT_DEADLINE_SECONDS). QueryDeadlineMiddleware
+stores a QueryBudget for the request in a context variable, which the
+worker thread running a sync endpoint inherits. Two engine events read it:
+
+- before_cursor_execute records the DBAPI connection as in flight, and
+  refuses to start a query once the budget is spent (QueryCancelled)
+- handle_error discards a connection whose query was cancelled, instead of
+  returning it to the pool in an unknown state
+
+While the request runs, the in-flight query is cancelled when the deadline
+passes, or when the client disconnects (watched for requests without a
+body: the list, detail, report and export GETs). The budget ends once the
+last body chunk is sent: background tasks run after that have no deadline,
+and the http.disconnect the server reports for a completed response does
+not cancel them. Cancelling sends an
+attention to SQL Server through pymssql (dbcancel), which aborts the running
+batch, so runaway queries stop holding pool slots and database CPU.
+
+The deadline is enforced by a watchdog thread (armed by the first query of
+the request) as well as by the middleware: an `async def` endpoint running
+blocking SQL keeps the event loop busy, so the middleware's tasks cannot run
+until the query returns. Disconnects can only be seen from the loop, so the
+endpoints meant to be stopped on disconnect (lead.read_leads_full_details,
+visit.read_visit_full_details) are plain `def` and run in the threadpool.
+
+A request stopped by its deadline answers 504; one whose client left gets
+no response. get_query_deadline_stats() (shown on /health) counts
+cancellations by reason and path.
+
+Scheduler jobs and scripts run outside any request and have no deadline;
+the connection's 60 s socket timeout (database.py) still applies.
+"""
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+from sqlalchemy import event
+from database import engine
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEADLINE = "deadline"
+DISCONNECT = "disconnect"
+
+DEFAULT_DEADLINE_SECONDS = 30
+
+# (HTTP method or None for any, path prefix, seconds); first match wins
+DEADLINES = [
+    ("POST", "/Employee/upload_excel", 300),
+    ("POST", "/brochure/upload", 120),
+    (None, "/export/", 300),
+    ("GET", "/leads/leads_full_detail", 20),
+    ("GET", "/visit/Visit_full_details", 20),
+    (None, "/ConversionReport/", 45),
+    (None, "/MonthlyBrokerReport/", 45),
+    (None, "/WeeklySiteVisitReport/", 45),
+    (None, "/weekly_report/", 45),
+    (None, "/dashboard/", 45),
+]
+
+# Never bounded: health checks and static frontend assets
+EXEMPT_PATHS = ("/healthy", "/health", "/favicon.ico")
+EXEMPT_PREFIXES = ("/_next/", "/assets/", "/fonts/", "/logo/")
+
+# Methods whose requests normally carry no body (safe to watch for disconnects)
+_BODYLESS_METHODS = {"GET", "HEAD", "DELETE"}
+
+
+class QueryCancelled(Exception):
+    """Raised instead of starting a query once the request's budget is spent."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Query cancelled: {reason}")
+        self.reason = reason
+
+
+@dataclass
+class QueryBudget:
+    path: str
+    deadline: float
+    reason: Optional[str] = None
+    finished: bool = False
+    _connection: object = None
+    _watched: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def check(self) -> None:
+        if self.reason is None and self.remaining <= 0:
+            self.cancel(DEADLINE)
+        if self.reason is not None:
+            raise QueryCancelled(self.reason)
+
+    def begin(self, dbapi_connection) -> None:
+        with self._lock:
+            self._connection = dbapi_connection
+            watch = not self._watched
+            self._watched = True
+        if watch:
+            _watchdog.watch(self)
+
+    def end(self) -> None:
+        with self._lock:
+            self._connection = None
+
+    def cancel(self, reason: str) -> None:
+        """Stop the request's queries: the running one now, later ones before they start."""
+        with self._lock:
+            if self.reason is not None or self.finished:
+                return
+            self.reason = reason
+            connection = self._connection
+        _record(reason, self.path)
+        if connection is not None:
+            _cancel_query(connection)
+
+
+class _DeadlineWatchdog:
+    """One daemon thread cancelling the budgets whose deadline has passed."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # (deadline, sequence, budget)
+        self._heap = []
+        self._sequence = itertools.count()
+        self._thread = None
+
+    def watch(self, budget: QueryBudget) -> None:
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-deadline-watchdog", daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, (budget.deadline, next(self._sequence), budget))
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                _, _, budget = heapq.heappop(self._heap)
+            # No-op when the request already finished or was cancelled
+            if not budget.finished:
+                budget.cancel(DEADLINE)
+
+
+_watchdog = _DeadlineWatchdog()
+
+_current_budget: ContextVar[Optional[QueryBudget]] = ContextVar("query_budget", default=None)
+
+# Paths counted individually; later ones are counted under "other"
+MAX_TRACKED_PATHS = 200
+
+_stats_lock = threading.Lock()
+_stats = {DEADLINE: 0, DISCONNECT: 0}
+_stats_by_path = {}
+
+
+def _record(reason: str, path: str) -> None:
+    with _stats_lock:
+        _stats[reason] += 1
+        if path not in _stats_by_path and len(_stats_by_path) >= MAX_TRACKED_PATHS:
+            path = "other"
+        by_reason = _stats_by_path.setdefault(path, {DEADLINE: 0, DISCONNECT: 0})
+        by_reason[reason] += 1
+    logger.warning(f"Query cancelled ({reason}): {path}")
+
+
+def _cancel_query(dbapi_connection) -> None:
+    try:
+        raw = getattr(dbapi_connection, "_conn", None)
+        if raw is not None and hasattr(raw, "cancel"):
+            # pymssql: dbcancel sends an attention, aborting the running batch
+            raw.cancel()
+        elif hasattr(dbapi_connection, "interrupt"):
+            # sqlite3 (local runs)
+            dbapi_connection.interrupt()
+    except Exception as e:
+        logger.warning(f"Query cancel failed: {e}")
+
+
+def deadline_for(method: str, path: str) -> Optional[float]:
+    """Deadline in seconds for a request, or None when it is not bounded."""
+    if method == "OPTIONS" or path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES):
+        return None
+    for route_method, prefix, seconds in DEADLINES:
+        if (route_method is None or route_method == method) and path.startswith(prefix):
+            return seconds
+    return DEFAULT_DEADLINE_SECONDS
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    budget = _current_budget.get()
+    if budget is None or budget.finished:
+        return
+    budget.check()
+    budget.begin(conn.connection.dbapi_connection)
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.end()
+
+
+@event.listens_for(engine, "handle_error")
+def _handle_cancelled_query(exception_context):
+    budget = _current_budget.get()
+    if budget is None:
+        return
+    budget.end()
+    if budget.reason is not None:
+        # Drop this connection only; the rest of the pool is fine
+        exception_context.is_disconnect = True
+        exception_context.invalidate_pool_on_disconnect = False
+
+
+class QueryDeadlineMiddleware:
+    """ASGI middleware giving each request a query budget and enforcing it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        seconds = deadline_for(scope["method"], scope["path"])
+        if seconds is None:
+            await self.app(scope, receive, send)
+            return
+
+        budget = QueryBudget(scope["path"], time.monotonic() + seconds)
+        token = _current_budget.set(budget)
+        response_started = False
+        replaced = False
+        watchers = []
+
+        def response_complete():
+            # Background tasks run after this; neither the deadline nor the
+            # disconnect that follows a finished response applies to them
+            budget.finished = True
+            for watcher in watchers:
+                watcher.cancel()
+
+        async def send_wrapper(message):
+            nonlocal response_started, replaced
+            if message["type"] == "http.response.start":
+                response_started = True
+                if budget.reason == DEADLINE and message["status"] >= 500:
+                    # The endpoint turned the cancelled query into a 500
+                    replaced = True
+                    await _send_timeout(send, seconds)
+                    response_complete()
+                    return
+            elif replaced:
+                return
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete()
+
+        pending = []
+
+        async def receive_wrapper():
+            if pending:
+                return pending.pop(0)
+            return await receive()
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    budget.cancel(DISCONNECT)
+                    pending.append(message)
+                    return
+                pending.append(message)
+
+        async def watch_deadline():
+            await asyncio.sleep(seconds)
+            budget.cancel(DEADLINE)
+
+        watchers.append(asyncio.ensure_future(watch_deadline()))
+        if scope["method"] in _BODYLESS_METHODS and not _has_body(scope):
+            watchers.append(asyncio.ensure_future(watch_disconnect()))
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception as e:
+            if budget.reason is None:
+                raise
+            if budget.reason == DEADLINE and not response_started:
+                await _send_timeout(send, seconds)
+            else:
+                logger.info(f"Request ended after query cancellation ({budget.reason}): {e}")
+        finally:
+            budget.finished = True
+            for watcher in watchers:
+                watcher.cancel()
+            _current_budget.reset(token)
+
+
+def _has_body(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"transfer-encoding" or (name == b"content-length" and value != b"0"):
+            return True
+    return False
+
+
+async def _send_timeout(send, seconds: float) -> None:
+    body = json.dumps({"detail": f"Query deadline exceeded ({seconds}s)"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 504,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def get_query_deadline_stats() -> dict:
+    with _stats_lock:
+        return {
+            "cancelled": dict(_stats),
+            "by_path": {path: dict(by_reason) for path, by_reason in _stats_by_path.items()},
+        }
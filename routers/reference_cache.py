@@ -0,0 +1,131 @@
+"""
+Reference Data Cache
+====================
+
+Versioned in-memory snapshots of slowly changing reference lists (sites, site
+types, amenities, amenity sites, prospect types, developers, roles,
+permissions, infra) with ETag / If-None-Match support.
+
+The list endpoint builds its response through cached_list_response(): the
+first call runs the query and stores the JSON body with an ETag; later calls
+return the stored body without touching the database, and a client that
+sends the ETag back in If-None-Match gets an empty 304.
+
+Each table's router calls invalidate() from its create/update/delete
+handlers, which bumps the table's version and drops the snapshot; the next
+read reloads it and the ETag changes with the content. Snapshots also expire after CACHE_TTL_SECONDS, so writes made
+elsewhere (uploads, another app instance, direct SQL) show up without a
+restart.
+"""
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from typing import Callable, Dict, Hashable, Tuple
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on snapshot age (catches writes outside the owning router)
+CACHE_TTL_SECONDS = 300
+# Variants kept per table (e.g. one per distinct site access list)
+MAX_VARIANTS_PER_TABLE = 256
+
+# Reference tables served from the cache
+SITE = "site"
+SITE_TYPE = "site_type"
+AMENITY = "amenity"
+AMENITY_SITE = "amenity_site"
+PROSPECT_TYPE = "prospect_type"
+DEVELOPER = "developer"
+ROLE = "role"
+PERMISSION = "permission"
+INFRA = "infra"
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+# (table, variant) -> (version, etag, body, built_at)
+_snapshots: Dict[Tuple[str, Hashable], Tuple[int, str, bytes, float]] = {}
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def invalidate(*tables: str) -> None:
+    """Drop the snapshots of the given tables; their next read reloads from the database."""
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+        for key in [key for key in _snapshots if key[0] in tables]:
+            del _snapshots[key]
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Compare weakly: proxies may add or strip the W/ prefix
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def _response(request: Request, etag: str, body: bytes) -> Response:
+    headers = {
+        "ETag": etag,
+        # The browser may keep the body but must revalidate on every use
+        "Cache-Control": "private, no-cache",
+    }
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        with _lock:
+            _stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_list_response(request: Request, table: str, load: Callable[[], object], variant: Hashable = None) -> Response:
+    """
+    Serve a reference list from its snapshot, loading it on a miss.
+
+    Args:
+        request: the incoming request (for If-None-Match)
+        table: cache name of the table, also used by invalidate()
+        load: runs the endpoint's query; the result is JSON encoded exactly
+              as FastAPI would encode it when returned from the endpoint
+        variant: distinguishes differently filtered results of one table,
+                 e.g. the caller's allowed site ids
+    """
+    key = (table, variant)
+    now = time.time()
+    with _lock:
+        version = _versions.get(table, 0)
+        snapshot = _snapshots.get(key)
+        fresh = snapshot is not None and snapshot[0] == version and now - snapshot[3] < CACHE_TTL_SECONDS
+        _stats["hits" if fresh else "misses"] += 1
+    if fresh:
+        return _response(request, snapshot[1], snapshot[2])
+
+    start_time = time.time()
+    body = json.dumps(jsonable_encoder(load()), separators=(",", ":")).encode()
+    # Content based, so app instances and restarts agree on the ETag of unchanged data
+    etag = f'W/"{table}-{hashlib.md5(body).hexdigest()[:16]}"'
+    logger.info(f"Reference cache {table}: loaded {len(body)} bytes in {(time.time() - start_time) * 1000:.2f}ms")
+
+    with _lock:
+        # Skip storing if a write invalidated the table while loading
+        if _versions.get(table, 0) == version:
+            if sum(1 for cached in _snapshots if cached[0] == table) >= MAX_VARIANTS_PER_TABLE:
+                for cached in [cached for cached in _snapshots if cached[0] == table]:
+                    del _snapshots[cached]
+            _snapshots[key] = (version, etag, body, now)
+    return _response(request, etag, body)
+
+
+def get_cache_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "snapshots": len(_snapshots),
+            "versions": dict(_versions),
+        }
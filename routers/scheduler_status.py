@@ -8,7 +8,7 @@ Endpoints to monitor and manage the background scheduler
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from scheduler.score_updater import get_scheduler_status, update_all_lead_scores
+from scheduler.score_updater_optimized import get_scheduler_status, get_last_score_run, update_all_lead_scores
 from datetime import datetime
 
 router = APIRouter(
@@ -78,10 +78,15 @@ def get_last_update_info(db: Session = Depends(get_db)):
     Get information about the last scoring update
 
     Returns:
-        - oldest_update: Oldest score update timestamp
-        - latest_update: Most recent score update timestamp
+        - oldest_update: Oldest score change timestamp
+        - latest_update: Most recent score change timestamp
         - total_scored: Number of leads with scores
-        - age_minutes: Minutes since last update
+        - last_run: Last successful scoring run in this process
+        - age_minutes: Minutes since that run
+
+    The job only writes leads whose scores changed, so ScoresLastUpdated
+    records the last change of a lead, not the last run; freshness is judged
+    from the run itself.
     """
     from models import Lead
     from sqlalchemy import func
@@ -95,12 +100,15 @@ def get_last_update_info(db: Session = Depends(get_db)):
             Lead.ScoresLastUpdated.isnot(None)
         ).first()
 
+        last_run = get_last_score_run()
+
         if not stats or not stats.latest:
             return {
                 "data": {
                     "oldest_update": None,
                     "latest_update": None,
                     "total_scored": 0,
+                    "last_run": last_run,
                     "age_minutes": None,
                     "status": "No scores have been calculated yet"
                 },
@@ -108,15 +116,21 @@ def get_last_update_info(db: Session = Depends(get_db)):
                 "statusCode": 200
             }
 
-        age_minutes = (datetime.now() - stats.latest).total_seconds() / 60 if stats.latest else None
+        if last_run is None:
+            age_minutes = None
+            run_status = "No scoring run since startup"
+        else:
+            age_minutes = (datetime.now() - datetime.fromisoformat(last_run["finished"])).total_seconds() / 60
+            run_status = "Scores are up to date" if age_minutes < 31 else "Scores may be stale"
 
         return {
             "data": {
                 "oldest_update": stats.oldest.isoformat() if stats.oldest else None,
                 "latest_update": stats.latest.isoformat() if stats.latest else None,
                 "total_scored": stats.total,
-                "age_minutes": round(age_minutes, 2) if age_minutes else None,
-                "status": "Scores are up to date" if age_minutes and age_minutes < 31 else "Scores may be stale"
+                "last_run": last_run,
+                "age_minutes": round(age_minutes, 2) if age_minutes is not None else None,
+                "status": run_status
             },
             "message": "Last update info retrieved successfully",
             "statusCode": 200
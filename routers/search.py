@@ -6,6 +6,7 @@ from starlette import status
 
 from database import SessionLocal
 from models import Lead, Contact, Site
+from services.phone_keys import phone_ends_with
 from .auth import get_current_user
 from typing import Annotated, Dict, Any
 
@@ -68,7 +69,7 @@ async def universal_search(user: user_dependency, db: db_dependency, query: str
                 Contact.ContactFName.ilike(f"%{query}%"),  # Search by Contact FName
                 Contact.ContactLName.ilike(f"%{query}%"),  # Search by Contact LName
                 Contact.ContactEmail.ilike(f"%{query}%"),  # Search by Contact Email
-                Contact.ContactNo.ilike(f"%{query}%"),  # Search by Contact Number
+                phone_ends_with(query),  # Search by Contact Number
                 Contact.ContactType.ilike(f"%{query}%"),  # Search by Contact Type
 
                 Site.SiteName.ilike(f"%{query}%")  # Search by Site Name
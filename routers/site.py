@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status, Request
 from pytz import timezone
 from fastapi import Path
 from pydantic import BaseModel,Field
@@ -9,6 +9,8 @@ from sqlalchemy import  select, func
 from sqlalchemy.exc import IntegrityError
 from database import SessionLocal
 from .auth import get_current_user
+from routers.reference_cache import cached_list_response, invalidate, SITE, INFRA
+from services.lead_search import refresh_lead_search
 from datetime import datetime
 from schemas.schemas import SiteRequest
 from routers.security_utils import get_user_site_ids
@@ -36,14 +38,17 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get("/")
-async def read_sites(user:user_dependency, db: db_dependency):
+async def read_sites(request: Request, user:user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException (status_code=401, detail='Authentication Failed')
     allowed_site_ids = get_user_site_ids(user, db)
     if not allowed_site_ids:
         raise HTTPException(status_code=403,detail="No site access assigned for this user")
-    sites = (db.query(Site).filter(Site.SiteId.in_(allowed_site_ids)).all())
-    return sites
+    # One snapshot per distinct site access list
+    return cached_list_response(
+        request, SITE, lambda: db.query(Site).filter(Site.SiteId.in_(allowed_site_ids)).all(),
+        variant=tuple(sorted(allowed_site_ids))
+    )
 
 
 
@@ -72,6 +77,7 @@ async def create_site(user: user_dependency, db: db_dependency,site_request:Site
         new_site = Site(**site_request.dict(),CreatedById=user.get('id'), CreatedDate=get_time(), UpdateDate=get_time())
         db.add(new_site)
         db.commit()
+        invalidate(SITE, INFRA)
         db.refresh( new_site)
         return {"SiteId": new_site.SiteId}
     except IntegrityError:
@@ -116,6 +122,8 @@ async def update_site (user: user_dependency,db: db_dependency,site_id: int, sit
         existing_site.UpdateDate = get_time()
         db.add(existing_site)
         db.commit()
+        invalidate(SITE, INFRA)
+        refresh_lead_search(db, site_ids=[existing_site.SiteId])
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Site with name '{site_request.SiteName}' already exists")
@@ -167,6 +175,7 @@ async def delete_site(user: user_dependency, db: db_dependency, site_id: int = P
     # Delete site safely
     db.delete(site_model)
     db.commit()
+    invalidate(SITE, INFRA)
 
 
 @router.patch("/SoftDeleteSite/{site_id}", status_code=status.HTTP_200_OK)
@@ -188,6 +197,7 @@ async def soft_delete_site(user: user_dependency, db: db_dependency, site_id: in
     site_model.IsDeleted = 1
     site_model.UpdateDate = get_time()
     db.commit()
+    invalidate(SITE, INFRA)
 
     return {
         "message": "Site soft deleted successfully",
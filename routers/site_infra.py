@@ -10,6 +10,7 @@ from database import SessionLocal
 from .auth import get_current_user
 from datetime import datetime
 from schemas.schemas import SiteInfraRequest
+from services.inventory_index import invalidate_inventory
 
 
 router = APIRouter(
@@ -71,6 +72,7 @@ async def create_site_infra(user: user_dependency, db:db_dependency, siteinfra_r
     )
     db.add(new_site_infra)
     db.commit()
+    invalidate_inventory([siteinfra_request.SiteId])
     if new_site_infra is not  None:
         return new_site_infra
     raise HTTPException(status_code=404, detail='site detail not found')
@@ -86,6 +88,7 @@ async def update_site_infra(user: user_dependency, db: db_dependency, site_infra
     site_infra_exist = db.query(SiteInfra).filter(SiteInfra.SiteInfraId == site_infra_id ).first()
     if site_infra_exist is None:
         raise HTTPException(status_code=404, detail="site detail not found")
+    previous_site_id = site_infra_exist.SiteId
     site_infra_exist.SiteId=siteinfra_request.SiteId
     site_infra_exist.InfraId=siteinfra_request.InfraId
     site_infra_exist.InfraUnitId=siteinfra_request.InfraUnitId
@@ -96,6 +99,7 @@ async def update_site_infra(user: user_dependency, db: db_dependency, site_infra
     site_infra_exist.CreatedById=siteinfra_request.CreatedById
     db.add(site_infra_exist)
     db.commit()
+    invalidate_inventory([previous_site_id, siteinfra_request.SiteId])
 
 
 
@@ -108,8 +112,10 @@ async def delete_site_infra (user: user_dependency, db: db_dependency, site_infr
     site_infra_model = db.query(SiteInfra).filter(SiteInfra.SiteInfraId == site_infra_id).first()
     if site_infra_model is None:
         raise HTTPException(status_code=404, detail="site detail not found")
+    site_id = site_infra_model.SiteId
     db.query(SiteInfra).filter(SiteInfra.SiteInfraId == site_infra_id).delete()
     db.commit()
+    invalidate_inventory([site_id])
 
 
 
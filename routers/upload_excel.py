@@ -15,6 +15,10 @@ from database import SessionLocal
 from .auth import get_current_user
 from datetime import datetime
 from schemas.schemas import AmenitySiteRequest
+from services.lead_search import refresh_lead_search
+from services.lead_counters import refresh_site_counters
+from services.broker_stats import refresh_broker_stats
+from services.contact_counters import refresh_contact_counters
 
 
 router = APIRouter(
@@ -30,6 +34,11 @@ def get_db():
         db.close()
 
 
+def _column_ids(objects, column: str) -> set:
+    """Distinct ids in one column of the imported rows (pandas leaves NaN for blank cells)."""
+    return {int(value) for value in (getattr(obj, column) for obj in objects) if pd.notna(value)}
+
+
 def get_time():
     ind_time = datetime.now(timezone("Asia/Kolkata"))
     return ind_time
@@ -201,12 +210,19 @@ async def upload_excel(
         raise HTTPException(status_code=400, detail="No valid data to insert")
 
     try:
-        db.bulk_save_objects(objects)
+        # Leads need their new ids for the search projection
+        db.bulk_save_objects(objects, return_defaults=model is Lead)
         db.commit()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to insert data into the database")
 
+    if model is Lead:
+        refresh_lead_search(db, [obj.LeadId for obj in objects])
+        refresh_site_counters(db, _column_ids(objects, 'SiteId'))
+        refresh_broker_stats(db, _column_ids(objects, 'BrokerId'))
+        refresh_contact_counters(db, _column_ids(objects, 'ContactId') | _column_ids(objects, 'BrokerId'))
+
     return {"message": f"Data uploaded successfully to {model_name}!"}
 
 
@@ -5,7 +5,9 @@ from models import Todos, Users, UserRole
 from typing import Annotated, List, Optional
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from .auth import get_current_user, bcrypt_context, CreateUserRequest
+from .auth import get_current_user, CreateUserRequest, hash_password, verify_password, \
+    forget_failed_logins
+from routers.paging_utils import PageParams, paged_response
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from pytz import timezone
@@ -76,11 +78,15 @@ class UpdateUserResponse(BaseModel):
 #     return db.query(Users).all()
 
 
-@router.get('/', response_model=List[UserResponse])
-async def read_users(user: user_dependency, db: db_dependency):
+@router.get('/')
+async def read_users(user: user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException(status_code=401, detail='Authentication Failed')
-    return db.query(Users).all()
+    if page.unpaged:
+        return [UserResponse.model_validate(u, from_attributes=True) for u in db.query(Users).all()]
+    # Only the UserResponse fields are exposed (never hashedpassword)
+    columns = {name: getattr(Users, name) for name in UserResponse.model_fields}
+    return paged_response(db.query(Users), Users.id, columns, page, "users")
 
 
 
@@ -211,7 +217,7 @@ async def create_user(user: user_dependency,db: db_dependency,create_user_reques
         username=create_user_request.username,
         FirstName=create_user_request.first_name,
         LastName=create_user_request.last_name,
-        hashedpassword=bcrypt_context.hash(create_user_request.password),
+        hashedpassword=await hash_password(create_user_request.password),
         is_active=create_user_request.is_active,
         ManagerId=create_user_request.ManagerId,
         ContactNo=create_user_request.ContactNo,
@@ -486,8 +492,9 @@ async def update_pass (user:user_dependency, db: db_dependency, updated_pass_req
     if user is None:
         raise HTTPException(status_code=401, detail='auth failed')
     user_model = db.query(Users).filter(Users.id==user.get('id')).first()
-    if not bcrypt_context.verify(updated_pass_request.password,user_model.hashedpassword):
+    if not await verify_password(updated_pass_request.password,user_model.hashedpassword):
         raise HTTPException(status_code=401, detail = 'Error password change')
-    user_model.hashedpassword =  bcrypt_context.hash(updated_pass_request.new_password)
+    user_model.hashedpassword = await hash_password(updated_pass_request.new_password)
     db.add(user_model)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    forget_failed_logins(user_model.username)
\ No newline at end of file
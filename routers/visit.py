@@ -1,6 +1,6 @@
 from string import ascii_uppercase
 from tokenize import String
-from sqlalchemy import cast, String, literal_column, or_, and_
+from sqlalchemy import literal_column, or_, and_
 from fastapi.responses import JSONResponse
 from fastapi import APIRouter, Depends, HTTPException,status
 from pytz import timezone
@@ -8,16 +8,19 @@ from fastapi import Path
 from pydantic import BaseModel,Field
 # from models import Lead, Contact, ProspectType, Site
 from typing import Annotated, Optional
-from sqlalchemy.orm import Session,joinedload, load_only, aliased
+from sqlalchemy.orm import Session,joinedload, load_only
 from sqlalchemy import  select, func
 from database import SessionLocal
-from models import Visit, Contact, Lead, Infra, Site, InfraUnit, Visitors, Users, ProspectType
+from models import Visit, Lead, Infra, Site, InfraUnit, Visitors, Users, ProspectType, VisitPrimaryVisitor, VisitVisitorKey
 from .auth import get_current_user
 from datetime import datetime
 from schemas.schemas import VisitRequest
 from collections import defaultdict
 from fastapi import Query
 from routers.security_utils import get_user_site_ids
+from routers.paging_utils import PageParams, model_columns, paged_response
+from services.phone_keys import reversed_key_ends_with
+from services.visit_visitors import ensure_visit_visitors
 
 
 router = APIRouter(
@@ -42,14 +45,16 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get('/')
-async def read_visit(user: user_dependency, db: db_dependency):
+async def read_visit(user: user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     allowed_site_ids = get_user_site_ids(user, db)
     if not allowed_site_ids:
         raise HTTPException(status_code=403, detail="No site access assigned for this user")
-    visits = db.query(Visit).filter(Visit.SiteId.in_(allowed_site_ids)).all()
-    return visits
+    query = db.query(Visit).filter(Visit.SiteId.in_(allowed_site_ids))
+    if page.unpaged:
+        return query.all()
+    return paged_response(query, Visit.VisitId, model_columns(Visit), page, "visit")
 
 
 
@@ -181,40 +186,27 @@ async def soft_delete_visit(user: user_dependency, db: db_dependency, visit_id:
 #     return response
 
 
-@router.get("/Visit_full_details/", status_code=status.HTTP_200_OK)
-async def read_visit_full_details(
-        user: user_dependency,
-        db: db_dependency,
-        sIndex: int = Query(1, alias="sIndex"),
-        limit: int = Query(20),
-        VisitStatus: Optional[list[str]] = Query(None),
-        VisitOutlook: Optional[list[str]] = Query(None),
-        Purpose: Optional[list[str]] = Query(None),
-        SiteName: Optional[list[str]] = Query(None),
-        StartDate: Optional[str] = Query(None),
-        EndDate: Optional[str] = Query(None),
-        BrokerName: Optional[list[str]] = Query(None),
-        BrokerNumber: Optional[list[str]] = Query(None),
-        CustomerName: Optional[list[str]] = Query(None),
-        CustomerNo: Optional[list[str]] = Query(None)
+def apply_visit_filters(
+    db: Session,
+    query,
+    VisitStatus: Optional[list[str]] = None,
+    VisitOutlook: Optional[list[str]] = None,
+    Purpose: Optional[list[str]] = None,
+    SiteName: Optional[list[str]] = None,
+    StartDate: Optional[str] = None,
+    EndDate: Optional[str] = None,
+    BrokerName: Optional[list[str]] = None,
+    BrokerNumber: Optional[list[str]] = None,
+    CustomerName: Optional[list[str]] = None,
+    CustomerNo: Optional[list[str]] = None,
 ):
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
-
-    allowed_site_ids = get_user_site_ids(user, db)
-    if not allowed_site_ids:
-        raise HTTPException(status_code=403, detail="No site access assigned for this user")
-
-    # Convert 1-based index to 0-based offset
-    offset = max(sIndex - 1, 0) * limit
-
-    # Create aliases for joining tables
-    BrokerContact = aliased(Contact)
-    CustomerContact = aliased(Contact)
-
-    # Apply site filter to the query
-    query = db.query(Visit).filter(Visit.SiteId.in_(allowed_site_ids))
+    """
+    Apply the Visit_full_details filter set to a Visit query.
+    Shared with the visit export so both return the same rows.
 
+    Returns:
+        (filtered query, whether any filter was applied)
+    """
     # Track if any filter was applied and which joins are needed
     filter_applied = False
     visitors_joined = False
@@ -275,93 +267,98 @@ async def read_visit_full_details(
         except ValueError as e:
             raise HTTPException(status_code=400, detail=f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}")
 
-    # Filter by Broker Name - uses Visitors → Contact join
+    # Customer / broker filters match any customer / broker visitor of the visit,
+    # from the VisitVisitorKey table (services/visit_visitors.py)
+    Key = VisitVisitorKey
+
+    # Filter by Broker Name
     if BrokerName:
         filter_applied = True
-        name_conditions = []
-        for name in BrokerName:
-            name = name.strip()
-            if not name:
-                continue
-            name_conditions.append(
-                or_(
-                    Contact.ContactFName.ilike(f"%{name}%"),
-                    Contact.ContactLName.ilike(f"%{name}%"),
-                    (Contact.ContactFName + ' ' + Contact.ContactLName).ilike(f"%{name}%")
-                )
-            )
-
+        name_conditions = [Key.Name.ilike(f"%{name.strip()}%") for name in BrokerName if name.strip()]
         if name_conditions:
-            broker_visit_ids = (
-                db.query(Visitors.VisitId)
-                .join(Contact, Visitors.ContactId == Contact.ContactId)
-                .filter(
-                    Contact.ContactId.isnot(None),  # Ensure ContactId exists
-                    Contact.ContactType == 'Broker',
-                    or_(*name_conditions)
-                )
-                .distinct()
-            )
-            query = query.filter(Visit.VisitId.in_(broker_visit_ids))
+            query = query.filter(Visit.VisitId.in_(
+                db.query(Key.VisitId).filter(Key.ContactType == 'Broker', or_(*name_conditions))
+            ))
 
     # Filter by Broker Number
     if BrokerNumber:
         filter_applied = True
-        broker_visit_ids = (
-            db.query(Visitors.VisitId)
-            .join(Contact, Visitors.ContactId == Contact.ContactId)
-            .filter(
-                Contact.ContactId.isnot(None),  # Ensure ContactId exists
-                Contact.ContactType == 'Broker',
-                or_(*[cast(Contact.ContactNo, String).ilike(f"%{num}%") for num in BrokerNumber])
+        query = query.filter(Visit.VisitId.in_(
+            db.query(Key.VisitId).filter(
+                Key.ContactType == 'Broker',
+                or_(*[reversed_key_ends_with(Key.PhoneKeyRev, num) for num in BrokerNumber])
             )
-            .distinct()
-        )
-        query = query.filter(Visit.VisitId.in_(broker_visit_ids))
+        ))
 
     # Filter by Customer Name
     if CustomerName:
         filter_applied = True
-        name_conditions = []
-        for name in CustomerName:
-            name = name.strip()
-            if not name:
-                continue
-            name_conditions.append(
-                or_(
-                    Contact.ContactFName.ilike(f"%{name}%"),
-                    Contact.ContactLName.ilike(f"%{name}%"),
-                    (Contact.ContactFName + ' ' + Contact.ContactLName).ilike(f"%{name}%")
-                )
-            )
-
+        name_conditions = [Key.Name.ilike(f"%{name.strip()}%") for name in CustomerName if name.strip()]
         if name_conditions:
-            customer_visit_ids = (
-                db.query(Visitors.VisitId)
-                .join(Contact, Visitors.ContactId == Contact.ContactId)
-                .filter(
-                    Contact.ContactId.isnot(None),  # Ensure ContactId exists
-                    Contact.ContactType == 'Customer',
-                    or_(*name_conditions)
-                )
-                .distinct()
-            )
-            query = query.filter(Visit.VisitId.in_(customer_visit_ids))
+            query = query.filter(Visit.VisitId.in_(
+                db.query(Key.VisitId).filter(Key.ContactType == 'Customer', or_(*name_conditions))
+            ))
 
     # Filter by Customer Number
     if CustomerNo:
         filter_applied = True
-        customer_visit_ids = (
-            db.query(Visitors.VisitId)
-            .join(Contact, Visitors.ContactId == Contact.ContactId)
-            .filter(
-                Contact.ContactId.isnot(None),  # Ensure ContactId exists
-                Contact.ContactType == 'Customer',
-                or_(*[cast(Contact.ContactNo, String).ilike(f"%{num}%") for num in CustomerNo])
+        query = query.filter(Visit.VisitId.in_(
+            db.query(Key.VisitId).filter(
+                Key.ContactType == 'Customer',
+                or_(*[reversed_key_ends_with(Key.PhoneKeyRev, num) for num in CustomerNo])
             )
-            .distinct()
-        )
-        query = query.filter(Visit.VisitId.in_(customer_visit_ids))
+        ))
+
+    return query, filter_applied
+
+
+@router.get("/Visit_full_details/", status_code=status.HTTP_200_OK)
+def read_visit_full_details(
+        user: user_dependency,
+        db: db_dependency,
+        sIndex: int = Query(1, alias="sIndex"),
+        limit: int = Query(20),
+        VisitStatus: Optional[list[str]] = Query(None),
+        VisitOutlook: Optional[list[str]] = Query(None),
+        Purpose: Optional[list[str]] = Query(None),
+        SiteName: Optional[list[str]] = Query(None),
+        StartDate: Optional[str] = Query(None),
+        EndDate: Optional[str] = Query(None),
+        BrokerName: Optional[list[str]] = Query(None),
+        BrokerNumber: Optional[list[str]] = Query(None),
+        CustomerName: Optional[list[str]] = Query(None),
+        CustomerNo: Optional[list[str]] = Query(None)
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    allowed_site_ids = get_user_site_ids(user, db)
+    if not allowed_site_ids:
+        raise HTTPException(status_code=403, detail="No site access assigned for this user")
+
+    # Convert 1-based index to 0-based offset
+    offset = max(sIndex - 1, 0) * limit
+
+    ensure_visit_visitors(db)
+
+    # Apply site filter to the query
+    query = db.query(Visit).filter(Visit.SiteId.in_(allowed_site_ids))
+
+    query, filter_applied = apply_visit_filters(
+        db,
+        query,
+        VisitStatus=VisitStatus,
+        VisitOutlook=VisitOutlook,
+        Purpose=Purpose,
+        SiteName=SiteName,
+        StartDate=StartDate,
+        EndDate=EndDate,
+        BrokerName=BrokerName,
+        BrokerNumber=BrokerNumber,
+        CustomerName=CustomerName,
+        CustomerNo=CustomerNo,
+    )
+
     # Total records for pagination (after filters)
     total_records = query.count()
 
@@ -380,9 +377,11 @@ async def read_visit_full_details(
         sIndex = total_pages
         offset = (sIndex - 1) * limit
 
-    # Fetch paginated visit data
+    # Fetch paginated visit data with the primary visitor summary (one row per visit)
     visit_details = (
         query
+        .add_entity(VisitPrimaryVisitor)
+        .outerjoin(VisitPrimaryVisitor, VisitPrimaryVisitor.VisitId == Visit.VisitId)
         .options(
             joinedload(Visit.site).load_only(Site.SiteId, Site.SiteName, Site.SiteAddress),
             joinedload(Visit.infra).load_only(Infra.InfraId, Infra.InfraName, Infra.InfraCategory),
@@ -397,52 +396,9 @@ async def read_visit_full_details(
     # Calculate next page index
     next_index = sIndex + 1 if sIndex < total_pages else 1
 
-    # Fetch visitors for each visit and add VisitorName
-    visit_ids = [visit.VisitId for visit in visit_details]
-
-    # Query visitors with contact information using LEFT JOIN to include visitors without contacts
-    # Include all visitors except those explicitly marked as deleted with "Yes"
-    # Order by CreatedDate to get the earliest created visitor first
-    visitors_data = (
-        db.query(Visitors, Contact)
-        .outerjoin(Contact, Visitors.ContactId == Contact.ContactId)
-        .filter(Visitors.VisitId.in_(visit_ids))
-        .filter(or_(Visitors.IsDeleted != "Yes", Visitors.IsDeleted == None))
-        .order_by(Visitors.CreatedDate.asc())  # Order by CreatedDate ascending (earliest first)
-        .all()
-    )
-
-    # Group visitors by VisitId - keep only the first visitor (earliest CreatedDate) per visit
-    visitors_by_visit = {}
-    seen_visits = set()  # Track which VisitIds we've already processed
-
-    for visitor, contact in visitors_data:
-        # Only process the first visitor for each VisitId (already ordered by CreatedDate asc)
-        if visitor.VisitId not in seen_visits:
-            seen_visits.add(visitor.VisitId)
-
-            # Handle cases where contact might be None (no matching ContactId)
-            if contact:
-                visitor_name = f"{contact.ContactFName or ''} {contact.ContactLName or ''}".strip()
-                contact_id = contact.ContactId
-                contact_type = contact.ContactType
-                contact_no = contact.ContactNo
-            else:
-                visitor_name = "Unknown Visitor"
-                contact_id = visitor.ContactId
-                contact_type = None
-                contact_no = None
-
-            visitors_by_visit[visitor.VisitId] = {
-                "VisitorName": visitor_name,
-                "ContactId": contact_id,
-                "ContactType": contact_type,
-                "ContactNo": contact_no
-            }
-
     # Prepare response with visitor information
     response_data = []
-    for visit in visit_details:
+    for visit, primary in visit_details:
         visit_dict = {
             "VisitId": visit.VisitId,
             "InfraId": visit.InfraId,
@@ -458,10 +414,10 @@ async def read_visit_full_details(
             "site": visit.site,
             "infra": visit.infra,
             "created_by": visit.created_by,
-            "VisitorName": visitors_by_visit.get(visit.VisitId, {}).get("VisitorName"),
-            "VisitorContactId": visitors_by_visit.get(visit.VisitId, {}).get("ContactId"),
-            "VisitorContactType": visitors_by_visit.get(visit.VisitId, {}).get("ContactType"),
-            "VisitorContactNo": visitors_by_visit.get(visit.VisitId, {}).get("ContactNo")
+            "VisitorName": primary.VisitorName if primary else None,
+            "VisitorContactId": primary.ContactId if primary else None,
+            "VisitorContactType": primary.ContactType if primary else None,
+            "VisitorContactNo": primary.ContactNo if primary else None
         }
         response_data.append(visit_dict)
 
@@ -551,28 +507,19 @@ async def read_visit_full_details_by_id (user:user_dependency, db: db_dependency
 async def get_site_wise_visit_count(user: user_dependency, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    visits = db.query(Visit).options(joinedload(Visit.site)).all()
-    site_visit_count = {}
-    site_name_map = {}
-
-    for visit in visits:
-        if visit.site:
-            site_id = visit.site.SiteId
-            site_name = visit.site.SiteName
-
-            if site_id in site_visit_count:
-                site_visit_count[site_id] += 1
-            else:
-                site_visit_count[site_id] = 1
-
-            site_name_map[site_id] = site_name  # Safe to overwrite with same value
+    # Count in the database instead of loading every Visit row into memory
+    site_visit_counts = (
+        db.query(Site.SiteId, Site.SiteName, func.count(Visit.VisitId).label("VisitCount"))
+        .join(Visit, Visit.SiteId == Site.SiteId)
+        .group_by(Site.SiteId, Site.SiteName)
+        .all()
+    )
 
-    # Build result list
     result = []
-    for site_id, count in site_visit_count.items():
+    for site_id, site_name, count in site_visit_counts:
         result.append({
             "SiteId": site_id,
-            "SiteName": site_name_map[site_id],
+            "SiteName": site_name,
             "VisitCount": count
         })
 
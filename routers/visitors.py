@@ -17,6 +17,12 @@ from schemas.schemas import VisitRequest, VisitorsRequest, VisitorCreate
 from collections import defaultdict
 from fastapi import Query
 from routers.security_utils import get_user_site_ids
+from routers.paging_utils import PageParams, model_columns, paged_response
+from services.lead_counters import refresh_site_counters
+from services.broker_stats import refresh_broker_stats
+from services.contact_counters import refresh_contact_counters
+from services.lead_search import refresh_lead_search
+from services.visit_visitors import refresh_visit_visitors
 
 
 router = APIRouter(
@@ -299,6 +305,7 @@ async def create_visitors_and_visit(
             broker_id = broker_contact.ContactId
 
     # Step 6: Create Lead only for visitors with ContactType "Customer"
+    leads_created = False
     for visitor_model in created_visitors:
         # Generate LeadName and check ContactType
         contact_name = "Unknown"
@@ -350,6 +357,14 @@ async def create_visitors_and_visit(
             visitor_model.LeadId = lead_model.LeadId
             db.add(visitor_model)
             db.commit()
+            leads_created = True
+
+    if leads_created:
+        refresh_site_counters(db, [visit_model.SiteId])
+        refresh_broker_stats(db, [broker_id])
+        refresh_contact_counters(db, [v.ContactId for v in created_visitors if v.LeadId] + [broker_id])
+        refresh_lead_search(db, [v.LeadId for v in created_visitors])
+    refresh_visit_visitors(db, [visit_model.VisitId])
 
     # Step 7: Prepare response
     response_visitors = []
@@ -432,6 +447,8 @@ async def update_Visitors (user: user_dependency,db: db_dependency,visitors_id:
     visitors_model.UpdatedDate = get_time()
     db.add(visitors_model)
     db.commit()
+    # Contact or IsDeleted changes can move the visit's primary visitor
+    refresh_visit_visitors(db, [visitors_model.VisitId])
 
 
 
@@ -444,17 +461,39 @@ async def delete_visitors (user:user_dependency, db: db_dependency,visitors_id:
     visitors_model = db.query(Visitors).filter(Visitors.VisitorsId == visitors_id).filter(Visitors.CreatedById == user.get('id')).first()
     if visitors_model is None:
         raise HTTPException(status_code=404, detail="visitors not found")
+    visit_id = visitors_model.VisitId
     db.query(Visitors).filter(Visitors.VisitorsId == visitors_id).delete()
     db.commit()
+    refresh_visit_visitors(db, [visit_id])
 
 
 @router.get("/Visitors_full_details/", status_code=status.HTTP_200_OK )
-async def read_visitors_full_details (user:user_dependency, db: db_dependency):
+async def read_visitors_full_details (user:user_dependency, db: db_dependency, page: Annotated[PageParams, Depends()]):
     if user is None:
         raise HTTPException (status_code=401, detail='Authentication Failed')
-    visitors_details = db.query(Visitors).options(joinedload(Visitors.visit), joinedload(Visitors.contacts).load_only(Contact.ContactFName,
-                       Contact.ContactLName, Contact.ContactEmail, Contact.ContactNo)).all()
-    return visitors_details
+    if page.unpaged:
+        visitors_details = db.query(Visitors).options(joinedload(Visitors.visit), joinedload(Visitors.contacts).load_only(Contact.ContactFName,
+                           Contact.ContactLName, Contact.ContactEmail, Contact.ContactNo)).all()
+        return visitors_details
+
+    # Flat projection: visit and contact fields come from outer joins instead of nested objects
+    columns = {
+        **model_columns(Visitors),
+        "VisitDate": Visit.VisitDate,
+        "VisitStatus": Visit.VisitStatus,
+        "VisitOutlook": Visit.VisitOutlook,
+        "SiteId": Visit.SiteId,
+        "ContactFName": Contact.ContactFName,
+        "ContactLName": Contact.ContactLName,
+        "ContactEmail": Contact.ContactEmail,
+        "ContactNo": Contact.ContactNo,
+    }
+    query = (
+        db.query(Visitors)
+        .outerjoin(Visit, Visit.VisitId == Visitors.VisitId)
+        .outerjoin(Contact, Contact.ContactId == Visitors.ContactId)
+    )
+    return paged_response(query, Visitors.VisitorsId, columns, page, "Visitors_full_details")
 
 
 
@@ -533,18 +533,17 @@
 
 # ---------------------------------------------------------------------------------------------------------
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
 from sqlalchemy.orm import Session
 from datetime import datetime
 from pytz import timezone
-from typing import Annotated
-from twilio.rest import Client
+from typing import Annotated, Optional
 
 from database import SessionLocal
-from models import APIConfiguration, Visitors, NotificationConfiguration, Visit, Contact
+from models import APIConfiguration, Visitors, NotificationConfiguration, Visit, Contact, NotificationOutbox
+from services.notification_outbox import enqueue_whatsapp, dispatch_pending
 from .auth import get_current_user
 from schemas.schemas import APIConfigurationBase
-import json
 
 
 router = APIRouter(
@@ -633,7 +632,7 @@ def fetch_report_data_from_db(db: Session):
 
 
 @router.post("/send_whatsapp", status_code=status.HTTP_201_CREATED)
-def send_whatsapp_report(user: user_dependency, db: db_dependency):
+def send_whatsapp_report(user: user_dependency, db: db_dependency, background_tasks: BackgroundTasks):
 
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
@@ -647,12 +646,13 @@ def send_whatsapp_report(user: user_dependency, db: db_dependency):
     if not api_config:
         raise HTTPException(status_code=404, detail="No active Twilio WhatsApp configuration found")
 
-    # Step 2: Fetch active recipient config from NotificationConfiguration
-    notification_config = db.query(NotificationConfiguration).filter(
-        NotificationConfiguration.IsActive == True
-    ).order_by(NotificationConfiguration.NotificationId.desc()).first()
+    # Step 2: Fetch every active recipient from NotificationConfiguration
+    notification_configs = db.query(NotificationConfiguration).filter(
+        NotificationConfiguration.IsActive == True,
+        NotificationConfiguration.ToNumber.isnot(None)
+    ).order_by(NotificationConfiguration.NotificationId.desc()).all()
 
-    if not notification_config:
+    if not notification_configs:
         raise HTTPException(status_code=404, detail="No active notification configuration found")
 
     # Step 3: Fetch report data
@@ -687,30 +687,81 @@ def send_whatsapp_report(user: user_dependency, db: db_dependency):
     # except Exception as e:
     #     raise HTTPException(status_code=500, detail=f"Failed to send WhatsApp message: {str(e)}")
 
-    # Send WhatsApp via Template
-    try:
-        client = Client(api_config.ConfigKey, api_config.ConfigValue)
-
-        whatsapp_from = f"whatsapp:{api_config.WhatsAppFrom}"
-        whatsapp_to = f"whatsapp:{notification_config.ToNumber}"
-
-        message = client.messages.create(
-            from_=whatsapp_from,
-            to=whatsapp_to,
-            content_sid=api_config.ContentTemplateSID,  # ✅ Using Template SID
-            content_variables=json.dumps({  # ✅ Mapping Variables
-                "1": str(report_data['total_visit']),
-                "2": str(report_data['direct_visit_count']),
-                "3": str(report_data['revisit_count']),
-                "4": str(report_data['new_visit_count']),
-                "5": get_time().strftime('%d-%m-%Y %H:%M')
-            })
-        )
-
-        return {"message": "WhatsApp weekly report sent successfully", "sid": message.sid}
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send WhatsApp message: {str(e)}")
+    # Step 5: Queue one message per recipient; the outbox dispatcher sends them
+    report_time = get_time()
+    content_variables = {
+        "1": str(report_data['total_visit']),
+        "2": str(report_data['direct_visit_count']),
+        "3": str(report_data['revisit_count']),
+        "4": str(report_data['new_visit_count']),
+        "5": report_time.strftime('%d-%m-%Y %H:%M')
+    }
+    # Same day + same figures = same report; a repeated click does not resend it
+    dedupe_prefix = (
+        f"weekly_report:{report_time.strftime('%Y-%m-%d')}:"
+        f"{report_data['total_visit']}-{report_data['direct_visit_count']}-"
+        f"{report_data['revisit_count']}-{report_data['new_visit_count']}"
+    )
+
+    outbox_rows = enqueue_whatsapp(
+        db,
+        recipients=[config.ToNumber for config in notification_configs],
+        dedupe_prefix=dedupe_prefix,
+        content_template_sid=api_config.ContentTemplateSID,
+        content_variables=content_variables,
+        config_id=api_config.ConfigId,
+        created_by_id=user.get('id')
+    )
+
+    # Deliver right after the response; the scheduler job picks up retries
+    background_tasks.add_task(dispatch_pending)
+
+    return {
+        "message": "WhatsApp weekly report queued successfully",
+        "queued": len(outbox_rows),
+        "outbox": [
+            {"OutboxId": row.OutboxId, "ToNumber": row.ToNumber, "Status": row.Status}
+            for row in outbox_rows
+        ]
+    }
+
+
+@router.get("/outbox")
+def read_notification_outbox(user: user_dependency, db: db_dependency,
+                             status_filter: Optional[str] = Query(None, alias="status"),
+                             sIndex: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    """Delivery status of queued notifications, newest first."""
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    query = db.query(NotificationOutbox)
+    if status_filter:
+        query = query.filter(NotificationOutbox.Status == status_filter)
+
+    total_records = query.count()
+    rows = query.order_by(NotificationOutbox.OutboxId.desc()).offset(sIndex).limit(limit).all()
+
+    return {
+        "data": [
+            {
+                "OutboxId": row.OutboxId,
+                "Channel": row.Channel,
+                "ToNumber": row.ToNumber,
+                "Status": row.Status,
+                "Attempts": row.Attempts,
+                "NextAttemptAt": row.NextAttemptAt,
+                "LastError": row.LastError,
+                "ProviderMessageSid": row.ProviderMessageSid,
+                "CreatedAt": row.CreatedAt,
+                "SentAt": row.SentAt
+            }
+            for row in rows
+        ],
+        "total_records": total_records,
+        "sIndex": sIndex,
+        "limit": limit,
+        "nextIndex": sIndex + limit if sIndex + limit < total_records else None
+    }
 
 
 
@@ -22,6 +22,9 @@ from datetime import datetime, timedelta
 from sqlalchemy import func, case, text
 from sqlalchemy.exc import OperationalError, DBAPIError
 from database import SessionLocal, engine
+from services.lead_counters import refresh_site_counters
+from services.broker_stats import refresh_broker_stats
+from services.contact_counters import refresh_contact_counters
 from models import Lead, FollowUps, Visit, Visitors, LeadVelocitySnapshots
 import pandas as pd
 import numpy as np
@@ -631,6 +634,13 @@ def update_all_lead_scores():
         db.commit()
         print(f"   Updated {len(update_df)} leads in single operation")
 
+        # Scores changed - rebuild the per-site counters behind /leads/leads_aggregates
+        refresh_site_counters(db)
+        # Full broker stats rebuild also picks up visit changes since the last run
+        refresh_broker_stats(db)
+        # Reconcile per-contact lead counters (catches writes outside the lead endpoints)
+        refresh_contact_counters(db)
+
         t28 = time.time()
         print(f"✅ Bulk update completed in {t28-t27:.2f}s")
 
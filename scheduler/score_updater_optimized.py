@@ -23,9 +23,20 @@ from datetime import datetime, timedelta
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, DBAPIError
 from database import SessionLocal, engine
+from services.lead_counters import refresh_site_counters
+from services.broker_stats import refresh_broker_stats
+from services.contact_counters import refresh_contact_counters
+from services.phone_keys import backfill_phone_keys
+from services.agenda import refresh_agenda
+from services.lead_search import refresh_lead_search
+from services.visit_visitors import refresh_visit_visitors
+from services.notification_outbox import dispatch_pending
+from services.whatsapp_inbox import process_pending as process_whatsapp_inbox, has_message_processor
+from services.analytics_snapshot import refresh_analytics_snapshot, REFRESH_INTERVAL_MINUTES
 import pandas as pd
 import numpy as np
 import logging
+import os
 import time
 # Removed ThreadPoolExecutor - using single connection for cloud optimization
 
@@ -47,6 +58,233 @@ def execute_query_to_df(query_func, query_name):
         logger.error(f"   {query_name} failed: {e}")
         return query_name, None, 0
 
+# "chunked" (default): LeadId-ordered batches, one short transaction each,
+# writing only leads whose scores changed. "single": the original one-statement
+# update of every open lead (holds locks on lead for the whole run).
+SCORE_WRITE_MODE = os.getenv("SCORE_WRITE_MODE", "chunked")
+# Open leads scored per transaction in chunked mode
+SCORE_CHUNK_SIZE = 500
+
+# Key range bounds covering every lead (single mode)
+_ALL_LEADS = {"after_id": -2147483648, "upto_id": 2147483647}
+
+# Scores of the open leads with :after_id < LeadId <= :upto_id. The range is
+# applied inside each aggregate too, so a chunk only reads its own leads'
+# follow-ups, visits and snapshots.
+_SCORES_SQL = """
+    -- Calculate all scores
+    SELECT
+        LeadId,
+        health_score,
+        velocity_score,
+        ai_priority,
+        conversion_probability,
+        CASE
+            WHEN risk_score < 30 THEN 'low'
+            WHEN risk_score < 50 THEN 'medium'
+            WHEN risk_score < 70 THEN 'high'
+            ELSE 'critical'
+        END as churn_risk,
+        followup_status,
+        max_overdue_days,
+        CASE
+            WHEN health_score < 40 AND max_overdue_days > 3 THEN
+                '{"priority":"urgent","action":"call_now","message":"URGENT: Call immediately! Lead health critical (' + CAST(health_score AS VARCHAR) + ') and ' + CAST(max_overdue_days AS VARCHAR) + ' days overdue.","reasoning":"High churn risk - immediate action required"}'
+            WHEN BuyingIntent >= 8 AND days_since_contact > 5 THEN
+                '{"priority":"high","action":"follow_up","message":"HIGH PRIORITY: Hot lead (intent ' + CAST(BuyingIntent AS VARCHAR) + '/10) going cold. Contact within 24 hours.","reasoning":"High buying intent with declining engagement"}'
+            WHEN velocity_score > 70 THEN
+                '{"priority":"medium","action":"nurture","message":"Good momentum! Lead improving. Continue current approach.","reasoning":"Positive trend - maintain engagement"}'
+            ELSE
+                '{"priority":"low","action":"monitor","message":"Monitor and follow standard process.","reasoning":"No urgent action needed"}'
+        END as recommendation_json
+    FROM (
+        -- Risk score calculation
+        SELECT
+            *,
+            (CASE WHEN health_score < 30 THEN 40 WHEN health_score < 50 THEN 25 WHEN health_score < 70 THEN 10 ELSE 0 END) +
+            (CASE WHEN velocity_score < 30 THEN 30 WHEN velocity_score < 40 THEN 20 WHEN velocity_score < 50 THEN 10 ELSE 0 END) +
+            (CASE WHEN days_since_contact > 14 THEN 20 WHEN days_since_contact > 7 THEN 15 WHEN days_since_contact > 3 THEN 5 ELSE 0 END) +
+            (CASE WHEN max_overdue_days > 5 THEN 10 WHEN max_overdue_days > 2 THEN 5 ELSE 0 END) as risk_score
+        FROM (
+            -- Velocity & other scores
+            SELECT
+                *,
+                CASE WHEN CAST(50 + (trend_7d / 100.0) * 30 + (trend_14d / 100.0) * 20 AS INT) > 100 THEN 100
+                     WHEN CAST(50 + (trend_7d / 100.0) * 30 + (trend_14d / 100.0) * 20 AS INT) < 0 THEN 0
+                     ELSE CAST(50 + (trend_7d / 100.0) * 30 + (trend_14d / 100.0) * 20 AS INT) END as velocity_score,
+                CASE WHEN CAST((100 - health_score) * 0.30 + (BuyingIntent * 10) * 0.40 + CASE WHEN max_overdue_days * 5 > 50 THEN 50 ELSE max_overdue_days * 5 END * 0.30 AS INT) > 100 THEN 100
+                     WHEN CAST((100 - health_score) * 0.30 + (BuyingIntent * 10) * 0.40 + CASE WHEN max_overdue_days * 5 > 50 THEN 50 ELSE max_overdue_days * 5 END * 0.30 AS INT) < 0 THEN 0
+                     ELSE CAST((100 - health_score) * 0.30 + (BuyingIntent * 10) * 0.40 + CASE WHEN max_overdue_days * 5 > 50 THEN 50 ELSE max_overdue_days * 5 END * 0.30 AS INT) END as ai_priority,
+                CASE WHEN CAST((health_score * 0.30) + (BuyingIntent * 10 * 0.25) + (50 * 0.20) + (CASE WHEN visit_count * 20 > 100 THEN 100 ELSE visit_count * 20 END * 0.15) + (response_rate * 0.10) AS DECIMAL(5,2)) > 100 THEN 100.00
+                     WHEN CAST((health_score * 0.30) + (BuyingIntent * 10 * 0.25) + (50 * 0.20) + (CASE WHEN visit_count * 20 > 100 THEN 100 ELSE visit_count * 20 END * 0.15) + (response_rate * 0.10) AS DECIMAL(5,2)) < 0 THEN 0.00
+                     ELSE CAST((health_score * 0.30) + (BuyingIntent * 10 * 0.25) + (50 * 0.20) + (CASE WHEN visit_count * 20 > 100 THEN 100 ELSE visit_count * 20 END * 0.15) + (response_rate * 0.10) AS DECIMAL(5,2)) END as conversion_probability,
+                CASE WHEN next_followup_date IS NULL THEN 'none'
+                     WHEN next_followup_date < GETDATE() THEN 'overdue'
+                     WHEN CAST(next_followup_date AS DATE) = CAST(GETDATE() AS DATE) THEN 'today'
+                     WHEN next_followup_date <= DATEADD(day, 7, GETDATE()) THEN 'this_week'
+                     ELSE 'scheduled' END as followup_status
+            FROM (
+                -- Health score calculation
+                SELECT
+                    *,
+                    CASE WHEN CAST(100
+                        - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
+                        - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
+                        + ((BuyingIntent - 5) * 4)
+                        + (response_rate / 10) AS INT) > 100 THEN 100
+                         WHEN CAST(100
+                        - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
+                        - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
+                        + ((BuyingIntent - 5) * 4)
+                        + (response_rate / 10) AS INT) < 0 THEN 0
+                         ELSE CAST(100
+                        - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
+                        - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
+                        + ((BuyingIntent - 5) * 4)
+                        + (response_rate / 10) AS INT) END as health_score,
+                    CASE WHEN snapshot_health_7d > 0 THEN CAST(100
+                        - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
+                        - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
+                        + ((BuyingIntent - 5) * 4)
+                        + (response_rate / 10) AS INT) - snapshot_health_7d ELSE 0 END as trend_7d,
+                    CASE WHEN snapshot_health_14d > 0 THEN CAST(100
+                        - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
+                        - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
+                        + ((BuyingIntent - 5) * 4)
+                        + (response_rate / 10) AS INT) - snapshot_health_14d ELSE 0 END as trend_14d
+                FROM (
+                    -- Base data with aggregations
+                    SELECT
+                        l.LeadId,
+                        ISNULL(l.BuyingIntent, 5) as BuyingIntent,
+                        ISNULL(DATEDIFF(day, CASE WHEN ISNULL(f.last_followup_date, '1900-01-01') > ISNULL(v.last_visit_date, '1900-01-01') THEN f.last_followup_date ELSE v.last_visit_date END, GETDATE()), 999) as days_since_contact,
+                        ISNULL(f.total_followups, 0) as total_followups,
+                        ISNULL(f.completed_followups, 0) as completed_followups,
+                        ISNULL(f.responded_followups, 0) as responded_followups,
+                        ISNULL(f.overdue_count, 0) as overdue_count,
+                        ISNULL(f.max_overdue_days, 0) as max_overdue_days,
+                        ISNULL(v.visit_count, 0) as visit_count,
+                        f.next_followup_date,
+                        CASE WHEN ISNULL(f.completed_followups, 0) > 0 THEN (CAST(ISNULL(f.responded_followups, 0) AS FLOAT) / f.completed_followups) * 100 ELSE 0 END as response_rate,
+                        ISNULL(vs.snapshot_health_7d, 0) as snapshot_health_7d,
+                        ISNULL(vs.snapshot_health_14d, 0) as snapshot_health_14d
+                    FROM Lead l WITH (NOLOCK)
+                    LEFT JOIN (
+                        SELECT
+                            LeadId,
+                            COUNT(*) as total_followups,
+                            SUM(CASE WHEN Status = 'Completed' THEN 1 ELSE 0 END) as completed_followups,
+                            SUM(CASE WHEN Status = 'Completed' AND Notes IS NOT NULL THEN 1 ELSE 0 END) as responded_followups,
+                            SUM(CASE WHEN Status != 'Completed' AND NextFollowUpDate < GETDATE() THEN 1 ELSE 0 END) as overdue_count,
+                            MAX(CASE WHEN Status = 'Completed' THEN FollowUpDate ELSE NULL END) as last_followup_date,
+                            MIN(CASE WHEN Status != 'Completed' THEN NextFollowUpDate ELSE NULL END) as next_followup_date,
+                            MAX(CASE WHEN Status != 'Completed' AND NextFollowUpDate < GETDATE() THEN DATEDIFF(day, NextFollowUpDate, GETDATE()) ELSE 0 END) as max_overdue_days
+                        FROM FollowUps WITH (NOLOCK)
+                        WHERE LeadId > :after_id AND LeadId <= :upto_id
+                        GROUP BY LeadId
+                    ) f ON l.LeadId = f.LeadId
+                    LEFT JOIN (
+                        SELECT vis.LeadId, COUNT(DISTINCT v.VisitId) as visit_count, MAX(v.VisitDate) as last_visit_date
+                        FROM Visit v WITH (NOLOCK)
+                        INNER JOIN Visitors vis WITH (NOLOCK) ON v.VisitId = vis.VisitId
+                        WHERE vis.LeadId > :after_id AND vis.LeadId <= :upto_id
+                        GROUP BY vis.LeadId
+                    ) v ON l.LeadId = v.LeadId
+                    LEFT JOIN (
+                        SELECT LeadId,
+                            MAX(CASE WHEN rn = 1 THEN HealthScore ELSE 0 END) as snapshot_health_7d,
+                            MAX(CASE WHEN rn = 2 THEN HealthScore ELSE 0 END) as snapshot_health_14d
+                        FROM (
+                            SELECT LeadId, HealthScore, ROW_NUMBER() OVER (PARTITION BY LeadId ORDER BY SnapshotDate DESC) as rn
+                            FROM lead_velocity_snapshots WITH (NOLOCK)
+                            WHERE SnapshotDate >= DATEADD(day, -15, GETDATE())
+                              AND LeadId > :after_id AND LeadId <= :upto_id
+                        ) ranked
+                        WHERE rn <= 2
+                        GROUP BY LeadId
+                    ) vs ON l.LeadId = vs.LeadId
+                    WHERE l.LeadStatus IN ('New', 'Contacted', 'Qualify', 'Negotiation')
+                      AND l.LeadId > :after_id AND l.LeadId <= :upto_id
+                ) Base
+            ) WithHealth
+        ) WithVelocity
+    ) WithRisk
+"""
+
+_SET_SCORES = """
+    HealthScore = Scores.health_score,
+    VelocityScore = Scores.velocity_score,
+    AIPriority = Scores.ai_priority,
+    ConversionProbability = Scores.conversion_probability,
+    ChurnRisk = Scores.churn_risk,
+    FollowUpStatus = Scores.followup_status,
+    OverdueDays = Scores.max_overdue_days,
+    RecommendationJson = Scores.recommendation_json,
+    ScoresLastUpdated = GETDATE()
+"""
+
+_SINGLE_UPDATE_SQL = text(f"""
+    UPDATE Lead
+    SET {_SET_SCORES}
+    FROM Lead
+    INNER JOIN ({_SCORES_SQL}) Scores ON Lead.LeadId = Scores.LeadId
+""")
+
+# Change-only: EXCEPT compares the computed and stored values NULL-safely, so
+# leads whose scores are unchanged are neither locked for update nor rewritten
+# (ScoresLastUpdated then records when the scores last changed)
+_CHUNK_UPDATE_SQL = text(f"""
+    UPDATE Lead
+    SET {_SET_SCORES}
+    FROM Lead
+    INNER JOIN ({_SCORES_SQL}) Scores ON Lead.LeadId = Scores.LeadId
+    WHERE EXISTS (
+        SELECT Scores.health_score, Scores.velocity_score, Scores.ai_priority, Scores.conversion_probability,
+               Scores.churn_risk, Scores.followup_status, Scores.max_overdue_days,
+               CAST(Scores.recommendation_json AS NVARCHAR(MAX))
+        EXCEPT
+        SELECT Lead.HealthScore, Lead.VelocityScore, Lead.AIPriority, Lead.ConversionProbability,
+               Lead.ChurnRisk, Lead.FollowUpStatus, Lead.OverdueDays,
+               CAST(Lead.RecommendationJson AS NVARCHAR(MAX))
+    )
+""")
+
+# Size and upper key of the next chunk of open leads after :after_id
+_CHUNK_BOUNDS_SQL = text("""
+    SELECT COUNT(*), MAX(LeadId)
+    FROM (
+        SELECT TOP (:chunk_size) LeadId
+        FROM Lead
+        WHERE LeadStatus IN ('New', 'Contacted', 'Qualify', 'Negotiation') AND LeadId > :after_id
+        ORDER BY LeadId
+    ) chunk
+""")
+
+# Outcome of the last score update (shown by get_scheduler_status)
+_last_run = {}
+
+
+def _update_scores_chunked(db, chunk_size: int = SCORE_CHUNK_SIZE):
+    """
+    Score the open leads in LeadId order, committing after every chunk, and
+    write only the leads whose computed scores differ from the stored ones.
+
+    Returns:
+        (leads examined, leads changed)
+    """
+    examined = changed = 0
+    after_id = _ALL_LEADS["after_id"]
+    while True:
+        count, upto_id = db.execute(_CHUNK_BOUNDS_SQL, {"after_id": after_id, "chunk_size": chunk_size}).one()
+        if not count:
+            break
+        result = db.execute(_CHUNK_UPDATE_SQL, {"after_id": after_id, "upto_id": upto_id})
+        db.commit()
+        examined += count
+        changed += result.rowcount
+        after_id = upto_id
+    return examined, changed
+
 
 def update_all_lead_scores():
     """
@@ -55,7 +293,8 @@ def update_all_lead_scores():
     Target: 2-3 seconds for 175 leads, <5s for 1000 leads
 
     CRITICAL OPTIMIZATION:
-    - Single UPDATE statement with CTEs
+    - UPDATE statements with CTEs: per LeadId chunk, changed rows only
+      (SCORE_WRITE_MODE=chunked), or one statement for every lead (single)
     - NO data transfer to Python
     - Database does ALL calculations
     - Minimal network overhead
@@ -97,165 +336,31 @@ def update_all_lead_scores():
         return
 
     try:
-        # ===== PURE SQL: Single statement does EVERYTHING =====
-        print("[SQL] Executing single UPDATE statement...")
-        logger.info("Executing pure SQL score update...")
-
-        # SINGLE SQL STATEMENT - All calculations in database (NO Python processing!)
-        update_sql = text("""
-            -- Update all lead scores in a single SQL statement
-            UPDATE Lead
-            SET
-                HealthScore = Scores.health_score,
-                VelocityScore = Scores.velocity_score,
-                AIPriority = Scores.ai_priority,
-                ConversionProbability = Scores.conversion_probability,
-                ChurnRisk = Scores.churn_risk,
-                FollowUpStatus = Scores.followup_status,
-                OverdueDays = Scores.max_overdue_days,
-                RecommendationJson = Scores.recommendation_json,
-                ScoresLastUpdated = GETDATE()
-            FROM Lead
-            INNER JOIN (
-                -- Calculate all scores
-                SELECT
-                    LeadId,
-                    health_score,
-                    velocity_score,
-                    ai_priority,
-                    conversion_probability,
-                    CASE
-                        WHEN risk_score < 30 THEN 'low'
-                        WHEN risk_score < 50 THEN 'medium'
-                        WHEN risk_score < 70 THEN 'high'
-                        ELSE 'critical'
-                    END as churn_risk,
-                    followup_status,
-                    max_overdue_days,
-                    CASE
-                        WHEN health_score < 40 AND max_overdue_days > 3 THEN
-                            '{"priority":"urgent","action":"call_now","message":"URGENT: Call immediately! Lead health critical (' + CAST(health_score AS VARCHAR) + ') and ' + CAST(max_overdue_days AS VARCHAR) + ' days overdue.","reasoning":"High churn risk - immediate action required"}'
-                        WHEN BuyingIntent >= 8 AND days_since_contact > 5 THEN
-                            '{"priority":"high","action":"follow_up","message":"HIGH PRIORITY: Hot lead (intent ' + CAST(BuyingIntent AS VARCHAR) + '/10) going cold. Contact within 24 hours.","reasoning":"High buying intent with declining engagement"}'
-                        WHEN velocity_score > 70 THEN
-                            '{"priority":"medium","action":"nurture","message":"Good momentum! Lead improving. Continue current approach.","reasoning":"Positive trend - maintain engagement"}'
-                        ELSE
-                            '{"priority":"low","action":"monitor","message":"Monitor and follow standard process.","reasoning":"No urgent action needed"}'
-                    END as recommendation_json
-                FROM (
-                    -- Risk score calculation
-                    SELECT
-                        *,
-                        (CASE WHEN health_score < 30 THEN 40 WHEN health_score < 50 THEN 25 WHEN health_score < 70 THEN 10 ELSE 0 END) +
-                        (CASE WHEN velocity_score < 30 THEN 30 WHEN velocity_score < 40 THEN 20 WHEN velocity_score < 50 THEN 10 ELSE 0 END) +
-                        (CASE WHEN days_since_contact > 14 THEN 20 WHEN days_since_contact > 7 THEN 15 WHEN days_since_contact > 3 THEN 5 ELSE 0 END) +
-                        (CASE WHEN max_overdue_days > 5 THEN 10 WHEN max_overdue_days > 2 THEN 5 ELSE 0 END) as risk_score
-                    FROM (
-                        -- Velocity & other scores
-                        SELECT
-                            *,
-                            CASE WHEN CAST(50 + (trend_7d / 100.0) * 30 + (trend_14d / 100.0) * 20 AS INT) > 100 THEN 100
-                                 WHEN CAST(50 + (trend_7d / 100.0) * 30 + (trend_14d / 100.0) * 20 AS INT) < 0 THEN 0
-                                 ELSE CAST(50 + (trend_7d / 100.0) * 30 + (trend_14d / 100.0) * 20 AS INT) END as velocity_score,
-                            CASE WHEN CAST((100 - health_score) * 0.30 + (BuyingIntent * 10) * 0.40 + CASE WHEN max_overdue_days * 5 > 50 THEN 50 ELSE max_overdue_days * 5 END * 0.30 AS INT) > 100 THEN 100
-                                 WHEN CAST((100 - health_score) * 0.30 + (BuyingIntent * 10) * 0.40 + CASE WHEN max_overdue_days * 5 > 50 THEN 50 ELSE max_overdue_days * 5 END * 0.30 AS INT) < 0 THEN 0
-                                 ELSE CAST((100 - health_score) * 0.30 + (BuyingIntent * 10) * 0.40 + CASE WHEN max_overdue_days * 5 > 50 THEN 50 ELSE max_overdue_days * 5 END * 0.30 AS INT) END as ai_priority,
-                            CASE WHEN CAST((health_score * 0.30) + (BuyingIntent * 10 * 0.25) + (50 * 0.20) + (CASE WHEN visit_count * 20 > 100 THEN 100 ELSE visit_count * 20 END * 0.15) + (response_rate * 0.10) AS DECIMAL(5,2)) > 100 THEN 100.00
-                                 WHEN CAST((health_score * 0.30) + (BuyingIntent * 10 * 0.25) + (50 * 0.20) + (CASE WHEN visit_count * 20 > 100 THEN 100 ELSE visit_count * 20 END * 0.15) + (response_rate * 0.10) AS DECIMAL(5,2)) < 0 THEN 0.00
-                                 ELSE CAST((health_score * 0.30) + (BuyingIntent * 10 * 0.25) + (50 * 0.20) + (CASE WHEN visit_count * 20 > 100 THEN 100 ELSE visit_count * 20 END * 0.15) + (response_rate * 0.10) AS DECIMAL(5,2)) END as conversion_probability,
-                            CASE WHEN next_followup_date IS NULL THEN 'none'
-                                 WHEN next_followup_date < GETDATE() THEN 'overdue'
-                                 WHEN CAST(next_followup_date AS DATE) = CAST(GETDATE() AS DATE) THEN 'today'
-                                 WHEN next_followup_date <= DATEADD(day, 7, GETDATE()) THEN 'this_week'
-                                 ELSE 'scheduled' END as followup_status
-                        FROM (
-                            -- Health score calculation
-                            SELECT
-                                *,
-                                CASE WHEN CAST(100
-                                    - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
-                                    - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
-                                    + ((BuyingIntent - 5) * 4)
-                                    + (response_rate / 10) AS INT) > 100 THEN 100
-                                     WHEN CAST(100
-                                    - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
-                                    - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
-                                    + ((BuyingIntent - 5) * 4)
-                                    + (response_rate / 10) AS INT) < 0 THEN 0
-                                     ELSE CAST(100
-                                    - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
-                                    - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
-                                    + ((BuyingIntent - 5) * 4)
-                                    + (response_rate / 10) AS INT) END as health_score,
-                                CASE WHEN snapshot_health_7d > 0 THEN CAST(100
-                                    - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
-                                    - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
-                                    + ((BuyingIntent - 5) * 4)
-                                    + (response_rate / 10) AS INT) - snapshot_health_7d ELSE 0 END as trend_7d,
-                                CASE WHEN snapshot_health_14d > 0 THEN CAST(100
-                                    - CASE WHEN days_since_contact <= 3 THEN 0 WHEN days_since_contact <= 7 THEN 10 WHEN days_since_contact <= 14 THEN 20 WHEN days_since_contact <= 30 THEN 30 ELSE 40 END
-                                    - CASE WHEN overdue_count * 10 > 30 THEN 30 ELSE overdue_count * 10 END
-                                    + ((BuyingIntent - 5) * 4)
-                                    + (response_rate / 10) AS INT) - snapshot_health_14d ELSE 0 END as trend_14d
-                            FROM (
-                                -- Base data with aggregations
-                                SELECT
-                                    l.LeadId,
-                                    ISNULL(l.BuyingIntent, 5) as BuyingIntent,
-                                    ISNULL(DATEDIFF(day, CASE WHEN ISNULL(f.last_followup_date, '1900-01-01') > ISNULL(v.last_visit_date, '1900-01-01') THEN f.last_followup_date ELSE v.last_visit_date END, GETDATE()), 999) as days_since_contact,
-                                    ISNULL(f.total_followups, 0) as total_followups,
-                                    ISNULL(f.completed_followups, 0) as completed_followups,
-                                    ISNULL(f.responded_followups, 0) as responded_followups,
-                                    ISNULL(f.overdue_count, 0) as overdue_count,
-                                    ISNULL(f.max_overdue_days, 0) as max_overdue_days,
-                                    ISNULL(v.visit_count, 0) as visit_count,
-                                    f.next_followup_date,
-                                    CASE WHEN ISNULL(f.completed_followups, 0) > 0 THEN (CAST(ISNULL(f.responded_followups, 0) AS FLOAT) / f.completed_followups) * 100 ELSE 0 END as response_rate,
-                                    ISNULL(vs.snapshot_health_7d, 0) as snapshot_health_7d,
-                                    ISNULL(vs.snapshot_health_14d, 0) as snapshot_health_14d
-                                FROM Lead l WITH (NOLOCK)
-                                LEFT JOIN (
-                                    SELECT
-                                        LeadId,
-                                        COUNT(*) as total_followups,
-                                        SUM(CASE WHEN Status = 'Completed' THEN 1 ELSE 0 END) as completed_followups,
-                                        SUM(CASE WHEN Status = 'Completed' AND Notes IS NOT NULL THEN 1 ELSE 0 END) as responded_followups,
-                                        SUM(CASE WHEN Status != 'Completed' AND NextFollowUpDate < GETDATE() THEN 1 ELSE 0 END) as overdue_count,
-                                        MAX(CASE WHEN Status = 'Completed' THEN FollowUpDate ELSE NULL END) as last_followup_date,
-                                        MIN(CASE WHEN Status != 'Completed' THEN NextFollowUpDate ELSE NULL END) as next_followup_date,
-                                        MAX(CASE WHEN Status != 'Completed' AND NextFollowUpDate < GETDATE() THEN DATEDIFF(day, NextFollowUpDate, GETDATE()) ELSE 0 END) as max_overdue_days
-                                    FROM FollowUps WITH (NOLOCK)
-                                    GROUP BY LeadId
-                                ) f ON l.LeadId = f.LeadId
-                                LEFT JOIN (
-                                    SELECT vis.LeadId, COUNT(DISTINCT v.VisitId) as visit_count, MAX(v.VisitDate) as last_visit_date
-                                    FROM Visit v WITH (NOLOCK)
-                                    INNER JOIN Visitors vis WITH (NOLOCK) ON v.VisitId = vis.VisitId
-                                    WHERE vis.LeadId IS NOT NULL
-                                    GROUP BY vis.LeadId
-                                ) v ON l.LeadId = v.LeadId
-                                LEFT JOIN (
-                                    SELECT LeadId,
-                                        MAX(CASE WHEN rn = 1 THEN HealthScore ELSE 0 END) as snapshot_health_7d,
-                                        MAX(CASE WHEN rn = 2 THEN HealthScore ELSE 0 END) as snapshot_health_14d
-                                    FROM (
-                                        SELECT LeadId, HealthScore, ROW_NUMBER() OVER (PARTITION BY LeadId ORDER BY SnapshotDate DESC) as rn
-                                        FROM lead_velocity_snapshots WITH (NOLOCK)
-                                        WHERE SnapshotDate >= DATEADD(day, -15, GETDATE())
-                                    ) ranked
-                                    WHERE rn <= 2
-                                    GROUP BY LeadId
-                                ) vs ON l.LeadId = vs.LeadId
-                                WHERE l.LeadStatus IN ('New', 'Contacted', 'Qualify', 'Negotiation')
-                            ) Base
-                        ) WithHealth
-                    ) WithVelocity
-                ) WithRisk
-            ) Scores ON Lead.LeadId = Scores.LeadId
-        """)
-
-        result = db.execute(update_sql)
-        db.commit()
+        # ===== PURE SQL: All calculations in the database (NO Python processing!) =====
+        print(f"[SQL] Executing score UPDATE ({SCORE_WRITE_MODE} mode)...")
+        logger.info(f"Executing pure SQL score update ({SCORE_WRITE_MODE} mode)...")
+
+        if SCORE_WRITE_MODE == "single":
+            db.execute(_SINGLE_UPDATE_SQL, _ALL_LEADS)
+            db.commit()
+            examined = changed = None
+        else:
+            examined, changed = _update_scores_chunked(db)
+
+        # Scores changed - rebuild the per-site counters behind /leads/leads_aggregates
+        refresh_site_counters(db)
+        # Full broker stats rebuild also picks up visit changes since the last run
+        refresh_broker_stats(db)
+        # Reconcile per-contact lead counters (catches writes outside the lead endpoints)
+        refresh_contact_counters(db)
+        # Phone keys for contacts imported outside the ORM
+        backfill_phone_keys(db)
+        # Rebuild the agenda index (catches follow-ups written by the chatbot and other paths)
+        refresh_agenda(db)
+        # Rebuild the lead search projection (scores, names and follow-up dates)
+        refresh_lead_search(db)
+        # Rebuild the per-visit primary visitor summary
+        refresh_visit_visitors(db)
 
         # Get count of updated leads
         count_sql = text("SELECT @@ROWCOUNT as updated_count")
@@ -268,6 +373,13 @@ def update_all_lead_scores():
         total_leads = count_result.fetchone()[0]
 
         elapsed = (datetime.now() - start_time).total_seconds()
+        _last_run.update(
+            finished=datetime.now().isoformat(), mode=SCORE_WRITE_MODE, seconds=round(elapsed, 2),
+            open_leads=total_leads, rows_examined=examined, rows_changed=changed,
+        )
+        if changed is not None:
+            print(f"[OK] Chunked write: {examined} leads examined, {changed} changed")
+            logger.info(f"Score update wrote {changed} of {examined} examined leads")
         print(f"\n[PERFORMANCE] PURE SQL RESULTS:")
         print(f"   Total time: {elapsed:.2f}s for {total_leads} leads")
         print(f"   Performance: {int(total_leads/elapsed if elapsed > 0 else 0)} leads/second")
@@ -332,6 +444,47 @@ def start_scheduler(delay_initial_run: int = 60):
         replace_existing=True
     )
 
+    # Notification outbox: delivers queued WhatsApp messages and due retries
+    _scheduler.add_job(
+        dispatch_pending,
+        'interval',
+        minutes=1,
+        id='dispatch_notification_outbox',
+        name='Dispatch notification outbox',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+    # WhatsApp inbound queue: picks up retries and messages a webhook kick-off missed.
+    # Only filled while the chatbot (whatsapp_chatbot.py) is enabled and registers its pipeline
+    if has_message_processor():
+        _scheduler.add_job(
+            process_whatsapp_inbox,
+            'interval',
+            seconds=30,
+            id='process_whatsapp_inbox',
+            name='Process WhatsApp inbound queue',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+    else:
+        logger.info("WhatsApp chatbot not enabled - inbound queue job not scheduled")
+
+    # Analytics snapshot: Parquet copy of the report tables (first run does a full export)
+    _scheduler.add_job(
+        refresh_analytics_snapshot,
+        'interval',
+        minutes=REFRESH_INTERVAL_MINUTES,
+        next_run_time=datetime.now() + timedelta(seconds=max(delay_initial_run, 0) + 60),
+        id='refresh_analytics_snapshot',
+        name='Refresh analytics snapshot',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
     # CRITICAL FIX: Delay initial run to prevent blocking app startup
     # Databricks Apps needs the app to respond to health checks quickly
     if delay_initial_run > 0:
@@ -372,9 +525,14 @@ def get_scheduler_status():
         "running": _scheduler.running,
         "state": str(_scheduler.state),
         "jobs": jobs_info,
+        "last_score_update": dict(_last_run) or None,
         "message": "Scheduler is active" if _scheduler.running else "Scheduler is stopped"
     }
 
+def get_last_score_run():
+    """Outcome of the last successful score update in this process, or None."""
+    return dict(_last_run) or None
+
 def shutdown_scheduler():
     global _scheduler
     if _scheduler is not None and _scheduler.running:
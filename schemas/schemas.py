@@ -1,7 +1,7 @@
 from xmlrpc.client import DateTime
 
 from pydantic import BaseModel, Field, EmailStr, conint, condecimal
-from datetime import datetime, time
+from datetime import datetime, time, date
 
 from decimal import Decimal
 from typing import Optional, List
@@ -599,4 +599,15 @@ class WhatsAppConversationStats(BaseModel):
     total_messages: int = Field(description="Total number of WhatsApp messages")
     unique_users: int = Field(description="Number of unique phone numbers")
     total_sessions: int = Field(description="Total number of conversation sessions")
-    intents: dict = Field(description="Count of messages by intent type")
\ No newline at end of file
+    intents: dict = Field(description="Count of messages by intent type")
+
+
+class DashboardBatchRequest(BaseModel):
+    widgets: List[str] = Field(min_length=1, description="Widget ids, e.g. '/ConversionReport/monthly-leads'")
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    site_id: Optional[List[int]] = None
+    lead_source: Optional[List[str]] = None
+    broker_id: Optional[int] = None
+    contact_id: Optional[int] = None
+    created_by_id: Optional[int] = None
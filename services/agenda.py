@@ -0,0 +1,253 @@
+# services/agenda.py
+
+"""
+Per-user Agenda Index
+=====================
+
+Keeps the AgendaItem table in sync with FollowUps and ActionItem.
+
+Each row is one open, dated item a user owes: a follow-up assigned to
+FollowUps.UserId (due NextFollowUpDate, else FollowUpDate - the date the
+scoring engine uses) or an action item assigned to ActionItem.AllotedToUserId
+(due ProposedEndDate). An action item created for a follow-up
+(ActionItem.FollowUpsId) is represented by that follow-up, so a follow-up
+never shows twice.
+
+GET /agenda/ answers "what do I owe?" with range seeks on (UserId, DueDate);
+the overdue / today / this week buckets are date ranges computed at read
+time, so rows never go stale as days pass.
+
+Follow-up and action-item writes refresh the items they touch; the scoring
+scheduler reconciles the whole table after each run. Rows are merged by
+(SourceType, SourceId), never deleted and reinserted wholesale: the full
+refresh walks each source table in key order, REFRESH_BATCH_SIZE items at a
+time, and per chunk inserts new items, updates only the rows whose values
+changed and deletes the rows of closed or deleted items, in a short
+transaction of its own.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+from models import AgendaItem, FollowUps, ActionItem
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses that take an item off the agenda
+CLOSED_FOLLOWUP_STATUSES = ('Completed', 'Cancelled')
+CLOSED_ACTION_ITEM_STATUSES = ('Closed', 'Completed', 'Cancelled')
+
+FOLLOWUP = 'followup'
+ACTION_ITEM = 'action_item'
+
+# Items merged per chunk / transaction (keeps IN lists, batches and locks bounded)
+REFRESH_BATCH_SIZE = 1000
+
+# Merges of one chunk before giving up on concurrent inserts of the same items
+MAX_MERGE_ATTEMPTS = 3
+
+# Columns compared to tell whether a row changed (UpdatedDate always does)
+_COMPARED_COLUMNS = ("UserId", "DueDate", "Title", "Status", "LeadId", "VisitId")
+
+# Set once the agenda table is known to be populated (avoids a probe per request)
+_agenda_ready = False
+
+
+def _clean_ids(ids: Optional[Iterable[Optional[int]]]):
+    if ids is None:
+        return None
+    return {item_id for item_id in ids if item_id is not None}
+
+
+def _build_rows(db: Session, source_type: str, source_ids):
+    """Agenda rows for the given follow-ups or action items (only the open, assigned, dated ones)."""
+    now = datetime.now()
+    if source_type == FOLLOWUP:
+        followup_due = func.coalesce(FollowUps.NextFollowUpDate, FollowUps.FollowUpDate)
+        followup_query = db.query(
+            FollowUps.FollowUpsId, FollowUps.UserId, followup_due.label('DueDate'),
+            FollowUps.FollowUpType, FollowUps.Status, FollowUps.LeadId, FollowUps.VisitId,
+        ).filter(
+            FollowUps.FollowUpsId.in_(source_ids),
+            FollowUps.UserId.isnot(None),
+            followup_due.isnot(None),
+            or_(FollowUps.Status.is_(None), FollowUps.Status.notin_(CLOSED_FOLLOWUP_STATUSES)),
+        )
+        return [
+            {
+                "UserId": row.UserId,
+                "SourceType": FOLLOWUP,
+                "SourceId": row.FollowUpsId,
+                "DueDate": row.DueDate,
+                "Title": (row.FollowUpType or "Follow-up")[:255],
+                "Status": row.Status,
+                "LeadId": row.LeadId,
+                "VisitId": row.VisitId,
+                "UpdatedDate": now,
+            }
+            for row in followup_query.all()
+        ]
+
+    action_item_query = db.query(
+        ActionItem.ActionItemId, ActionItem.AllotedToUserId, ActionItem.ProposedEndDate,
+        ActionItem.ActionItemName, ActionItem.Status, ActionItem.LeadId, ActionItem.VisitId,
+    ).filter(
+        ActionItem.ActionItemId.in_(source_ids),
+        ActionItem.AllotedToUserId.isnot(None),
+        ActionItem.ProposedEndDate.isnot(None),
+        ActionItem.FollowUpsId.is_(None),
+        or_(ActionItem.Status.is_(None), ActionItem.Status.notin_(CLOSED_ACTION_ITEM_STATUSES)),
+    )
+    return [
+        {
+            "UserId": row.AllotedToUserId,
+            "SourceType": ACTION_ITEM,
+            "SourceId": row.ActionItemId,
+            "DueDate": row.ProposedEndDate,
+            "Title": (row.ActionItemName or "Action item")[:255],
+            "Status": row.Status,
+            "LeadId": row.LeadId,
+            "VisitId": row.VisitId,
+            "UpdatedDate": now,
+        }
+        for row in action_item_query.all()
+    ]
+
+
+def _merge_rows(db: Session, source_type: str, rows, scope) -> Tuple[int, int, int]:
+    """
+    Make the agenda rows of source_type matching scope equal to rows: insert
+    new items, update changed rows, delete rows whose item is not in rows.
+
+    Returns:
+        (inserted, updated, deleted)
+    """
+    existing = {
+        row.SourceId: row for row in db.query(
+            AgendaItem.AgendaItemId, AgendaItem.SourceId,
+            *(getattr(AgendaItem, column) for column in _COMPARED_COLUMNS),
+        ).filter(AgendaItem.SourceType == source_type, scope).all()
+    }
+    inserts = []
+    updates = []
+    for row in rows:
+        current = existing.pop(row["SourceId"], None)
+        if current is None:
+            inserts.append(row)
+        elif any(getattr(current, column) != row[column] for column in _COMPARED_COLUMNS):
+            updates.append({**row, "AgendaItemId": current.AgendaItemId})
+
+    if existing:
+        db.query(AgendaItem).filter(
+            AgendaItem.AgendaItemId.in_([row.AgendaItemId for row in existing.values()])
+        ).delete(synchronize_session=False)
+    if updates:
+        db.bulk_update_mappings(AgendaItem, updates)
+    if inserts:
+        db.bulk_insert_mappings(AgendaItem, inserts)
+    return len(inserts), len(updates), len(existing)
+
+
+def _merge_chunk(db: Session, source_type: str, source_ids, scope) -> Tuple[int, int, int]:
+    """Merge the rows of source_ids over scope in one transaction, retrying insert collisions."""
+    for attempt in range(1, MAX_MERGE_ATTEMPTS + 1):
+        try:
+            rows = _build_rows(db, source_type, source_ids) if source_ids else []
+            counts = _merge_rows(db, source_type, rows, scope)
+            db.commit()
+            return counts
+        except IntegrityError:
+            # A concurrent refresh inserted one of these items first (UQ_AgendaItem_Source): merge again
+            db.rollback()
+            if attempt == MAX_MERGE_ATTEMPTS:
+                raise
+
+
+def _reconcile_source(db: Session, source_type: str, source_key) -> Tuple[int, int, int]:
+    """
+    Reconcile every agenda row of one source, walking its ids in key order.
+    Each chunk also covers the gap before its first id, and the last (empty)
+    chunk the rows past the highest id.
+    """
+    totals = [0, 0, 0]
+    last_id = None
+    while True:
+        chunk_query = db.query(source_key).order_by(source_key)
+        scope = AgendaItem.SourceId.isnot(None)
+        if last_id is not None:
+            chunk_query = chunk_query.filter(source_key > last_id)
+            scope = AgendaItem.SourceId > last_id
+        chunk = [source_id for source_id, in chunk_query.limit(REFRESH_BATCH_SIZE).all()]
+        if chunk:
+            scope = scope & (AgendaItem.SourceId <= chunk[-1])
+        for index, count in enumerate(_merge_chunk(db, source_type, chunk, scope)):
+            totals[index] += count
+        if not chunk:
+            return tuple(totals)
+        last_id = chunk[-1]
+
+
+def refresh_agenda(
+    db: Session,
+    followup_ids: Optional[Iterable[Optional[int]]] = None,
+    action_item_ids: Optional[Iterable[Optional[int]]] = None,
+) -> bool:
+    """
+    Recompute agenda rows for the given follow-ups and action items
+    (the whole agenda when both are None).
+
+    Merges REFRESH_BATCH_SIZE items per transaction; items that are closed,
+    deleted, unassigned or undated lose their row. Failures are logged and
+    rolled back - the scheduler's full refresh reconciles any missed update.
+
+    Returns:
+        True if the agenda was refreshed, False on error
+    """
+    global _agenda_ready
+
+    full = followup_ids is None and action_item_ids is None
+    followup_ids = _clean_ids(followup_ids)
+    action_item_ids = _clean_ids(action_item_ids)
+    if not full and not followup_ids and not action_item_ids:
+        return True
+
+    try:
+        if full:
+            totals = [
+                _reconcile_source(db, FOLLOWUP, FollowUps.FollowUpsId),
+                _reconcile_source(db, ACTION_ITEM, ActionItem.ActionItemId),
+            ]
+        else:
+            for source_type, source_ids in ((FOLLOWUP, followup_ids), (ACTION_ITEM, action_item_ids)):
+                source_ids = sorted(source_ids or ())
+                for start in range(0, len(source_ids), REFRESH_BATCH_SIZE):
+                    batch = source_ids[start:start + REFRESH_BATCH_SIZE]
+                    _merge_chunk(db, source_type, batch, AgendaItem.SourceId.in_(batch))
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Agenda refresh failed for follow-ups {followup_ids if not full else 'ALL'}, "
+                       f"action items {action_item_ids if not full else 'ALL'}: {e}")
+        return False
+
+    if full:
+        _agenda_ready = True
+        inserted, updated, deleted = (sum(counts) for counts in zip(*totals))
+        logger.info(f"Agenda reconciled: {inserted} inserted, {updated} updated, {deleted} deleted")
+    return True
+
+
+def ensure_agenda(db: Session) -> None:
+    """
+    Populate the agenda table on first use if the scheduler has not run yet.
+    """
+    global _agenda_ready
+    if _agenda_ready:
+        return
+    if db.query(AgendaItem.AgendaItemId).first() is None:
+        # Marks the table ready on success; a failed refresh is retried next call
+        refresh_agenda(db)
+        return
+    _agenda_ready = True
@@ -0,0 +1,373 @@
+# services/analytics_snapshot.py
+
+"""
+Analytics Snapshot
+==================
+
+Columnar copy of the tables the report routers aggregate (lead, Visit,
+visitors, FollowUps, contact) as local Parquet files, queried in-process
+with DuckDB.
+
+The report endpoints (ConversionReport, MonthlyBrokerReport,
+WeeklySiteVisitReport) scan months of rows to build weekly / monthly buckets
+and conversion ratios. Answering those from the snapshot costs milliseconds
+and puts no load on Azure SQL; the endpoints fall back to their live query
+whenever the snapshot cannot answer (DuckDB not installed, snapshot missing
+or older than MAX_SNAPSHOT_AGE, read error).
+
+Layout (ANALYTICS_SNAPSHOT_DIR, default ./analytics_snapshot):
+
+    <table>/base.parquet         full export
+    <table>/delta-<seq>.parquet  rows changed since the previous export
+    _state.json                  per table: watermark, sequence, last full export
+
+refresh_analytics_snapshot() runs from the scheduler every
+REFRESH_INTERVAL_MINUTES. It exports rows whose COALESCE(UpdatedDate,
+CreatedDate) passed the table's watermark into a new delta file; readers
+keep the newest version of each key. Deltas are compacted into the base
+after MAX_DELTA_FILES, and every table is re-exported in full every
+FULL_EXPORT_HOURS, which also drops rows deleted at the source.
+
+SQL Server compares strings case-insensitively and ignores trailing spaces;
+DuckDB compares them exactly. The string columns reports filter on
+(SnapshotTable.match_columns) are therefore also exported as
+lower(trim(value)) in a "<column>Key" column, and report predicates compare
+those keys with match_key() values or lowercase literals
+(LeadStatusKey = 'win'). A change to the exported columns bumps
+SCHEMA_VERSION: older files are re-exported in full on the next refresh, and
+the snapshot does not answer queries until then.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Lead, Visit, Visitors, FollowUps, Contact
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional: reports use their live queries without it
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path(os.getenv("ANALYTICS_SNAPSHOT_DIR", "analytics_snapshot"))
+REFRESH_INTERVAL_MINUTES = 15
+# Reports fall back to live queries when the snapshot is older than this
+MAX_SNAPSHOT_AGE = timedelta(minutes=3 * REFRESH_INTERVAL_MINUTES)
+FULL_EXPORT_HOURS = 24
+MAX_DELTA_FILES = 24
+# Rows read from Azure SQL per round-trip
+EXPORT_CHUNK_ROWS = 50000
+
+# Bump when the exported columns change (forces a full export of every table)
+SCHEMA_VERSION = 2
+
+_STATE_FILE = "_state.json"
+_LOCK_FILE = ".lock"
+_SEQ_COLUMN = "_snapshot_seq"
+
+
+@dataclass(frozen=True)
+class SnapshotTable:
+    name: str
+    model: type
+    key: str
+    # column -> DuckDB type; the Parquet schema stays stable even for all-NULL deltas
+    columns: Dict[str, str]
+    # String columns also exported as lower(trim(value)) in "<column>Key"
+    match_columns: Tuple[str, ...] = ()
+
+
+TABLES: List[SnapshotTable] = [
+    SnapshotTable("lead", Lead, "LeadId", {
+        "LeadId": "INTEGER", "SiteId": "INTEGER", "ContactId": "INTEGER", "BrokerId": "INTEGER",
+        "ProspectTypeId": "INTEGER", "LeadSource": "VARCHAR", "LeadStatus": "VARCHAR", "LeadType": "VARCHAR",
+        "BuyingIntent": "INTEGER", "QuotedAmount": "DOUBLE", "RequestedAmount": "DOUBLE",
+        "ClosedAmount": "DOUBLE", "CreatedById": "INTEGER", "CreatedDate": "TIMESTAMP",
+        "UpdatedDate": "TIMESTAMP", "LeadClosedDate": "TIMESTAMP", "IsDeleted": "INTEGER",
+    }, match_columns=("LeadSource", "LeadStatus")),
+    SnapshotTable("visit", Visit, "VisitId", {
+        "VisitId": "INTEGER", "SiteId": "INTEGER", "InfraId": "INTEGER", "VisitDate": "TIMESTAMP",
+        "VisitStatus": "VARCHAR", "SalesPersonId": "INTEGER", "Purpose": "VARCHAR",
+        "VisitOutlook": "VARCHAR", "CreatedById": "INTEGER", "CreatedDate": "TIMESTAMP",
+        "UpdatedDate": "TIMESTAMP", "IsDeleted": "INTEGER",
+    }),
+    SnapshotTable("visitors", Visitors, "VisitorsId", {
+        "VisitorsId": "INTEGER", "VisitId": "INTEGER", "ContactId": "INTEGER", "LeadId": "INTEGER",
+        "VisitType": "VARCHAR", "PropertyType": "VARCHAR", "BuyingIntent": "INTEGER",
+        "CreatedById": "INTEGER", "CreatedDate": "TIMESTAMP", "UpdatedDate": "TIMESTAMP", "IsDeleted": "VARCHAR",
+    }),
+    SnapshotTable("followups", FollowUps, "FollowUpsId", {
+        "FollowUpsId": "INTEGER", "LeadId": "INTEGER", "VisitId": "INTEGER", "UserId": "INTEGER",
+        "FollowUpType": "VARCHAR", "Status": "VARCHAR", "FollowUpDate": "TIMESTAMP",
+        "NextFollowUpDate": "TIMESTAMP", "CreatedDate": "TIMESTAMP", "UpdatedDate": "TIMESTAMP",
+    }),
+    SnapshotTable("contact", Contact, "ContactId", {
+        "ContactId": "INTEGER", "ContactFName": "VARCHAR", "ContactLName": "VARCHAR",
+        "ContactType": "VARCHAR", "ContactCity": "VARCHAR", "CreatedById": "INTEGER",
+        "CreatedDate": "TIMESTAMP", "UpdatedDate": "TIMESTAMP",
+    }, match_columns=("ContactType",)),
+]
+_TABLES_BY_NAME = {table.name: table for table in TABLES}
+
+# Serializes refreshes within this process; the file lock covers other workers
+_refresh_lock = threading.Lock()
+
+
+def is_available() -> bool:
+    return duckdb is not None
+
+
+def match_key(value: Optional[str]) -> Optional[str]:
+    """The "<column>Key" form of a value, for parameters compared with a match column."""
+    return value.strip().lower() if value is not None else None
+
+
+def _load_state() -> dict:
+    try:
+        return json.loads((SNAPSHOT_DIR / _STATE_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state: dict) -> None:
+    tmp = SNAPSHOT_DIR / f"{_STATE_FILE}.tmp"
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, SNAPSHOT_DIR / _STATE_FILE)
+
+
+def _read_source(db: Session, table: SnapshotTable, since: Optional[datetime]) -> Tuple[pd.DataFrame, Optional[datetime]]:
+    """Rows changed after `since` (all rows when None) and the new watermark."""
+    model = table.model
+    changed = func.coalesce(model.UpdatedDate, model.CreatedDate)
+    stmt = select(*[getattr(model, column) for column in table.columns])
+    if since is not None:
+        stmt = stmt.where(changed > since)
+    # Watermark from the source clock, taken first: rows changed during the read
+    # are exported again next run rather than missed
+    watermark = db.execute(select(func.max(changed))).scalar()
+    chunks = list(pd.read_sql(stmt, db.connection(), chunksize=EXPORT_CHUNK_ROWS))
+    frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(table.columns))
+    return frame, watermark or since
+
+
+def _write_parquet(con, table: SnapshotTable, frame: pd.DataFrame, seq: int, path: Path) -> None:
+    """Write frame with the table's declared types; the file appears atomically."""
+    con.register("export_frame", frame)
+    casts = ", ".join(
+        [f'CAST("{column}" AS {sql_type}) AS "{column}"' for column, sql_type in table.columns.items()]
+        + [f'lower(trim(CAST("{column}" AS VARCHAR))) AS "{column}Key"' for column in table.match_columns]
+    )
+    tmp = path.with_suffix(".parquet.tmp")
+    con.execute(f"COPY (SELECT {casts}, CAST({seq} AS BIGINT) AS {_SEQ_COLUMN} FROM export_frame) "
+                f"TO '{tmp.as_posix()}' (FORMAT PARQUET)")
+    con.unregister("export_frame")
+    os.replace(tmp, path)
+
+
+def _export_full(con, db: Session, table: SnapshotTable, table_state: dict) -> int:
+    frame, watermark = _read_source(db, table, None)
+    seq = table_state.get("seq", 0) + 1
+    staging = SNAPSHOT_DIR / f"{table.name}.new"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    _write_parquet(con, table, frame, seq, staging / "base.parquet")
+    # Swap directories; a reader hitting the gap falls back to its live query
+    target = SNAPSHOT_DIR / table.name
+    retired = SNAPSHOT_DIR / f"{table.name}.old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if target.exists():
+        os.replace(target, retired)
+    os.replace(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+    table_state.update(seq=seq, deltas=0, watermark=watermark.isoformat() if watermark else None,
+                       full_export=datetime.now().isoformat(), schema=SCHEMA_VERSION)
+    return len(frame)
+
+
+def _compact(con, table: SnapshotTable) -> None:
+    """Fold the delta files into base.parquet (newest version of each key wins)."""
+    target = SNAPSHOT_DIR / table.name
+    deltas = sorted(target.glob("delta-*.parquet"))
+    merged = target / "base.parquet.merged"
+    con.execute(f"COPY ({_table_sql(table)}) TO '{merged.as_posix()}' (FORMAT PARQUET)")
+    os.replace(merged, target / "base.parquet")
+    # Readers dedupe by key, so briefly seeing a delta next to the new base is harmless
+    for delta in deltas:
+        delta.unlink(missing_ok=True)
+
+
+def _export_delta(con, db: Session, table: SnapshotTable, table_state: dict) -> int:
+    since = datetime.fromisoformat(table_state["watermark"]) if table_state.get("watermark") else None
+    frame, watermark = _read_source(db, table, since)
+    if frame.empty:
+        return 0
+    seq = table_state.get("seq", 0) + 1
+    _write_parquet(con, table, frame, seq, SNAPSHOT_DIR / table.name / f"delta-{seq:08d}.parquet")
+    table_state.update(seq=seq, deltas=table_state.get("deltas", 0) + 1,
+                       watermark=watermark.isoformat() if watermark else None)
+    if table_state["deltas"] >= MAX_DELTA_FILES:
+        _compact(con, table)
+        table_state["deltas"] = 0
+    return len(frame)
+
+
+def refresh_analytics_snapshot(db: Optional[Session] = None) -> bool:
+    """
+    Bring every snapshot table up to date (full export when due, else a delta).
+    Skips the run when another worker holds the snapshot lock.
+
+    Returns:
+        True if the snapshot was refreshed, False if skipped or failed
+    """
+    if duckdb is None:
+        return False
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+
+    owns_session = db is None
+    db = db or SessionLocal()
+    start_time = time.time()
+    try:
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        with open(SNAPSHOT_DIR / _LOCK_FILE, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Analytics snapshot refresh already running in another worker")
+                return False
+
+            state = _load_state()
+            con = duckdb.connect()
+            try:
+                for table in TABLES:
+                    table_state = state.setdefault(table.name, {})
+                    full_export = table_state.get("full_export")
+                    due = (not (SNAPSHOT_DIR / table.name / "base.parquet").exists() or not full_export
+                           or table_state.get("schema") != SCHEMA_VERSION
+                           or datetime.now() - datetime.fromisoformat(full_export) > timedelta(hours=FULL_EXPORT_HOURS))
+                    rows = (_export_full if due else _export_delta)(con, db, table, table_state)
+                    logger.info(f"Analytics snapshot {table.name}: {'full' if due else 'delta'} export, {rows} rows")
+                state["refreshed_at"] = datetime.now().isoformat()
+                _save_state(state)
+            finally:
+                con.close()
+    except Exception as e:
+        logger.error(f"Analytics snapshot refresh failed: {e}")
+        return False
+    finally:
+        if owns_session:
+            db.close()
+        _refresh_lock.release()
+
+    logger.info(f"Analytics snapshot refreshed in {(time.time() - start_time) * 1000:.2f}ms")
+    return True
+
+
+def snapshot_age() -> Optional[timedelta]:
+    refreshed_at = _load_state().get("refreshed_at")
+    return datetime.now() - datetime.fromisoformat(refreshed_at) if refreshed_at else None
+
+
+def _table_sql(table: SnapshotTable) -> str:
+    files = (SNAPSHOT_DIR / table.name).as_posix() + "/*.parquet"
+    return (f"SELECT * EXCLUDE ({_SEQ_COLUMN}) FROM read_parquet('{files}', union_by_name = true) "
+            f"QUALIFY row_number() OVER (PARTITION BY \"{table.key}\" ORDER BY {_SEQ_COLUMN} DESC) = 1")
+
+
+def query_snapshot(sql: str, params: Optional[dict] = None, tables: Iterable[str] = ()) -> Optional[List[dict]]:
+    """
+    Run a DuckDB query over the snapshot. The given tables are available as
+    views of the same name (lead, visit, visitors, followups, contact).
+
+    Returns:
+        Result rows as dicts, or None when the snapshot cannot answer (the
+        caller then runs its live query)
+    """
+    if duckdb is None:
+        return None
+    age = snapshot_age()
+    if age is None or age > MAX_SNAPSHOT_AGE:
+        return None
+    state = _load_state()
+    if any(state.get(name, {}).get("schema") != SCHEMA_VERSION for name in tables):
+        # Exported before the current columns existed; the next refresh re-exports it
+        return None
+
+    start_time = time.time()
+    try:
+        con = duckdb.connect()
+        try:
+            for name in tables:
+                con.execute(f"CREATE VIEW {name} AS {_table_sql(_TABLES_BY_NAME[name])}")
+            cursor = con.execute(sql, params or {})
+            columns = [description[0] for description in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            con.close()
+    except Exception as e:
+        logger.warning(f"Analytics snapshot query failed, using live query: {e}")
+        return None
+    logger.info(f"Analytics snapshot query: {len(rows)} rows in {(time.time() - start_time) * 1000:.2f}ms")
+    return rows
+
+
+def lead_filter_sql(
+    start_date=None,
+    end_date=None,
+    site_id: Optional[List[int]] = None,
+    lead_source: Optional[List[str]] = None,
+    created_by_id: Optional[int] = None,
+    broker_id: Optional[int] = None,
+) -> Tuple[str, dict]:
+    """
+    WHERE clause (over the lead view) and parameters for the report filter set
+    the ConversionReport endpoints share. Empty values add no condition, as in
+    the live queries.
+    """
+    conditions = ["TRUE"]
+    params = {}
+    if start_date:
+        conditions.append("CreatedDate >= $start_date")
+        params["start_date"] = start_date
+    if end_date:
+        conditions.append("CreatedDate <= $end_date")
+        params["end_date"] = end_date
+    if site_id:
+        conditions.append("list_contains($site_id, SiteId)")
+        params["site_id"] = list(site_id)
+    if lead_source:
+        # Case / trailing-space insensitive, like LeadSource IN (...) on SQL Server
+        conditions.append("list_contains($lead_source, LeadSourceKey)")
+        params["lead_source"] = [match_key(source) for source in lead_source]
+    if created_by_id:
+        conditions.append("CreatedById = $created_by_id")
+        params["created_by_id"] = created_by_id
+    if broker_id:
+        conditions.append("BrokerId = $broker_id")
+        params["broker_id"] = broker_id
+    return " AND ".join(conditions), params
+
+
+def get_snapshot_stats() -> dict:
+    state = _load_state()
+    age = snapshot_age()
+    return {
+        "available": is_available(),
+        "age_seconds": round(age.total_seconds()) if age is not None else None,
+        "tables": {name: {key: state[name].get(key) for key in ("watermark", "deltas", "full_export")}
+                   for name in _TABLES_BY_NAME if name in state},
+    }
@@ -3,7 +3,7 @@
 import os
 import logging
 from typing import Dict, List, Optional
-from groq import Groq
+from services.integration_clients import get_groq_client
 import json
 from sqlalchemy.orm import Session
 from database import SessionLocal
@@ -23,7 +23,7 @@ class BrochureService:
     def __init__(self, project_name: str = None, site_id: int = None, db: Session = None):
         self.project_name = project_name
         self.site_id = site_id
-        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.groq_client = get_groq_client()
         self.model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
         self._db = db
         self._should_close_db = False
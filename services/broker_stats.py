@@ -0,0 +1,120 @@
+# services/broker_stats.py
+
+"""
+Broker Monthly Stats
+====================
+
+Keeps the BrokerMonthlyStats table in sync with broker leads.
+
+One row per (BrokerId, SiteId, StatMonth) holding the lead, win, loss, site
+visit and won-customer counts of the leads that broker brought in that month.
+The MonthlyBrokerReport leaderboards read these rows instead of joining
+Contact -> Lead -> Visitors -> Visit on every request.
+
+Lead writes refresh the rows of the brokers they touch; the scoring scheduler
+refreshes everything after each run, which also picks up visit changes.
+
+WinCustomers is distinct per month, so a multi-month total counts a customer
+with wins in two months twice.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, distinct
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, date
+from typing import Iterable, Optional
+from models import Lead, Visitors, BrokerMonthlyStats
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Set once the stats table is known to be populated (avoids a probe per request)
+_stats_ready = False
+
+
+def refresh_broker_stats(db: Session, broker_ids: Optional[Iterable[Optional[int]]] = None) -> bool:
+    """
+    Recompute stats rows for the given brokers (all brokers when broker_ids is None).
+
+    Runs one GROUP BY over the brokers' leads and replaces their rows in a
+    single transaction. Failures are logged and rolled back - the scheduler's
+    full refresh reconciles any missed update.
+
+    Returns:
+        True if the stats were refreshed, False on error
+    """
+    global _stats_ready
+
+    if broker_ids is not None:
+        broker_ids = {broker_id for broker_id in broker_ids if broker_id is not None}
+        if not broker_ids:
+            return True
+
+    stat_year = func.year(Lead.CreatedDate)
+    stat_month = func.month(Lead.CreatedDate)
+
+    aggregate_query = db.query(
+        Lead.BrokerId,
+        Lead.SiteId,
+        stat_year.label('StatYear'),
+        stat_month.label('StatMonth'),
+        func.count(distinct(Lead.LeadId)).label('Leads'),
+        func.count(distinct(case((Lead.LeadStatus == 'Win', Lead.LeadId)))).label('Wins'),
+        func.count(distinct(case((Lead.LeadStatus == 'Lost', Lead.LeadId)))).label('Losses'),
+        func.count(distinct(Visitors.VisitId)).label('Visits'),
+        func.count(distinct(case((Lead.LeadStatus == 'Win', Lead.ContactId)))).label('WinCustomers'),
+    ).outerjoin(
+        Visitors, Visitors.LeadId == Lead.LeadId
+    ).filter(
+        Lead.BrokerId.isnot(None),
+        Lead.CreatedDate.isnot(None)
+    )
+    delete_query = db.query(BrokerMonthlyStats)
+
+    if broker_ids is not None:
+        aggregate_query = aggregate_query.filter(Lead.BrokerId.in_(broker_ids))
+        delete_query = delete_query.filter(BrokerMonthlyStats.BrokerId.in_(broker_ids))
+
+    try:
+        rows = aggregate_query.group_by(Lead.BrokerId, Lead.SiteId, stat_year, stat_month).all()
+        now = datetime.now()
+
+        delete_query.delete(synchronize_session=False)
+        db.bulk_insert_mappings(BrokerMonthlyStats, [
+            {
+                "BrokerId": row.BrokerId,
+                "SiteId": row.SiteId,
+                "StatMonth": date(int(row.StatYear), int(row.StatMonth), 1),
+                "Leads": row.Leads or 0,
+                "Wins": row.Wins or 0,
+                "Losses": row.Losses or 0,
+                "Visits": row.Visits or 0,
+                "WinCustomers": row.WinCustomers or 0,
+                "UpdatedDate": now,
+            }
+            for row in rows
+        ])
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Broker stats refresh failed for brokers {broker_ids if broker_ids is not None else 'ALL'}: {e}")
+        return False
+
+    if broker_ids is None:
+        _stats_ready = True
+    logger.info(f"Broker stats refreshed: {len(rows)} rows for brokers {sorted(broker_ids) if broker_ids is not None else 'ALL'}")
+    return True
+
+
+def ensure_broker_stats(db: Session) -> None:
+    """
+    Populate the stats table on first use if the scheduler has not run yet.
+    """
+    global _stats_ready
+    if _stats_ready:
+        return
+    if db.query(BrokerMonthlyStats.StatsId).first() is None:
+        # Marks the table ready on success; a failed refresh is retried next call
+        refresh_broker_stats(db)
+        return
+    _stats_ready = True
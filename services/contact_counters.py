@@ -0,0 +1,125 @@
+# services/contact_counters.py
+
+"""
+Per-contact Lead Counters
+=========================
+
+Keeps the ContactLeadCounters table in sync with the lead table.
+
+Each row holds, for one contact, the number of leads where it is the customer
+(Lead.ContactId) or the broker (Lead.BrokerId), its open customer leads and the
+latest lead activity. /contact/ sorts and pages on these columns instead of
+grouping the whole lead table per request.
+
+Lead writes refresh the contacts they touch; the scoring scheduler reconciles
+every contact after each run.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, or_
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+from typing import Iterable, Optional
+from models import Lead, ContactLeadCounters
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lead statuses that no longer count as open
+CLOSED_LEAD_STATUSES = ('Win', 'Lost')
+
+# Set once the counter table is known to be populated (avoids a probe per request)
+_counters_ready = False
+
+
+def refresh_contact_counters(db: Session, contact_ids: Optional[Iterable[Optional[int]]] = None) -> bool:
+    """
+    Recompute counter rows for the given contacts (all contacts when contact_ids is None).
+
+    Runs one GROUP BY on Lead.ContactId and one on Lead.BrokerId, then replaces
+    the contacts' rows in a single transaction. Contacts left without leads lose
+    their row. Failures are logged and rolled back - the scheduler's full
+    refresh reconciles any missed update.
+
+    Returns:
+        True if the counters were refreshed, False on error
+    """
+    global _counters_ready
+
+    if contact_ids is not None:
+        contact_ids = {contact_id for contact_id in contact_ids if contact_id is not None}
+        if not contact_ids:
+            return True
+
+    last_activity = func.max(func.coalesce(Lead.UpdatedDate, Lead.CreatedDate))
+
+    customer_query = db.query(
+        Lead.ContactId.label('ContactId'),
+        func.count(Lead.LeadId).label('LeadCount'),
+        func.count(case((or_(Lead.LeadStatus.is_(None), Lead.LeadStatus.notin_(CLOSED_LEAD_STATUSES)), Lead.LeadId))).label('OpenCount'),
+        last_activity.label('LastActivity'),
+    ).filter(Lead.ContactId.isnot(None))
+    broker_query = db.query(
+        Lead.BrokerId.label('ContactId'),
+        func.count(Lead.LeadId).label('LeadCount'),
+        last_activity.label('LastActivity'),
+    ).filter(Lead.BrokerId.isnot(None))
+    delete_query = db.query(ContactLeadCounters)
+
+    if contact_ids is not None:
+        customer_query = customer_query.filter(Lead.ContactId.in_(contact_ids))
+        broker_query = broker_query.filter(Lead.BrokerId.in_(contact_ids))
+        delete_query = delete_query.filter(ContactLeadCounters.ContactId.in_(contact_ids))
+
+    try:
+        counters = {}
+        for row in customer_query.group_by(Lead.ContactId).all():
+            counters[row.ContactId] = {
+                "ContactId": row.ContactId,
+                "CustomerLeadCount": row.LeadCount or 0,
+                "BrokerLeadCount": 0,
+                "OpenLeadCount": row.OpenCount or 0,
+                "LastActivityDate": row.LastActivity,
+            }
+        for row in broker_query.group_by(Lead.BrokerId).all():
+            counter = counters.setdefault(row.ContactId, {
+                "ContactId": row.ContactId,
+                "CustomerLeadCount": 0,
+                "BrokerLeadCount": 0,
+                "OpenLeadCount": 0,
+                "LastActivityDate": None,
+            })
+            counter["BrokerLeadCount"] = row.LeadCount or 0
+            if row.LastActivity and (counter["LastActivityDate"] is None or row.LastActivity > counter["LastActivityDate"]):
+                counter["LastActivityDate"] = row.LastActivity
+
+        now = datetime.now()
+        for counter in counters.values():
+            counter["UpdatedDate"] = now
+
+        delete_query.delete(synchronize_session=False)
+        db.bulk_insert_mappings(ContactLeadCounters, list(counters.values()))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Contact counter refresh failed for contacts {contact_ids if contact_ids is not None else 'ALL'}: {e}")
+        return False
+
+    if contact_ids is None:
+        _counters_ready = True
+        logger.info(f"Contact counters refreshed: {len(counters)} contacts")
+    return True
+
+
+def ensure_contact_counters(db: Session) -> None:
+    """
+    Populate the counter table on first use if the scheduler has not run yet.
+    """
+    global _counters_ready
+    if _counters_ready:
+        return
+    if db.query(ContactLeadCounters.ContactId).first() is None:
+        # Marks the table ready on success; a failed refresh is retried next call
+        refresh_contact_counters(db)
+        return
+    _counters_ready = True
@@ -1,9 +1,10 @@
 # services/groq_client.py
 
 import os
-from groq import Groq
+from services.integration_clients import get_groq_client
 from typing import List, Dict, Optional
 import json
+from services.intent_classifier import classify_local
 
 class GroqClient:
     """
@@ -13,7 +14,7 @@ class GroqClient:
     def __init__(self):
         self.api_key = os.getenv("GROQ_API_KEY")
         self.model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
-        self.client = Groq(api_key=self.api_key)
+        self.client = get_groq_client(self.api_key)
 
     def detect_intent(self, message: str, context: List[Dict] = None) -> Dict:
         """
@@ -33,6 +34,11 @@ class GroqClient:
         }
         """
 
+        # Rules / local model first - only ambiguous, negated or entity-bearing messages reach Groq
+        local_result = classify_local(message, has_context=bool(context))
+        if local_result is not None:
+            return local_result
+
         system_prompt = """You are an intent classifier for a real estate CRM chatbot.
 
 Classify the user's message into ONE of these intents:
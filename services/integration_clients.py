@@ -0,0 +1,284 @@
+# services/integration_clients.py
+
+"""
+Integration Clients
+===================
+
+Process-wide clients for the outbound integrations (Groq, Twilio), so every
+caller reuses the same keep-alive connection pool instead of paying DNS, TCP
+and TLS setup on each call.
+
+get_groq_client() returns the shared Groq client (one per API key) and
+get_twilio_client(account_sid, auth_token) the shared Twilio client for a
+credential pair. All clients of a provider send through one guarded HTTP
+layer that applies the provider's settings in PROVIDERS:
+
+- connection pool: idle connections are kept alive and reused
+- timeouts: connect and read timeouts on every request
+- concurrency limit: at most max_concurrent requests in flight; a caller
+  waits up to acquire_timeout seconds for a slot, then IntegrationUnavailable
+- circuit breaker: failure_threshold consecutive failures (connection
+  errors, timeouts, 429 and 5xx answers) open the circuit, and calls fail
+  fast with IntegrationUnavailable for reset_seconds; then one trial
+  request decides whether it closes again
+
+get_integration_stats() (shown on /health) reports per provider: calls,
+failures, rejections, circuit state and latency (average, p50, p95 over the
+last LATENCY_WINDOW requests).
+
+Set TWILIO_API_BASE_URL to point Twilio clients at a local fake endpoint.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+from groq import Groq, DefaultHttpxClient
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+import httpx
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+GROQ = "groq"
+TWILIO = "twilio"
+
+# Override for the Twilio API host, e.g. http://127.0.0.1:8081 for a fake endpoint
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
+
+# Requests whose latency is kept for the percentiles
+LATENCY_WINDOW = 500
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class IntegrationUnavailable(Exception):
+    """Raised instead of calling a provider whose circuit is open or whose slots stay full."""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider} unavailable: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+@dataclass
+class Provider:
+    name: str
+    # Requests in flight at once (also the size of the keep-alive pool)
+    max_concurrent: int
+    # Longest wait for a free slot (seconds)
+    acquire_timeout: float
+    connect_timeout: float
+    read_timeout: float
+    # Consecutive failures that open the circuit
+    failure_threshold: int
+    # How long an open circuit rejects calls before a trial request (seconds)
+    reset_seconds: float
+
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    calls: int = 0
+    failures: int = 0
+    rejected: int = 0
+    total_latency: float = 0.0
+    _trial_running: bool = False
+    _latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW), repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _slots: threading.BoundedSemaphore = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+
+    def _admit(self) -> bool:
+        """Whether the circuit lets a request through; True marks it as the trial request."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+        raise IntegrationUnavailable(self.name, "circuit open")
+
+    def _record(self, latency: float, failed: bool, trial: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            self._latencies.append(latency)
+            if trial:
+                self._trial_running = False
+            if not failed:
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    logger.info(f"{self.name} circuit closed")
+                self.state = CLOSED
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            if trial or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                logger.warning(f"{self.name} circuit open after {self.consecutive_failures} "
+                               f"consecutive failure(s), retrying in {self.reset_seconds}s")
+
+    def send(self, request_fn):
+        """
+        Run one HTTP request under the provider's limit and circuit breaker.
+
+        request_fn() returns a response with a status_code or raises; 429,
+        5xx and exceptions count as failures.
+        """
+        trial = self._admit()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.rejected += 1
+                if trial:
+                    self._trial_running = False
+            raise IntegrationUnavailable(self.name, f"all {self.max_concurrent} connections busy")
+        start_time = time.perf_counter()
+        failed = True
+        try:
+            response = request_fn()
+            failed = response.status_code == 429 or response.status_code >= 500
+            return response
+        finally:
+            self._slots.release()
+            self._record(time.perf_counter() - start_time, failed, trial)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            state = self.state
+            if state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                state = HALF_OPEN
+
+            def percentile(pct):
+                if not latencies:
+                    return 0.0
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000, 1)
+
+            return {
+                "state": state,
+                "max_concurrent": self.max_concurrent,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_latency / self.calls * 1000, 1) if self.calls else 0.0,
+                "p50_ms": percentile(50),
+                "p95_ms": percentile(95),
+            }
+
+
+PROVIDERS = {
+    # Chatbot replies plus brochure extraction (2 at a time through the llm bulkhead);
+    # vision extraction of a page can take close to a minute
+    GROQ: Provider(
+        GROQ,
+        max_concurrent=int(os.getenv("GROQ_MAX_CONCURRENT", "4")),
+        acquire_timeout=30, connect_timeout=5, read_timeout=90,
+        failure_threshold=5, reset_seconds=30,
+    ),
+    # Outbox dispatch (5 parallel sends) plus inbox replies; requests applies
+    # read_timeout to connect and read alike
+    TWILIO: Provider(
+        TWILIO,
+        max_concurrent=int(os.getenv("TWILIO_MAX_CONCURRENT", "8")),
+        acquire_timeout=10, connect_timeout=5, read_timeout=15,
+        failure_threshold=5, reset_seconds=30,
+    ),
+}
+
+
+class _GuardedTransport(httpx.BaseTransport):
+    """httpx transport sending every request through a provider's guard."""
+
+    def __init__(self, provider: Provider):
+        self.provider = provider
+        self._transport = httpx.HTTPTransport(limits=httpx.Limits(
+            max_connections=provider.max_concurrent,
+            max_keepalive_connections=provider.max_concurrent,
+            keepalive_expiry=60,
+        ))
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        def send():
+            response = self._transport.handle_request(request)
+            # Read the body inside the guard: latency and the slot cover the whole exchange
+            response.read()
+            return response
+
+        return self.provider.send(send)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class _GuardedTwilioHttpClient(TwilioHttpClient):
+    """Twilio HTTP client on one pooled requests session, guarded like the httpx transport."""
+
+    def __init__(self, provider: Provider):
+        super().__init__(pool_connections=True, timeout=provider.read_timeout)
+        self.provider = provider
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=provider.max_concurrent)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None,
+                timeout=None, allow_redirects=False):
+        return self.provider.send(lambda: super(_GuardedTwilioHttpClient, self).request(
+            method, url, params=params, data=data, headers=headers, auth=auth,
+            timeout=timeout, allow_redirects=allow_redirects,
+        ))
+
+
+_clients_lock = threading.Lock()
+_groq_clients: Dict[Optional[str], Groq] = {}
+_twilio_clients: Dict[Tuple[str, str], Client] = {}
+_groq_http: Optional[httpx.Client] = None
+_twilio_http: Optional[_GuardedTwilioHttpClient] = None
+
+
+def get_groq_client(api_key: Optional[str] = None) -> Groq:
+    """Shared Groq client for api_key (default: GROQ_API_KEY)."""
+    global _groq_http
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    with _clients_lock:
+        client = _groq_clients.get(api_key)
+        if client is None:
+            provider = PROVIDERS[GROQ]
+            if _groq_http is None:
+                _groq_http = DefaultHttpxClient(transport=_GuardedTransport(provider))
+            client = _groq_clients[api_key] = Groq(
+                api_key=api_key,
+                http_client=_groq_http,
+                timeout=httpx.Timeout(provider.read_timeout, connect=provider.connect_timeout),
+            )
+        return client
+
+
+def get_twilio_client(account_sid: str, auth_token: str) -> Client:
+    """Shared Twilio client for a credential pair."""
+    global _twilio_http
+    with _clients_lock:
+        client = _twilio_clients.get((account_sid, auth_token))
+        if client is None:
+            if _twilio_http is None:
+                _twilio_http = _GuardedTwilioHttpClient(PROVIDERS[TWILIO])
+            client = Client(account_sid, auth_token, http_client=_twilio_http)
+            if TWILIO_API_BASE_URL:
+                client.api.base_url = TWILIO_API_BASE_URL.rstrip('/')
+            _twilio_clients[(account_sid, auth_token)] = client
+        return client
+
+
+def get_integration_stats() -> dict:
+    return {name: provider.stats() for name, provider in PROVIDERS.items()}
@@ -0,0 +1,273 @@
+# services/intent_classifier.py
+
+"""
+Local Intent Classifier
+=======================
+
+In-process fast path in front of GroqClient.detect_intent().
+
+Two stages, tried in order:
+
+1. Rules - anchored regexes for messages with an unambiguous intent
+   ("Hi", "Thanks", "Call me back", "I want to visit", ...).
+2. Model - a multinomial logistic regression over hashed word and character
+   n-grams, trained at first use on the intent examples of the Groq prompt
+   (SEED_EXAMPLES). Training takes a few milliseconds; a prediction is a sparse
+   dot product per intent.
+
+A message is only classified locally when the winning stage is confident and
+the message carries nothing the LLM is needed for: entity hints (numbers,
+budgets, BHK, dates, times) always go to Groq, and so do bare acknowledgements
+("ok", "yes") inside a conversation, where their meaning depends on context.
+
+Intents that trigger actions (lead_creation, followup_schedule,
+visit_request) are only taken from the rules; the model may answer
+MODEL_INTENTS only. Messages containing a negation ("don't call me",
+"not interested in buying") always go to Groq: n-gram features cannot tell
+them from the positive request.
+
+Counters of local hits and LLM fall-throughs are kept in-process; see
+get_stats().
+"""
+
+from typing import Dict, List, Optional, Tuple
+import threading
+import logging
+import math
+import random
+import re
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ("brochure_query", "visit_request", "lead_creation", "followup_schedule", "site_info", "general")
+
+# Intents the model may decide on its own (nothing is created or scheduled for them)
+MODEL_INTENTS = ("brochure_query", "site_info", "general")
+# Minimum probability for a model prediction to skip the LLM
+MODEL_CONFIDENCE_THRESHOLD = 0.80
+# Rules are written to be unambiguous
+RULE_CONFIDENCE = 0.95
+# Messages longer than this always go to the LLM
+MAX_LOCAL_WORDS = 12
+# Log a stats line every this many messages
+STATS_LOG_EVERY = 100
+
+HASH_BUCKETS = 1 << 14
+TRAIN_EPOCHS = 60
+LEARNING_RATE = 0.5
+L2 = 1e-4
+
+# Intent examples from the detect_intent prompt, plus close variants
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    "brochure_query": [
+        "What's the price?", "Tell me about amenities", "How big is 2BHK?", "Where is it located?",
+        "What is Cilantra?", "Tell me about the property", "what is the price of the flat",
+        "what amenities do you have", "is there a swimming pool", "what is the carpet area",
+        "tell me about the project", "what are the specifications", "do you have a gym",
+        "what is the cost", "send me details of the project", "what floor plans are available",
+        "how many towers are there", "what is the possession date", "is parking included",
+        "tell me more about the apartments",
+    ],
+    "visit_request": [
+        "I want to visit", "Can I see the property?", "Schedule a visit", "Book a tour",
+        "I want to come see it", "can I visit the site", "I would like to visit the project",
+        "arrange a site visit", "can we come and see the flat", "book a site visit",
+        "I want to see the sample flat", "can I come for a visit", "plan a visit to the site",
+        "I'd like a tour of the property",
+    ],
+    "lead_creation": [
+        "I want to buy", "I'm interested in purchasing", "I want to invest", "Book an apartment",
+        "I want to purchase a flat", "interested in buying", "I am looking to buy a home",
+        "I want to book a flat", "we are planning to buy", "I would like to invest in this project",
+        "I want to buy an apartment", "looking to purchase property",
+    ],
+    "followup_schedule": [
+        "Call me back", "Contact me later", "Have someone call me", "please call me",
+        "can someone call me", "give me a call", "call me later", "ask your team to call me",
+        "I want a callback", "request a call back", "can your agent contact me",
+    ],
+    "site_info": [
+        "What's near the property?", "How is the location?", "Transportation nearby?",
+        "what schools are nearby", "is there a hospital near", "how far is the airport",
+        "what is the connectivity", "is the metro close", "what is around the site",
+        "how is the neighbourhood", "distance from railway station",
+    ],
+    "general": [
+        "Hi", "Hello", "Thank you", "Bye", "Ok", "hey", "good morning", "thanks a lot",
+        "ok thanks", "good evening", "hello there", "thank you so much", "see you",
+        "goodbye", "great", "cool", "nice", "okay", "hi there", "thanks",
+    ],
+}
+
+# (intent, pattern) - matched against the normalized message
+RULES: List[Tuple[str, re.Pattern]] = [
+    ("general", re.compile(r"^(hi+|hey+|hello+|hii+|namaste|good (morning|afternoon|evening|night))( there| team| sir| madam)?$")),
+    ("general", re.compile(r"^(thanks?( you)?( so much| a lot| very much)?|thank u|thx|ty|bye+|good ?bye|see you|take care)$")),
+    ("general", re.compile(r"^(ok(ay)?|k|sure|yes|yeah|yep|fine|great|cool|nice|alright|done)( thanks?( you)?)?$")),
+    ("followup_schedule", re.compile(r"^(please |pls |kindly )?(call me( back| later| tomorrow)?|give me a call|have someone call me|contact me( later)?|(i want|i need|request) a call ?back)( please| pls)?$")),
+    ("visit_request", re.compile(r"^(i want to|i would like to|i'd like to|can i|can we|want to) (visit|see|tour)( the)?( site| property| project| flat| sample flat)?$")),
+    ("visit_request", re.compile(r"^(schedule|book|arrange|plan)( a)? (site )?(visit|tour)$")),
+    ("lead_creation", re.compile(r"^(i want to|i'm interested in|i am interested in|interested in|i would like to) (buy|buying|purchase|purchasing|invest|investing)$")),
+]
+
+# Anything here needs entity extraction (or is too specific for the local stages)
+ENTITY_HINTS = re.compile(
+    r"\d|lakh|lac|crore|cr\b|bhk|sq ?ft|sqft|budget|today|tomorrow|weekend|monday|tuesday|wednesday|"
+    r"thursday|friday|saturday|sunday|next (week|month|[a-z]+day)|this (week|month)|tonight|"
+    r"day after|morning at|evening at|noon|my name|this is [a-z]+|@"
+)
+
+# Negations flip the meaning of an otherwise matching message
+NEGATION = re.compile(r"\b(no|not|nope|never|cancel|stop|dont|wont|cant)\b|n't\b")
+
+# Acknowledgements whose meaning depends on the previous bot message
+CONTEXT_DEPENDENT = re.compile(r"^(ok(ay)?|k|sure|yes|yeah|yep|no|nope|fine|alright|done)$")
+
+_TOKEN = re.compile(r"[a-z']+")
+
+
+def _normalize(message: str) -> str:
+    text = re.sub(r"[^\w\s'@]", " ", (message or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _features(text: str) -> Dict[int, float]:
+    """Hashed word unigrams/bigrams and character trigrams, L2 normalized."""
+    words = _TOKEN.findall(text)
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {text} "
+    grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    features: Dict[int, float] = {}
+    for gram in grams:
+        bucket = zlib.crc32(gram.encode()) & (HASH_BUCKETS - 1)
+        features[bucket] = features.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {k: v / norm for k, v in features.items()}
+
+
+class HashedNgramModel:
+    """Multinomial logistic regression on hashed n-gram features."""
+
+    def __init__(self, intents=INTENTS):
+        self.intents = list(intents)
+        self.weights: List[Dict[int, float]] = [{} for _ in self.intents]
+        self.bias = [0.0] * len(self.intents)
+
+    def _scores(self, features: Dict[int, float]) -> List[float]:
+        return [
+            self.bias[k] + sum(weights.get(i, 0.0) * v for i, v in features.items())
+            for k, weights in enumerate(self.weights)
+        ]
+
+    @staticmethod
+    def _softmax(scores: List[float]) -> List[float]:
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def fit(self, examples: Dict[str, List[str]], epochs: int = TRAIN_EPOCHS, seed: int = 7) -> "HashedNgramModel":
+        data = [(_features(_normalize(text)), self.intents.index(intent))
+                for intent, texts in examples.items() for text in texts]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = LEARNING_RATE / (1 + epoch * 0.1)
+            for features, label in data:
+                probs = self._softmax(self._scores(features))
+                for k, weights in enumerate(self.weights):
+                    gradient = probs[k] - (1.0 if k == label else 0.0)
+                    self.bias[k] -= rate * gradient
+                    for i, v in features.items():
+                        weights[i] = weights.get(i, 0.0) * (1 - rate * L2) - rate * gradient * v
+        return self
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probs = self._softmax(self._scores(_features(text)))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.intents[best], probs[best]
+
+
+_model: Optional[HashedNgramModel] = None
+_model_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "messages": 0,
+    "rules": 0,
+    "model": 0,
+    "llm": 0,
+    "local_time_us": 0.0,
+    "by_intent": {},
+}
+
+
+def _get_model() -> HashedNgramModel:
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                start = time.time()
+                _model = HashedNgramModel().fit(SEED_EXAMPLES)
+                logger.info(f"Intent model trained on {sum(map(len, SEED_EXAMPLES.values()))} examples "
+                            f"in {(time.time() - start) * 1000:.1f}ms")
+    return _model
+
+
+def _record(stage: str, intent: Optional[str], elapsed_us: float) -> None:
+    with _stats_lock:
+        _stats["messages"] += 1
+        _stats[stage] += 1
+        _stats["local_time_us"] += elapsed_us
+        if intent is not None:
+            _stats["by_intent"][intent] = _stats["by_intent"].get(intent, 0) + 1
+        log_now = _stats["messages"] % STATS_LOG_EVERY == 0
+    if log_now:
+        logger.info(f"Intent fast path: {get_stats()}")
+
+
+def classify_local(message: str, has_context: bool = False) -> Optional[Dict]:
+    """
+    Classify a message without the LLM if possible.
+
+    Returns:
+        {"intent", "confidence", "entities": {}, "source": "rules" | "model"},
+        or None when the message should go to the LLM
+    """
+    start = time.perf_counter()
+    text = _normalize(message)
+
+    result = None
+    if text and len(text.split()) <= MAX_LOCAL_WORDS and not ENTITY_HINTS.search(text) \
+            and not NEGATION.search(text) and not (has_context and CONTEXT_DEPENDENT.match(text)):
+        for intent, pattern in RULES:
+            if pattern.match(text):
+                result = {"intent": intent, "confidence": RULE_CONFIDENCE, "entities": {}, "source": "rules"}
+                break
+        if result is None:
+            intent, confidence = _get_model().predict(text)
+            if intent in MODEL_INTENTS and confidence >= MODEL_CONFIDENCE_THRESHOLD:
+                result = {"intent": intent, "confidence": round(confidence, 3), "entities": {}, "source": "model"}
+
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    _record(result["source"] if result else "llm", result["intent"] if result else None, elapsed_us)
+    return result
+
+
+def get_stats() -> Dict:
+    """Local hit / LLM fall-through counters since process start."""
+    with _stats_lock:
+        messages = _stats["messages"]
+        local = _stats["rules"] + _stats["model"]
+        return {
+            "messages": messages,
+            "classified_by_rules": _stats["rules"],
+            "classified_by_model": _stats["model"],
+            "sent_to_llm": _stats["llm"],
+            "llm_calls_avoided_pct": round(100.0 * local / messages, 1) if messages else 0.0,
+            "avg_local_time_us": round(_stats["local_time_us"] / messages, 1) if messages else 0.0,
+            "local_by_intent": dict(_stats["by_intent"]),
+        }
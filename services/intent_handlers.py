@@ -8,6 +8,11 @@ import re
 import os
 import logging
 from services.brochure_service import BrochureService
+from services.lead_counters import refresh_site_counters
+from services.contact_counters import refresh_contact_counters
+from services.lead_search import refresh_lead_search
+from services.visit_visitors import refresh_visit_visitors
+from services.phone_keys import find_contact_by_phone
 
 logger = logging.getLogger(__name__)
 
@@ -47,9 +52,7 @@ class IntentHandler:
         clean_phone = self._clean_phone_number(phone_number)
 
         # Find or create contact
-        contact = self.db.query(Contact).filter(
-            Contact.ContactNo == clean_phone
-        ).first()
+        contact = find_contact_by_phone(self.db, clean_phone)
 
         if not contact:
             # Extract first and last name from profile_name
@@ -87,6 +90,9 @@ class IntentHandler:
         self.db.add(lead)
         self.db.commit()
         self.db.refresh(lead)
+        refresh_site_counters(self.db, [lead.SiteId])
+        refresh_contact_counters(self.db, [lead.ContactId])
+        refresh_lead_search(self.db, [lead.LeadId])
 
         additional_info = f"Lead created: {lead.LeadName}"
         if entities.get("property_type"):
@@ -150,9 +156,7 @@ class IntentHandler:
             clean_phone = self._clean_phone_number(phone_number)
 
             # Step 1: Find or create Contact
-            contact = self.db.query(Contact).filter(
-                Contact.ContactNo == clean_phone
-            ).first()
+            contact = find_contact_by_phone(self.db, clean_phone)
 
             if not contact:
                 # Create new contact
@@ -219,6 +223,7 @@ class IntentHandler:
             self.db.commit()
             self.db.refresh(visitor)
             logger.info(f"✓ Created visitor: {visitor.VisitorsId}")
+            refresh_visit_visitors(self.db, [visit.VisitId])
 
             # Step 6: Prepare response message
             visit_date_str = visit.VisitDate.strftime("%B %d, %Y at %I:%M %p")
@@ -278,9 +283,7 @@ class IntentHandler:
 
         if not lead_id:
             # Try to find existing lead by phone
-            contact = self.db.query(Contact).filter(
-                Contact.ContactNo == clean_phone
-            ).first()
+            contact = find_contact_by_phone(self.db, clean_phone)
 
             if contact:
                 lead = self.db.query(Lead).filter(
@@ -327,9 +330,7 @@ class IntentHandler:
 
         # Find or create contact if not provided
         if not contact_id:
-            contact = self.db.query(Contact).filter(
-                Contact.ContactNo == clean_phone
-            ).first()
+            contact = find_contact_by_phone(self.db, clean_phone)
 
             if not contact:
                 # Extract first and last name from profile_name
@@ -378,6 +379,9 @@ class IntentHandler:
                 self.db.add(lead)
                 self.db.commit()
                 self.db.refresh(lead)
+                refresh_site_counters(self.db, [lead.SiteId])
+                refresh_contact_counters(self.db, [lead.ContactId])
+                refresh_lead_search(self.db, [lead.LeadId])
 
             lead_id = lead.LeadId
 
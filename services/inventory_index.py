@@ -0,0 +1,219 @@
+# services/inventory_index.py
+
+"""
+Inventory Index
+===============
+
+In-memory faceted index over InfraUnit rows, one per site (plus one over all
+units for searches without a site).
+
+Each index keeps bitmap postings (Python ints, one bit per unit) for floor,
+direction, unit type, view and availability, and a sorted size array for
+range filters. Combined filters are bitmap ANDs, and facet counts are popcounts
+of the result bitmap against each posting - no database round-trip per search.
+
+Indexes are built lazily on first use and dropped by invalidate_inventory()
+from the InfraUnit / SiteInfra write endpoints. A TTL bounds staleness for
+writes made outside those endpoints (Excel upload, other app workers).
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+from models import InfraUnit, SiteInfra
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Rebuild an index at least this often, even without a local write
+INDEX_TTL_SECONDS = 300
+
+# Unit fields exposed as facets: facet name -> InfraUnit attribute
+FACET_FIELDS = {
+    "floor": "FloorNumber",
+    "direction": "Direction",
+    "unit_type": "UnitType",
+    "view": "View",
+    "availability": "AvailabilityStatus",
+}
+
+_indexes: Dict[Optional[int], "SiteInventoryIndex"] = {}
+_lock = threading.Lock()
+
+
+def _normalize(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value).strip().lower()
+
+
+class SiteInventoryIndex:
+    """Immutable postings over one site's units, ordered by InfraUnitId."""
+
+    def __init__(self, units: List[dict]):
+        self.units = units
+        self.all_bits = (1 << len(units)) - 1
+        self.built_at = time.time()
+
+        # facet -> normalized value -> bitmap; labels keep the stored spelling
+        self.postings: Dict[str, Dict[object, int]] = {facet: {} for facet in FACET_FIELDS}
+        self.labels: Dict[str, Dict[object, object]] = {facet: {} for facet in FACET_FIELDS}
+        self.unit_numbers: Dict[str, int] = {}
+
+        for position, unit in enumerate(units):
+            bit = 1 << position
+            for facet, field in FACET_FIELDS.items():
+                value = unit[field]
+                key = value if facet == "floor" else _normalize(value)
+                if key is None:
+                    continue
+                self.postings[facet][key] = self.postings[facet].get(key, 0) | bit
+                self.labels[facet].setdefault(key, value if facet == "floor" else str(value).strip())
+            number = _normalize(unit["UnitNumber"])
+            if number is not None:
+                self.unit_numbers[number] = self.unit_numbers.get(number, 0) | bit
+
+        sized = sorted((unit["UnitSize"], position) for position, unit in enumerate(units) if unit["UnitSize"] is not None)
+        self.sizes = [size for size, _ in sized]
+        self.size_positions = [position for _, position in sized]
+
+    def _contains(self, facet: str, text: str) -> int:
+        """Bitmap of units whose facet value contains text (ILIKE '%text%')."""
+        needle = _normalize(text)
+        bits = 0
+        for key, posting in self.postings[facet].items():
+            if needle in key:
+                bits |= posting
+        return bits
+
+    def _size_range(self, min_size: Optional[float], max_size: Optional[float]) -> int:
+        start = 0 if min_size is None else bisect_left(self.sizes, min_size)
+        end = len(self.sizes) if max_size is None else bisect_right(self.sizes, max_size)
+        bits = 0
+        for position in self.size_positions[start:end]:
+            bits |= 1 << position
+        return bits
+
+    def match(
+        self,
+        query: Optional[str] = None,
+        floor_number: Optional[int] = None,
+        direction: Optional[str] = None,
+        unit_type: Optional[str] = None,
+        view: Optional[str] = None,
+        availability: Optional[str] = None,
+        min_size: Optional[float] = None,
+        max_size: Optional[float] = None,
+    ) -> int:
+        """Bitmap of units matching every given filter (same semantics as the SQL search)."""
+        bits = self.all_bits
+
+        if query:
+            try:
+                query_as_int = int(query)
+                bits &= self.postings["floor"].get(query_as_int, 0) | self.unit_numbers.get(_normalize(query), 0)
+            except ValueError:
+                try:
+                    query_as_float = float(query)
+                    bits &= self._size_range(query_as_float, query_as_float)
+                except ValueError:
+                    bits &= (self._contains("availability", query) | self._contains("direction", query)
+                             | self._contains("unit_type", query) | self._contains("view", query))
+
+        if floor_number is not None:
+            bits &= self.postings["floor"].get(floor_number, 0)
+        if direction:
+            bits &= self._contains("direction", direction)
+        if unit_type:
+            bits &= self._contains("unit_type", unit_type)
+        if view:
+            bits &= self._contains("view", view)
+        if availability:
+            bits &= self._contains("availability", availability)
+        if min_size is not None or max_size is not None:
+            bits &= self._size_range(min_size, max_size)
+
+        return bits
+
+    @staticmethod
+    def positions(bits: int):
+        """Yield set bit positions in ascending order."""
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def rows(self, bits: int, sIndex: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Units of a bitmap in InfraUnitId order, optionally paged."""
+        rows = []
+        for n, position in enumerate(self.positions(bits)):
+            if n < sIndex:
+                continue
+            if limit is not None and len(rows) >= limit:
+                break
+            rows.append(self.units[position])
+        return rows
+
+    def facets(self, bits: int) -> dict:
+        """Per-facet value counts within a result bitmap, largest first."""
+        counts = {}
+        for facet, postings in self.postings.items():
+            values = [
+                {"value": self.labels[facet][key], "count": (posting & bits).bit_count()}
+                for key, posting in postings.items()
+            ]
+            counts[facet] = sorted((v for v in values if v["count"]), key=lambda v: (-v["count"], str(v["value"])))
+        sizes = [self.units[p]["UnitSize"] for p in self.positions(bits) if self.units[p]["UnitSize"] is not None]
+        counts["size"] = {"min": min(sizes), "max": max(sizes)} if sizes else {"min": None, "max": None}
+        return counts
+
+
+def _load_units(db: Session, site_id: Optional[int]) -> List[dict]:
+    columns = (
+        InfraUnit.InfraUnitId, InfraUnit.InfraId, InfraUnit.UnitNumber, InfraUnit.FloorNumber,
+        InfraUnit.UnitSize, InfraUnit.AvailabilityStatus, InfraUnit.Direction, InfraUnit.UnitType,
+        InfraUnit.View,
+    )
+    query = db.query(*columns)
+    if site_id is not None:
+        query = query.join(SiteInfra, and_(
+            InfraUnit.InfraId == SiteInfra.InfraId,
+            InfraUnit.InfraUnitId == SiteInfra.InfraUnitId
+        )).filter(SiteInfra.SiteId == site_id).distinct()
+    return [dict(row._mapping) for row in query.order_by(InfraUnit.InfraUnitId).all()]
+
+
+def get_inventory_index(db: Session, site_id: Optional[int] = None) -> SiteInventoryIndex:
+    """Return the index for a site (all units when site_id is None), building it if needed."""
+    index = _indexes.get(site_id)
+    if index is not None and time.time() - index.built_at < INDEX_TTL_SECONDS:
+        return index
+
+    with _lock:
+        index = _indexes.get(site_id)
+        if index is None or time.time() - index.built_at >= INDEX_TTL_SECONDS:
+            start = time.time()
+            index = SiteInventoryIndex(_load_units(db, site_id))
+            _indexes[site_id] = index
+            logger.info(f"Inventory index built for site {site_id if site_id is not None else 'ALL'}: "
+                        f"{len(index.units)} units in {(time.time() - start) * 1000:.1f}ms")
+    return index
+
+
+def invalidate_inventory(site_ids: Optional[List[Optional[int]]] = None) -> None:
+    """
+    Drop cached indexes so the next search rebuilds them.
+
+    The all-units index is always dropped; pass site_ids to keep other sites'
+    indexes, or None to drop everything.
+    """
+    with _lock:
+        if site_ids is None:
+            _indexes.clear()
+            return
+        _indexes.pop(None, None)
+        for site_id in site_ids:
+            _indexes.pop(site_id, None)
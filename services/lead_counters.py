@@ -0,0 +1,159 @@
+# services/lead_counters.py
+
+"""
+Per-site Lead Counters
+======================
+
+Keeps the LeadSiteCounters table in sync with the lead table.
+
+Each row holds the counts behind /leads/leads_aggregates, /leads/count and
+/leads/sitewisecount for one (SiteId, LeadStatus) pair. Lead writes refresh the
+rows of the sites they touch; the scoring scheduler refreshes everything after
+each run, since urgent/due-today/churn counts depend on the computed scores.
+
+Rows are merged by (SiteId, LeadStatus) - updated in place, inserted or
+deleted - under a unique index on the pair, so two concurrent refreshes of a
+site cannot both insert its rows; the one that loses the race retries.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, and_, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from datetime import datetime
+from typing import Iterable, Optional
+from models import Lead, LeadSiteCounters
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Attempts of a refresh that lost an insert race to a concurrent refresh
+MAX_REFRESH_ATTEMPTS = 3
+
+# Set once the counter table is known to be populated (avoids a probe per request)
+_counters_ready = False
+
+
+def _site_filter(column, site_ids: set):
+    """Build `column IN (...)` that also matches NULL when None is requested."""
+    non_null = [site_id for site_id in site_ids if site_id is not None]
+    conditions = []
+    if non_null:
+        conditions.append(column.in_(non_null))
+    if None in site_ids:
+        conditions.append(column.is_(None))
+    return or_(*conditions)
+
+
+def refresh_site_counters(db: Session, site_ids: Optional[Iterable[Optional[int]]] = None) -> bool:
+    """
+    Recompute counter rows for the given sites (all sites when site_ids is None).
+
+    Runs one GROUP BY over the affected sites' leads and merges the result into
+    their counter rows in a single transaction. Failures are logged and rolled
+    back - the scheduler's full refresh reconciles any missed update.
+
+    Returns:
+        True if the counters were refreshed, False on error
+    """
+    global _counters_ready
+
+    if site_ids is not None:
+        site_ids = set(site_ids)
+        if not site_ids:
+            return True
+
+    aggregate_query = db.query(
+        Lead.SiteId,
+        Lead.LeadStatus,
+        func.count(Lead.LeadId).label('TotalCount'),
+        func.count(case((and_(Lead.HealthScore < 40, Lead.OverdueDays > 3), 1))).label('UrgentCount'),
+        func.count(case((Lead.FollowUpStatus == 'today', 1))).label('DueTodayCount'),
+        func.count(case((Lead.BuyingIntent >= 8, 1))).label('HighIntentCount'),
+        func.count(case((Lead.FollowUpStatus == 'overdue', 1))).label('OverdueCount'),
+        func.count(case((Lead.ChurnRisk == 'critical', 1))).label('CriticalChurnCount'),
+        func.count(case((Lead.ChurnRisk == 'high', 1))).label('HighChurnCount'),
+        func.sum(Lead.HealthScore).label('HealthScoreSum'),
+        func.count(Lead.HealthScore).label('HealthScoreCount'),
+        func.sum(Lead.ConversionProbability).label('ConversionProbabilitySum'),
+        func.count(Lead.ConversionProbability).label('ConversionProbabilityCount'),
+    )
+    existing_query = db.query(LeadSiteCounters.CounterId, LeadSiteCounters.SiteId, LeadSiteCounters.LeadStatus)
+
+    if site_ids is not None:
+        aggregate_query = aggregate_query.filter(_site_filter(Lead.SiteId, site_ids))
+        existing_query = existing_query.filter(_site_filter(LeadSiteCounters.SiteId, site_ids))
+
+    for attempt in range(1, MAX_REFRESH_ATTEMPTS + 1):
+        try:
+            rows = _merge_counters(db, aggregate_query, existing_query)
+            break
+        except IntegrityError as e:
+            # A concurrent refresh inserted one of our pairs first; its rows are visible now
+            db.rollback()
+            if attempt == MAX_REFRESH_ATTEMPTS:
+                logger.warning(f"Lead counter refresh lost {attempt} insert races for sites "
+                               f"{site_ids if site_ids is not None else 'ALL'}: {e}")
+                return False
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Lead counter refresh failed for sites {site_ids if site_ids is not None else 'ALL'}: {e}")
+            return False
+
+    if site_ids is None:
+        _counters_ready = True
+    logger.info(f"Lead counters refreshed: {rows} rows for sites {sorted(site_ids, key=str) if site_ids is not None else 'ALL'}")
+    return True
+
+
+def _merge_counters(db: Session, aggregate_query, existing_query) -> int:
+    """Update, insert and delete counter rows to match the aggregate; commits. Returns the row count."""
+    now = datetime.now()
+    existing = {(row.SiteId, row.LeadStatus): row.CounterId for row in existing_query.all()}
+    updates, inserts = [], []
+    for row in aggregate_query.group_by(Lead.SiteId, Lead.LeadStatus).all():
+        values = {
+            "SiteId": row.SiteId,
+            "LeadStatus": row.LeadStatus,
+            "TotalCount": row.TotalCount or 0,
+            "UrgentCount": row.UrgentCount or 0,
+            "DueTodayCount": row.DueTodayCount or 0,
+            "HighIntentCount": row.HighIntentCount or 0,
+            "OverdueCount": row.OverdueCount or 0,
+            "CriticalChurnCount": row.CriticalChurnCount or 0,
+            "HighChurnCount": row.HighChurnCount or 0,
+            "HealthScoreSum": row.HealthScoreSum or 0,
+            "HealthScoreCount": row.HealthScoreCount or 0,
+            "ConversionProbabilitySum": row.ConversionProbabilitySum or 0,
+            "ConversionProbabilityCount": row.ConversionProbabilityCount or 0,
+            "UpdatedDate": now,
+        }
+        counter_id = existing.pop((row.SiteId, row.LeadStatus), None)
+        if counter_id is None:
+            inserts.append(values)
+        else:
+            updates.append({"CounterId": counter_id, **values})
+
+    if existing:
+        db.query(LeadSiteCounters).filter(
+            LeadSiteCounters.CounterId.in_(existing.values())
+        ).delete(synchronize_session=False)
+    if updates:
+        db.bulk_update_mappings(LeadSiteCounters, updates)
+    if inserts:
+        db.bulk_insert_mappings(LeadSiteCounters, inserts)
+    db.commit()
+    return len(updates) + len(inserts)
+
+
+def ensure_site_counters(db: Session) -> None:
+    """
+    Populate the counter table on first use if the scheduler has not run yet.
+    """
+    global _counters_ready
+    if _counters_ready:
+        return
+    if db.query(LeadSiteCounters.CounterId).first() is None:
+        # Marks the table ready on success; a failed refresh is retried next call
+        refresh_site_counters(db)
+        return
+    _counters_ready = True
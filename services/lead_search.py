@@ -0,0 +1,301 @@
+# services/lead_search.py
+
+"""
+Lead Search Projection
+======================
+
+Keeps the LeadSearchProjection table in sync with lead and the tables its
+list filters read: site, prospecttype, contact (customer and broker) and
+FollowUps.
+
+Each row holds, for one lead, the site and prospect type names, the customer
+and broker full names, contact types and reversed phone keys (see
+services/phone_keys.py), the score columns, the budget sort key and the
+next / last follow-up dates. apply_lead_filters() and apply_lead_sort() in
+routers/lead.py work on these columns, so the lead list filters, counts and
+sorts on one table.
+
+Lead, contact, site, prospect type and follow-up writes refresh the leads they
+touch; the scoring scheduler reconciles every row after each run (scores
+change there). Rows are merged by LeadId, never deleted and reinserted
+wholesale: the full refresh walks the leads in LeadId order,
+REFRESH_BATCH_SIZE at a time, and per chunk inserts new rows, updates only
+the rows whose values changed and deletes the rows of deleted leads, in a
+short transaction of its own. The table is never empty or locked as a whole,
+and a chunk that collides with a concurrent insert of the same lead is
+rebuilt and merged again. Leads inserted without a refresh (temp-table imports, direct
+SQL) are picked up by ensure_lead_search(), which adds the rows of leads
+missing from the projection at most every RECONCILE_INTERVAL_SECONDS.
+"""
+
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+from models import Lead, Site, ProspectType, Contact, FollowUps, LeadSearchProjection
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Leads merged per chunk / transaction (keeps IN lists, batches and locks bounded)
+REFRESH_BATCH_SIZE = 1000
+
+# Merges of one chunk before giving up on concurrent inserts of the same leads
+MAX_MERGE_ATTEMPTS = 3
+
+# Columns compared to tell whether a row changed (UpdatedDate always does)
+_COMPARED_COLUMNS = [
+    column.name for column in LeadSearchProjection.__table__.columns
+    if column.name not in ("LeadId", "UpdatedDate")
+]
+
+# How often ensure_lead_search() looks for leads without a projection row
+RECONCILE_INTERVAL_SECONDS = 60
+
+# Set once the projection is known to be populated (avoids a probe per request)
+_projection_ready = False
+_last_reconcile = 0.0
+
+
+def _clip(value: Optional[str], length: int) -> Optional[str]:
+    return value[:length] if value else value
+
+
+def _full_name(first: Optional[str], last: Optional[str]) -> Optional[str]:
+    return " ".join(part for part in (first, last) if part) or None
+
+
+def _clean_ids(ids: Optional[Iterable[Optional[int]]]):
+    if ids is None:
+        return None
+    return {item_id for item_id in ids if item_id is not None}
+
+
+def _build_rows(db: Session, lead_ids):
+    """Projection rows for the given leads (all leads when lead_ids is None)."""
+    CustomerContact = aliased(Contact)
+    BrokerContact = aliased(Contact)
+
+    next_followup_query = db.query(
+        FollowUps.LeadId, func.min(FollowUps.NextFollowUpDate).label('NextFollowUpDate')
+    ).filter(FollowUps.Status != 'Completed')
+    last_contact_query = db.query(
+        FollowUps.LeadId, func.max(FollowUps.FollowUpDate).label('LastContactDate')
+    ).filter(FollowUps.Status == 'Completed')
+    lead_query = db.query(
+        Lead.LeadId, Lead.SiteId, Site.SiteName, Lead.ProspectTypeId, ProspectType.ProspectTypeName,
+        Lead.LeadName, Lead.LeadStatus, Lead.LeadSource, Lead.CreatedDate,
+        Lead.ContactId, CustomerContact.ContactFName.label('CustomerFName'),
+        CustomerContact.ContactLName.label('CustomerLName'), CustomerContact.ContactType.label('CustomerType'),
+        CustomerContact.PhoneKeyRev.label('CustomerPhoneKeyRev'),
+        Lead.BrokerId, BrokerContact.ContactFName.label('BrokerFName'),
+        BrokerContact.ContactLName.label('BrokerLName'), BrokerContact.ContactType.label('BrokerType'),
+        BrokerContact.PhoneKeyRev.label('BrokerPhoneKeyRev'),
+        Lead.HealthScore, Lead.BuyingIntent, Lead.AIPriority, Lead.ChurnRisk, Lead.FollowUpStatus,
+        Lead.OverdueDays, func.coalesce(Lead.RequestedAmount, Lead.QuotedAmount, 0).label('Budget'),
+    ).outerjoin(Site, Site.SiteId == Lead.SiteId) \
+        .outerjoin(ProspectType, ProspectType.ProspectTypeId == Lead.ProspectTypeId) \
+        .outerjoin(CustomerContact, CustomerContact.ContactId == Lead.ContactId) \
+        .outerjoin(BrokerContact, BrokerContact.ContactId == Lead.BrokerId)
+
+    if lead_ids is not None:
+        lead_query = lead_query.filter(Lead.LeadId.in_(lead_ids))
+        next_followup_query = next_followup_query.filter(FollowUps.LeadId.in_(lead_ids))
+        last_contact_query = last_contact_query.filter(FollowUps.LeadId.in_(lead_ids))
+    else:
+        next_followup_query = next_followup_query.filter(FollowUps.LeadId.isnot(None))
+        last_contact_query = last_contact_query.filter(FollowUps.LeadId.isnot(None))
+
+    next_followups = dict(next_followup_query.group_by(FollowUps.LeadId).all())
+    last_contacts = dict(last_contact_query.group_by(FollowUps.LeadId).all())
+
+    now = datetime.now()
+    return [
+        {
+            "LeadId": row.LeadId,
+            "SiteId": row.SiteId,
+            "SiteName": _clip(row.SiteName, 255),
+            "ProspectTypeId": row.ProspectTypeId,
+            "ProspectTypeName": _clip(row.ProspectTypeName, 255),
+            "LeadName": _clip(row.LeadName, 255),
+            "LeadStatus": _clip(row.LeadStatus, 50),
+            "LeadSource": _clip(row.LeadSource, 100),
+            "CreatedDate": row.CreatedDate,
+            "CustomerId": row.ContactId,
+            "CustomerName": _clip(_full_name(row.CustomerFName, row.CustomerLName), 512),
+            "CustomerType": _clip(row.CustomerType, 50),
+            "CustomerPhoneKeyRev": row.CustomerPhoneKeyRev,
+            "BrokerId": row.BrokerId,
+            "BrokerName": _clip(_full_name(row.BrokerFName, row.BrokerLName), 512),
+            "BrokerType": _clip(row.BrokerType, 50),
+            "BrokerPhoneKeyRev": row.BrokerPhoneKeyRev,
+            "HealthScore": row.HealthScore,
+            "BuyingIntent": row.BuyingIntent,
+            "AIPriority": row.AIPriority,
+            "ChurnRisk": _clip(row.ChurnRisk, 50),
+            "FollowUpStatus": _clip(row.FollowUpStatus, 50),
+            "OverdueDays": row.OverdueDays,
+            "Budget": row.Budget,
+            "NextFollowUpDate": next_followups.get(row.LeadId),
+            "LastContactDate": last_contacts.get(row.LeadId),
+            "UpdatedDate": now,
+        }
+        for row in lead_query.all()
+    ]
+
+
+def _merge_rows(db: Session, rows, scope) -> Tuple[int, int, int]:
+    """
+    Make the projection rows matching scope equal to rows: insert new leads,
+    update changed rows, delete rows whose lead is not in rows.
+
+    Returns:
+        (inserted, updated, deleted)
+    """
+    existing = {
+        row.LeadId: row for row in db.query(LeadSearchProjection.__table__).filter(scope).all()
+    }
+    inserts = []
+    updates = []
+    for row in rows:
+        current = existing.pop(row["LeadId"], None)
+        if current is None:
+            inserts.append(row)
+        elif any(getattr(current, column) != row[column] for column in _COMPARED_COLUMNS):
+            updates.append(row)
+
+    if existing:
+        db.query(LeadSearchProjection).filter(
+            LeadSearchProjection.LeadId.in_(list(existing))
+        ).delete(synchronize_session=False)
+    if updates:
+        db.bulk_update_mappings(LeadSearchProjection, updates)
+    if inserts:
+        db.bulk_insert_mappings(LeadSearchProjection, inserts)
+    return len(inserts), len(updates), len(existing)
+
+
+def _merge_chunk(db: Session, lead_ids, scope) -> Tuple[int, int, int]:
+    """Merge the rows of lead_ids over scope in one transaction, retrying insert collisions."""
+    for attempt in range(1, MAX_MERGE_ATTEMPTS + 1):
+        try:
+            counts = _merge_rows(db, _build_rows(db, lead_ids) if lead_ids else [], scope)
+            db.commit()
+            return counts
+        except IntegrityError:
+            # A concurrent refresh inserted one of these leads first: merge again
+            db.rollback()
+            if attempt == MAX_MERGE_ATTEMPTS:
+                raise
+
+
+def refresh_lead_search(
+    db: Session,
+    lead_ids: Optional[Iterable[Optional[int]]] = None,
+    contact_ids: Optional[Iterable[Optional[int]]] = None,
+    site_ids: Optional[Iterable[Optional[int]]] = None,
+    prospect_type_ids: Optional[Iterable[Optional[int]]] = None,
+) -> bool:
+    """
+    Recompute projection rows for the given leads, plus the leads of the given
+    contacts (as customer or broker), sites and prospect types. Every row is
+    reconciled when no ids are given.
+
+    Merges REFRESH_BATCH_SIZE leads per transaction; deleted leads lose their
+    row. Failures are logged and rolled back - the scheduler's full refresh
+    reconciles any missed update.
+
+    Returns:
+        True if the projection was refreshed, False on error
+    """
+    global _projection_ready
+
+    full = lead_ids is None and contact_ids is None and site_ids is None and prospect_type_ids is None
+    totals = [0, 0, 0]
+    try:
+        if full:
+            # Keyset walk: each chunk also covers the gap before its first lead,
+            # and the last (empty) chunk the rows past the highest lead
+            last_id = None
+            while True:
+                chunk_query = db.query(Lead.LeadId).order_by(Lead.LeadId)
+                scope = LeadSearchProjection.LeadId.isnot(None)
+                if last_id is not None:
+                    chunk_query = chunk_query.filter(Lead.LeadId > last_id)
+                    scope = LeadSearchProjection.LeadId > last_id
+                chunk = [lead_id for lead_id, in chunk_query.limit(REFRESH_BATCH_SIZE).all()]
+                if chunk:
+                    scope = scope & (LeadSearchProjection.LeadId <= chunk[-1])
+                for index, count in enumerate(_merge_chunk(db, chunk, scope)):
+                    totals[index] += count
+                if not chunk:
+                    break
+                last_id = chunk[-1]
+            _projection_ready = True
+            logger.info(f"Lead search projection reconciled: {totals[0]} inserted, "
+                        f"{totals[1]} updated, {totals[2]} deleted")
+            return True
+
+        lead_ids = _clean_ids(lead_ids) or set()
+        contact_ids = _clean_ids(contact_ids)
+        site_ids = _clean_ids(site_ids)
+        prospect_type_ids = _clean_ids(prospect_type_ids)
+        related = []
+        if contact_ids:
+            related.append(or_(Lead.ContactId.in_(contact_ids), Lead.BrokerId.in_(contact_ids)))
+        if site_ids:
+            related.append(Lead.SiteId.in_(site_ids))
+        if prospect_type_ids:
+            related.append(Lead.ProspectTypeId.in_(prospect_type_ids))
+        if related:
+            lead_ids.update(lead_id for lead_id, in db.query(Lead.LeadId).filter(or_(*related)).all())
+        if not lead_ids:
+            return True
+
+        lead_ids = sorted(lead_ids)
+        for start in range(0, len(lead_ids), REFRESH_BATCH_SIZE):
+            batch = lead_ids[start:start + REFRESH_BATCH_SIZE]
+            _merge_chunk(db, batch, LeadSearchProjection.LeadId.in_(batch))
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Lead search projection refresh failed "
+                       f"({'ALL' if full else f'{len(lead_ids or [])} leads'}): {e}")
+        return False
+    return True
+
+
+def refresh_missing_lead_search(db: Session) -> int:
+    """
+    Add projection rows for leads that have none.
+
+    Returns:
+        Number of leads added
+    """
+    missing = [
+        lead_id for lead_id, in db.query(Lead.LeadId)
+        .outerjoin(LeadSearchProjection, LeadSearchProjection.LeadId == Lead.LeadId)
+        .filter(LeadSearchProjection.LeadId.is_(None)).all()
+    ]
+    if missing and refresh_lead_search(db, missing):
+        logger.info(f"Lead search projection: added {len(missing)} missing leads")
+        return len(missing)
+    return 0
+
+
+def ensure_lead_search(db: Session) -> None:
+    """
+    Populate the projection on first use if the scheduler has not run yet,
+    and add leads missing from it at most every RECONCILE_INTERVAL_SECONDS.
+    """
+    global _projection_ready, _last_reconcile
+    if not _projection_ready and db.query(LeadSearchProjection.LeadId).first() is None:
+        # Marks the projection ready on success; a failed refresh is retried next call
+        refresh_lead_search(db)
+        _last_reconcile = time.monotonic()
+        return
+    _projection_ready = True
+    if time.monotonic() - _last_reconcile >= RECONCILE_INTERVAL_SECONDS:
+        _last_reconcile = time.monotonic()
+        refresh_missing_lead_search(db)
@@ -0,0 +1,236 @@
+# services/notification_outbox.py
+
+"""
+Notification Outbox
+===================
+
+Queues WhatsApp notifications in the NotificationOutbox table and delivers them
+in the background.
+
+enqueue_whatsapp() inserts one row per recipient (skipping rows whose DedupeKey
+already exists) and returns immediately. dispatch_pending() claims due rows,
+sends them through Twilio with bounded concurrency and records the outcome:
+
+- sent:    delivered to Twilio, ProviderMessageSid stored
+- pending: transient failure, retried at NextAttemptAt (exponential backoff)
+- failed:  permanent failure (4xx from Twilio) or MAX_ATTEMPTS reached
+
+The dispatcher runs as a scheduler job and is also kicked off right after an
+enqueue. Twilio clients come from services.integration_clients (set
+TWILIO_API_BASE_URL there to point them at a local fake Twilio endpoint).
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from twilio.base.exceptions import TwilioRestException
+from database import SessionLocal
+from models import APIConfiguration, NotificationOutbox
+from services.integration_clients import get_twilio_client
+import threading
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+# Parallel Twilio calls per dispatch run
+MAX_CONCURRENT_SENDS = int(os.getenv("OUTBOX_MAX_CONCURRENT_SENDS", "5"))
+# Rows claimed per dispatch run
+DISPATCH_BATCH_SIZE = 50
+# Attempts before a message is marked failed
+MAX_ATTEMPTS = 5
+# Retry delay is BASE * 2^(attempts - 1), capped at MAX
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 30 * 60
+# A row left in 'sending' this long (worker died mid-send) is picked up again
+STALE_SENDING_SECONDS = 10 * 60
+
+# One dispatch run per process at a time (scheduler job and request kick-off share it)
+_dispatch_lock = threading.Lock()
+
+
+def enqueue_whatsapp(
+    db: Session,
+    recipients: Iterable[str],
+    dedupe_prefix: str,
+    content_template_sid: Optional[str],
+    content_variables: dict,
+    config_id: Optional[int] = None,
+    created_by_id: Optional[int] = None,
+) -> List[NotificationOutbox]:
+    """
+    Queue one WhatsApp template message per distinct recipient.
+
+    The DedupeKey is "<dedupe_prefix>:<number>"; recipients that already have a
+    row with that key are skipped, so repeating a request does not resend.
+
+    Returns:
+        The outbox rows for all recipients (newly queued and already existing)
+    """
+    numbers = list(dict.fromkeys(n.strip() for n in recipients if n and n.strip()))
+    if not numbers:
+        return []
+
+    keys = {number: f"{dedupe_prefix}:{number}" for number in numbers}
+    existing = {
+        row.DedupeKey: row
+        for row in db.query(NotificationOutbox).filter(NotificationOutbox.DedupeKey.in_(keys.values())).all()
+    }
+
+    now = datetime.now()
+    rows = []
+    for number in numbers:
+        if keys[number] in existing:
+            rows.append(existing[keys[number]])
+            continue
+        row = NotificationOutbox(
+            Channel='WA',
+            ToNumber=number,
+            ConfigId=config_id,
+            ContentTemplateSID=content_template_sid,
+            ContentVariables=json.dumps(content_variables),
+            DedupeKey=keys[number],
+            Status='pending',
+            Attempts=0,
+            NextAttemptAt=now,
+            CreatedAt=now,
+            UpdatedAt=now,
+            CreatedById=created_by_id,
+        )
+        db.add(row)
+        rows.append(row)
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request queued the same keys first - return what is stored
+        db.rollback()
+        rows = db.query(NotificationOutbox).filter(NotificationOutbox.DedupeKey.in_(keys.values())).all()
+
+    return rows
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def _is_permanent(error: Exception) -> bool:
+    """4xx responses other than 429 will not succeed on retry."""
+    return isinstance(error, TwilioRestException) and 400 <= error.status < 500 and error.status != 429
+
+
+def _claim_due_rows(db: Session, limit: int) -> List[int]:
+    """Move due rows to 'sending' and return their ids."""
+    now = datetime.now()
+    is_due = or_(
+        and_(NotificationOutbox.Status == 'pending', NotificationOutbox.NextAttemptAt <= now),
+        and_(NotificationOutbox.Status == 'sending',
+             NotificationOutbox.UpdatedAt <= now - timedelta(seconds=STALE_SENDING_SECONDS)),
+    )
+    candidates = db.query(NotificationOutbox.OutboxId).filter(is_due) \
+        .order_by(NotificationOutbox.NextAttemptAt).limit(limit).all()
+
+    claimed = []
+    for (outbox_id,) in candidates:
+        # Conditional update so another app instance cannot claim the same row
+        updated = db.query(NotificationOutbox).filter(
+            NotificationOutbox.OutboxId == outbox_id, is_due
+        ).update({"Status": 'sending', "UpdatedAt": now}, synchronize_session=False)
+        if updated:
+            claimed.append(outbox_id)
+    db.commit()
+    return claimed
+
+
+def _send_one(outbox_id: int) -> str:
+    """Send one claimed row on its own session and record the result."""
+    db = SessionLocal()
+    try:
+        row = db.query(NotificationOutbox).filter(NotificationOutbox.OutboxId == outbox_id).first()
+        if row is None:
+            return 'missing'
+
+        config_query = db.query(APIConfiguration)
+        if row.ConfigId is not None:
+            config = config_query.filter(APIConfiguration.ConfigId == row.ConfigId).first()
+        else:
+            config = config_query.filter(
+                APIConfiguration.ConfigType == "WA",
+                APIConfiguration.IsActive == True
+            ).order_by(APIConfiguration.ConfigId.desc()).first()
+
+        row.Attempts = (row.Attempts or 0) + 1
+        now = datetime.now()
+        try:
+            if config is None:
+                raise ValueError("No Twilio WhatsApp configuration found")
+
+            message = get_twilio_client(config.ConfigKey, config.ConfigValue).messages.create(
+                from_=f"whatsapp:{config.WhatsAppFrom}",
+                to=f"whatsapp:{row.ToNumber}",
+                content_sid=row.ContentTemplateSID or config.ContentTemplateSID,
+                content_variables=row.ContentVariables,
+            )
+            row.Status = 'sent'
+            row.ProviderMessageSid = message.sid
+            row.SentAt = now
+            row.LastError = None
+        except Exception as e:
+            row.LastError = str(e)[:500]
+            if _is_permanent(e) or isinstance(e, ValueError) or row.Attempts >= MAX_ATTEMPTS:
+                row.Status = 'failed'
+                logger.error(f"Outbox {outbox_id} to {row.ToNumber} failed after {row.Attempts} attempt(s): {e}")
+            else:
+                row.Status = 'pending'
+                row.NextAttemptAt = now + _retry_delay(row.Attempts)
+                logger.warning(f"Outbox {outbox_id} to {row.ToNumber} attempt {row.Attempts} failed, retrying at {row.NextAttemptAt}: {e}")
+
+        row.UpdatedAt = now
+        db.commit()
+        return row.Status
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Outbox {outbox_id} status update failed: {e}")
+        return 'error'
+    finally:
+        db.close()
+
+
+def dispatch_pending(batch_size: int = DISPATCH_BATCH_SIZE) -> dict:
+    """
+    Send every due outbox row (up to batch_size) with bounded concurrency.
+
+    Returns:
+        Counts per resulting status, e.g. {"sent": 3, "pending": 1}
+    """
+    if not _dispatch_lock.acquire(blocking=False):
+        logger.info("Outbox dispatch already running - skipped")
+        return {}
+
+    try:
+        db = SessionLocal()
+        try:
+            claimed = _claim_due_rows(db, batch_size)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Outbox claim failed: {e}")
+            return {}
+        finally:
+            db.close()
+
+        if not claimed:
+            return {}
+
+        summary = {}
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SENDS) as executor:
+            for result in executor.map(_send_one, claimed):
+                summary[result] = summary.get(result, 0) + 1
+
+        logger.info(f"Outbox dispatch: {len(claimed)} message(s) processed {summary}")
+        return summary
+    finally:
+        _dispatch_lock.release()
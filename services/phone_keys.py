@@ -0,0 +1,157 @@
+# services/phone_keys.py
+
+"""
+Normalized Phone Keys
+=====================
+
+Contact numbers arrive in many shapes: the CRM stores a 10 digit ContactNo
+with the country code in ContactCountryCode, the WhatsApp webhook delivers
+"whatsapp:+919876543210", users search "+91 98765 43210" or "43210". Exact
+matches on ContactNo miss across formats and ILIKE '%num%' scans the table.
+
+Every contact carries two indexed keys derived from its number:
+
+- PhoneKey:    E.164 digits without the '+', e.g. '919876543210'
+- PhoneKeyRev: PhoneKey reversed, so "number ends with 43210" becomes the
+               prefix search PhoneKeyRev LIKE '01234%' (an index seek)
+
+The keys are set by an ORM listener on every Contact insert/update.
+Rows written outside the ORM (SQL imports from ContactTemp) are filled by
+backfill_phone_keys(), run from the scoring scheduler.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event, false, or_
+from sqlalchemy.exc import SQLAlchemyError
+from typing import List, Optional
+from models import Contact
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Country calling code assumed for national numbers without one
+DEFAULT_COUNTRY_CODE = "91"
+# Digits in a national number (without country code)
+NATIONAL_NUMBER_LENGTH = 10
+# Rows filled per batch by backfill_phone_keys()
+BACKFILL_BATCH_SIZE = 1000
+
+# Search terms made only of these characters are treated as phone numbers
+_PHONE_LIKE = re.compile(r"^\+?[\d\s\-().]+$")
+
+
+def _digits(value) -> str:
+    return re.sub(r"\D", "", str(value)) if value is not None else ""
+
+
+def normalize_phone(number, country_code: Optional[str] = None) -> Optional[str]:
+    """
+    E.164 digits for a phone number in any format.
+
+    Leading zeros (trunk or '00' international prefix) are dropped; a national
+    number gets country_code prepended ('+91', '91'; DEFAULT_COUNTRY_CODE when
+    missing or not numeric), as migration 007 does. Returns None when the
+    number has no digits.
+    """
+    digits = _digits(number).lstrip("0")
+    if not digits:
+        return None
+    if len(digits) == NATIONAL_NUMBER_LENGTH:
+        code = re.sub(r"[+\s\-]", "", country_code or "")
+        digits = (code if code.isdigit() else DEFAULT_COUNTRY_CODE) + digits
+    return digits
+
+
+def reverse_key(key: Optional[str]) -> Optional[str]:
+    return key[::-1] if key else None
+
+
+def apply_phone_keys(contact: Contact) -> None:
+    """Set PhoneKey/PhoneKeyRev from the contact's ContactNo and ContactCountryCode."""
+    contact.PhoneKey = normalize_phone(contact.ContactNo, contact.ContactCountryCode)
+    contact.PhoneKeyRev = reverse_key(contact.PhoneKey)
+
+
+@event.listens_for(Contact, "before_insert")
+@event.listens_for(Contact, "before_update")
+def _set_phone_keys(mapper, connection, contact):
+    apply_phone_keys(contact)
+
+
+def phone_equals(number, country_code: Optional[str] = None, contact=Contact):
+    """Exact match on the normalized number (contact may be an alias of Contact)."""
+    key = normalize_phone(number, country_code)
+    return contact.PhoneKey == key if key else false()
+
+
+def phone_ends_with(term, contact=Contact):
+    """
+    Numbers ending with the digits of term, as a prefix search on PhoneKeyRev.
+
+    Terms that are not phone-like (names, emails) match nothing, so this can be
+    OR-ed into free text searches.
+    """
+    return reversed_key_ends_with(contact.PhoneKeyRev, term)
+
+
+def reversed_key_ends_with(reversed_key_column, term):
+    """phone_ends_with() against any column holding a reversed PhoneKey."""
+    term = str(term).strip() if term is not None else ""
+    digits = _digits(term).lstrip("0")
+    if not digits or not _PHONE_LIKE.match(term):
+        return false()
+    return reversed_key_column.like(reverse_key(digits) + "%")
+
+
+def find_contact_by_phone(db: Session, number, country_code: Optional[str] = None) -> Optional[Contact]:
+    """Oldest contact with this number, or None."""
+    return db.query(Contact).filter(
+        phone_equals(number, country_code)
+    ).order_by(Contact.ContactId).first()
+
+
+def find_duplicate_contacts(
+    db: Session,
+    number,
+    country_code: Optional[str] = None,
+    exclude_contact_id: Optional[int] = None,
+) -> List[Contact]:
+    """Contacts already holding this number (in any format), oldest first."""
+    query = db.query(Contact).filter(phone_equals(number, country_code))
+    if exclude_contact_id is not None:
+        query = query.filter(Contact.ContactId != exclude_contact_id)
+    return query.order_by(Contact.ContactId).all()
+
+
+def backfill_phone_keys(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Fill PhoneKey/PhoneKeyRev for contacts that have a number but no key.
+
+    Returns:
+        Number of contacts updated (0 on error - the next run retries)
+    """
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            contacts = db.query(Contact).filter(
+                Contact.ContactId > last_id,
+                Contact.ContactNo > 0,
+                or_(Contact.PhoneKey.is_(None), Contact.PhoneKeyRev.is_(None)),
+            ).order_by(Contact.ContactId).limit(batch_size).all()
+            if not contacts:
+                break
+            for contact in contacts:
+                apply_phone_keys(contact)
+            db.commit()
+            updated += len(contacts)
+            last_id = contacts[-1].ContactId
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Phone key backfill failed after {updated} contact(s): {e}")
+        return 0
+
+    if updated:
+        logger.info(f"Phone keys backfilled for {updated} contact(s)")
+    return updated
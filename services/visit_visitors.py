@@ -0,0 +1,259 @@
+# services/visit_visitors.py
+
+"""
+Primary Visitor Summary
+=======================
+
+Keeps the VisitPrimaryVisitor and VisitVisitorKey tables in sync with
+Visitors and contact.
+
+VisitPrimaryVisitor holds, for one visit with at least one visitor that is
+not deleted, the primary visitor - the earliest created one, shown as
+VisitorName / VisitorContactId / VisitorContactType / VisitorContactNo on
+/visit/Visit_full_details - and the number of visitors. The visit list and
+its export join it one-to-one on VisitId instead of loading every visitor of
+the page and keeping the first in Python.
+
+VisitVisitorKey holds every customer and broker visitor (not deleted) of a
+visit with full name and reversed phone key (see services/phone_keys.py).
+The customer and broker name / number filters read it, so a visit is found
+by any of its attendees.
+
+Visitor and contact writes refresh the visits they touch; the scoring
+scheduler reconciles every row after each run. Rows are merged by key, never
+deleted and reinserted wholesale: the full refresh walks the visited visits
+in VisitId order, REFRESH_BATCH_SIZE at a time, and per chunk inserts new
+rows, updates only the rows whose values changed and deletes the rows of
+visitors and visits that are gone, in a short transaction of its own.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+from models import Visitors, Contact, VisitPrimaryVisitor, VisitVisitorKey
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Visits merged per chunk / transaction (keeps IN lists, batches and locks bounded)
+REFRESH_BATCH_SIZE = 1000
+
+# Merges of one chunk before giving up on concurrent inserts of the same visits
+MAX_MERGE_ATTEMPTS = 3
+
+# Columns compared to tell whether a row changed (UpdatedDate always does)
+_SUMMARY_COLUMNS = ("VisitorsId", "ContactId", "VisitorName", "ContactType", "ContactNo", "LeadId", "VisitorCount")
+_KEY_COLUMNS = ("ContactType", "Name", "PhoneKeyRev")
+
+# Stale composite keys deleted per statement (two parameters each; SQL Server allows 2100)
+DELETE_BATCH_SIZE = 500
+
+# Set once the summary is known to be populated (avoids a probe per request)
+_summary_ready = False
+
+
+def _full_name(first: Optional[str], last: Optional[str]) -> Optional[str]:
+    return " ".join(part for part in (first, last) if part) or None
+
+
+def _clip(value: Optional[str], length: int) -> Optional[str]:
+    return value[:length] if value else value
+
+
+def _clean_ids(ids: Optional[Iterable[Optional[int]]]):
+    if ids is None:
+        return None
+    return {item_id for item_id in ids if item_id is not None}
+
+
+def _build_rows(db: Session, visit_ids):
+    """
+    Summary and filter key rows for the given visits, from their visitors
+    that are not deleted.
+
+    Returns:
+        (VisitPrimaryVisitor rows, VisitVisitorKey rows)
+    """
+    visitors = db.query(
+        Visitors.VisitId, Visitors.VisitorsId, Visitors.ContactId, Visitors.LeadId,
+        Contact.ContactId.label('ContactFound'), Contact.ContactFName, Contact.ContactLName,
+        Contact.ContactType, Contact.ContactNo, Contact.PhoneKeyRev,
+    ).outerjoin(Contact, Contact.ContactId == Visitors.ContactId).filter(
+        Visitors.VisitId.in_(visit_ids),
+        or_(Visitors.IsDeleted != "Yes", Visitors.IsDeleted.is_(None)),
+    ).order_by(Visitors.VisitId, Visitors.CreatedDate, Visitors.VisitorsId).all()
+
+    now = datetime.now()
+    rows = {}
+    keys = []
+    for visitor in visitors:
+        name = _clip(_full_name(visitor.ContactFName, visitor.ContactLName), 512)
+        row = rows.get(visitor.VisitId)
+        if row is None:
+            # Earliest created visitor of the visit
+            row = rows[visitor.VisitId] = {
+                "VisitId": visitor.VisitId,
+                "VisitorsId": visitor.VisitorsId,
+                "ContactId": visitor.ContactId,
+                "VisitorName": (name or "") if visitor.ContactFound else "Unknown Visitor",
+                "ContactType": _clip(visitor.ContactType, 50),
+                "ContactNo": visitor.ContactNo,
+                "LeadId": visitor.LeadId,
+                "VisitorCount": 0,
+                "UpdatedDate": now,
+            }
+        row["VisitorCount"] += 1
+        if visitor.ContactType in ('Customer', 'Broker'):
+            keys.append({
+                "VisitId": visitor.VisitId,
+                "VisitorsId": visitor.VisitorsId,
+                "ContactType": visitor.ContactType,
+                "Name": name,
+                "PhoneKeyRev": visitor.PhoneKeyRev,
+            })
+    return list(rows.values()), keys
+
+
+def _merge_rows(db: Session, model, key_names, compared, rows, scope) -> Tuple[int, int, int]:
+    """
+    Make the rows of model matching scope equal to rows (matched on
+    key_names): insert new rows, update changed ones, delete the rest.
+
+    Returns:
+        (inserted, updated, deleted)
+    """
+    key_columns = [getattr(model, name) for name in key_names]
+    existing = {
+        tuple(getattr(row, name) for name in key_names): row
+        for row in db.query(*key_columns, *(getattr(model, name) for name in compared)).filter(scope).all()
+    }
+    inserts = []
+    updates = []
+    for row in rows:
+        current = existing.pop(tuple(row[name] for name in key_names), None)
+        if current is None:
+            inserts.append(row)
+        elif any(getattr(current, name) != row[name] for name in compared):
+            updates.append(row)
+
+    # A composite key has no single-column IN: OR the keys, a bounded batch at a time
+    stale = list(existing)
+    for start in range(0, len(stale), DELETE_BATCH_SIZE):
+        batch = stale[start:start + DELETE_BATCH_SIZE]
+        db.query(model).filter(or_(*(
+            and_(*(column == value for column, value in zip(key_columns, key))) for key in batch
+        ))).delete(synchronize_session=False)
+    if updates:
+        db.bulk_update_mappings(model, updates)
+    if inserts:
+        db.bulk_insert_mappings(model, inserts)
+    return len(inserts), len(updates), len(stale)
+
+
+def _merge_chunk(db: Session, visit_ids, summary_scope, key_scope) -> int:
+    """
+    Merge both tables for visit_ids over the scopes in one transaction,
+    retrying insert collisions.
+
+    Returns:
+        Number of summary rows written (inserted or updated)
+    """
+    for attempt in range(1, MAX_MERGE_ATTEMPTS + 1):
+        try:
+            rows, keys = _build_rows(db, visit_ids) if visit_ids else ([], [])
+            inserted, updated, _ = _merge_rows(
+                db, VisitPrimaryVisitor, ("VisitId",), _SUMMARY_COLUMNS, rows, summary_scope
+            )
+            _merge_rows(db, VisitVisitorKey, ("VisitId", "VisitorsId"), _KEY_COLUMNS, keys, key_scope)
+            db.commit()
+            return inserted + updated
+        except IntegrityError:
+            # A concurrent refresh inserted rows of these visits first: merge again
+            db.rollback()
+            if attempt == MAX_MERGE_ATTEMPTS:
+                raise
+
+
+def refresh_visit_visitors(
+    db: Session,
+    visit_ids: Optional[Iterable[Optional[int]]] = None,
+    contact_ids: Optional[Iterable[Optional[int]]] = None,
+) -> bool:
+    """
+    Recompute summary rows for the given visits, plus the visits the given
+    contacts attended. Every row is reconciled when both are None.
+
+    Merges REFRESH_BATCH_SIZE visits per transaction; visits left without
+    visitors lose their row. Failures are logged and rolled back - the
+    scheduler's full refresh reconciles any missed update.
+
+    Returns:
+        True if the summary was refreshed, False on error
+    """
+    global _summary_ready
+
+    full = visit_ids is None and contact_ids is None
+    written = 0
+    try:
+        if full:
+            # Keyset walk: each chunk also covers the gap before its first visit,
+            # and the last (empty) chunk the rows past the highest visit
+            last_id = None
+            while True:
+                chunk_query = db.query(Visitors.VisitId).filter(Visitors.VisitId.isnot(None))
+                summary_scope = VisitPrimaryVisitor.VisitId.isnot(None)
+                key_scope = VisitVisitorKey.VisitId.isnot(None)
+                if last_id is not None:
+                    chunk_query = chunk_query.filter(Visitors.VisitId > last_id)
+                    summary_scope = VisitPrimaryVisitor.VisitId > last_id
+                    key_scope = VisitVisitorKey.VisitId > last_id
+                chunk = [
+                    visit_id for visit_id, in
+                    chunk_query.distinct().order_by(Visitors.VisitId).limit(REFRESH_BATCH_SIZE).all()
+                ]
+                if chunk:
+                    summary_scope = summary_scope & (VisitPrimaryVisitor.VisitId <= chunk[-1])
+                    key_scope = key_scope & (VisitVisitorKey.VisitId <= chunk[-1])
+                written += _merge_chunk(db, chunk, summary_scope, key_scope)
+                if not chunk:
+                    break
+                last_id = chunk[-1]
+            _summary_ready = True
+            logger.info(f"Visit visitor summary reconciled: {written} visits written")
+            return True
+
+        visit_ids = _clean_ids(visit_ids) or set()
+        contact_ids = _clean_ids(contact_ids)
+        if contact_ids:
+            visit_ids.update(
+                visit_id for visit_id, in db.query(Visitors.VisitId).filter(Visitors.ContactId.in_(contact_ids)).all()
+            )
+        visit_ids = sorted(visit_id for visit_id in visit_ids if visit_id is not None)
+        if not visit_ids:
+            return True
+
+        for start in range(0, len(visit_ids), REFRESH_BATCH_SIZE):
+            batch = visit_ids[start:start + REFRESH_BATCH_SIZE]
+            _merge_chunk(db, batch, VisitPrimaryVisitor.VisitId.in_(batch), VisitVisitorKey.VisitId.in_(batch))
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Visit visitor summary refresh failed "
+                       f"({'ALL' if full else f'{len(visit_ids or [])} visits'}): {e}")
+        return False
+    return True
+
+
+def ensure_visit_visitors(db: Session) -> None:
+    """
+    Populate the summary on first use if the scheduler has not run yet.
+    """
+    global _summary_ready
+    if _summary_ready:
+        return
+    if db.query(VisitPrimaryVisitor.VisitId).first() is None or db.query(VisitVisitorKey.VisitId).first() is None:
+        # Marks the summary ready on success; a failed refresh is retried next call
+        refresh_visit_visitors(db)
+        return
+    _summary_ready = True
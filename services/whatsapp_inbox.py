@@ -0,0 +1,306 @@
+# services/whatsapp_inbox.py
+
+"""
+WhatsApp Inbound Queue
+======================
+
+Takes the chatbot pipeline (context, intent detection, intent handlers, Groq
+response, Twilio reply) off the webhook request.
+
+enqueue_inbound() stores the message in WhatsAppInboundMessage, skipping
+MessageSids that are already stored (Twilio retries a webhook that answers
+slowly), so the webhook can return 200 immediately. process_pending() runs the
+registered message processor on a bounded worker pool and sends the replies:
+
+- at most one message per phone number is in flight, and a phone's messages
+  are handled in ReceivedAt order - a conversation never sees its second
+  message before its first
+- the reply text is stored before it is sent, so a failed send is retried
+  without running the LLM again
+- the pipeline runs on a session of its own, and every commit it makes also
+  sets ProcessorCommittedAt on the message in the same transaction. A
+  pipeline that fails after committing (a lead or visit was created) is not
+  run again: the message is marked failed instead of duplicating records.
+  One that fails before committing anything left no trace and is retried
+- failures are retried with exponential backoff up to MAX_ATTEMPTS, then the
+  message is marked failed
+
+The chatbot registers its pipeline with set_message_processor() when it is
+imported; the scheduler only polls the queue when a pipeline is registered,
+and without one process_pending() leaves the queue untouched.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event, or_, and_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from database import SessionLocal
+from models import WhatsAppInboundMessage
+from services.integration_clients import get_twilio_client
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Conversations (phone numbers) processed in parallel
+MAX_CONCURRENT_CONVERSATIONS = int(os.getenv("WA_INBOX_MAX_CONCURRENT", "4"))
+# Messages claimed per round (at most one per phone)
+CLAIM_BATCH_SIZE = 20
+# Rounds per process_pending() call, so one call cannot run forever
+MAX_ROUNDS = 25
+# Attempts before a message is marked failed
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 15
+RETRY_MAX_SECONDS = 10 * 60
+# A message left in 'processing' this long (worker died) is picked up again
+STALE_PROCESSING_SECONDS = 5 * 60
+
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
+
+# (db, phone_number, message_text, profile_name) -> reply text
+MessageProcessorFn = Callable[[Session, str, str, str], str]
+
+_processor: Optional[MessageProcessorFn] = None
+_process_lock = threading.Lock()
+
+
+def set_message_processor(processor: Optional[MessageProcessorFn]) -> None:
+    """Register the chatbot pipeline run for each queued message."""
+    global _processor
+    _processor = processor
+
+
+def has_message_processor() -> bool:
+    return _processor is not None
+
+
+def enqueue_inbound(
+    db: Session,
+    message_sid: str,
+    phone_number: str,
+    body: Optional[str],
+    profile_name: Optional[str] = None,
+) -> bool:
+    """
+    Queue one inbound message.
+
+    Returns:
+        True if the message was queued, False if its MessageSid was already stored
+    """
+    if db.query(WhatsAppInboundMessage.InboundId).filter(
+        WhatsAppInboundMessage.MessageSid == message_sid
+    ).first() is not None:
+        return False
+
+    now = datetime.now()
+    db.add(WhatsAppInboundMessage(
+        MessageSid=message_sid,
+        PhoneNumber=phone_number,
+        ProfileName=profile_name,
+        Body=body,
+        Status='pending',
+        Attempts=0,
+        NextAttemptAt=now,
+        ReceivedAt=now,
+        UpdatedAt=now,
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry of the same webhook stored it first
+        db.rollback()
+        return False
+    return True
+
+
+class _NotReplayed(Exception):
+    def __init__(self):
+        super().__init__("pipeline committed changes on an earlier attempt; not run again")
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def _claim_next_per_phone(db: Session, limit: int) -> List[int]:
+    """
+    Claim the oldest open message of up to `limit` phone numbers.
+
+    A phone is skipped while its oldest open message is being processed or
+    waiting for a retry, so later messages never overtake it.
+    """
+    now = datetime.now()
+    stale_before = now - timedelta(seconds=STALE_PROCESSING_SECONDS)
+    open_rows = db.query(
+        WhatsAppInboundMessage.InboundId,
+        WhatsAppInboundMessage.PhoneNumber,
+        WhatsAppInboundMessage.Status,
+        WhatsAppInboundMessage.NextAttemptAt,
+        WhatsAppInboundMessage.UpdatedAt,
+    ).filter(
+        WhatsAppInboundMessage.Status.in_(('pending', 'processing'))
+    ).order_by(WhatsAppInboundMessage.ReceivedAt, WhatsAppInboundMessage.InboundId).all()
+
+    is_due = or_(
+        and_(WhatsAppInboundMessage.Status == 'pending', WhatsAppInboundMessage.NextAttemptAt <= now),
+        and_(WhatsAppInboundMessage.Status == 'processing', WhatsAppInboundMessage.UpdatedAt <= stale_before),
+    )
+
+    seen_phones = set()
+    claimed = []
+    for row in open_rows:
+        if row.PhoneNumber in seen_phones:
+            continue
+        seen_phones.add(row.PhoneNumber)
+
+        due = (row.Status == 'pending' and (row.NextAttemptAt is None or row.NextAttemptAt <= now)) or \
+              (row.Status == 'processing' and row.UpdatedAt is not None and row.UpdatedAt <= stale_before)
+        if not due:
+            continue
+
+        # Conditional update so another app instance cannot claim the same row
+        updated = db.query(WhatsAppInboundMessage).filter(
+            WhatsAppInboundMessage.InboundId == row.InboundId, is_due
+        ).update({"Status": 'processing', "UpdatedAt": now}, synchronize_session=False)
+        if updated:
+            claimed.append(row.InboundId)
+        if len(claimed) >= limit:
+            break
+    db.commit()
+    return claimed
+
+
+def _run_processor(row: WhatsAppInboundMessage, processor: MessageProcessorFn) -> None:
+    """
+    Run the pipeline for one message on a session of its own and store the
+    reply with its final commit.
+
+    Every commit of that session - the pipeline's own and the final one -
+    also sets ProcessorCommittedAt on the message, in the same transaction.
+    """
+    inbound_id = row.InboundId
+    work = SessionLocal()
+
+    @event.listens_for(work, "before_commit")
+    def _mark_committed(session):
+        session.execute(update(WhatsAppInboundMessage).where(
+            WhatsAppInboundMessage.InboundId == inbound_id
+        ).values(ProcessorCommittedAt=datetime.now()))
+
+    try:
+        reply = processor(work, row.PhoneNumber, row.Body or "", row.ProfileName or "WhatsApp User")
+        work.execute(update(WhatsAppInboundMessage).where(
+            WhatsAppInboundMessage.InboundId == inbound_id
+        ).values(ReplyText=reply, UpdatedAt=datetime.now()))
+        work.commit()
+    except Exception:
+        work.rollback()
+        raise
+    finally:
+        work.close()
+
+
+def _handle_one(inbound_id: int, processor: MessageProcessorFn) -> str:
+    """Run the pipeline for one claimed message and send the reply."""
+    db = SessionLocal()
+    try:
+        row = db.query(WhatsAppInboundMessage).filter(WhatsAppInboundMessage.InboundId == inbound_id).first()
+        if row is None:
+            return 'missing'
+
+        # Committed before the pipeline runs: the pipeline's session updates this row too
+        attempts = (row.Attempts or 0) + 1
+        row.Attempts = attempts
+        row.UpdatedAt = datetime.now()
+        db.commit()
+        try:
+            if row.ReplyText is None:
+                if row.ProcessorCommittedAt is not None:
+                    raise _NotReplayed()
+                _run_processor(row, processor)
+                # The reply was stored by the pipeline's session; reload the row
+                db.expire(row)
+
+            to_number = row.PhoneNumber if row.PhoneNumber.startswith("whatsapp:") else f"whatsapp:{row.PhoneNumber}"
+            message = get_twilio_client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN).messages.create(
+                from_=TWILIO_WHATSAPP_NUMBER,
+                to=to_number,
+                body=row.ReplyText
+            )
+            row.Status = 'replied'
+            row.ReplyMessageSid = message.sid
+            row.ProcessedAt = datetime.now()
+            row.LastError = None
+        except Exception as e:
+            db.rollback()
+            row.LastError = str(e)[:500]
+            if row.ReplyText is None and row.ProcessorCommittedAt is not None:
+                # The pipeline committed changes before failing: running it again would repeat them
+                row.Status = 'failed'
+                logger.error(f"Inbound {inbound_id} from {row.PhoneNumber} failed after its pipeline "
+                             f"committed changes, not retried: {e}")
+            elif row.Attempts >= MAX_ATTEMPTS:
+                row.Status = 'failed'
+                logger.error(f"Inbound {inbound_id} from {row.PhoneNumber} failed after {row.Attempts} attempt(s): {e}")
+            else:
+                row.Status = 'pending'
+                row.NextAttemptAt = datetime.now() + _retry_delay(row.Attempts)
+                logger.warning(f"Inbound {inbound_id} from {row.PhoneNumber} attempt {row.Attempts} failed, retrying at {row.NextAttemptAt}: {e}")
+
+        row.UpdatedAt = datetime.now()
+        db.commit()
+        return row.Status
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Inbound {inbound_id} status update failed: {e}")
+        return 'error'
+    finally:
+        db.close()
+
+
+def process_pending(batch_size: int = CLAIM_BATCH_SIZE) -> dict:
+    """
+    Process queued messages until none is due (or MAX_ROUNDS is reached).
+
+    Each round claims the next message of up to batch_size phones and runs them
+    on the worker pool; a phone's next message is only claimed in a later round.
+
+    Returns:
+        Counts per resulting status, e.g. {"replied": 4, "pending": 1}
+    """
+    processor = _processor
+    if processor is None:
+        return {}
+    if not _process_lock.acquire(blocking=False):
+        logger.info("WhatsApp inbox processing already running - skipped")
+        return {}
+
+    try:
+        summary = {}
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CONVERSATIONS) as executor:
+            for _ in range(MAX_ROUNDS):
+                db = SessionLocal()
+                try:
+                    claimed = _claim_next_per_phone(db, batch_size)
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    logger.error(f"WhatsApp inbox claim failed: {e}")
+                    break
+                finally:
+                    db.close()
+
+                if not claimed:
+                    break
+                for result in executor.map(lambda inbound_id: _handle_one(inbound_id, processor), claimed):
+                    summary[result] = summary.get(result, 0) + 1
+
+        if summary:
+            logger.info(f"WhatsApp inbox: {sum(summary.values())} message(s) processed {summary}")
+        return summary
+    finally:
+        _process_lock.release()
@@ -2,15 +2,17 @@
 
 # import os
 # from dotenv import load_dotenv
-# from fastapi import FastAPI, Request, Depends, HTTPException
+# from fastapi import FastAPI, Request, Depends, HTTPException, BackgroundTasks
 # from sqlalchemy.orm import Session
 # from datetime import datetime
 # from twilio.rest import Client
 # from models import Contact, Lead
 # from database import SessionLocal
 # from services.groq_client import GroqClient
+# from services.intent_classifier import get_stats as intent_stats
 # from services.context_manager import ConversationContext
 # from services.intent_handlers import IntentHandler
+# from services.whatsapp_inbox import enqueue_inbound, process_pending, set_message_processor
 # from schemas.schemas import WhatsAppConversationStats, WhatsAppConversationResponse
 # from typing import Dict, List
 # import logging
@@ -229,56 +231,51 @@
 #             logger.error(f"Error processing message: {e}", exc_info=True)
 #             return "I apologize, but I'm having trouble processing your request. Let me connect you with our team."
 
+# # Queued webhook messages are run through the same pipeline by services/whatsapp_inbox.py
+# set_message_processor(
+#     lambda db, phone_number, message_text, profile_name:
+#         MessageProcessor(db).process_message(phone_number, message_text, profile_name)
+# )
+
 # # ----------------------
 # # WhatsApp Webhook
 # # ----------------------
 # @router.post("/webhook/whatsapp")
-# async def whatsapp_webhook(request: Request, db: Session = Depends(get_db)):
-#     """
-#     Enhanced WhatsApp webhook with Groq AI integration.
-#     Uses SQL Server for conversation history (no Redis required).
+# async def whatsapp_webhook(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
 #     """
+#     WhatsApp webhook - queues the message and returns at once.
 
-#     try:
-#         form = await request.form()
-#         from_number = form.get("From")
-#         message_text = form.get("Body")
-#         profile_name = form.get("ProfileName", "WhatsApp User")
-
-#         if not from_number or not message_text:
-#             raise HTTPException(
-#                 status_code=400,
-#                 detail="Invalid WhatsApp message payload"
-#             )
+#     The AI pipeline and the Twilio reply run in services/whatsapp_inbox.py,
+#     so a slow Groq call can no longer time out the webhook. Twilio retries of
+#     the same message (same MessageSid) are acknowledged but not queued again.
+#     """
 
-#         # Process message through AI pipeline
-#         processor = MessageProcessor(db)
-#         response_text = processor.process_message(
-#             phone_number=from_number,
-#             message_text=message_text,
-#             profile_name=profile_name
-#         )
+#     form = await request.form()
+#     message_sid = form.get("MessageSid")
+#     from_number = form.get("From")
+#     message_text = form.get("Body")
+#     profile_name = form.get("ProfileName", "WhatsApp User")
 
-#         # Send response via Twilio
-#         twilio_client.messages.create(
-#             from_=TWILIO_WHATSAPP_NUMBER,
-#             to=from_number,
-#             body=response_text
+#     if not message_sid or not from_number or not message_text:
+#         raise HTTPException(
+#             status_code=400,
+#             detail="Invalid WhatsApp message payload"
 #         )
 
-#         return {
-#             "status": "success",
-#             "message": "Response sent",
-#             "intent_detected": True
-#         }
-
-#     except HTTPException:
-#         # Re-raise HTTPException without modification to preserve status code
-#         raise
+#     try:
+#         queued = enqueue_inbound(db, message_sid, from_number, message_text, profile_name)
 #     except Exception as e:
 #         logger.error(f"Webhook error: {e}", exc_info=True)
 #         raise HTTPException(status_code=500, detail=str(e))
 
+#     if queued:
+#         background_tasks.add_task(process_pending)
+
+#     return {
+#         "status": "queued" if queued else "duplicate",
+#         "message_sid": message_sid
+#     }
+
 # # ----------------------
 # # Health Check & Status
 # # ----------------------
@@ -308,7 +305,8 @@
 #         "status": "healthy" if db_status == "connected" else "unhealthy",
 #         "database": db_status,
 #         "groq_model": os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
-#         "twilio_configured": bool(TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN)
+#         "twilio_configured": bool(TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN),
+#         "intent_fast_path": intent_stats()
 #     }
 
 # @router.get("/conversations/stats", response_model=WhatsAppConversationStats)